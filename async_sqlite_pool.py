@@ -0,0 +1,253 @@
+#!/usr/bin/env python3
+"""
+🗄️ ASYNC SQLITE CONNECTION POOL
+Shared aiosqlite connection pool for the stable_* services
+- Connections are opened once with prepared pragmas (WAL, busy_timeout) and reused
+- No thread spawn / file reopen per query
+- Open transactions are rolled back before a connection goes back to the pool
+
+Benchmark (connect-per-query vs pool):
+    python3 async_sqlite_pool.py bench --queries 5000 --concurrency 20
+"""
+import argparse
+import asyncio
+import logging
+import os
+import sqlite3
+import time
+from contextlib import asynccontextmanager
+from typing import Dict, List, Optional, Tuple
+
+import aiosqlite
+
+logger = logging.getLogger(__name__)
+
+# Her yeni bağlantıda bir kez çalıştırılır
+DEFAULT_PRAGMAS: List[Tuple[str, str]] = [
+    ("journal_mode", "WAL"),
+    ("synchronous", "NORMAL"),
+    ("busy_timeout", "30000"),
+    ("temp_store", "MEMORY"),
+    ("cache_size", "-16000"),
+]
+
+
+class AsyncSQLitePool:
+    """Fixed-size aiosqlite connection pool (lazy open, LIFO reuse)"""
+
+    def __init__(self, db_path: str, size: int = 4, pragmas: Optional[List[Tuple[str, str]]] = None,
+                 acquire_timeout: float = 30.0):
+        self.db_path = db_path
+        self.size = max(1, size)
+        self.pragmas = DEFAULT_PRAGMAS if pragmas is None else pragmas
+        self.acquire_timeout = acquire_timeout
+        self._idle: List[aiosqlite.Connection] = []
+        self._available: Optional[asyncio.Condition] = None
+        self._created = 0
+        self._closed = False
+        self.stats = {'acquired': 0, 'opened': 0, 'discarded': 0, 'waited': 0, 'wait_time': 0.0}
+
+    def _condition(self) -> asyncio.Condition:
+        # Event loop'a ilk kullanımda bağlan (modül import edilirken loop yok)
+        if self._available is None:
+            self._available = asyncio.Condition()
+        return self._available
+
+    async def _open(self) -> aiosqlite.Connection:
+        db = await aiosqlite.connect(self.db_path, timeout=30.0)
+        try:
+            for name, value in self.pragmas:
+                await db.execute(f"PRAGMA {name}={value}")
+        except Exception:
+            await db.close()
+            raise
+        self.stats['opened'] += 1
+        return db
+
+    async def _acquire(self) -> aiosqlite.Connection:
+        if self._closed:
+            raise RuntimeError("Connection pool is closed")
+        condition = self._condition()
+        started = time.monotonic()
+        waited = False
+        async with condition:
+            while not self._idle and self._created >= self.size:
+                waited = True
+                remaining = self.acquire_timeout - (time.monotonic() - started)
+                if remaining <= 0:
+                    raise asyncio.TimeoutError(f"No SQLite connection available within {self.acquire_timeout}s")
+                try:
+                    await asyncio.wait_for(condition.wait(), remaining)
+                except asyncio.TimeoutError:
+                    continue
+            if self._idle:
+                db = self._idle.pop()
+            else:
+                self._created += 1
+                db = None
+
+        if db is None:
+            try:
+                db = await self._open()
+            except Exception:
+                await self._forget()
+                raise
+
+        self.stats['acquired'] += 1
+        if waited:
+            self.stats['waited'] += 1
+            self.stats['wait_time'] += time.monotonic() - started
+        return db
+
+    async def _forget(self):
+        """Bozuk/kapatılmış bağlantının yerini boşalt"""
+        async with self._condition():
+            self._created -= 1
+            self._condition().notify()
+
+    async def _release(self, db: aiosqlite.Connection, failed: bool):
+        try:
+            if db.in_transaction:
+                if not failed:
+                    logger.warning("⚠️ Connection returned to pool with an open transaction - rolling back")
+                await db.rollback()
+        except Exception as e:
+            logger.error(f"❌ Discarding pooled SQLite connection: {e}")
+            self.stats['discarded'] += 1
+            try:
+                await db.close()
+            finally:
+                await self._forget()
+            return
+
+        if self._closed:
+            await db.close()
+            await self._forget()
+            return
+
+        async with self._condition():
+            self._idle.append(db)
+            self._condition().notify()
+
+    @asynccontextmanager
+    async def connection(self):
+        """`async with pool.connection() as db:` - aiosqlite.connect() yerine"""
+        db = await self._acquire()
+        failed = False
+        try:
+            yield db
+        except BaseException:
+            failed = True
+            raise
+        finally:
+            await self._release(db, failed)
+
+    async def close(self):
+        """Boştaki tüm bağlantıları kapat; kullanımdakiler iade edilince kapanır"""
+        self._closed = True
+        idle, self._idle = self._idle, []
+        for db in idle:
+            try:
+                await db.close()
+            except Exception as e:
+                logger.error(f"❌ Error closing pooled connection: {e}")
+            self._created -= 1
+        logger.info(f"🗄️ SQLite pool closed ({self.db_path}) stats={self.get_stats()}")
+
+    def get_stats(self) -> Dict:
+        stats = dict(self.stats)
+        stats['size'] = self.size
+        stats['open'] = self._created
+        stats['idle'] = len(self._idle)
+        stats['wait_time'] = round(stats['wait_time'], 4)
+        return stats
+
+
+# ----------------------------------------------------------------------
+# Benchmark
+# ----------------------------------------------------------------------
+BENCH_QUERIES = [
+    ("SELECT leverage, trade_amount, take_profit_percent, auto_trading FROM user_settings WHERE user_id = ?", False),
+    ("UPDATE user_settings SET trade_amount = trade_amount WHERE user_id = ?", True),
+]
+
+
+def _prepare_bench_db(path: str, users: int):
+    for suffix in ('', '-wal', '-shm'):
+        if os.path.exists(path + suffix):
+            os.remove(path + suffix)
+    conn = sqlite3.connect(path)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("""
+        CREATE TABLE user_settings (
+            user_id INTEGER PRIMARY KEY,
+            leverage INTEGER DEFAULT 125,
+            trade_amount REAL DEFAULT 50.0,
+            take_profit_percent REAL DEFAULT 10.0,
+            auto_trading BOOLEAN DEFAULT true
+        )
+    """)
+    conn.executemany("INSERT INTO user_settings (user_id) VALUES (?)", [(i,) for i in range(users)])
+    conn.commit()
+    conn.close()
+
+
+async def _run_queries(get_connection, queries: int, concurrency: int, users: int) -> float:
+    counter = iter(range(queries))
+
+    async def worker():
+        for i in counter:
+            sql, is_write = BENCH_QUERIES[1] if i % 10 == 0 else BENCH_QUERIES[0]
+            async with get_connection() as db:
+                cursor = await db.execute(sql, (i % users,))
+                if is_write:
+                    await db.commit()
+                else:
+                    await cursor.fetchone()
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return time.perf_counter() - started
+
+
+async def benchmark(queries: int, concurrency: int, pool_size: int, path: str = "async_pool_bench.db"):
+    """Aynı iş yükü: her sorguda aiosqlite.connect() vs paylaşılan pool (%10 write)"""
+    users = 1000
+    _prepare_bench_db(path, users)
+
+    elapsed_connect = await _run_queries(lambda: aiosqlite.connect(path), queries, concurrency, users)
+
+    pool = AsyncSQLitePool(path, size=pool_size)
+    elapsed_pool = await _run_queries(pool.connection, queries, concurrency, users)
+    stats = pool.get_stats()
+    await pool.close()
+
+    for suffix in ('', '-wal', '-shm'):
+        if os.path.exists(path + suffix):
+            os.remove(path + suffix)
+
+    print(f"🏁 {queries} queries, concurrency {concurrency}, pool size {pool_size}")
+    print(f"{'MODE':<20}{'SECONDS':>10}{'QUERIES/S':>12}")
+    print(f"{'connect-per-query':<20}{elapsed_connect:>10.2f}{queries / elapsed_connect:>12.0f}")
+    print(f"{'pool':<20}{elapsed_pool:>10.2f}{queries / elapsed_pool:>12.0f}")
+    print(f"📈 Speedup: {elapsed_connect / elapsed_pool:.1f}x")
+    print(f"🗄️ Pool stats: {stats}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Async SQLite pool")
+    sub = parser.add_subparsers(dest='command')
+    bench = sub.add_parser('bench', help="connect-per-query vs pool throughput")
+    bench.add_argument('--queries', type=int, default=5000)
+    bench.add_argument('--concurrency', type=int, default=20)
+    bench.add_argument('--pool-size', type=int, default=4)
+    args = parser.parse_args()
+
+    if args.command == 'bench':
+        asyncio.run(benchmark(args.queries, args.concurrency, args.pool_size))
+    else:
+        parser.print_help()
+
+
+if __name__ == "__main__":
+    main()
@@ -5,6 +5,7 @@ Gelişmiş Telegram Bot - Kripto Ticaret Yönetim Sistemi
 Kullanıcı kaydı, API yönetimi, ticaret ayarları ve canlı bildirimler
 """
 import os
+import sys
 import json
 import sqlite3
 import asyncio
@@ -19,6 +20,13 @@ from cryptography.hazmat.primitives import hashes
 from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2HMAC
 from notification_config import notification_config
 
+sys.path.append(os.path.join(os.path.dirname(os.path.realpath(__file__)), '..', 'production', 'core'))
+from db_indexes import ensure_hot_query_indexes
+from telegram_notifier import TelegramNotifier
+from emergency_stop import emergency_stop_executor, format_summary
+from bitget_client import BitgetCredentials
+from portfolio_snapshot import PortfolioSnapshotter, format_portfolio
+
 # Telegram imports (bağımlılık kontrolü)
 try:
     from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup, ReplyKeyboardMarkup, KeyboardButton
@@ -231,6 +239,9 @@ class TradingBotDatabase:
         ''')
         
         conn.commit()
+        
+        # mass_trade_all_users join'i için index'ler
+        ensure_hot_query_indexes(conn)
         conn.close()
         print("🗄️ Veritabanı başarıyla başlatıldı")
     
@@ -443,10 +454,24 @@ class AdvancedTradingBot:
         # Centralized notification configuration kullan
         self.notification_file = notification_config.telegram_notifications_file
         self.last_notification_check = 0
+        # Toplu bildirimler: paylaşılan session, rate limit'li eşzamanlı gönderim
+        self.notifier = TelegramNotifier()
+        # Portföy snapshot'ları: işlem durumu ekranı borsaya gitmeden cevaplanır
+        self.portfolio = PortfolioSnapshotter(self._load_portfolio_credentials, interval=30).start()
         print(f"🤖 Telegram Bot using centralized notification config: {self.notification_file}")
         
         # User state management - custom symbol girişi için
         self.user_states = {}
+    
+    def _load_portfolio_credentials(self) -> Dict:
+        """Snapshotter için API anahtarı yapılandırılmış aktif kullanıcılar"""
+        credentials = {}
+        for user_id in self.db.get_active_users():
+            api_keys = self.db.get_user_api_keys(user_id)
+            if api_keys and api_keys['is_configured']:
+                credentials[user_id] = BitgetCredentials(api_keys['api_key'], api_keys['secret_key'],
+                                                         api_keys['passphrase'], user_id=str(user_id))
+        return credentials
         
     async def start_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Bot başlatma komutu"""
@@ -1059,6 +1084,8 @@ Bu ayarlarla long işlemi açmak istediğinden emin misin?
             
             with open(perp_file, 'w') as f:
                 f.write(perp_symbol)
+            # Pozisyon açılınca snapshot beklemeden güncellensin
+            self.portfolio.request_refresh(user_id)
             
             # Log kaydı oluştur
             logger.info(f"Manual long triggered: {coin_symbol} by user {user_id}")
@@ -1441,6 +1468,12 @@ Bu ayarlarla {text} long işlemi açmak istediğinden emin misin?
         except Exception as e:
             trade_text = f"❌ **İşlem Durumu Hatası**\n\n{str(e)}"
         
+        # Canlı pozisyonlar: bellekteki snapshot, yoksa arka planda hemen yenilenir
+        snapshot = self.portfolio.get(user_id)
+        if snapshot is None:
+            self.portfolio.request_refresh(user_id)
+        trade_text += "\n\n" + format_portfolio(snapshot)
+        
         await query.edit_message_text(
             trade_text,
             parse_mode=ParseMode.MARKDOWN,
@@ -1491,6 +1524,7 @@ Bu ayarlarla {text} long işlemi açmak istediğinden emin misin?
                 thread.join()
             
             print(f"✅ Mass Trading tamamlandı: {symbol}")
+            self.portfolio.request_refresh()
             
         except Exception as e:
             print(f"❌ Mass Trading hatası: {e}")
@@ -1590,7 +1624,7 @@ Bu ayarlarla {text} long işlemi açmak istediğinden emin misin?
             # API anahtarlarını al ve pozisyonları kapat
             api_keys = self.db.get_user_api_keys(user_id)
             if api_keys and api_keys['is_configured']:
-                close_result = await self.close_user_positions(api_keys)
+                close_result = await self.close_user_positions(api_keys, user_id)
                 
                 if close_result['success']:
                     final_text = f"""
@@ -1661,56 +1695,24 @@ Pozisyonları manuel olarak kontrol edin.
                 ])
             )
     
-    async def close_user_positions(self, api_keys):
-        """Kullanıcının pozisyonlarını kapat"""
+    async def close_user_positions(self, api_keys, user_id: int = None):
+        """Kullanıcının pozisyonlarını kapat (süreç içi, paylaşımlı bağlantı havuzu)"""
         try:
-            import subprocess
-            
-            # PERP/long.py'deki close_all_positions fonksiyonunu kullan
-            close_script = f"""
-import sys
-import json
-sys.path.append('PERP')
-from long import close_all_positions
-
-api_key = "{api_keys['api_key']}"
-secret_key = "{api_keys['secret_key']}"
-passphrase = "{api_keys['passphrase']}"
-
-try:
-    result = close_all_positions(api_key, secret_key, passphrase)
-    if result:
-        print("CLOSE_SUCCESS:" + json.dumps(result))
-    else:
-        print("CLOSE_ERROR:No result returned")
-except Exception as e:
-    print("CLOSE_ERROR:" + str(e))
-"""
-            
-            result = subprocess.run(
-                ["python3", "-c", close_script],
-                capture_output=True,
-                text=True,
-                timeout=60
-            )
-            
-            if result.returncode == 0 and "CLOSE_SUCCESS:" in result.stdout:
-                # Parse JSON response
-                import json
-                result_json = json.loads(result.stdout.split("CLOSE_SUCCESS:")[1])
+            credentials = BitgetCredentials(api_keys['api_key'], api_keys['secret_key'],
+                                            api_keys['passphrase'], user_id=str(user_id))
+            summary = await emergency_stop_executor.run_async({user_id: credentials})
+            self.portfolio.request_refresh(user_id)
+            result = summary['per_user'][user_id]
+            if result['status'] in ('closed', 'no_position'):
                 return {
                     'success': True,
-                    'total_pnl': result_json.get('total_pnl', 0),
-                    'positions_count': result_json.get('positions_count', 0)
-                }
-            else:
-                error_msg = result.stderr or result.stdout or "Unknown error"
-                if "CLOSE_ERROR:" in result.stdout:
-                    error_msg = result.stdout.split("CLOSE_ERROR:")[1]
-                return {
-                    'success': False,
-                    'error': error_msg
+                    'total_pnl': 0,
+                    'positions_count': result['positions']
                 }
+            return {
+                'success': False,
+                'error': result['error'] or result['status']
+            }
                 
         except Exception as e:
             return {
@@ -1718,6 +1720,37 @@ except Exception as e:
                 'error': str(e)
             }
     
+    async def emergency_stop_all_users(self) -> Dict:
+        """Tüm aktif kullanıcıların pozisyonlarını aynı anda kapat (global deadline ile)"""
+        try:
+            user_ids = self.db.get_active_users()
+            credentials = {}
+            for user_id in user_ids:
+                self.db.update_user_settings(user_id, emergency_stop=True, auto_trading=False)
+                api_keys = self.db.get_user_api_keys(user_id)
+                if api_keys and api_keys['is_configured']:
+                    credentials[user_id] = BitgetCredentials(api_keys['api_key'], api_keys['secret_key'],
+                                                             api_keys['passphrase'], user_id=str(user_id))
+            
+            print(f"🚨 Toplu acil durdurma: {len(credentials)} kullanıcı")
+            summary = await emergency_stop_executor.run_async(credentials)
+            print(format_summary(summary))
+            self.portfolio.request_refresh()
+            
+            for user_id, result in summary['per_user'].items():
+                self.db.add_notification(
+                    user_id,
+                    'EMERGENCY_STOP',
+                    'Acil Durdurma',
+                    'Tüm pozisyonlar kapatıldı' if result['status'] in ('closed', 'no_position')
+                    else f"Pozisyon kapatma hatası: {result['error'] or result['status']}"
+                )
+            return summary
+            
+        except Exception as e:
+            print(f"❌ Toplu acil durdurma hatası: {e}")
+            return {}
+    
     async def broadcast_trade_notification(self, user_id: int, action: str, coin_symbol: str, 
                                          amount: float, price: float, trade_id: int):
         """İşlem bildirimini kullanıcıya gönder"""
@@ -1799,29 +1832,30 @@ Ayarlarınıza göre tüm aktif kullanıcılara long işlemi açıldı.
                     ]
                     reply_markup = InlineKeyboardMarkup(keyboard)
                     
-                    # Her kullanıcıya gönder
-                    for user_id in active_users:
-                        try:
-                            user_settings = self.db.get_user_settings(user_id)
-                            if user_settings.get('notifications', True):
-                                await application.bot.send_message(
-                                    chat_id=user_id,
-                                    text=notification_text,
-                                    parse_mode=ParseMode.MARKDOWN,
-                                    reply_markup=reply_markup
-                                )
-                                
-                                # Veritabanına bildirim ekle
-                                self.db.add_notification(
-                                    user_id,
-                                    'NEW_COIN',
-                                    f'Yeni Coin: {symbol}',
-                                    f'{symbol} listesine eklendi: {perp_symbol}'
-                                )
-                                
-                                print(f"📢 {user_id} kullanıcısına yeni coin bildirimi gönderildi: {symbol}")
-                        except Exception as e:
-                            print(f"Bildirim gönderme hatası (User {user_id}): {e}")
+                    # Bildirim açık tüm kullanıcılara eşzamanlı gönder
+                    recipients = [user_id for user_id in active_users
+                                  if self.db.get_user_settings(user_id).get('notifications', True)]
+                    await self.notifier.start()
+                    result = await self.notifier.broadcast(
+                        recipients, notification_text,
+                        parse_mode=ParseMode.MARKDOWN,
+                        reply_markup=reply_markup.to_dict()
+                    )
+                    
+                    for user_id in recipients:
+                        if user_id in result['failed']:
+                            print(f"Bildirim gönderme hatası (User {user_id}): {result['failed'][user_id]}")
+                            continue
+                        # Veritabanına bildirim ekle
+                        self.db.add_notification(
+                            user_id,
+                            'NEW_COIN',
+                            f'Yeni Coin: {symbol}',
+                            f'{symbol} listesine eklendi: {perp_symbol}'
+                        )
+                    
+                    print(f"📢 Yeni coin bildirimi {symbol}: {result['delivered']}/{result['recipients']} kullanıcı, "
+                          f"{result['seconds']}s (ilk->son {result['first_to_last']}s)")
             
             # Son kontrol zamanını güncelle
             self.last_notification_check = file_mtime
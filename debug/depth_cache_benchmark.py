@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Depth Cache Benchmark - aynı listing için eşzamanlı long.py süreçlerinin depth yükü
+Fake Bitget (debug/fake_exchange_server.py) üzerinde N alt süreç long.py'nin depth akışını
+taklit eder: track() -> leverage/bakiye/margin süresi kadar bekle -> plan_order().
+Raporlanan: merge-depth istek sayısı (eski 5 Hz poller tahmini ile), plan alınan süreç sayısı.
+
+Kullanım:
+    python3 debug/depth_cache_benchmark.py
+    python3 debug/depth_cache_benchmark.py --users 50 --prep 1.5
+"""
+import os
+import sys
+import json
+import time
+import socket
+import asyncio
+import argparse
+import tempfile
+
+sys.path.append(os.path.dirname(os.path.realpath(__file__)))
+from fake_exchange_server import FakeVenueConfig, create_bitget_app, start_fake_venue
+
+PERP_DIR = os.path.join(os.path.dirname(os.path.realpath(__file__)), '..', 'production', 'exchanges', 'PERP')
+
+# long.py'nin depth akışı: sembolü oku, track, ön adımlar, order anında plan
+WORKER_SCRIPT = """
+import os, sys, json, time
+sys.path.append(os.environ["PERP_DIR"])
+from depth_cache import depth_cache
+depth_cache.track("NEWCOINUSDT")
+time.sleep(float(os.environ["PREP"]))
+started = time.perf_counter()
+plan = depth_cache.plan_order("NEWCOINUSDT", 20.0, 0.02)
+print(json.dumps({"planned": plan is not None, "plan_ms": (time.perf_counter() - started) * 1000}))
+"""
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+async def run(users: int, prep: float, latency_ms: float) -> bool:
+    config = FakeVenueConfig(latency_ms=latency_ms)
+    port = free_port()
+    runner = await start_fake_venue(create_bitget_app(config), port)
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            env = dict(os.environ, PERP_DIR=PERP_DIR, PREP=str(prep), BITGET_API_HOST=f"http://127.0.0.1:{port}",
+                       STATE_DB_PATH=os.path.join(tmp, "state.db"))
+            started = time.perf_counter()
+            procs = [await asyncio.create_subprocess_exec(sys.executable, "-c", WORKER_SCRIPT, env=env,
+                                                          stdout=asyncio.subprocess.PIPE,
+                                                          stderr=asyncio.subprocess.PIPE)
+                     for _ in range(users)]
+            outputs = [await proc.communicate() for proc in procs]
+            elapsed = time.perf_counter() - started
+    finally:
+        await runner.cleanup()
+
+    results = []
+    for stdout, stderr in outputs:
+        try:
+            results.append(json.loads(stdout.decode().strip().splitlines()[-1]))
+        except (IndexError, ValueError):
+            print(f"❌ worker failed: {stderr.decode()[-300:]}")
+    planned = sum(1 for r in results if r['planned'])
+    plan_ms = sorted(r['plan_ms'] for r in results) or [0.0]
+    legacy = users * (1 + prep / 0.2)
+    print(f"👥 users={users} prep={prep}s wall={elapsed:.1f}s")
+    print(f"📚 merge-depth requests: {config.depth_requests} (5 Hz poller per process ≈ {legacy:.0f})")
+    print(f"🎯 planned: {planned}/{users}, plan_order p50={plan_ms[len(plan_ms) // 2]:.1f}ms "
+          f"max={plan_ms[-1]:.1f}ms")
+    return planned == users and config.depth_requests <= users * 2
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Depth cache load benchmark")
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--prep", type=float, default=1.5, help="track() ile plan_order() arası süre (s)")
+    parser.add_argument("--latency-ms", type=float, default=20.0)
+    args = parser.parse_args()
+    ok = asyncio.run(run(args.users, args.prep, args.latency_ms))
+    print("✅ OK" if ok else "❌ FAILED")
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
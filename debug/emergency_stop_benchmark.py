@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+Emergency Stop Benchmark - kullanıcı başına kapat.py alt süreci vs EmergencyStopExecutor
+Fake Bitget (debug/fake_exchange_server.py) üzerinde:
+  1) Eski yol: kullanıcı başına sırayla `python3` alt süreci + imzalı close isteği
+  2) Executor: ısıtılmış tek havuz, tüm kullanıcılar eşzamanlı
+  3) Arıza: %30 hata oranı + yanıt vermeyen kullanıcılar, kısa deadline
+
+Kullanım:
+    python3 debug/emergency_stop_benchmark.py
+    python3 debug/emergency_stop_benchmark.py --users 500 --latency-ms 80 --legacy-users 20
+"""
+import os
+import sys
+import time
+import socket
+import asyncio
+import argparse
+import subprocess
+
+sys.path.append(os.path.dirname(os.path.realpath(__file__)))
+sys.path.append(os.path.join(os.path.dirname(os.path.realpath(__file__)), '..', 'production', 'core'))
+from fake_exchange_server import FakeVenueConfig, create_bitget_app, start_fake_venue
+from emergency_stop import EmergencyStopExecutor, format_summary
+from bitget_client import BitgetCredentials
+
+# kapat.py'nin yaptığı iş: yeni interpreter, requests import, imzalı POST
+LEGACY_SCRIPT = """
+import os, time, hmac, json, base64, requests
+ts = str(int(time.time() * 1000))
+path = "/api/v2/mix/order/close-positions"
+body = json.dumps({"productType": "USDT-FUTURES"})
+sign = base64.b64encode(hmac.new(os.environ["BITGET_SECRET_KEY"].encode(), (ts + "POST" + path + body).encode(),
+                                 digestmod="sha256").digest()).decode()
+r = requests.post(os.environ["HOST"] + path, data=body, timeout=30, headers={
+    "ACCESS-KEY": os.environ["BITGET_API_KEY"], "ACCESS-SIGN": sign, "ACCESS-TIMESTAMP": ts,
+    "ACCESS-PASSPHRASE": os.environ["BITGET_PASSPHRASE"], "Content-Type": "application/json"})
+print(r.status_code)
+"""
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def legacy_stop(host: str, users: int):
+    started = time.perf_counter()
+    latencies = []
+    for i in range(users):
+        env = dict(os.environ, HOST=host, BITGET_API_KEY=f"legacy{i}", BITGET_SECRET_KEY="secret",
+                   BITGET_PASSPHRASE="pass", USER_ID=str(i))
+        subprocess.run([sys.executable, "-c", LEGACY_SCRIPT], capture_output=True, text=True, timeout=60, env=env)
+        latencies.append((time.perf_counter() - started) * 1000)
+    return time.perf_counter() - started, latencies
+
+
+def credentials_for(users: int, prefix: str):
+    return {100000 + i: BitgetCredentials(f"{prefix}{i}", "secret", "pass", user_id=str(100000 + i))
+            for i in range(users)}
+
+
+async def main(users: int, legacy_users: int, latency_ms: float, deadline: float):
+    config = FakeVenueConfig(latency_ms=latency_ms)
+    port = free_port()
+    runner = await start_fake_venue(create_bitget_app(config), port)
+    host = f"http://127.0.0.1:{port}"
+    try:
+        elapsed, latencies = await asyncio.get_running_loop().run_in_executor(None, legacy_stop, host, legacy_users)
+        print(f"🐢 Legacy subprocess per user: {legacy_users} users in {elapsed:.2f}s "
+              f"(last user closed at {latencies[-1]:.0f}ms, ~{elapsed / legacy_users * 1000:.0f}ms/user "
+              f"-> {users} users ≈ {elapsed / legacy_users * users:.1f}s)")
+
+        executor = EmergencyStopExecutor(host=host, deadline=deadline)
+        await executor.warm_async()
+        summary = await executor.close_users(credentials_for(users, "bench"))
+        print(f"\n⚡ Executor, {users} users:")
+        print(format_summary(summary))
+
+        # Arıza: rastgele 5xx + hiç yanıt vermeyen 3 kullanıcı, kısa deadline
+        short = EmergencyStopExecutor(host=host, deadline=3.0, attempt_timeout=1.0)
+        await short.warm_async()
+        config.fail_rate = 0.3
+        config.hang_keys = {"chaos0", "chaos1", "chaos2"}
+        summary = await short.close_users(credentials_for(users, "chaos"))
+        print(f"\n🔥 Executor with 30% 5xx and 3 hung users, deadline 3s:")
+        print(format_summary(summary))
+        await executor.aclose()
+        await short.aclose()
+    finally:
+        await runner.cleanup()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Emergency stop benchmark")
+    parser.add_argument('--users', type=int, default=200)
+    parser.add_argument('--legacy-users', type=int, default=20, help="Eski yol için ölçülen kullanıcı sayısı")
+    parser.add_argument('--latency-ms', type=float, default=50.0)
+    parser.add_argument('--deadline', type=float, default=20.0)
+    args = parser.parse_args()
+    asyncio.run(main(args.users, args.legacy_users, args.latency_ms, args.deadline))
@@ -0,0 +1,323 @@
+#!/usr/bin/env python3
+"""
+Fake Exchange Server - Bitget ve Gate.io API'lerinin yerel taklidi
+Venue router ve async client'ları gerçek borsaya dokunmadan test etmek için.
+
+Kullanım:
+    python3 debug/fake_exchange_server.py serve      # 8801 (bitget) + 8802 (gateio)
+    python3 debug/fake_exchange_server.py selftest   # router'ı fake venue'lere karşı çalıştır
+
+Client'ları yönlendirmek için:
+    BITGET_API_HOST=http://127.0.0.1:8801 GATEIO_API_HOST=http://127.0.0.1:8802
+"""
+import os
+import sys
+import time
+import random
+import asyncio
+import itertools
+import timeit
+
+from aiohttp import web
+import aiohttp
+
+sys.path.append(os.path.join(os.path.dirname(os.path.realpath(__file__)), '..', 'production', 'core'))
+
+
+class FakeVenueConfig:
+    """Fake venue davranışı: gecikme, hata oranı, listelenen asset'ler"""
+
+    def __init__(self, latency_ms: float = 10.0, fail_rate: float = 0.0,
+                 bases=("BTC", "ETH", "NEWCOIN"), price: float = 1.2345):
+        self.latency_ms = latency_ms
+        self.fail_rate = fail_rate
+        self.bases = list(bases)
+        self.price = price
+        self.orders = {}
+        self.request_count = 0
+        self.hang_keys = set()      # bu API key'lerin istekleri hiç yanıtlanmaz
+        self.order_failure = None   # 'before': emir kaydedilmeden 503, 'after': kaydedildikten sonra 503
+        self.closed_by_key = {}
+        self.depth_requests = 0
+
+
+def _middleware(config: FakeVenueConfig):
+    @web.middleware
+    async def delay_and_fail(request, handler):
+        config.request_count += 1
+        await asyncio.sleep(config.latency_ms / 1000.0)
+        if request.headers.get('ACCESS-KEY') in config.hang_keys:
+            await asyncio.sleep(3600)
+        if config.fail_rate and random.random() < config.fail_rate:
+            return web.json_response({'code': '50000', 'msg': 'fake failure',
+                                      'label': 'SERVER_ERROR', 'message': 'fake failure'}, status=503)
+        return await handler(request)
+    return delay_and_fail
+
+
+def create_bitget_app(config: FakeVenueConfig) -> web.Application:
+    """Bitget v2 mix endpoint'lerinin minimal taklidi"""
+    order_ids = itertools.count(1000)
+
+    def ok(data):
+        return web.json_response({'code': '00000', 'msg': 'success', 'data': data})
+
+    async def server_time(request):
+        return ok({'serverTime': str(int(time.time() * 1000))})
+
+    async def contracts(request):
+        symbol = request.query.get('symbol')
+        return ok([{'symbol': f"{base}USDT", 'baseCoin': base, 'quoteCoin': 'USDT',
+                    'volumePlace': '2', 'pricePlace': '4', 'minTradeNum': '0.01'} for base in config.bases
+                   if symbol is None or f"{base}USDT" == symbol])
+
+    async def ticker(request):
+        symbol = request.query.get('symbol', '')
+        if symbol[:-4] not in config.bases:
+            return web.json_response({'code': '40034', 'msg': 'symbol does not exist'}, status=400)
+        return ok([{'symbol': symbol, 'lastPr': str(config.price),
+                    'askPr': str(config.price * 1.001), 'bidPr': str(config.price * 0.999)}])
+
+    async def merge_depth(request):
+        config.depth_requests += 1
+        if request.query.get('symbol', '')[:-4] not in config.bases:
+            return web.json_response({'code': '40034', 'msg': 'symbol does not exist'}, status=400)
+        levels = int(request.query.get('limit', 50))
+        return ok({'asks': [[str(round(config.price * (1 + 0.001 * i), 4)), '100'] for i in range(levels)],
+                   'bids': [[str(round(config.price * (1 - 0.001 * (i + 1)), 4)), '100'] for i in range(levels)],
+                   'ts': str(int(time.time() * 1000))})
+
+    async def place_order(request):
+        if 'ACCESS-SIGN' not in request.headers:
+            return web.json_response({'code': '40037', 'msg': 'apikey does not exist'}, status=401)
+        body = await request.json()
+        order_id = str(next(order_ids))
+        config.orders[order_id] = {**body, 'orderId': order_id}
+        return ok({'orderId': order_id, 'clientOid': body.get('clientOid')})
+
+    async def set_leverage(request):
+        if 'ACCESS-SIGN' not in request.headers:
+            return web.json_response({'code': '40037', 'msg': 'apikey does not exist'}, status=401)
+        body = await request.json()
+        return ok({'symbol': body.get('symbol'), 'longLeverage': body.get('leverage'),
+                   'shortLeverage': body.get('leverage'), 'marginMode': 'isolated'})
+
+    async def order_detail(request):
+        order = config.orders.get(request.query.get('orderId'))
+        if order is None and request.query.get('clientOid'):
+            order = next((o for o in config.orders.values() if o.get('clientOid') == request.query['clientOid']), None)
+        if order is None:
+            return web.json_response({'code': '40109', 'msg': 'order not found'}, status=400)
+        return ok({**order, 'state': 'filled', 'priceAvg': str(config.price)})
+
+    async def close_positions(request):
+        if 'ACCESS-SIGN' not in request.headers:
+            return web.json_response({'code': '40037', 'msg': 'apikey does not exist'}, status=401)
+        body = await request.json()
+        api_key = request.headers['ACCESS-KEY']
+        config.closed_by_key[api_key] = config.closed_by_key.get(api_key, 0) + 1
+        symbols = [body['symbol']] if body.get('symbol') else [f"{base}USDT" for base in config.bases[:2]]
+        return ok({'successList': [{'symbol': s, 'productType': body.get('productType'), 'orderId': str(next(order_ids))}
+                                   for s in symbols], 'failureList': []})
+
+    async def positions(request):
+        if 'ACCESS-SIGN' not in request.headers:
+            return web.json_response({'code': '40037', 'msg': 'apikey does not exist'}, status=401)
+        return ok([{'symbol': f"{base}USDT", 'marginCoin': 'USDT', 'holdSide': 'long', 'total': '10',
+                    'available': '10', 'openPriceAvg': str(config.price * 0.9), 'markPrice': str(config.price),
+                    'unrealizedPL': str(round(10 * config.price * 0.1, 4)), 'marginSize': '5',
+                    'leverage': '3', 'marginMode': 'isolated'} for base in config.bases[:2]])
+
+    async def accounts(request):
+        if 'ACCESS-SIGN' not in request.headers:
+            return web.json_response({'code': '40037', 'msg': 'apikey does not exist'}, status=401)
+        return ok([{'marginCoin': 'USDT', 'available': '250.5', 'accountEquity': '260.0',
+                    'usdtEquity': '260.0', 'unrealizedPL': str(round(20 * config.price * 0.1, 4))}])
+
+    app = web.Application(middlewares=[_middleware(config)])
+    app.router.add_get('/api/v2/public/time', server_time)
+    app.router.add_get('/api/v2/mix/market/contracts', contracts)
+    app.router.add_get('/api/v2/mix/market/ticker', ticker)
+    app.router.add_get('/api/v2/mix/market/merge-depth', merge_depth)
+    app.router.add_post('/api/v2/mix/order/place-order', place_order)
+    app.router.add_get('/api/v2/mix/order/detail', order_detail)
+    app.router.add_post('/api/v2/mix/account/set-leverage', set_leverage)
+    app.router.add_post('/api/v2/mix/order/close-positions', close_positions)
+    app.router.add_get('/api/v2/mix/position/all-position', positions)
+    app.router.add_get('/api/v2/mix/account/accounts', accounts)
+    return app
+
+
+def create_gateio_app(config: FakeVenueConfig) -> web.Application:
+    """Gate.io APIv4 futures endpoint'lerinin minimal taklidi"""
+    order_ids = itertools.count(5000)
+
+    def contract(base):
+        return {'name': f"{base}_USDT", 'last_price': str(config.price), 'mark_price': str(config.price),
+                'leverage_max': '20', 'mark_price_round': '0.0001', 'order_price_round': '0.0001',
+                'order_size_min': 1, 'quanto_multiplier': '0.1'}
+
+    async def server_time(request):
+        return web.json_response({'server_time': int(time.time() * 1000)})
+
+    async def contracts(request):
+        return web.json_response([contract(base) for base in config.bases])
+
+    async def single_contract(request):
+        name = request.match_info['contract']
+        if name.rsplit('_', 1)[0] not in config.bases:
+            return web.json_response({'label': 'CONTRACT_NOT_FOUND', 'message': name}, status=400)
+        return web.json_response(contract(name.rsplit('_', 1)[0]))
+
+    async def place_order(request):
+        if 'SIGN' not in request.headers:
+            return web.json_response({'label': 'INVALID_KEY', 'message': 'missing signature'}, status=401)
+        body = await request.json()
+        if config.order_failure == 'before':
+            return web.json_response({'label': 'SERVER_ERROR', 'message': 'fake failure'}, status=503)
+        order_id = next(order_ids)
+        order = {**body, 'id': order_id, 'status': 'finished', 'finish_as': 'filled',
+                 'left': 0, 'fill_price': str(config.price)}
+        config.orders[str(order_id)] = order
+        if config.order_failure == 'after':
+            return web.json_response({'label': 'SERVER_ERROR', 'message': 'fake failure'}, status=503)
+        return web.json_response(order, status=201)
+
+    async def get_order(request):
+        order_id = request.match_info['order_id']
+        order = config.orders.get(order_id)
+        if order is None and order_id.startswith('t-'):
+            order = next((o for o in config.orders.values() if o.get('text') == order_id), None)
+        if order is None:
+            return web.json_response({'label': 'ORDER_NOT_FOUND', 'message': 'not found'}, status=404)
+        return web.json_response(order)
+
+    app = web.Application(middlewares=[_middleware(config)])
+    app.router.add_get('/api/v4/spot/time', server_time)
+    app.router.add_get('/api/v4/futures/usdt/contracts', contracts)
+    app.router.add_get('/api/v4/futures/usdt/contracts/{contract}', single_contract)
+    app.router.add_post('/api/v4/futures/usdt/orders', place_order)
+    app.router.add_get('/api/v4/futures/usdt/orders/{order_id}', get_order)
+    return app
+
+
+async def start_fake_venue(app: web.Application, port: int) -> web.AppRunner:
+    """Fake venue'yü 127.0.0.1:port üzerinde başlat"""
+    runner = web.AppRunner(app)
+    await runner.setup()
+    await web.TCPSite(runner, '127.0.0.1', port, backlog=1024).start()
+    return runner
+
+
+async def serve(bitget_port: int = 8801, gateio_port: int = 8802):
+    bitget = await start_fake_venue(create_bitget_app(FakeVenueConfig(latency_ms=20)), bitget_port)
+    gateio = await start_fake_venue(create_gateio_app(FakeVenueConfig(latency_ms=8)), gateio_port)
+    print(f"🧪 Fake Bitget: http://127.0.0.1:{bitget_port}")
+    print(f"🧪 Fake Gate.io: http://127.0.0.1:{gateio_port}")
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await bitget.cleanup()
+        await gateio.cleanup()
+
+
+async def selftest(users: int = 20, bitget_port: int = 8801, gateio_port: int = 8802):
+    """Router'ı iki fake venue'ye karşı çalıştır; seçim süresini ve dağılımı raporla"""
+    from venue_router import create_default_router
+    from bitget_client import BitgetCredentials
+    from gateio_executor import GateioCredentials
+
+    bitget_config = FakeVenueConfig(latency_ms=20, bases=("BTC", "ETH", "NEWCOIN", "ONLYBG"))
+    gateio_config = FakeVenueConfig(latency_ms=5, bases=("BTC", "ETH", "NEWCOIN"))
+    runners = [await start_fake_venue(create_bitget_app(bitget_config), bitget_port),
+               await start_fake_venue(create_gateio_app(gateio_config), gateio_port)]
+
+    passed = True
+    try:
+        async with aiohttp.ClientSession() as session:
+            router = create_default_router(session,
+                                           bitget_host=f"http://127.0.0.1:{bitget_port}",
+                                           gateio_host=f"http://127.0.0.1:{gateio_port}",
+                                           lookup_delay=0.01)
+            await router.refresh_listings()
+            for _ in range(5):
+                await router.probe()
+
+            print("📊 Venue stats:")
+            for row in router.get_stats():
+                print(f"   {row}")
+
+            best = router.select("NEWCOIN")
+            only = router.select("ONLYBG")
+            missing = router.select("NOPE")
+            print(f"🎯 NEWCOIN -> {best}, ONLYBG -> {only}, NOPE -> {missing}")
+            passed &= best == "gateio" and only == "bitget" and missing is None
+
+            n = 100000
+            elapsed = timeit.timeit(lambda: router.select("NEWCOIN"), number=n)
+            print(f"⚡ select(): {elapsed / n * 1e6:.2f} µs/call")
+
+            credentials = [{
+                'bitget': BitgetCredentials(f"bgkey{i}", "secret", "pass", user_id=str(i)),
+                'gateio': GateioCredentials(f"gtkey{i}", "secret", user_id=str(i)),
+            } for i in range(users)]
+
+            started = time.perf_counter()
+            single = await asyncio.gather(*(router.route_order(c, "NEWCOIN", 20.0) for c in credentials))
+            split = await asyncio.gather(*(router.route_order(c, "NEWCOIN", 100.0, split=True) for c in credentials))
+            elapsed = time.perf_counter() - started
+
+            ok_single = sum(1 for results in single if results[-1]['success'])
+            ok_split = sum(1 for results in split if all(r['success'] for r in results))
+            venues_used = sorted({r['venue'] for results in split for r in results})
+            print(f"📦 single: {ok_single}/{users} ok, split: {ok_split}/{users} ok across {venues_used} "
+                  f"in {elapsed * 1000:.0f}ms")
+            passed &= ok_single == users and ok_split == users
+
+            # Gate.io emri kaydedip 503 döndü: sorgu emri bulmalı, Bitget'te ikinci emir açılmamalı
+            bitget_orders = len(bitget_config.orders)
+            router.stats['gateio'].ewma_latency = 0.0  # yük testinden sonra Gate.io ilk aday olsun
+            gateio_config.order_failure = 'after'
+            ambiguous = await router.route_order(credentials[0], "NEWCOIN", 20.0)
+            # Gate.io emri kaydetmeden 503 döndü: sorgu boş, Bitget'e düşmek güvenli
+            gateio_config.order_failure = 'before'
+            dropped = await router.route_order(credentials[0], "NEWCOIN", 20.0)
+            gateio_config.order_failure = None
+            print(f"🧾 Gate.io 503 after accept -> {[(r['venue'], r.get('recovered', False)) for r in ambiguous]}, "
+                  f"503 before accept -> {[(r['venue'], r['success']) for r in dropped]}")
+            passed &= [(r['venue'], r['success'], r.get('recovered')) for r in ambiguous] == [('gateio', True, True)]
+            passed &= len(bitget_config.orders) == bitget_orders + 1
+            passed &= [(r['venue'], r['success']) for r in dropped] == [('gateio', False), ('bitget', True)]
+
+            # long.py yolu: depth planlı hazır gövde Bitget'e client OID ile aynen gitmeli
+            router.venues['bitget'].prepare("ONLYBG", {
+                "productType": "USDT-FUTURES", "marginMode": "isolated", "marginCoin": "USDT",
+                "size": "12", "side": "buy", "tradeSide": "open",
+                "orderType": "limit", "price": "1.25", "force": "ioc"})
+            planned = (await router.route_order(credentials[0], "ONLYBG", 15.0))[-1]
+            sent = bitget_config.orders.get((planned.get('order') or {}).get('orderId'), {})
+            print(f"📚 Prepared Bitget order -> {sent.get('orderType')}/{sent.get('force')} size={sent.get('size')}")
+            passed &= (planned['success'] and sent.get('orderType') == 'limit' and sent.get('force') == 'ioc'
+                       and sent.get('clientOid') == planned['client_oid'] and sent.get('symbol') == 'ONLYBGUSDT')
+
+            # Gate.io'yu düşür: router Bitget'e düşmeli
+            gateio_config.fail_rate = 1.0
+            for _ in range(router.failure_threshold):
+                await router.probe()
+            fallback = router.select("NEWCOIN")
+            print(f"🔁 Gate.io down -> {fallback}")
+            passed &= fallback == "bitget"
+    finally:
+        for runner in runners:
+            await runner.cleanup()
+
+    print("✅ Self-test passed" if passed else "❌ Self-test FAILED")
+    return passed
+
+
+if __name__ == "__main__":
+    command = sys.argv[1] if len(sys.argv) > 1 else "selftest"
+    if command == "serve":
+        asyncio.run(serve())
+    else:
+        sys.exit(0 if asyncio.run(selftest()) else 1)
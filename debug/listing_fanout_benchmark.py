@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+Listing Fan-out Benchmark - StableTradingSystem._handle_new_listing
+Eski kullanıcı başına döngü (bağlantı + SELECT + 2 INSERT + commit + XADD) ile
+toplu yolu (tek transaction executemany + pipeline XADD) karşılaştırır.
+
+Kullanım (çalışan Redis gerekir, REDIS_URL):
+    python3 debug/listing_fanout_benchmark.py                 # 10 / 100 / 1000 kullanıcı
+    python3 debug/listing_fanout_benchmark.py --users 50 500
+
+Gerçek kuyruk kirlenmesin diye ayrı SQLite dosyası ve 'bench:pending_orders' stream'i kullanılır.
+"""
+import os
+import sys
+import time
+import uuid
+import asyncio
+import argparse
+
+import redis.asyncio as redis
+
+sys.path.append(os.path.join(os.path.dirname(os.path.realpath(__file__)), '..'))
+from stable_trading_system import StableTradingSystem, DatabaseManager
+
+BENCH_DB = "listing_fanout_bench.db"
+BENCH_STREAM = "bench:pending_orders"
+
+
+async def legacy_handle_new_listing(system: StableTradingSystem, token: str, announcement_id: str):
+    """Eski davranış: kullanıcı başına bağlantı, commit ve XADD"""
+    async with system.db_manager.pool.connection() as db:
+        cursor = await db.execute("""
+            SELECT u.user_id FROM users u
+            JOIN user_settings s ON u.user_id = s.user_id
+            WHERE s.auto_trading = true
+        """)
+        users = await cursor.fetchall()
+
+    for (user_id,) in users:
+        task_id = str(uuid.uuid4())
+        idempotency_key = f"{user_id}:{token}:{announcement_id}"
+        async with system.db_manager.pool.connection() as db:
+            cursor = await db.execute("SELECT key FROM idempotency_keys WHERE key = ?", (idempotency_key,))
+            if await cursor.fetchone():
+                continue
+            await db.execute("INSERT INTO idempotency_keys (key, user_id, task_id) VALUES (?, ?, ?)",
+                             (idempotency_key, user_id, task_id))
+            await db.execute("""
+                INSERT INTO trading_tasks (id, user_id, announcement_id, token_symbol, action, status)
+                VALUES (?, ?, ?, ?, 'open', 'pending')
+            """, (task_id, user_id, announcement_id, token))
+            await db.commit()
+        await system.redis_client.xadd(system.pending_orders_stream, {
+            "task_id": task_id, "user_id": user_id, "token": token, "action": "open"
+        })
+
+
+async def seed_users(db_manager: DatabaseManager, count: int):
+    async with db_manager.pool.connection() as db:
+        await db.execute("DELETE FROM user_settings")
+        await db.execute("DELETE FROM users")
+        await db.executemany("INSERT INTO users (user_id, username) VALUES (?, ?)",
+                             [(100000 + i, f"bench_{i}") for i in range(count)])
+        await db.executemany("INSERT INTO user_settings (user_id, auto_trading) VALUES (?, 1)",
+                             [(100000 + i,) for i in range(count)])
+        await db.commit()
+
+
+async def run(user_counts):
+    for suffix in ('', '-wal', '-shm'):
+        if os.path.exists(BENCH_DB + suffix):
+            os.remove(BENCH_DB + suffix)
+
+    system = StableTradingSystem()
+    system.db_manager = DatabaseManager(BENCH_DB)
+    system.pending_orders_stream = BENCH_STREAM
+    system.redis_client = redis.Redis.from_url(os.getenv('REDIS_URL', 'redis://localhost:6379'), decode_responses=True)
+    await system.redis_client.ping()
+    await system.db_manager.initialize()
+
+    print(f"{'USERS':>7}{'LEGACY ms':>12}{'BULK ms':>10}{'SPEEDUP':>9}{'DUP ms':>9}")
+    try:
+        for count in user_counts:
+            await seed_users(system.db_manager, count)
+
+            started = time.perf_counter()
+            await legacy_handle_new_listing(system, "BENCH", f"legacy_{count}_{uuid.uuid4().hex[:6]}")
+            legacy_ms = (time.perf_counter() - started) * 1000
+
+            announcement_id = f"bulk_{count}_{uuid.uuid4().hex[:6]}"
+            listing = {"token": "BENCH", "announcement_id": announcement_id}
+            started = time.perf_counter()
+            await system._handle_new_listing(listing)
+            bulk_ms = (time.perf_counter() - started) * 1000
+
+            # Aynı listing tekrar gelirse (duplicate) hiçbir task oluşmamalı
+            started = time.perf_counter()
+            await system._handle_new_listing(listing)
+            duplicate_ms = (time.perf_counter() - started) * 1000
+
+            async with system.db_manager.pool.connection() as db:
+                cursor = await db.execute("SELECT COUNT(*) FROM trading_tasks WHERE announcement_id = ?", (announcement_id,))
+                created = (await cursor.fetchone())[0]
+            status = "✅" if created == count else f"❌ {created} tasks"
+
+            print(f"{count:>7}{legacy_ms:>12.1f}{bulk_ms:>10.1f}{legacy_ms / bulk_ms:>8.1f}x{duplicate_ms:>9.1f} {status}")
+    finally:
+        await system.redis_client.delete(BENCH_STREAM)
+        await system.redis_client.close()
+        await system.db_manager.close()
+        for suffix in ('', '-wal', '-shm'):
+            if os.path.exists(BENCH_DB + suffix):
+                os.remove(BENCH_DB + suffix)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Listing fan-out benchmark")
+    parser.add_argument('--users', type=int, nargs='+', default=[10, 100, 1000])
+    args = parser.parse_args()
+    asyncio.run(run(args.users))
@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""
+Notification Outbox Benchmark - long.py kritik yolundaki bildirim maliyeti
+  1) Eski yol: send_sync (Telegram yanıtını bekler) - yavaş API'de order akışı kadar gecikir
+  2) Yeni yol: outbox.put() - p50/p99/max mikro saniye
+  3) Sender: outbox -> fake Bot API, put'tan teslime kadar geçen süre
+  4) Telegram erişilemez: put() süresi değişmez, mesajlar outbox'ta bekler
+
+Kullanım:
+    python3 debug/notification_outbox_benchmark.py
+    python3 debug/notification_outbox_benchmark.py --slow-ms 3000 --messages 300
+"""
+import os
+import sys
+import time
+import shutil
+import asyncio
+import logging
+import argparse
+import tempfile
+import threading
+
+from aiohttp import web
+
+sys.path.append(os.path.dirname(os.path.realpath(__file__)))
+sys.path.append(os.path.join(os.path.dirname(os.path.realpath(__file__)), '..', 'production', 'core'))
+from telegram_notifier import TelegramNotifier
+from notification_outbox import NotificationOutbox, OutboxSender
+from telegram_notifier_benchmark import FakeBotAPI, BENCH_TOKEN
+
+
+def percentile(values, pct):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct / 100))]
+
+
+def start_fake_api(api: FakeBotAPI) -> str:
+    """Fake Bot API'yi ayrı thread'de başlat, base URL döndür"""
+    ready = threading.Event()
+    url = []
+
+    def serve():
+        async def main():
+            app = web.Application()
+            app.router.add_post(f"/bot{BENCH_TOKEN}/sendMessage", api.send_message)
+            runner = web.AppRunner(app)
+            await runner.setup()
+            site = web.TCPSite(runner, "127.0.0.1", 0)
+            await site.start()
+            url.append(f"http://127.0.0.1:{site._server.sockets[0].getsockname()[1]}")
+            ready.set()
+            await asyncio.Event().wait()
+        asyncio.run(main())
+
+    threading.Thread(target=serve, daemon=True).start()
+    ready.wait()
+    return url[0]
+
+
+def bench_blocking(api_url: str, calls: int):
+    notifier = TelegramNotifier(BENCH_TOKEN, api_url=api_url)
+    timings = []
+    for i in range(calls):
+        started = time.perf_counter()
+        notifier.send_sync(200000 + i, "🚀 order opened", parse_mode="HTML", timeout=10)
+        timings.append((time.perf_counter() - started) * 1000)
+    return timings
+
+
+def bench_put(outbox: NotificationOutbox, count: int):
+    outbox.warm()
+    timings = []
+    for i in range(count):
+        started = time.perf_counter()
+        outbox.put(300000 + i % 500, "🚀 order opened", parse_mode="HTML", trade_id=f"bench/{i}")
+        timings.append((time.perf_counter() - started) * 1e6)
+    return timings
+
+
+class SenderThread:
+    """OutboxSender'ı ayrı thread'deki event loop'ta çalıştır"""
+
+    def __init__(self, outbox: NotificationOutbox, api_url: str):
+        self.sender = OutboxSender(outbox, TelegramNotifier(BENCH_TOKEN, api_url=api_url, global_rate=1000,
+                                                            chat_interval=0.0))
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self.loop.run_until_complete, args=(self.sender.run(),), daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.loop.call_soon_threadsafe(self.sender.stop)
+        self.thread.join(30)
+
+
+def main(slow_ms: float, messages: int):
+    workdir = tempfile.mkdtemp(prefix="outbox_bench_")
+    outbox = NotificationOutbox(os.path.join(workdir, "outbox.db"))
+
+    slow_api = FakeBotAPI(slow_ms, global_rate=10000, chat_interval=0.0)
+    slow_url = start_fake_api(slow_api)
+    blocking = bench_blocking(slow_url, 5)
+    print(f"🐢 Blocking send_sync, API latency {slow_ms:.0f}ms: "
+          f"p50 {percentile(blocking, 50):.0f}ms, max {max(blocking):.0f}ms per order")
+
+    puts = bench_put(outbox, 2000)
+    print(f"⚡ outbox.put(): p50 {percentile(puts, 50):.0f}µs, p99 {percentile(puts, 99):.0f}µs, "
+          f"max {max(puts):.0f}µs ({len(puts)} writes)")
+
+    # Telegram erişilemez: sender çalışıyor ama API yok -> put() yine aynı hızda, mesajlar bekler
+    logging.getLogger('telegram_notifier').setLevel(logging.CRITICAL)
+    down = NotificationOutbox(os.path.join(workdir, "outbox_down.db"))
+    sender = SenderThread(down, "http://127.0.0.1:9")
+    time.sleep(0.2)
+    down_puts = bench_put(down, 200)
+    time.sleep(1)
+    sender.stop()
+    print(f"🔌 Telegram down: put() p50 {percentile(down_puts, 50):.0f}µs p99 {percentile(down_puts, 99):.0f}µs, "
+          f"outbox {down.stats()}")
+
+    # Uçtan uca: sender çalışırken executor'lar aralıklı put() yapar
+    fast_api = FakeBotAPI(20, global_rate=10000, chat_interval=0.0)
+    e2e = NotificationOutbox(os.path.join(workdir, "outbox_e2e.db"))
+    sender = SenderThread(e2e, start_fake_api(fast_api))
+    time.sleep(0.2)
+    started = time.time()
+    for i in range(messages):
+        e2e.put(400000 + i, f"order #{i}", trade_id=f"bench/{i}")
+        time.sleep(0.005)
+    deadline = time.time() + 30
+    while time.time() < deadline and e2e.stats()['sent'] < messages:
+        time.sleep(0.05)
+    elapsed = time.time() - started
+    sender.stop()
+    delays = [row[0] for row in e2e._conn().execute(
+        "SELECT (sent_at - created_at) * 1000 FROM outbox WHERE status = 'sent'")]
+    print(f"📤 Sender: {len(delays)}/{messages} delivered in {elapsed:.2f}s, "
+          f"put->sent p50 {percentile(delays, 50):.0f}ms p95 {percentile(delays, 95):.0f}ms "
+          f"(API latency 20ms)")
+
+    for box in (outbox, down, e2e):
+        box.close()
+    shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Notification outbox benchmark")
+    parser.add_argument('--slow-ms', type=float, default=2000.0)
+    parser.add_argument('--messages', type=int, default=200)
+    args = parser.parse_args()
+    main(args.slow_ms, args.messages)
@@ -10,8 +10,18 @@ import hmac
 import hashlib
 import base64
 import sqlite3
+import sys
 from datetime import datetime
 
+# Cross-process rate limit governor (production/core)
+sys.path.append(os.path.join(os.path.dirname(os.path.realpath(__file__)), '..', 'production', 'core'))
+from rate_limit_governor import rate_limit_governor, PRIORITY_POLL
+from telegram_notifier import telegram_notifier
+from portfolio_snapshot import PortfolioSnapshotter, format_age
+from bitget_client import BitgetCredentials
+
+MONITOR_USER = 'monitor'
+
 def get_timestamp():
     return int(time.time() * 1000)
 
@@ -31,29 +41,16 @@ def parse_params_to_str(params):
 
 def send_telegram_notification(message, user_id, reply_markup=None):
     """Send Telegram notification with optional inline keyboard"""
-    bot_token = os.getenv("TELEGRAM_BOT_TOKEN")
-    if not bot_token:
+    if not telegram_notifier.token:
         print("⚠️ TELEGRAM_BOT_TOKEN not found")
         return False
     
-    url = f"https://api.telegram.org/bot{bot_token}/sendMessage"
-    payload = {
-        "chat_id": user_id,
-        "text": message,
-        "parse_mode": "HTML"
-    }
-    
-    if reply_markup:
-        payload["reply_markup"] = reply_markup
-    
-    try:
-        response = requests.post(url, json=payload, timeout=10)
-        return response.status_code == 200
-    except:
-        return False
+    return telegram_notifier.send_sync(user_id, message, parse_mode="HTML", reply_markup=reply_markup, timeout=10)
 
 def get_positions(api_key, secret_key, passphrase):
     """Get all open positions from Bitget API"""
+    # Polling lane: order akışı aynı key üzerinde bekliyorsa geri çekilir
+    rate_limit_governor.acquire(api_key, "position", PRIORITY_POLL)
     timestamp = str(get_timestamp())
     request_path = "/api/v2/mix/position/all-position"
     params = {"productType": "USDT-FUTURES"}
@@ -84,8 +81,14 @@ def get_positions(api_key, secret_key, passphrase):
         print(f"❌ Position API exception: {e}")
         return []
 
+def _field(position, raw_key, snapshot_key, default=0):
+    """Ham Bitget pozisyonu veya PortfolioSnapshot pozisyonundan alan oku"""
+    return position.get(raw_key, position.get(snapshot_key, default))
+
 def calculate_pnl_percentage(position):
     """Calculate P&L percentage from position data"""
+    if 'pnl_percent' in position:
+        return position['pnl_percent']
     try:
         unrealized_pnl = float(position.get('unrealizedPL', 0))
         margin = float(position.get('margin', 0))
@@ -97,8 +100,8 @@ def calculate_pnl_percentage(position):
     except:
         return 0.0
 
-def format_pnl_message(positions):
-    """Format P&L status message for Telegram"""
+def format_pnl_message(positions, age_seconds=None):
+    """Format P&L status message for Telegram (age_seconds: snapshot yaşı)"""
     if not positions:
         return "📊 <b>POZİSYON DURUMU</b>\n\n🔹 Açık pozisyon bulunamadı"
     
@@ -107,10 +110,10 @@ def format_pnl_message(positions):
     
     for pos in positions:
         symbol = pos.get('symbol', 'Unknown')
-        size = float(pos.get('total', 0))
-        unrealized_pnl = float(pos.get('unrealizedPL', 0))
+        size = float(_field(pos, 'total', 'size'))
+        unrealized_pnl = float(_field(pos, 'unrealizedPL', 'unrealized_pnl'))
         pnl_percentage = calculate_pnl_percentage(pos)
-        margin_mode = pos.get('marginMode', 'unknown')
+        margin_mode = _field(pos, 'marginMode', 'margin_mode', 'unknown')
         leverage = pos.get('leverage', '1')
         
         # P&L emoji
@@ -127,7 +130,10 @@ def format_pnl_message(positions):
     # Total summary
     total_emoji = "🟢" if total_pnl >= 0 else "🔴"
     message += f"💰 <b>TOPLAM P&L: {total_emoji} ${total_pnl:.2f}</b>\n"
-    message += f"🕐 <i>Güncelleme: {datetime.now().strftime('%H:%M:%S')}</i>"
+    if age_seconds is None:
+        message += f"🕐 <i>Güncelleme: {datetime.now().strftime('%H:%M:%S')}</i>"
+    else:
+        message += f"🕐 <i>Güncelleme: {format_age(age_seconds)}</i>"
     
     return message
 
@@ -164,13 +170,23 @@ def monitor_positions():
         print("❌ HATA: Bitget API anahtarları bulunamadı!")
         return
     
+    # Pozisyonlar arka planda snapshot'lanır; döngü ve status ekranları aynı veriyi okur
+    credentials = {MONITOR_USER: BitgetCredentials(api_key, secret_key, passphrase)}
+    portfolio = PortfolioSnapshotter(lambda: credentials, interval=60).start()
+    
     while True:
         try:
             print(f"📊 {datetime.now().strftime('%H:%M:%S')} - Pozisyonlar kontrol ediliyor...")
             
-            # Get positions
-            positions = get_positions(api_key, secret_key, passphrase)
-            open_positions = [pos for pos in positions if float(pos.get('total', 0)) != 0]
+            # Get positions (snapshot; yenileme başarısızsa son başarılı veri korunur)
+            snapshot = portfolio.get(MONITOR_USER)
+            if snapshot is None or not snapshot.fetched_at:
+                print(f"⏳ Portföy snapshot'ı henüz hazır değil{f' ({snapshot.error})' if snapshot else ''}")
+                time.sleep(5)
+                continue
+            open_positions = snapshot.positions
+            if snapshot.error:
+                print(f"⚠️ Son yenileme başarısız ({snapshot.error}), {format_age(snapshot.age)} alınan veri kullanılıyor")
             
             print(f"📍 {len(open_positions)} açık pozisyon bulundu")
             
@@ -179,15 +195,22 @@ def monitor_positions():
             
             if open_positions:
                 # Format P&L message
-                message = format_pnl_message(open_positions)
+                message = format_pnl_message(open_positions, age_seconds=snapshot.age)
                 stop_button = create_stop_button()
                 
-                # Send to all users
-                for user_id in users:
-                    if send_telegram_notification(message, user_id, stop_button):
+                # Send to all users - kuyruğa hepsini at, notifier eşzamanlı gönderir
+                if not telegram_notifier.token:
+                    print("⚠️ TELEGRAM_BOT_TOKEN not found")
+                    users = []
+                deliveries = {user_id: telegram_notifier.notify(user_id, message, parse_mode="HTML",
+                                                                reply_markup=stop_button)
+                              for user_id in users}
+                for user_id, delivery in deliveries.items():
+                    try:
+                        delivery.result(timeout=30)
                         print(f"✅ P&L bildirim gönderildi: User {user_id}")
-                    else:
-                        print(f"❌ P&L bildirim hatası: User {user_id}")
+                    except Exception as e:
+                        print(f"❌ P&L bildirim hatası: User {user_id} ({e})")
             else:
                 print("📭 Açık pozisyon yok, bildirim gönderilmedi")
             
@@ -197,6 +220,7 @@ def monitor_positions():
             
         except KeyboardInterrupt:
             print("\n🛑 P&L Monitor durduruldu")
+            portfolio.stop()
             break
         except Exception as e:
             print(f"❌ Monitoring error: {e}")
@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""
+Portfolio Snapshot Benchmark - status isteği başına canlı borsa çağrısı vs PortfolioSnapshotter
+Fake Bitget (debug/fake_exchange_server.py) üzerinde, yüksek gecikmeyle:
+  1) Canlı: her /status için get_positions + get_accounts (eski yol)
+  2) Snapshot: get() + format_portfolio (borsaya gitmeden)
+  3) İşlem sonrası request_refresh -> snapshot'ın güncellenme süresi
+  4) Arıza: yenileme başarısızken son başarılı snapshot hata ile korunur
+
+Kullanım:
+    python3 debug/portfolio_snapshot_benchmark.py
+    python3 debug/portfolio_snapshot_benchmark.py --users 200 --latency-ms 500 --requests 2000
+"""
+import os
+import sys
+import time
+import socket
+import asyncio
+import argparse
+import statistics
+
+import aiohttp
+
+sys.path.append(os.path.dirname(os.path.realpath(__file__)))
+sys.path.append(os.path.join(os.path.dirname(os.path.realpath(__file__)), '..', 'production', 'core'))
+from fake_exchange_server import FakeVenueConfig, create_bitget_app, start_fake_venue
+from portfolio_snapshot import PortfolioSnapshotter, format_portfolio
+from bitget_client import BitgetClient, BitgetCredentials
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def credentials_for(users: int):
+    return {100000 + i: BitgetCredentials(f"snap{i}", "secret", "pass", user_id=str(100000 + i))
+            for i in range(users)}
+
+
+async def live_status(host: str, credentials, samples: int):
+    """Eski yol: her status isteği borsaya iki imzalı çağrı yapar"""
+    latencies = []
+    async with aiohttp.ClientSession() as session:
+        users = list(credentials.values())
+        for i in range(samples):
+            client = BitgetClient(session, users[i % len(users)], host=host)
+            started = time.perf_counter()
+            await asyncio.gather(client.get_positions(), client.get_accounts())
+            latencies.append((time.perf_counter() - started) * 1000)
+    return latencies
+
+
+def cached_status(snapshotter: PortfolioSnapshotter, user_ids, requests: int):
+    latencies = []
+    for i in range(requests):
+        started = time.perf_counter()
+        format_portfolio(snapshotter.get(user_ids[i % len(user_ids)]))
+        latencies.append((time.perf_counter() - started) * 1e6)
+    return latencies
+
+
+async def wait_for_update(snapshotter: PortfolioSnapshotter, user_id, previous: float, timeout: float = 10.0):
+    started = time.perf_counter()
+    while time.perf_counter() - started < timeout:
+        snapshot = snapshotter.get(user_id)
+        if snapshot is not None and (snapshot.fetched_at > previous or snapshot.error_at):
+            return (time.perf_counter() - started) * 1000
+        await asyncio.sleep(0.005)
+    return None
+
+
+async def main(users: int, latency_ms: float, requests: int, live_samples: int):
+    config = FakeVenueConfig(latency_ms=latency_ms)
+    port = free_port()
+    runner = await start_fake_venue(create_bitget_app(config), port)
+    host = f"http://127.0.0.1:{port}"
+    credentials = credentials_for(users)
+    user_ids = list(credentials)
+    try:
+        live = await live_status(host, credentials, live_samples)
+        print(f"🐢 Live fetch per status ({latency_ms:.0f}ms venue): "
+              f"p50 {statistics.median(live):.1f}ms, p95 {percentile(live, 95):.1f}ms")
+
+        snapshotter = PortfolioSnapshotter(lambda: credentials, interval=3600, host=host,
+                                           max_concurrency=64, refresh_delay=0.0)
+        task = asyncio.create_task(snapshotter.run())
+        started = time.perf_counter()
+        while snapshotter.get_stats()['snapshots'] < users:
+            await asyncio.sleep(0.01)
+        print(f"💼 Initial snapshot of {users} users in {(time.perf_counter() - started) * 1000:.0f}ms "
+              f"(cycle {snapshotter.get_stats()['last_cycle_ms']}ms)")
+
+        cached = cached_status(snapshotter, user_ids, requests)
+        print(f"⚡ Snapshot status ({requests} requests): p50 {statistics.median(cached):.1f}µs, "
+              f"p95 {percentile(cached, 95):.1f}µs")
+        print("\n" + format_portfolio(snapshotter.get(user_ids[0])) + "\n")
+
+        # İşlem sonrası tek kullanıcı yenilemesi (refresh_delay=0, sadece borsa gecikmesi)
+        refresh_times = []
+        for user_id in user_ids[:10]:
+            previous = snapshotter.get(user_id).fetched_at
+            snapshotter.request_refresh(user_id)
+            refresh_times.append(await wait_for_update(snapshotter, user_id, previous))
+        print(f"🔄 request_refresh after trade -> updated snapshot: "
+              f"p50 {statistics.median(refresh_times):.0f}ms, max {max(refresh_times):.0f}ms")
+
+        # Arıza: tüm istekler 5xx, son başarılı veri hata ile korunmalı
+        config.fail_rate = 1.0
+        target = user_ids[0]
+        before = snapshotter.get(target)
+        snapshotter.request_refresh(target)
+        await wait_for_update(snapshotter, target, before.fetched_at)
+        after = snapshotter.get(target)
+        kept = after.fetched_at == before.fetched_at and after.positions == before.positions and after.error
+        print(f"🔥 Failed refresh: positions kept={bool(kept)}, error={after.error!r}")
+        print(format_portfolio(after).splitlines()[-1])
+        config.fail_rate = 0.0
+
+        snapshotter.stop()
+        await task
+        print(f"\n📊 Stats: {snapshotter.get_stats()}")
+        return bool(kept)
+    finally:
+        await runner.cleanup()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Portfolio snapshot benchmark")
+    parser.add_argument('--users', type=int, default=100)
+    parser.add_argument('--latency-ms', type=float, default=300.0)
+    parser.add_argument('--requests', type=int, default=1000, help="Snapshot'tan cevaplanan status isteği")
+    parser.add_argument('--live-samples', type=int, default=20, help="Canlı ölçülen status isteği")
+    args = parser.parse_args()
+    ok = asyncio.run(main(args.users, args.latency_ms, args.requests, args.live_samples))
+    sys.exit(0 if ok else 1)
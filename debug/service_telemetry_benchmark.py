@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+Service Telemetry Benchmark - supervisor telemetrisinin sızıntı / takılma tespit süresi ve maliyeti
+Geçici dizinde ProductionSupervisor altında üç sahte servis (heartbeat + incr sayaçları):
+  1) steady:  düzenli poll döngüsü
+  2) leaky:   her turda RSS büyür ve kapatılmayan alt process bırakır (sızan Selenium/chromedriver)
+  3) stalled: heartbeat thread'i yaşıyor ama ana döngü bir süre sonra takılıyor (polls durur)
+  4) failover: standby olarak başlar (standby_polls), bir süre sonra lider olur (polls);
+     sayaçlardan biri hep durmuş olsa da takılma uyarısı üretmemeli
+Eski durum: log_system_status 10 dakikada bir sadece çalışıyor/çalışmıyor yazıyordu; üçü de
+"çalışıyor" görünürdü.
+
+Kullanım:
+    python3 debug/service_telemetry_benchmark.py
+"""
+import os
+import sys
+import time
+import signal
+import tempfile
+import threading
+import statistics
+
+CORE_DIR = os.path.realpath(os.path.join(os.path.dirname(os.path.realpath(__file__)), '..', 'production', 'core'))
+WORKDIR = tempfile.mkdtemp(prefix="service_telemetry_")
+os.environ["STATE_DB_PATH"] = os.path.join(WORKDIR, "state.db")
+os.environ["TELEMETRY_INTERVAL"] = "0.2"
+sys.path.append(CORE_DIR)
+import service_telemetry
+from service_telemetry import analyze, format_report, sample_process_groups
+from state_store import state_store
+
+STALL_AFTER = 1.0  # benchmark için 180 sn yerine
+
+SERVICE_SCRIPT = """
+import sys, time, subprocess
+sys.path.append({core_dir!r})
+from service_heartbeat import service_heartbeat
+service_heartbeat.start()
+kind = sys.argv[1]
+started = time.monotonic()
+leaked, children = [], []
+while True:
+    if kind == "stalled" and time.monotonic() - started > 1.0:
+        time.sleep(3600)  # ana döngü takıldı, heartbeat thread'i yaşıyor
+    if kind == "failover" and time.monotonic() - started < 1.0:
+        service_heartbeat.incr('standby_polls')  # lease bekleyen hot standby
+    else:
+        service_heartbeat.incr('polls')
+    if kind == "leaky":
+        leaked.append(bytearray(b"x" * 4 * 1024 * 1024))
+        if len(leaked) % 5 == 0:
+            children.append(subprocess.Popen(["sleep", "3600"]))
+    time.sleep(0.05)
+"""
+
+
+def main():
+    os.chdir(WORKDIR)
+    service_telemetry.STALL_AFTER = STALL_AFTER
+    from production_supervisor import ProductionSupervisor
+
+    script = os.path.join(WORKDIR, "telemetry_service.py")
+    with open(script, "w") as f:
+        f.write(SERVICE_SCRIPT.format(core_dir=CORE_DIR))
+    config = {kind: {"command": [sys.executable, script, kind], "description": kind, "max_restarts": 5,
+                     "restart_window": 3600, "heartbeat_timeout": 1.0, "depends_on": [], "critical": False}
+              for kind in ("steady", "leaky", "stalled", "failover")}
+
+    supervisor = ProductionSupervisor(services=config, heartbeat_socket=os.path.join(WORKDIR, "hb.sock"))
+    supervisor.start_all_services()
+    started = time.monotonic()
+    monitor = threading.Thread(target=supervisor.monitor_services, daemon=True)
+    monitor.start()
+
+    detected = {}
+    try:
+        # failover: devralmadan sonra standby_polls'un takılma eşiğini geçmesini de bekle
+        deadline = time.monotonic() + 15
+        settle = started + 1.0 + STALL_AFTER + 3 * supervisor.telemetry.interval
+        while (len(detected) < 3 or time.monotonic() < settle) and time.monotonic() < deadline:
+            for name in config:
+                for warning in analyze(state_store.telemetry_series(name)):
+                    key = (name, warning.split()[0])
+                    if key not in detected:
+                        detected[key] = (time.monotonic() - started, warning)
+            time.sleep(0.05)
+
+        print(f"⏱️ Telemetry interval {supervisor.telemetry.interval}s, stall threshold {STALL_AFTER}s (prod 180s)")
+        for (name, _), (elapsed, warning) in sorted(detected.items(), key=lambda item: item[1][0]):
+            print(f"🔎 {name}: {warning} - detected {elapsed:.1f}s after start")
+        for name in ("steady", "failover"):
+            warnings = analyze(state_store.telemetry_series(name))
+            print(f"{'❌' if warnings else '✅'} {name} service warnings: {warnings or 'none'}")
+        print()
+        print(format_report())
+
+        with supervisor._lock:
+            snapshot = supervisor.telemetry_snapshot()
+        scan_ms, round_ms = [], []
+        for _ in range(50):
+            t0 = time.perf_counter()
+            sample_process_groups(info['pid'] for info in snapshot.values() if info['pid'])
+            scan_ms.append((time.perf_counter() - t0) * 1000)
+            t0 = time.perf_counter()
+            supervisor.telemetry.sample(snapshot)
+            round_ms.append((time.perf_counter() - t0) * 1000)
+        print()
+        print(f"📏 /proc scan p50 {statistics.median(scan_ms):.2f}ms, full sample + ring write "
+              f"p50 {statistics.median(round_ms):.2f}ms ({len(os.listdir('/proc'))} /proc entries); "
+              f"runs on its own thread, selector loop untouched")
+    finally:
+        # stop_service sadece grup liderini durdurur: sızan `sleep` çocuklarını grupla temizle
+        pgids = [info['process'].pid for info in supervisor.processes.values()]
+        supervisor.stop_all_services()
+        monitor.join(timeout=5)
+        for pgid in pgids:
+            try:
+                os.killpg(pgid, signal.SIGKILL)
+            except ProcessLookupError:
+                pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+State Timeout Benchmark - UserStateTimeoutManager cleanup tick'i: O(n) tarama vs TimerWheel
+  1) 100k sentetik dialog state'i, 30 saniyelik tick'lerle süreleri dolar
+     eski: her tick'te tüm dict taranır / yeni: sadece süresi dolan slot'lar çıkar
+  2) Churn: state'ler sürekli yenilenir/silinir -> slot sayısı ve bellek sınırlı kalır
+
+Kullanım:
+    python3 debug/state_timeout_benchmark.py
+    python3 debug/state_timeout_benchmark.py --states 500000 --ticks 40
+"""
+import os
+import sys
+import time
+import random
+import argparse
+import tracemalloc
+
+sys.path.append(os.path.join(os.path.dirname(os.path.realpath(__file__)), '..', 'production', 'core'))
+from timer_wheel import TimerWheel
+
+TIMEOUT = 600.0
+TICK = 30.0
+
+
+def legacy_tick(timestamps: dict, now: float) -> list:
+    """Eski check_and_cleanup_expired_states: tüm state'leri tara"""
+    expired = [user_id for user_id, ts in timestamps.items() if now - ts > TIMEOUT]
+    for user_id in expired:
+        del timestamps[user_id]
+    return expired
+
+
+def bench_ticks(states: int, ticks: int):
+    rng = random.Random(7)
+    base = 1_000_000.0
+    # State'ler 10 dakikaya yayılmış: her 30 saniyelik tick'te ~%5'inin süresi dolar
+    started_at = {100000 + i: base + rng.uniform(0, TIMEOUT) for i in range(states)}
+
+    legacy = dict(started_at)
+    wheel = TimerWheel()
+    for user_id, ts in started_at.items():
+        wheel.set(user_id, ts + TIMEOUT)
+
+    legacy_times, wheel_times, legacy_total, wheel_total = [], [], 0, 0
+    for tick in range(1, ticks + 1):
+        now = base + TIMEOUT + tick * TICK
+
+        t0 = time.perf_counter()
+        legacy_total += len(legacy_tick(legacy, now))
+        legacy_times.append((time.perf_counter() - t0) * 1000)
+
+        t0 = time.perf_counter()
+        wheel_total += len(wheel.pop_expired(now))
+        wheel_times.append((time.perf_counter() - t0) * 1000)
+
+    print(f"⏱️ {states} states, {ticks} ticks of {TICK:.0f}s (~{int(states * TICK / TIMEOUT)} expire per tick)")
+    print(f"   legacy O(n) scan : avg {sum(legacy_times) / ticks:8.3f}ms, max {max(legacy_times):8.3f}ms "
+          f"({legacy_total} expired)")
+    print(f"   TimerWheel       : avg {sum(wheel_times) / ticks:8.3f}ms, max {max(wheel_times):8.3f}ms "
+          f"({wheel_total} expired)")
+
+    # Yeni state'ler girdi ama henüz hiçbiri dolmadı: eski yol yine hepsini tarar
+    now = base + TIMEOUT + ticks * TICK
+    for user_id in range(states):
+        legacy[user_id] = now
+        wheel.set(user_id, now + TIMEOUT)
+    t0 = time.perf_counter()
+    legacy_tick(legacy, now + TICK)
+    idle_legacy = (time.perf_counter() - t0) * 1000
+    t0 = time.perf_counter()
+    wheel.pop_expired(now + TICK)
+    idle_wheel = (time.perf_counter() - t0) * 1000
+    print(f"   idle tick        : legacy {idle_legacy:.3f}ms vs wheel {idle_wheel:.4f}ms ({len(wheel)} live)")
+    return legacy_total == wheel_total
+
+
+def bench_churn(states: int, operations: int):
+    """Kullanıcılar state'e girip çıkıyor / yeniliyor: wheel boş slot'larla şişmemeli"""
+    rng = random.Random(11)
+    tracemalloc.start()
+    wheel = TimerWheel()
+    now = 0.0
+    peak_slots = 0
+    for i in range(operations):
+        user_id = 100000 + rng.randrange(states)
+        now += 0.01
+        if rng.random() < 0.6:
+            wheel.set(user_id, now + TIMEOUT)
+        else:
+            wheel.discard(user_id)
+        if i % 3000 == 0:
+            wheel.pop_expired(now)
+            peak_slots = max(peak_slots, wheel.get_stats()['slots'])
+    _, peak_bytes = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    stats = wheel.get_stats()
+    print(f"♻️ Churn: {operations} set/discard over {states} users ({now:.0f}s simulated) -> "
+          f"live {stats['live']}, open slots {stats['slots']} (peak {peak_slots}), "
+          f"peak memory {peak_bytes / 1e6:.1f}MB")
+    # Açık slot sayısı timeout / resolution (+ tick payı) ile sınırlı
+    return peak_slots <= (TIMEOUT + 30) / wheel.resolution + 2
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="UserStateTimeoutManager expiry benchmark")
+    parser.add_argument('--states', type=int, default=100000)
+    parser.add_argument('--ticks', type=int, default=20)
+    parser.add_argument('--churn', type=int, default=1000000)
+    args = parser.parse_args()
+    ok = bench_ticks(args.states, args.ticks)
+    ok &= bench_churn(args.states, args.churn)
+    print("✅ Expired sets match, memory bounded" if ok else "❌ Mismatch")
+    sys.exit(0 if ok else 1)
@@ -0,0 +1,215 @@
+#!/usr/bin/env python3
+"""
+Stream Workers Test - StableTradingSystem consumer groups
+Yerel redis uyumlu bir stand-in ile:
+  1) Kuyruktaki order'ları 1/2/4 worker ile işler (throughput ölçeklenmesi)
+  2) Bir worker'ı ack vermeden "öldürür"; kalan worker'lar XAUTOCLAIM ile devralmalı
+  3) Listing stream'i: tüketici meşgulken yayınlanan listing'ler kaybolmamalı
+  4) Restart sonrası kendi PEL'i: geçici hata veren entry'ler art arda okunup dead-letter olmamalı
+
+Kullanım:
+    python3 debug/stream_workers_test.py                          # fakeredis (pip install fakeredis)
+    REDIS_URL=redis://localhost:6379 python3 debug/stream_workers_test.py   # redis/valkey/keydb
+"""
+import os
+import sys
+import time
+import uuid
+import asyncio
+import argparse
+
+ROOT_DIR = os.path.join(os.path.dirname(os.path.realpath(__file__)), '..')
+sys.path.append(ROOT_DIR)
+# stable_trading_system import anında logs/stable_system.log açar; logs -> production/monitoring/logs
+os.makedirs(os.path.realpath(os.path.join(ROOT_DIR, 'logs')), exist_ok=True)
+from stable_trading_system import (StableTradingSystem, DatabaseManager, StreamConsumer,
+                                   create_redis_client, ORDERS_GROUP, LISTINGS_GROUP)
+
+TEST_DB = "stream_workers_test.db"
+
+
+class SimulatedSystem(StableTradingSystem):
+    """Order yürütmeyi sabit gecikmeyle taklit eder (Bitget çağrısı yerine)"""
+
+    trade_latency = 0.02
+    fail_until = 0.0   # bu zamana kadar (monotonic) geçici hata
+
+    async def _execute_order(self, task_id, user_id, token, action, redelivered=False):
+        if time.monotonic() < self.fail_until:
+            raise ConnectionError("simulated transient error")
+        await asyncio.sleep(self.trade_latency)
+        return {'orderId': f"sim-{task_id[:8]}"}
+
+
+async def make_system(redis_client, workers: int, claim_idle_ms: int, run_id: str) -> SimulatedSystem:
+    system = SimulatedSystem()
+    system.db_manager = DatabaseManager(TEST_DB)
+    await system.db_manager.initialize()
+    system.redis_client = redis_client
+    system.listings_stream = f"test:{run_id}:listings"
+    system.pending_orders_stream = f"test:{run_id}:orders"
+    system.consumer_name = f"test-{run_id}"
+    system.order_workers = workers
+    system.claim_idle_ms = claim_idle_ms
+    system.consumers = system._create_consumers()
+    for consumer in system.consumers:
+        await consumer.ensure_group()
+    return system
+
+
+async def seed_orders(system: StableTradingSystem, count: int):
+    tasks = [{'task_id': str(uuid.uuid4()), 'user_id': 1000 + i} for i in range(count)]
+    async with system.db_manager.pool.connection() as db:
+        await db.executemany("""
+            INSERT INTO trading_tasks (id, user_id, announcement_id, token_symbol, action, status)
+            VALUES (?, ?, 'test', 'TEST', 'open', 'pending')
+        """, [(task['task_id'], task['user_id']) for task in tasks])
+        await db.commit()
+    await system._queue_trade_tasks(tasks, "TEST")
+    return [task['task_id'] for task in tasks]
+
+
+async def task_statuses(system: StableTradingSystem, task_ids) -> dict:
+    counts = {}
+    async with system.db_manager.pool.connection() as db:
+        for i in range(0, len(task_ids), 500):
+            chunk = task_ids[i:i + 500]
+            cursor = await db.execute(
+                f"SELECT status, COUNT(*) FROM trading_tasks WHERE id IN ({','.join('?' * len(chunk))}) GROUP BY status",
+                chunk)
+            for status, count in await cursor.fetchall():
+                counts[status] = counts.get(status, 0) + count
+    return counts
+
+
+async def drain(system: StableTradingSystem, task_ids, timeout: float) -> float:
+    """Consumer'ları tüm task'lar completed olana kadar çalıştır; süreyi döndür"""
+    system.running = True
+    started = time.perf_counter()
+    runner = asyncio.create_task(system._run_consumers())
+    try:
+        deadline = started + timeout
+        while time.perf_counter() < deadline:
+            if (await task_statuses(system, task_ids)).get('completed', 0) == len(task_ids):
+                break
+            await asyncio.sleep(0.05)
+        return time.perf_counter() - started
+    finally:
+        system.running = False
+        await runner
+
+
+async def test_scaling(redis_client, orders: int):
+    print(f"\n📈 Throughput: {orders} orders, {SimulatedSystem.trade_latency * 1000:.0f}ms simulated trade latency")
+    print(f"{'WORKERS':>8}{'SECONDS':>10}{'ORDERS/S':>10}  RESULT")
+    for workers in (1, 2, 4):
+        system = await make_system(redis_client, workers, 60000, uuid.uuid4().hex[:6])
+        task_ids = await seed_orders(system, orders)
+        elapsed = await drain(system, task_ids, timeout=120)
+        statuses = await task_statuses(system, task_ids)
+        result = "✅" if statuses == {'completed': orders} else f"❌ {statuses}"
+        print(f"{workers:>8}{elapsed:>10.2f}{orders / elapsed:>10.0f}  {result}")
+        await system.db_manager.close()
+
+
+async def test_crash_reclaim(redis_client, orders: int):
+    print(f"\n♻️ Crash reclaim: a consumer reads {orders} orders and dies without XACK")
+    run_id = uuid.uuid4().hex[:6]
+    system = await make_system(redis_client, 2, claim_idle_ms=300, run_id=run_id)
+    task_ids = await seed_orders(system, orders)
+
+    # "Ölen" worker: entry'leri alır, task'ları processing'e çeker, ack vermez
+    crashed = StreamConsumer(redis_client, system.pending_orders_stream, ORDERS_GROUP,
+                             f"test-{run_id}-crashed", handler=None)
+    stolen = await crashed._read('>')
+    async with system.db_manager.pool.connection() as db:
+        await db.executemany("UPDATE trading_tasks SET status = 'processing' WHERE id = ?",
+                             [(fields['task_id'],) for _, fields in stolen])
+        await db.commit()
+    print(f"   💀 crashed consumer held {len(stolen)} entries")
+
+    elapsed = await drain(system, task_ids, timeout=30)
+    statuses = await task_statuses(system, task_ids)
+    reclaimed = sum(consumer.stats['reclaimed'] for consumer in system.consumers)
+    pending = await redis_client.xpending(system.pending_orders_stream, ORDERS_GROUP)
+    ok = statuses == {'completed': orders} and pending['pending'] == 0
+    print(f"   {'✅' if ok else '❌'} {statuses} in {elapsed:.2f}s, reclaimed={reclaimed}, "
+          f"pending entries left={pending['pending']}")
+    await system.db_manager.close()
+
+
+async def test_listing_backlog(redis_client, listings: int):
+    print(f"\n📰 Listing backlog: {listings} listings published while no consumer is running")
+    system = await make_system(redis_client, 0, 60000, uuid.uuid4().hex[:6])
+    handled = []
+
+    async def record(listing):
+        handled.append(listing['announcement_id'])
+
+    system.consumers[0].handler = record
+    for i in range(listings):
+        await redis_client.xadd(system.listings_stream, {"announcement_id": f"a{i}", "token": f"T{i}"})
+
+    system.running = True
+    runner = asyncio.create_task(system._run_consumers())
+    for _ in range(100):
+        if len(handled) >= listings:
+            break
+        await asyncio.sleep(0.05)
+    system.running = False
+    await runner
+
+    info = await redis_client.xinfo_groups(system.listings_stream)
+    lag_ok = all(group['pending'] == 0 for group in info if group['name'] == LISTINGS_GROUP)
+    print(f"   {'✅' if len(handled) == listings and lag_ok else '❌'} handled {len(handled)}/{listings}")
+    await system.db_manager.close()
+
+
+async def test_startup_pending(redis_client, orders: int):
+    print(f"\n🔁 Restart with {orders} own pending entries and a 1s transient handler error")
+    run_id = uuid.uuid4().hex[:6]
+    system = await make_system(redis_client, 1, claim_idle_ms=500, run_id=run_id)
+    task_ids = await seed_orders(system, orders)
+    # Önceki instance: aynı consumer adıyla okudu, ack vermeden öldü
+    previous = StreamConsumer(redis_client, system.pending_orders_stream, ORDERS_GROUP,
+                              system.consumers[0].consumer, handler=None)
+    await previous._read('>')
+
+    system.fail_until = time.monotonic() + 1.0
+    elapsed = await drain(system, task_ids, timeout=30)
+    statuses = await task_statuses(system, task_ids)
+    dead = sum(consumer.stats['dead_lettered'] for consumer in system.consumers)
+    ok = statuses == {'completed': orders} and dead == 0
+    print(f"   {'✅' if ok else '❌'} {statuses} in {elapsed:.2f}s, dead-lettered={dead} "
+          f"(retries via XAUTOCLAIM, not back-to-back re-reads)")
+    await system.db_manager.close()
+
+
+async def main(orders: int, listings: int):
+    for suffix in ('', '-wal', '-shm'):
+        if os.path.exists(TEST_DB + suffix):
+            os.remove(TEST_DB + suffix)
+
+    redis_client = create_redis_client(os.getenv('REDIS_URL', 'fakeredis://'))
+    await redis_client.ping()
+    try:
+        await test_scaling(redis_client, orders)
+        await test_crash_reclaim(redis_client, min(orders, 20))
+        await test_listing_backlog(redis_client, listings)
+        await test_startup_pending(redis_client, min(orders, 20))
+    finally:
+        # Test stream'lerini temizle
+        async for key in redis_client.scan_iter(match="test:*"):
+            await redis_client.delete(key)
+        await redis_client.aclose()
+        for suffix in ('', '-wal', '-shm'):
+            if os.path.exists(TEST_DB + suffix):
+                os.remove(TEST_DB + suffix)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Redis Streams consumer group test")
+    parser.add_argument('--orders', type=int, default=200)
+    parser.add_argument('--listings', type=int, default=25)
+    args = parser.parse_args()
+    asyncio.run(main(args.orders, args.listings))
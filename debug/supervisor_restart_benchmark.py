@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+Supervisor Restart Benchmark - ProductionSupervisor time-to-restart ölçümü
+Geçici dizinde sahte servisler (service_heartbeat ile heartbeat gönderen küçük scriptler):
+  1) Crash: servis SIGKILL ile ölür -> pidfd event -> yeni process + ilk heartbeat
+  2) Hang: servis SIGSTOP ile donar (heartbeat durur) -> heartbeat_timeout -> kill + restart
+  3) Loop hang: ana döngü takılır, heartbeat thread'i yaşar (SIGUSR1) -> stall_after sonra
+     beat kesilir -> heartbeat_timeout -> kill + restart
+Eski döngüyle karşılaştırma: 30 sn poll + 5 sn startup bekleme (crash),
+2 dk health dosyası eşiği + 30 sn poll (hang).
+
+Kullanım:
+    python3 debug/supervisor_restart_benchmark.py
+    python3 debug/supervisor_restart_benchmark.py --services 8 --heartbeat-timeout 0.5
+"""
+import os
+import sys
+import time
+import signal
+import argparse
+import tempfile
+import threading
+import statistics
+
+CORE_DIR = os.path.join(os.path.dirname(os.path.realpath(__file__)), '..', 'production', 'core')
+sys.path.append(CORE_DIR)
+
+LOOP_STALL_AFTER = 0.5
+
+SERVICE_SCRIPT = """
+import sys, time, signal
+sys.path.append({core_dir!r})
+from service_heartbeat import service_heartbeat
+hung = []
+signal.signal(signal.SIGUSR1, lambda signum, frame: hung.append(True))
+service_heartbeat.start(stall_after={stall_after})
+while True:
+    if hung:
+        time.sleep(3600)  # takılan istek: thread yaşıyor, döngü ilerlemiyor
+    service_heartbeat.sleep(1)
+"""
+
+
+def wait_until(predicate, timeout: float = 30.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return time.monotonic()
+        time.sleep(0.001)
+    raise TimeoutError("condition not met")
+
+
+def current(supervisor, name):
+    info = supervisor.processes.get(name)
+    return (info['process'].pid, info['last_beat']) if info else (None, None)
+
+
+def measure(supervisor, name, fault: int):
+    """Servise sinyal gönder, yeni PID ve yeni PID'in ilk heartbeat'ine kadar geçen süre"""
+    old_pid, _ = current(supervisor, name)
+    started = time.monotonic()
+    os.kill(old_pid, fault)
+    restarted = wait_until(lambda: current(supervisor, name)[0] not in (None, old_pid))
+    ready = wait_until(lambda: current(supervisor, name)[1] is not None)
+    return (restarted - started) * 1000, (ready - started) * 1000
+
+
+def report(label, results, legacy):
+    restart = [r for r, _ in results]
+    ready = [r for _, r in results]
+    print(f"{label}: restart p50 {statistics.median(restart):.0f}ms (max {max(restart):.0f}ms), "
+          f"first heartbeat p50 {statistics.median(ready):.0f}ms (max {max(ready):.0f}ms) | legacy {legacy}")
+
+
+def main(services: int, heartbeat_timeout: float):
+    workdir = tempfile.mkdtemp(prefix="supervisor_bench_")
+    os.chdir(workdir)
+    from production_supervisor import ProductionSupervisor, STABLE_AFTER
+
+    config = {}
+    for i in range(services):
+        script = os.path.join(workdir, f"bench_service_{i}.py")
+        with open(script, 'w') as f:
+            f.write(SERVICE_SCRIPT.format(core_dir=os.path.realpath(CORE_DIR), stall_after=LOOP_STALL_AFTER))
+        config[f"svc{i}"] = {"command": [sys.executable, script], "description": f"🧪 svc{i}",
+                             "max_restarts": 100, "restart_window": 3600,
+                             "heartbeat_timeout": heartbeat_timeout, "critical": False}
+
+    supervisor = ProductionSupervisor(services=config, heartbeat_socket=os.path.join(workdir, "hb.sock"))
+    monitor = threading.Thread(target=supervisor.monitor_services, daemon=True)
+    monitor.start()
+    try:
+        wait_until(lambda: all(current(supervisor, name)[1] is not None for name in config))
+        print(f"🧪 {services} services up (heartbeat every 0.2s, timeout {heartbeat_timeout}s)")
+
+        crash = [measure(supervisor, name, signal.SIGKILL) for name in config]
+        report("💥 Crash (SIGKILL)", crash, "≈ 15s avg / 35s worst (30s poll + 5s startup sleep)")
+
+        # Backoff sıfırlansın diye servisler STABLE_AFTER kadar ayakta kalsın
+        time.sleep(STABLE_AFTER + 0.5)
+        hang = [measure(supervisor, name, signal.SIGSTOP) for name in config]
+        report("🧊 Hang (SIGSTOP)", hang, "≈ 2-2.5 min (2 min stale health file + 30s poll)")
+
+        time.sleep(STABLE_AFTER + 0.5)
+        loop_hang = [measure(supervisor, name, signal.SIGUSR1) for name in config]
+        report(f"🪝 Loop hang (stall_after {LOOP_STALL_AFTER}s)", loop_hang,
+               "never (heartbeat thread kept beating)")
+
+        print(f"📊 {supervisor.get_restart_stats()['svc0']}")
+    finally:
+        supervisor.stop_all_services()
+        monitor.join(timeout=5)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Supervisor time-to-restart benchmark")
+    parser.add_argument('--services', type=int, default=6)
+    parser.add_argument('--heartbeat-timeout', type=float, default=1.0)
+    args = parser.parse_args()
+    main(args.services, args.heartbeat_timeout)
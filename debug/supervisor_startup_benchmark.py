@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+"""
+Supervisor Startup Benchmark - soğuk başlangıçta tüm servislerin hazır olma süresi
+Geçici dizinde sahte servisler (import süresini taklit eden boot gecikmesi + heartbeat),
+her servisin önceden çalışan eski bir instance'ı da var (409 temizliği devreye girsin):
+  1) Eski yol: servis başına pgrep/ps/kill + 2 sn bekleme, servisler arası 3 sn stagger
+  2) Yeni yol: tek /proc taraması + toplu SIGTERM, bağımlılık grafiğine göre paralel başlangıç
+
+Kullanım:
+    python3 debug/supervisor_startup_benchmark.py
+"""
+import os
+import sys
+import time
+import argparse
+import tempfile
+import threading
+import subprocess
+
+CORE_DIR = os.path.join(os.path.dirname(os.path.realpath(__file__)), '..', 'production', 'core')
+sys.path.append(CORE_DIR)
+
+SERVICE_SCRIPT = """
+import os, sys, time
+sys.path.append({core_dir!r})
+time.sleep({boot_delay})  # import / bağlantı kurulumu
+from service_heartbeat import service_heartbeat
+if "stale" not in sys.argv:
+    open(__file__ + ".ready", "w").close()
+service_heartbeat.start()
+while True:
+    time.sleep(1)
+"""
+
+# servis -> (boot gecikmesi sn, bağımlılıklar)
+SERVICES = {
+    "notification_sender": (0.4, []),
+    "telegram_bot": (1.2, ["notification_sender"]),
+    "upbit_monitor": (1.0, []),
+    "market_tracker": (0.3, []),
+}
+
+
+def write_services(workdir):
+    config = {}
+    for name, (boot_delay, depends_on) in SERVICES.items():
+        script = os.path.join(workdir, f"{name}_bench.py")
+        with open(script, 'w') as f:
+            f.write(SERVICE_SCRIPT.format(core_dir=os.path.realpath(CORE_DIR), boot_delay=boot_delay))
+        config[name] = {"command": [sys.executable, script], "description": name, "max_restarts": 5,
+                        "restart_window": 3600, "heartbeat_timeout": 1.0, "depends_on": depends_on,
+                        "critical": True}
+    return config
+
+
+def spawn_stale(config):
+    """Önceki çalıştırmadan kalmış instance'lar (heartbeat env'i yok)"""
+    env = {k: v for k, v in os.environ.items() if not k.startswith("SUPERVISOR_")}
+    return [subprocess.Popen(c["command"] + ["stale"], env=env, stdout=subprocess.DEVNULL,
+                             stderr=subprocess.DEVNULL) for c in config.values()]
+
+
+def clear_ready(config):
+    for c in config.values():
+        try:
+            os.unlink(c["command"][1] + ".ready")
+        except FileNotFoundError:
+            pass
+
+
+def legacy_kill(script_name):
+    """Eski kill_existing_instances: pgrep + ps + kill alt süreçleri, sabit 2 sn bekleme"""
+    result = subprocess.run(["pgrep", "-f", script_name], capture_output=True, text=True)
+    if result.returncode == 0:
+        for pid in [p.strip() for p in result.stdout.split('\n') if p.strip()]:
+            ps_result = subprocess.run(["ps", "-p", pid, "-o", "cmd="], capture_output=True, text=True)
+            if "production_supervisor.py" not in ps_result.stdout and str(os.getpid()) != pid:
+                subprocess.run(["kill", "-TERM", pid], timeout=3)
+        time.sleep(2)
+        result = subprocess.run(["pgrep", "-f", script_name], capture_output=True, text=True)
+
+
+def watch_ready(config, started, ready):
+    while len(ready) < len(config):
+        for name, c in config.items():
+            if name not in ready and os.path.exists(c["command"][1] + ".ready"):
+                ready[name] = (time.monotonic() - started) * 1000
+        time.sleep(0.005)
+
+
+def legacy_start(config):
+    started = time.monotonic()
+    ready = {}
+    watcher = threading.Thread(target=watch_ready, args=(config, started, ready), daemon=True)
+    watcher.start()
+    processes = []
+    for c in config.values():
+        legacy_kill(c["command"][1])
+        processes.append(subprocess.Popen(c["command"], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL))
+        time.sleep(3)  # stagger
+    watcher.join()
+    for process in processes:
+        process.kill()
+        process.wait()
+    return ready
+
+
+def main():
+    workdir = tempfile.mkdtemp(prefix="supervisor_startup_")
+    os.chdir(workdir)
+    from production_supervisor import ProductionSupervisor
+
+    config = write_services(workdir)
+
+    stale = spawn_stale(config)
+    time.sleep(0.5)
+    legacy = legacy_start(config)
+    for p in stale:
+        p.wait()
+    print(f"🐢 Legacy sequential start: all ready in {max(legacy.values()) / 1000:.2f}s "
+          f"({', '.join(f'{n} {ms / 1000:.1f}s' for n, ms in legacy.items())})")
+
+    clear_ready(config)
+    stale = spawn_stale(config)
+    time.sleep(0.5)
+    supervisor = ProductionSupervisor(services=config, heartbeat_socket=os.path.join(workdir, "hb.sock"))
+    scan_started = time.perf_counter()
+    supervisor.start_all_services()
+    monitor = threading.Thread(target=supervisor.monitor_services, daemon=True)
+    monitor.start()
+    try:
+        deadline = time.monotonic() + 30
+        while supervisor.get_startup_report()['total_ms'] is None and time.monotonic() < deadline:
+            time.sleep(0.005)
+        report = supervisor.get_startup_report()
+        for p in stale:
+            p.wait()
+        print(f"⚡ Dependency-aware parallel start: all ready in {report['total_ms'] / 1000:.2f}s "
+              f"({', '.join(f'{n} {ms / 1000:.1f}s' for n, ms in report['services_ms'].items())})")
+        print(f"   order: {' -> '.join(supervisor.start_order)}; telegram_bot waits for notification_sender "
+              f"readiness (boot {SERVICES['notification_sender'][0]}s + {SERVICES['telegram_bot'][0]}s)")
+        print(f"   stale instances cleaned by one /proc scan + batch SIGTERM "
+              f"(scan_started -> all ready {time.perf_counter() - scan_started:.2f}s)")
+    finally:
+        supervisor.stop_all_services()
+        monitor.join(timeout=5)
+
+
+if __name__ == "__main__":
+    argparse.ArgumentParser(description="Supervisor cold start benchmark").parse_args()
+    main()
@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""
+Telegram Notifier Benchmark - eski seri requests.post döngüsü vs TelegramNotifier
+Yerel fake Bot API (aiohttp.web) Telegram limitlerini uygular:
+  - global 30 msg/s, chat başına 1 msg/s -> aşılırsa 429 + parameters.retry_after
+  - her istekte sabit gecikme (--latency-ms)
+
+Ölçülen: teslim edilen mesaj, toplam süre, ilk->son alıcı süresi, 429 sayısı.
+Ayrıca aynı chat'e burst (coalescing) senaryosu.
+
+Kullanım:
+    python3 debug/telegram_notifier_benchmark.py
+    python3 debug/telegram_notifier_benchmark.py --recipients 300 --latency-ms 80
+"""
+import os
+import sys
+import time
+import asyncio
+import argparse
+from collections import deque
+
+import requests
+from aiohttp import web
+
+sys.path.append(os.path.join(os.path.dirname(os.path.realpath(__file__)), '..', 'production', 'core'))
+from telegram_notifier import TelegramNotifier
+
+BENCH_TOKEN = "123456:BENCH"
+
+
+class FakeBotAPI:
+    """sendMessage uç noktası; Telegram'ın flood limitlerini taklit eder"""
+
+    def __init__(self, latency_ms: float, global_rate: int = 30, chat_interval: float = 1.0):
+        self.latency = latency_ms / 1000.0
+        self.global_rate = global_rate
+        self.chat_interval = chat_interval
+        self.reset()
+
+    def reset(self):
+        self.window = deque()
+        self.last_by_chat = {}
+        self.delivered = {}
+        self.rate_limited = 0
+        self.requests = 0
+
+    async def send_message(self, request):
+        payload = await request.json()
+        chat_id = int(payload['chat_id'])
+        self.requests += 1
+        await asyncio.sleep(self.latency)
+        now = time.monotonic()
+
+        while self.window and now - self.window[0] > 1.0:
+            self.window.popleft()
+        chat_wait = self.last_by_chat.get(chat_id, -1e9) + self.chat_interval - now
+        if len(self.window) >= self.global_rate or chat_wait > 0:
+            self.rate_limited += 1
+            retry_after = max(1, int(chat_wait + 0.999))
+            return web.json_response({"ok": False, "error_code": 429,
+                                      "description": f"Too Many Requests: retry after {retry_after}",
+                                      "parameters": {"retry_after": retry_after}}, status=429)
+
+        self.window.append(now)
+        self.last_by_chat[chat_id] = now
+        self.delivered.setdefault(chat_id, []).append((now, payload['text']))
+        return web.json_response({"ok": True, "result": {"message_id": self.requests, "chat": {"id": chat_id}}})
+
+    def summary(self, started: float, recipients):
+        first = [self.delivered[chat_id][0][0] for chat_id in recipients if chat_id in self.delivered]
+        return {
+            'delivered': len(first),
+            'first_to_last': (max(first) - min(first)) if first else 0.0,
+            'seconds': (max(first) - started) if first else 0.0,
+            'rate_limited': self.rate_limited,
+        }
+
+
+def legacy_broadcast(api_url: str, recipients, text: str):
+    """Eski davranış: alıcı başına yeni bağlantı ile seri requests.post"""
+    url = f"{api_url}/bot{BENCH_TOKEN}/sendMessage"
+    for chat_id in recipients:
+        try:
+            requests.post(url, json={"chat_id": chat_id, "text": text, "parse_mode": "HTML"}, timeout=10)
+        except requests.RequestException:
+            pass
+
+
+async def run(recipients_count: int, latency_ms: float, burst: int, server_rate: int):
+    api = FakeBotAPI(latency_ms, global_rate=server_rate)
+    app = web.Application()
+    app.router.add_post(f"/bot{BENCH_TOKEN}/sendMessage", api.send_message)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    api_url = f"http://127.0.0.1:{port}"
+
+    recipients = list(range(100000, 100000 + recipients_count))
+    text = "🚀 <b>YENİ COİN LİSTELENDİ!</b> BENCH"
+    floor = recipients_count / min(api.global_rate, 30)
+    print(f"📨 {recipients_count} recipients, {latency_ms:.0f}ms API latency, "
+          f"limit {api.global_rate} msg/s (floor {floor:.1f}s)")
+    print(f"{'MODE':<12}{'DELIVERED':>11}{'SECONDS':>9}{'MSG/S':>8}{'FIRST->LAST':>13}{'429s':>7}")
+
+    try:
+        started = time.monotonic()
+        await asyncio.get_running_loop().run_in_executor(None, legacy_broadcast, api_url, recipients, text)
+        legacy = api.summary(started, recipients)
+
+        api.reset()
+        notifier = TelegramNotifier(BENCH_TOKEN, api_url=api_url)
+        await notifier.start()
+        started = time.monotonic()
+        result = await notifier.broadcast(recipients, text, parse_mode="HTML")
+        service = api.summary(started, recipients)
+
+        for name, row in (("legacy", legacy), ("notifier", service)):
+            rate = row['delivered'] / row['seconds'] if row['seconds'] else 0
+            print(f"{name:<12}{row['delivered']:>6}/{recipients_count:<4}{row['seconds']:>9.2f}{rate:>8.1f}"
+                  f"{row['first_to_last']:>13.2f}{row['rate_limited']:>7}")
+        if result['failed']:
+            print(f"❌ notifier failures: {len(result['failed'])}")
+
+        # Aynı chat'e burst: 1 msg/s limitinde tek tek gönderim 'burst' saniye sürerdi
+        api.reset()
+        chat_id = recipients[0]
+        started = time.monotonic()
+        futures = []
+        for i in range(burst):
+            futures.append(notifier.enqueue(chat_id, f"PnL update #{i}"))
+            await asyncio.sleep(0.01)
+        await asyncio.gather(*futures)
+        elapsed = time.monotonic() - started
+        received = sum(text.count("PnL update") for _, text in api.delivered.get(chat_id, []))
+        print(f"\n🧩 Burst of {burst} to one chat: {received}/{burst} updates in "
+              f"{len(api.delivered.get(chat_id, []))} messages, {elapsed:.2f}s")
+        print(f"📊 Notifier stats: {notifier.get_stats()}")
+        await notifier.close()
+    finally:
+        await runner.cleanup()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Telegram notifier benchmark")
+    parser.add_argument('--recipients', type=int, default=200)
+    parser.add_argument('--latency-ms', type=float, default=50.0)
+    parser.add_argument('--burst', type=int, default=20)
+    parser.add_argument('--server-rate', type=int, default=30,
+                        help="Fake API global limiti; 30'un altı notifier'ın 429/retry_after yolunu test eder")
+    args = parser.parse_args()
+    asyncio.run(run(args.recipients, args.latency_ms, args.burst, args.server_rate))
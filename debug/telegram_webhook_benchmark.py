@@ -0,0 +1,237 @@
+#!/usr/bin/env python3
+"""
+Telegram Webhook Benchmark - long-polling vs webhook, sıralı vs eşzamanlı update işleme
+Yerel fake Bot API (aiohttp.web) Telegram'ı taklit eder:
+  - getUpdates long-poll, setWebhook/deleteWebhook, answerCallbackQuery
+  - her HTTP bacağında --rtt-ms / 2 ağ gecikmesi
+  - webhook modunda update'leri sırayla POST eder (secret token header ile)
+
+Sentetik buton basışları (callback_query) --users kullanıcıdan --rate/s hızla gelir;
+handler answer() çağırır ve --handler-ms kadar iş yapar (DB / borsa API).
+
+Ölçülen: basıştan handler başlangıcına gecikme p50/p95/max, toplam süre ve
+kullanıcı başına sıra ihlali (0 olmalı).
+
+Kullanım:
+    python3 debug/telegram_webhook_benchmark.py
+    python3 debug/telegram_webhook_benchmark.py --users 100 --updates 1000 --rate 300 --handler-ms 50
+"""
+import os
+import sys
+import json
+import time
+import random
+import socket
+import asyncio
+import logging
+import argparse
+
+from aiohttp import web, ClientSession
+from telegram import Update
+from telegram.ext import Application, CallbackQueryHandler
+
+sys.path.append(os.path.join(os.path.dirname(os.path.realpath(__file__)), '..', 'production', 'core'))
+from telegram_webhook import PerUserUpdateProcessor, run_webhook
+
+BENCH_TOKEN = "123456:WEBHOOKBENCH"
+
+
+def percentile(values, pct):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct / 100))]
+
+
+class FakeTelegram:
+    """Bot API'nin update teslimi tarafı: polling ya da webhook"""
+
+    def __init__(self, rtt_ms: float):
+        self.half_rtt = rtt_ms / 2000.0
+        self.updates = []
+        self.injected = {}
+        self.new_update = asyncio.Condition()
+        self.webhook_url = None
+        self.secret_token = None
+        self.webhook_queue: asyncio.Queue = asyncio.Queue()
+        self.api_calls = 0
+
+    def inject(self, update: dict):
+        """Kullanıcı butona bastı: Telegram sunucusuna ulaştığı an"""
+        self.injected[update['update_id']] = time.monotonic()
+        if self.webhook_url:
+            # Ağ gecikmesi boru hattı gibi: her update kendi rtt/2'sini yaşar, sıra korunur
+            asyncio.get_running_loop().call_later(self.half_rtt, self.webhook_queue.put_nowait, update)
+        else:
+            self.updates.append(update)
+            asyncio.get_running_loop().create_task(self._notify())
+
+    async def _notify(self):
+        async with self.new_update:
+            self.new_update.notify_all()
+
+    async def handle(self, request: web.Request) -> web.Response:
+        method = request.match_info['method']
+        params = dict(await request.post())
+        self.api_calls += 1
+        await asyncio.sleep(self.half_rtt)
+
+        result = True
+        if method == 'getMe':
+            result = {"id": 123456, "is_bot": True, "first_name": "Bench", "username": "bench_bot"}
+        elif method == 'getUpdates':
+            offset = int(params.get('offset') or 0)
+            deadline = time.monotonic() + float(params.get('timeout') or 0)
+            async with self.new_update:
+                while True:
+                    pending = [u for u in self.updates if u['update_id'] >= offset]
+                    remaining = deadline - time.monotonic()
+                    if pending or remaining <= 0:
+                        break
+                    try:
+                        await asyncio.wait_for(self.new_update.wait(), remaining)
+                    except asyncio.TimeoutError:
+                        pass
+            self.updates = pending
+            result = pending[:int(params.get('limit') or 100)]
+        elif method == 'setWebhook':
+            self.webhook_url = params['url']
+            self.secret_token = params.get('secret_token')
+        elif method == 'deleteWebhook':
+            self.webhook_url = None
+
+        await asyncio.sleep(self.half_rtt)
+        return web.json_response({"ok": True, "result": result})
+
+    async def deliver_webhooks(self):
+        """Telegram update'leri sırayla POST eder, 200 gelmeden sıradakine geçmez"""
+        async with ClientSession() as session:
+            while True:
+                update = await self.webhook_queue.get()
+                async with session.post(self.webhook_url, json=update,
+                                        headers={"X-Telegram-Bot-Api-Secret-Token": self.secret_token}) as resp:
+                    await resp.read()
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def build_schedule(users: int, updates: int, rate: float):
+    """Poisson gelişli (user_id, seq) buton basışları"""
+    rng = random.Random(42)
+    seq = {}
+    schedule, at = [], 0.0
+    for update_id in range(1, updates + 1):
+        user_id = 500000 + rng.randrange(users)
+        seq[user_id] = seq.get(user_id, 0) + 1
+        at += rng.expovariate(rate)
+        schedule.append((at, {
+            "update_id": update_id,
+            "callback_query": {
+                "id": str(update_id),
+                "from": {"id": user_id, "is_bot": False, "first_name": "U"},
+                "chat_instance": str(user_id),
+                "data": f"seq:{seq[user_id]}",
+            },
+        }))
+    return schedule
+
+
+async def run_mode(name: str, fake: FakeTelegram, api_url: str, schedule, handler_ms: float,
+                   concurrency: int, webhook: bool):
+    latencies, last_seq, violations = [], {}, [0]
+    done = asyncio.Event()
+
+    async def on_button(update: Update, context):
+        query = update.callback_query
+        latencies.append(time.monotonic() - fake.injected[update.update_id])
+        seq = int(query.data.split(':')[1])
+        if seq <= last_seq.get(query.from_user.id, 0):
+            violations[0] += 1
+        last_seq[query.from_user.id] = seq
+        await query.answer()
+        await asyncio.sleep(handler_ms / 1000.0)
+        if len(latencies) == len(schedule):
+            done.set()
+
+    builder = Application.builder().token(BENCH_TOKEN).base_url(f"{api_url}/bot")
+    if concurrency > 1:
+        builder = builder.concurrent_updates(PerUserUpdateProcessor(concurrency))
+    if webhook:
+        builder = builder.updater(None)
+    application = builder.build()
+    application.add_handler(CallbackQueryHandler(on_button))
+
+    stop_event = asyncio.Event()
+    if webhook:
+        port = free_port()
+        runner = asyncio.create_task(run_webhook(application, f"http://127.0.0.1:{port}/hook", port=port,
+                                                 stop_event=stop_event))
+        while not fake.webhook_url:
+            await asyncio.sleep(0.01)
+    else:
+        await application.initialize()
+        await application.updater.start_polling(poll_interval=0.0, timeout=10)
+        await application.start()
+
+    started = time.monotonic()
+    for at, update in schedule:
+        delay = started + at - time.monotonic()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        fake.inject(json.loads(json.dumps(update)))
+    await asyncio.wait_for(done.wait(), 300)
+    elapsed = time.monotonic() - started
+
+    if webhook:
+        stop_event.set()
+        await runner
+    else:
+        await application.updater.stop()
+        await application.stop()
+        await application.shutdown()
+
+    print(f"{name:<22}{len(latencies):>8}{elapsed:>9.2f}{percentile(latencies, 50) * 1000:>9.1f}"
+          f"{percentile(latencies, 95) * 1000:>9.1f}{max(latencies) * 1000:>9.1f}{violations[0]:>8}")
+
+
+async def main(users: int, updates: int, rate: float, handler_ms: float, rtt_ms: float, concurrency: int):
+    schedule = build_schedule(users, updates, rate)
+    print(f"🔘 {updates} button presses from {users} users at {rate:.0f}/s, handler {handler_ms:.0f}ms, "
+          f"RTT {rtt_ms:.0f}ms, concurrency {concurrency}")
+    print(f"{'MODE':<22}{'UPDATES':>8}{'SECONDS':>9}{'P50 MS':>9}{'P95 MS':>9}{'MAX MS':>9}{'ORDER':>8}")
+
+    modes = (
+        ("polling sequential", 1, False),
+        ("polling concurrent", concurrency, False),
+        ("webhook concurrent", concurrency, True),
+    )
+    for name, mode_concurrency, webhook in modes:
+        fake = FakeTelegram(rtt_ms)
+        app = web.Application()
+        app.router.add_post("/bot{token}/{method}", fake.handle)
+        runner = web.AppRunner(app, access_log=None)
+        await runner.setup()
+        site = web.TCPSite(runner, "127.0.0.1", 0)
+        await site.start()
+        api_url = f"http://127.0.0.1:{site._server.sockets[0].getsockname()[1]}"
+        deliverer = asyncio.create_task(fake.deliver_webhooks())
+        try:
+            await run_mode(name, fake, api_url, schedule, handler_ms, mode_concurrency, webhook)
+        finally:
+            deliverer.cancel()
+            await runner.cleanup()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Telegram webhook vs polling benchmark")
+    parser.add_argument('--users', type=int, default=50)
+    parser.add_argument('--updates', type=int, default=600)
+    parser.add_argument('--rate', type=float, default=150.0, help="Saniyede buton basışı")
+    parser.add_argument('--handler-ms', type=float, default=30.0)
+    parser.add_argument('--rtt-ms', type=float, default=60.0, help="Bot API ile aradaki gidiş-dönüş süresi")
+    parser.add_argument('--concurrency', type=int, default=64)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.WARNING)
+    asyncio.run(main(args.users, args.updates, args.rate, args.handler_ms, args.rtt_ms, args.concurrency))
@@ -0,0 +1,367 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Hot Query Indexes - trading_bot.db
+Sıcak sorguların (long.py, user_trading_engine, mass trade, task kuyruğu) kayıt defteri,
+bunlar için covering/partial index migration'ı, EXPLAIN QUERY PLAN aracı ve
+sentetik 10k kullanıcılı şema benchmark'ı.
+
+- Migration idempotent: her index yalnızca gereken tablo/kolonlar varsa oluşturulur
+  (working_telegram_bot ve advanced_telegram_bot şemaları farklı)
+- Benchmark, index sonrası herhangi bir sıcak sorgu tam tabloya/index'e SCAN yaparsa
+  (SCAN_EXPECTED hariç) veya index'siz halinden yavaşlarsa exit code 1 döner
+- Kaldırılan index'ler (DROPPED_INDEXES) mevcut DB'lerden de silinir
+
+Kullanım:
+    python3 production/core/db_indexes.py migrate [--db trading_bot.db]
+    python3 production/core/db_indexes.py explain [--db trading_bot.db]
+    python3 production/core/db_indexes.py bench [--users 10000]
+"""
+import os
+import sys
+import time
+import random
+import sqlite3
+import logging
+import argparse
+import tempfile
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_DB_PATH = "trading_bot.db"
+
+# Sıcak sorgular: (isim, kaynak, SQL, örnek parametreler)
+# SQL metinleri kaynaktakiyle aynı tutulmalı - aksi halde partial index eşleşmez
+HOT_QUERIES: List[Tuple[str, str, str, tuple]] = [
+    ("long_settings", "PERP/long.py",
+     "SELECT leverage, amount_usdt FROM user_settings WHERE user_id = ?", (42,)),
+    ("get_user_api_keys", "user_trading_engine.get_user_api_keys",
+     """SELECT api_key, secret_key, passphrase, active
+                FROM user_settings WHERE user_id = ?""", (42,)),
+    ("get_user_settings", "user_trading_engine.get_user_settings",
+     """SELECT amount_usdt, take_profit_percent, leverage, auto_trading, active, emergency_stop
+                FROM user_settings WHERE user_id = ?""", (42,)),
+    ("get_active_users", "user_trading_engine.get_active_users",
+     """SELECT DISTINCT user_id
+                FROM user_settings
+                WHERE active = 1
+                  AND api_key IS NOT NULL AND api_key != ''
+                  AND secret_key IS NOT NULL AND secret_key != ''
+                  AND passphrase IS NOT NULL AND passphrase != ''""", ()),
+    ("mass_trade_all_users", "advanced_telegram_bot.mass_trade_all_users",
+     """SELECT DISTINCT u.user_id
+                FROM users u
+                JOIN user_settings s ON u.user_id = s.user_id
+                JOIN user_api_keys a ON u.user_id = a.user_id
+                WHERE s.auto_trading = 1 AND s.emergency_stop = 0 AND a.is_configured = 1""", ()),
+    ("pending_tasks", "stable_crypto_bot._claim_trade_tasks",
+     """SELECT id, user_id, token_symbol, action, status
+                FROM trading_tasks
+                WHERE status = 'pending'
+                ORDER BY created_at
+                LIMIT ?""", (10,)),
+    ("expired_leases", "stable_crypto_bot._claim_trade_tasks",
+     """SELECT id, user_id, token_symbol, action, status
+                    FROM trading_tasks
+                    WHERE status = 'processing' AND lease_until < ?
+                    ORDER BY lease_until
+                    LIMIT ?""", (0, 10)),
+]
+
+# Index migration: (isim, tablo, gereken kolonlar, DDL)
+# user_id INTEGER PRIMARY KEY olduğundan tekil kullanıcı okumaları zaten rowid araması
+HOT_QUERY_INDEXES: List[Tuple[str, str, Tuple[str, ...], str]] = [
+    # get_active_users: yalnızca tam credential'ı olan satırlar indexlenir (partial)
+    ("idx_user_settings_active_credentials", "user_settings",
+     ("active", "api_key", "secret_key", "passphrase"),
+     """CREATE INDEX IF NOT EXISTS idx_user_settings_active_credentials
+        ON user_settings(active, user_id)
+        WHERE api_key IS NOT NULL AND api_key != ''
+          AND secret_key IS NOT NULL AND secret_key != ''
+          AND passphrase IS NOT NULL AND passphrase != ''"""),
+    # Task kuyruğu (stable_crypto_bot migration'ı ile aynı isimler)
+    ("idx_trading_tasks_status", "trading_tasks",
+     ("status", "created_at"),
+     "CREATE INDEX IF NOT EXISTS idx_trading_tasks_status ON trading_tasks(status, created_at)"),
+    ("idx_trading_tasks_lease", "trading_tasks",
+     ("status", "lease_until"),
+     "CREATE INDEX IF NOT EXISTS idx_trading_tasks_lease ON trading_tasks(status, lease_until)"),
+]
+
+
+# Benchmark'ta zarar ettiği için kaldırılan index'ler: migration mevcut DB'lerden siler.
+# idx_user_settings_auto_trading: auto_trading=1 AND emergency_stop=0 kullanıcıların ~%40'ı
+# (düşük seçicilik); mass_trade_all_users 3.15 -> 4.08 ms yavaşladı (0.8x)
+DROPPED_INDEXES: Tuple[str, ...] = ("idx_user_settings_auto_trading",)
+
+# Tam taraması beklenen sorgular: satırların büyük kısmını döndürür, index'le yavaşlar
+SCAN_EXPECTED = {"mass_trade_all_users"}
+
+# Planı index'le değişen sorgu index'siz halinin bu oranından yavaşsa regresyon.
+# Planı değişmeyen sorgularda fark ölçüm gürültüsüdür (aynı plan 0.6x-1.2x oynayabiliyor)
+SLOWDOWN_TOLERANCE = 0.9
+
+
+def _table_columns(conn: sqlite3.Connection, table: str) -> set:
+    return {row[1] for row in conn.execute(f"PRAGMA table_info({table})")}
+
+
+def ensure_hot_query_indexes(conn: sqlite3.Connection) -> List[str]:
+    """
+    Sıcak sorgu index'lerini oluştur (idempotent). Tablosu/kolonu olmayan index'ler
+    atlanır; şema sonradan genişlerse bir sonraki çağrıda oluşturulur.
+    Yeni oluşturulan index isimlerini döndürür.
+    """
+    existing = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'index'")}
+    dropped = [name for name in DROPPED_INDEXES if name in existing]
+    for name in dropped:
+        conn.execute(f"DROP INDEX IF EXISTS {name}")
+    if dropped:
+        conn.commit()
+        logger.info(f"🗂️ Obsolete indexes dropped: {', '.join(dropped)}")
+    created = []
+    for name, table, columns, ddl in HOT_QUERY_INDEXES:
+        if name in existing:
+            continue
+        if not set(columns) <= _table_columns(conn, table):
+            continue
+        conn.execute(ddl)
+        created.append(name)
+    if created:
+        conn.commit()
+        logger.info(f"🗂️ Hot query indexes created: {', '.join(created)}")
+    return created
+
+
+def explain(conn: sqlite3.Connection, sql: str, params: tuple = ()) -> List[str]:
+    """EXPLAIN QUERY PLAN detay satırları"""
+    return [row[3] for row in conn.execute(f"EXPLAIN QUERY PLAN {sql}", params)]
+
+
+def full_scans(plan: List[str]) -> List[str]:
+    """
+    Tam tarama adımları. 'SCAN x USING COVERING INDEX' de tüm index'i okur,
+    bu yüzden o da regresyon sayılır; SEARCH adımları serbest.
+    """
+    return [step for step in plan if step.startswith("SCAN ")]
+
+
+def explain_all(conn: sqlite3.Connection) -> Dict[str, Dict]:
+    """Her sıcak sorgu için plan; şemada olmayan sorgular 'skipped' ile döner"""
+    report = {}
+    for name, source, sql, params in HOT_QUERIES:
+        try:
+            plan = explain(conn, sql, params)
+        except sqlite3.OperationalError as e:
+            report[name] = {'source': source, 'skipped': str(e)}
+            continue
+        scans = [] if name in SCAN_EXPECTED else full_scans(plan)
+        report[name] = {'source': source, 'plan': plan, 'full_scans': scans}
+    return report
+
+
+def print_plans(report: Dict[str, Dict]):
+    for name, entry in report.items():
+        if 'skipped' in entry:
+            print(f"⏭️ {name} ({entry['source']}): {entry['skipped']}")
+            continue
+        status = "❌ FULL SCAN" if entry['full_scans'] else "✅"
+        print(f"{status} {name} ({entry['source']})")
+        for step in entry['plan']:
+            print(f"      {step}")
+
+
+# ----------------------------------------------------------------------
+# Sentetik şema benchmark'ı
+# ----------------------------------------------------------------------
+# İki bot şemasının birleşimi: tüm sıcak sorgular aynı dosyada çalışabilsin
+SYNTHETIC_SCHEMA = """
+    CREATE TABLE users (
+        user_id INTEGER PRIMARY KEY,
+        username TEXT,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    );
+    CREATE TABLE user_settings (
+        user_id INTEGER PRIMARY KEY,
+        api_key TEXT,
+        secret_key TEXT,
+        passphrase TEXT,
+        amount_usdt REAL DEFAULT 20.0,
+        leverage INTEGER DEFAULT 10,
+        take_profit_percent REAL DEFAULT 100.0,
+        active INTEGER DEFAULT 1,
+        auto_trading BOOLEAN DEFAULT 1,
+        emergency_stop BOOLEAN DEFAULT 0
+    );
+    CREATE TABLE user_api_keys (
+        user_id INTEGER PRIMARY KEY,
+        bitget_api_key TEXT,
+        bitget_secret_key TEXT,
+        bitget_passphrase TEXT,
+        is_configured BOOLEAN DEFAULT 0
+    );
+    CREATE TABLE trading_tasks (
+        id TEXT PRIMARY KEY,
+        user_id INTEGER,
+        token_symbol TEXT,
+        action TEXT,
+        status TEXT DEFAULT 'pending',
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        lease_until REAL
+    );
+"""
+
+
+def build_synthetic_db(path: str, users: int, tasks_per_user: int = 5, seed: int = 7):
+    """
+    Gerçekçi dağılımla sentetik DB: kullanıcıların ~%70'i aktif ve credential'lı,
+    ~%40'ı auto_trading, task'ların ~%2'si pending.
+    """
+    rng = random.Random(seed)
+    for suffix in ('', '-wal', '-shm'):
+        if os.path.exists(path + suffix):
+            os.remove(path + suffix)
+    conn = sqlite3.connect(path)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.executescript(SYNTHETIC_SCHEMA)
+
+    user_rows, settings_rows, key_rows = [], [], []
+    for user_id in range(100000, 100000 + users):
+        has_keys = rng.random() < 0.7
+        key = f"bg_{user_id}" if has_keys else ''
+        user_rows.append((user_id, f"user_{user_id}"))
+        settings_rows.append((user_id, key, key, key, rng.choice([10, 20, 50, 100]),
+                              rng.choice([5, 10, 20]), int(rng.random() < 0.9),
+                              int(rng.random() < 0.4), int(rng.random() < 0.02)))
+        key_rows.append((user_id, key, key, key, int(has_keys)))
+    conn.executemany("INSERT INTO users (user_id, username) VALUES (?, ?)", user_rows)
+    conn.executemany("""
+        INSERT INTO user_settings (user_id, api_key, secret_key, passphrase, amount_usdt,
+                                   leverage, active, auto_trading, emergency_stop)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+    """, settings_rows)
+    conn.executemany("INSERT INTO user_api_keys VALUES (?, ?, ?, ?, ?)", key_rows)
+
+    now = time.time()
+    task_rows = []
+    for i in range(users * tasks_per_user):
+        roll = rng.random()
+        status = 'pending' if roll < 0.02 else 'processing' if roll < 0.03 else 'completed'
+        lease = now + rng.uniform(-120, 60) if status == 'processing' else None
+        task_rows.append((f"task_{i}", 100000 + rng.randrange(users), 'TEST', 'open', status,
+                          time.strftime('%Y-%m-%d %H:%M:%S', time.gmtime(now - rng.uniform(0, 86400))),
+                          lease))
+    conn.executemany("INSERT INTO trading_tasks VALUES (?, ?, ?, ?, ?, ?, ?)", task_rows)
+    conn.commit()
+    return conn
+
+
+def _time_queries(conn: sqlite3.Connection, users: int, iterations: int, rounds: int = 3) -> Dict[str, float]:
+    """Sorgu başına ortalama süre (ms), `rounds` turun en iyisi. Tekil okumalar rastgele kullanıcılarla."""
+    rng = random.Random(11)
+    results = {}
+    now = time.time()
+    for name, _, sql, params in HOT_QUERIES:
+        if params == (42,):
+            param_list = [(100000 + rng.randrange(users),) for _ in range(iterations)]
+        elif name == 'expired_leases':
+            param_list = [(now, 10)] * iterations
+        else:
+            param_list = [params] * iterations
+        best = float('inf')
+        for _ in range(rounds):
+            started = time.perf_counter()
+            for p in param_list:
+                conn.execute(sql, p).fetchall()
+            best = min(best, time.perf_counter() - started)
+        results[name] = best * 1000 / iterations
+    return results
+
+
+def benchmark(users: int, iterations: int, path: Optional[str] = None) -> int:
+    """Index'siz vs index'li sorgu süreleri; index sonrası tam tarama varsa 1 döner"""
+    path = path or os.path.join(tempfile.gettempdir(), "hot_query_bench.db")
+    started = time.perf_counter()
+    conn = build_synthetic_db(path, users)
+    print(f"🏗️ Synthetic DB: {users} users, {users * 5} tasks ({time.perf_counter() - started:.1f}s)")
+
+    try:
+        # Baseline: task kuyruğu index'leri dahil hiçbir ikincil index yok
+        before = _time_queries(conn, users, iterations)
+        before_plans = explain_all(conn)
+        ensure_hot_query_indexes(conn)
+        # İstatistikler planner'ı tam taramaya itmemeli
+        conn.execute("ANALYZE")
+        after = _time_queries(conn, users, iterations)
+        report = explain_all(conn)
+
+        print(f"\n{'QUERY':<24}{'NO INDEX ms':>12}{'INDEXED ms':>12}{'SPEEDUP':>9}  PLAN")
+        regressions, slower = [], []
+        for name, entry in report.items():
+            if 'skipped' in entry:
+                print(f"{name:<24}{'-':>12}{'-':>12}{'-':>9}  ⏭️ {entry['skipped']}")
+                regressions.append(name)
+                continue
+            speedup = before[name] / after[name] if after[name] else 0
+            print(f"{name:<24}{before[name]:>12.3f}{after[name]:>12.3f}{speedup:>8.1f}x  "
+                  f"{' | '.join(entry['plan'])}{'  (scan expected)' if name in SCAN_EXPECTED else ''}")
+            if entry['full_scans']:
+                regressions.append(name)
+            if speedup < SLOWDOWN_TOLERANCE and entry['plan'] != before_plans[name].get('plan'):
+                slower.append(f"{name} ({speedup:.2f}x)")
+
+        if regressions:
+            print(f"\n❌ Full scan regression: {', '.join(regressions)}")
+        if slower:
+            print(f"\n❌ Slower than without indexes: {', '.join(slower)}")
+        if regressions or slower:
+            return 1
+        print(f"\n✅ All {len(report)} hot queries use an index (or an expected scan) and none got slower")
+        return 0
+    finally:
+        conn.close()
+        for suffix in ('', '-wal', '-shm'):
+            if os.path.exists(path + suffix):
+                os.remove(path + suffix)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="trading_bot.db hot query indexes")
+    sub = parser.add_subparsers(dest='command')
+    migrate = sub.add_parser('migrate', help="Eksik sıcak sorgu index'lerini oluştur")
+    migrate.add_argument('--db', default=DEFAULT_DB_PATH)
+    show = sub.add_parser('explain', help="Her sıcak sorgu için EXPLAIN QUERY PLAN")
+    show.add_argument('--db', default=DEFAULT_DB_PATH)
+    bench = sub.add_parser('bench', help="Sentetik DB üzerinde index benchmark'ı (scan varsa exit 1)")
+    bench.add_argument('--users', type=int, default=10000)
+    bench.add_argument('--iterations', type=int, default=200)
+    args = parser.parse_args()
+
+    if args.command == 'bench':
+        sys.exit(benchmark(args.users, args.iterations))
+
+    if args.command in ('migrate', 'explain'):
+        if not os.path.exists(args.db):
+            print(f"❌ Database not found: {args.db}")
+            sys.exit(1)
+        conn = sqlite3.connect(args.db, timeout=30.0)
+        try:
+            if args.command == 'migrate':
+                created = ensure_hot_query_indexes(conn)
+                print(f"✅ Created: {', '.join(created)}" if created else "✅ Indexes already up to date")
+            else:
+                report = explain_all(conn)
+                print_plans(report)
+                if any(entry.get('full_scans') for entry in report.values()):
+                    sys.exit(1)
+        finally:
+            conn.close()
+        return
+
+    parser.print_help()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    main()
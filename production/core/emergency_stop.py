@@ -0,0 +1,307 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Emergency Stop Executor
+Tüm kullanıcıların pozisyonlarını aynı anda, süreç içinden kapatır.
+
+Eski yol kullanıcı başına bir kapat.py alt süreci başlatıyordu; panik anında
+toplam süre (kullanıcı sayısı × interpreter açılışı + RTT) oluyordu. Burada:
+- Tek paylaşımlı aiohttp session (ısıtılmış bağlantı havuzu) + BitgetClient
+- Tüm kullanıcılar eşzamanlı, global deadline ile sınırlı
+- Takılan/başarısız istekler deadline dolana kadar yeniden denenir
+- Sonuç: kullanıcı başına kapanış süresi, deneme sayısı, hata - tek özet
+
+Kullanım:
+    python3 emergency_stop.py all [--deadline 20]     # tüm aktif kullanıcılar
+    python3 emergency_stop.py users 123 456           # belirli kullanıcılar
+Benchmark: python3 debug/emergency_stop_benchmark.py
+"""
+import os
+import sys
+import math
+import time
+import sqlite3
+import asyncio
+import logging
+import argparse
+import threading
+from typing import Dict, Iterable, List, Optional
+
+import aiohttp
+
+_CORE_DIR = os.path.dirname(os.path.realpath(__file__))
+sys.path.append(os.path.join(_CORE_DIR, '..', 'exchanges', 'PERP'))
+from bitget_client import BitgetClient, BitgetCredentials, BitgetAPIError
+
+logger = logging.getLogger(__name__)
+
+DB_PATH = os.path.join(os.getcwd(), "trading_bot.db")
+
+# Kapatılacak pozisyon yok - başarı sayılır
+NO_POSITION_CODES = {"22002"}
+# Kimlik / yetki hataları - yeniden denemek anlamsız
+FATAL_CODES = {"40006", "40012", "40014", "40037", "40038"}
+
+
+class EmergencyStopExecutor:
+    """Paylaşımlı bağlantı havuzuyla eşzamanlı, deadline'lı pozisyon kapatma"""
+
+    def __init__(self, host: str = None, deadline: float = 20.0, attempt_timeout: float = 5.0,
+                 max_concurrency: int = 200, retry_backoff: float = 0.2):
+        self.host = host
+        self.deadline = deadline
+        self.attempt_timeout = attempt_timeout
+        self.max_concurrency = max_concurrency
+        self.retry_backoff = retry_backoff
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._thread_lock = threading.Lock()
+
+    # ------------------------------------------------------------------
+    # Bağlantı havuzu
+    # ------------------------------------------------------------------
+    async def _get_session(self) -> aiohttp.ClientSession:
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(limit=self.max_concurrency, limit_per_host=self.max_concurrency,
+                                             ttl_dns_cache=300, keepalive_timeout=120)
+            self._session = aiohttp.ClientSession(connector=connector)
+        return self._session
+
+    async def warm_async(self, connections: int = 8, timeout: float = 10.0):
+        """Havuzu önceden aç: panik anında DNS + TLS el sıkışması beklenmesin"""
+        client = BitgetClient(await self._get_session(), host=self.host)
+        results = await asyncio.gather(*(asyncio.wait_for(client._request("GET", "/api/v2/public/time"), timeout)
+                                         for _ in range(connections)), return_exceptions=True)
+        failed = [r for r in results if isinstance(r, Exception)]
+        if failed:
+            logger.warning(f"⚠️ Emergency stop pool warm-up: {len(failed)}/{connections} failed ({failed[0]})")
+
+    async def aclose(self):
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    # ------------------------------------------------------------------
+    # Kapatma
+    # ------------------------------------------------------------------
+    async def _close_user(self, session: aiohttp.ClientSession, semaphore: asyncio.Semaphore,
+                          user_id, credentials: BitgetCredentials, started: float, deadline_at: float,
+                          result: Dict):
+        client = BitgetClient(session, credentials, host=self.host)
+        backoff = self.retry_backoff
+        while True:
+            remaining = deadline_at - time.monotonic()
+            if remaining <= 0:
+                result['status'] = 'deadline'
+                return
+            result['attempts'] += 1
+            try:
+                async with semaphore:
+                    data = await asyncio.wait_for(client.close_all_positions(),
+                                                  min(self.attempt_timeout, remaining))
+                failures = (data or {}).get('failureList') or []
+                result['positions'] += len((data or {}).get('successList') or [])
+                if not failures:
+                    result['status'] = 'closed'
+                    result['error'] = None
+                    break
+                result['error'] = f"{len(failures)} position(s) not closed: {failures[0]}"
+            except BitgetAPIError as e:
+                if e.code in NO_POSITION_CODES:
+                    result['status'] = 'no_position'
+                    result['error'] = None
+                    break
+                result['error'] = str(e)
+                if e.code in FATAL_CODES or e.status in (401, 403):
+                    result['status'] = 'failed'
+                    break
+            except asyncio.TimeoutError:
+                result['error'] = f"attempt timed out after {self.attempt_timeout}s"
+            except aiohttp.ClientError as e:
+                result['error'] = f"{type(e).__name__}: {e}"
+
+            await asyncio.sleep(min(backoff, max(0.0, deadline_at - time.monotonic())))
+            backoff = min(backoff * 2, 2.0)
+        result['latency_ms'] = round((time.monotonic() - started) * 1000, 1)
+
+    async def close_users(self, credentials: Dict, deadline: float = None) -> Dict:
+        """
+        {user_id: BitgetCredentials} için tüm pozisyonları eşzamanlı kapat.
+        Deadline dolduğunda bitmeyen kullanıcılar 'deadline' olarak raporlanır.
+        """
+        deadline = deadline or self.deadline
+        session = await self._get_session()
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        started = time.monotonic()
+        deadline_at = started + deadline
+
+        results = {user_id: {'status': 'pending', 'attempts': 0, 'positions': 0,
+                             'latency_ms': None, 'error': None} for user_id in credentials}
+        tasks = [asyncio.ensure_future(self._close_user(session, semaphore, user_id, creds,
+                                                        started, deadline_at, results[user_id]))
+                 for user_id, creds in credentials.items()]
+        if tasks:
+            # Deadline'a kısa bir pay: son deneme wait_for ile zaten sınırlı
+            _, pending = await asyncio.wait(tasks, timeout=deadline + 0.5)
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+        for result in results.values():
+            if result['status'] == 'pending':
+                result['status'] = 'deadline'
+
+        return self._summary(results, time.monotonic() - started, deadline)
+
+    @staticmethod
+    def _summary(results: Dict, elapsed: float, deadline: float) -> Dict:
+        latencies = sorted(r['latency_ms'] for r in results.values()
+                           if r['status'] in ('closed', 'no_position'))
+
+        def pct(p):
+            return latencies[max(0, math.ceil(p / 100 * len(latencies)) - 1)] if latencies else None
+
+        return {
+            'users': len(results),
+            'closed': sum(1 for r in results.values() if r['status'] == 'closed'),
+            'no_position': sum(1 for r in results.values() if r['status'] == 'no_position'),
+            'failed': {uid: r['error'] for uid, r in results.items() if r['status'] == 'failed'},
+            'timed_out': {uid: r['error'] for uid, r in results.items() if r['status'] == 'deadline'},
+            'retried': sum(1 for r in results.values() if r['attempts'] > 1),
+            'positions': sum(r['positions'] for r in results.values()),
+            'seconds': round(elapsed, 3),
+            'deadline': deadline,
+            'latency_p50_ms': pct(50),
+            'latency_p95_ms': pct(95),
+            'latency_max_ms': latencies[-1] if latencies else None,
+            'per_user': results,
+        }
+
+    # ------------------------------------------------------------------
+    # Senkron / başka loop'tan çağırma (havuz tek loop'ta yaşar)
+    # ------------------------------------------------------------------
+    def _ensure_background(self) -> asyncio.AbstractEventLoop:
+        if self._loop is not None:
+            return self._loop
+        with self._thread_lock:
+            if self._loop is None:
+                loop = asyncio.new_event_loop()
+                self._thread = threading.Thread(target=loop.run_forever, name="emergency-stop", daemon=True)
+                self._thread.start()
+                self._loop = loop
+        return self._loop
+
+    def warm(self, connections: int = 8):
+        """Arka plan loop'unu başlat ve bağlantı havuzunu ısıt (süreç açılışında çağrılır)"""
+        asyncio.run_coroutine_threadsafe(self.warm_async(connections), self._ensure_background()).result(15)
+
+    def run(self, credentials: Dict, deadline: float = None) -> Dict:
+        """Thread'lerden senkron çağrı; özet döner"""
+        deadline = deadline or self.deadline
+        future = asyncio.run_coroutine_threadsafe(self.close_users(credentials, deadline), self._ensure_background())
+        return future.result(deadline + 5)
+
+    async def run_async(self, credentials: Dict, deadline: float = None) -> Dict:
+        """Başka bir event loop'tan (ör. Telegram bot) çağrı"""
+        future = asyncio.run_coroutine_threadsafe(self.close_users(credentials, deadline), self._ensure_background())
+        return await asyncio.wrap_future(future)
+
+
+def load_credentials(db_path: str = DB_PATH, user_ids: Iterable[int] = None) -> Dict[int, BitgetCredentials]:
+    """user_settings'ten API bilgileri tam olan kullanıcılar (user_ids verilmezse tüm aktifler)"""
+    conn = sqlite3.connect(db_path, timeout=10)
+    try:
+        query = """SELECT user_id, api_key, secret_key, passphrase FROM user_settings
+                   WHERE api_key IS NOT NULL AND api_key != ''
+                     AND secret_key IS NOT NULL AND secret_key != ''
+                     AND passphrase IS NOT NULL AND passphrase != ''"""
+        if user_ids is None:
+            rows = conn.execute(query + " AND active = 1").fetchall()
+        else:
+            user_ids = list(user_ids)
+            rows = conn.execute(query + f" AND user_id IN ({','.join('?' * len(user_ids))})",
+                                user_ids).fetchall() if user_ids else []
+    finally:
+        conn.close()
+    return {row[0]: BitgetCredentials(row[1], row[2], row[3], user_id=str(row[0])) for row in rows}
+
+
+def halt_trading(db_path: str, user_ids: List[int]):
+    """
+    Kapatma sürerken yeni işlem açılmasın: emergency_stop=1, auto_trading=0.
+    Best-effort: şemada olmayan kolonlar atlanır, hata loglanır (kapatmayı asla engellemez).
+    """
+    if not user_ids:
+        return
+    try:
+        conn = sqlite3.connect(db_path, timeout=10)
+        try:
+            columns = {row[1] for row in conn.execute("PRAGMA table_info(user_settings)")}
+            assignments = [f"{column} = {value}" for column, value in (('emergency_stop', 1), ('auto_trading', 0))
+                           if column in columns]
+            if not assignments:
+                logger.warning("⚠️ user_settings has no emergency_stop/auto_trading column, trading not halted")
+                return
+            with conn:
+                conn.execute(f"UPDATE user_settings SET {', '.join(assignments)} "
+                             f"WHERE user_id IN ({','.join('?' * len(user_ids))})", list(user_ids))
+        finally:
+            conn.close()
+    except sqlite3.Error as e:
+        logger.error(f"❌ Could not halt trading for {len(user_ids)} user(s): {e}")
+
+
+def emergency_stop_users(user_ids: Iterable[int] = None, db_path: str = DB_PATH,
+                         deadline: float = None) -> Dict:
+    """Trading'i durdur ve pozisyonları kapat (user_ids None ise tüm aktif kullanıcılar)"""
+    credentials = load_credentials(db_path, user_ids)
+    # Halt yazısı (busy_timeout'a kadar bekleyebilir) kapatmayı geciktirmesin: eşzamanlı çalışır
+    halt = threading.Thread(target=halt_trading, args=(db_path, list(credentials)), name="emergency-halt")
+    halt.start()
+    logger.warning(f"🚨 Emergency stop: closing positions for {len(credentials)} user(s)")
+    try:
+        summary = emergency_stop_executor.run(credentials, deadline)
+    finally:
+        halt.join()
+    logger.warning(format_summary(summary))
+    return summary
+
+
+def format_summary(summary: Dict) -> str:
+    """Log / Telegram için tek parça özet"""
+    lines = [
+        f"🚨 Emergency stop: {summary['closed']} closed, {summary['no_position']} without positions, "
+        f"{len(summary['failed'])} failed, {len(summary['timed_out'])} timed out "
+        f"({summary['users']} users, {summary['seconds']:.2f}s / deadline {summary['deadline']:.0f}s)",
+    ]
+    if summary['latency_p50_ms'] is not None:
+        lines.append(f"⏱️ Close latency p50 {summary['latency_p50_ms']:.0f}ms, "
+                     f"p95 {summary['latency_p95_ms']:.0f}ms, max {summary['latency_max_ms']:.0f}ms, "
+                     f"{summary['retried']} user(s) retried")
+    for label, errors in (("❌ Failed", summary['failed']), ("⌛ Timed out", summary['timed_out'])):
+        for user_id, error in errors.items():
+            lines.append(f"{label} {user_id}: {error}")
+    return "\n".join(lines)
+
+
+# Global executor (arka plan loop'u ilk kullanımda açılır)
+emergency_stop_executor = EmergencyStopExecutor()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Concurrent emergency stop for all users")
+    parser.add_argument('command', choices=['all', 'users'])
+    parser.add_argument('user_ids', nargs='*', type=int)
+    parser.add_argument('--deadline', type=float, default=None)
+    parser.add_argument('--db', default=DB_PATH)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    if args.command == 'users' and not args.user_ids:
+        parser.error("users: en az bir user_id gerekli")
+    summary = emergency_stop_users(args.user_ids if args.command == 'users' else None, args.db, args.deadline)
+    sys.exit(0 if not summary['failed'] and not summary['timed_out'] else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Leader Lease
+Detection servisleri (upbit_announcement_scraper, upbit_market_tracker) iki replica
+halinde çalışır: lease'i tutan lider tarar ve sinyal üretir, diğeri HTTP session'ı
+ve durumu yüklü halde bekler. Lider çökerse / donarsa lease TTL içinde düşer ve
+standby devralır; kapanışta lease bırakılır, devralma bir poll aralığında olur.
+
+- Lease: state_store'daki `leases` satırı (holder, epoch, expires_at)
+- Lider her ttl/5 saniyede bir yeniler (ayrı thread); yenileyemezse liderliği bırakır
+- fenced(): sinyal claim'i (processed coin / seen market) lease doğrulamasıyla aynı
+  SQLite transaction'ında -> lease'i kaybetmiş eski lider ve aynı sinyali gören
+  ikinci replica hiçbir zaman ikinci kez sinyal üretemez
+
+Kullanım:
+    python3 production/core/leader_lease.py status [name ...]
+
+Benchmark: python3 debug/leader_lease_benchmark.py
+"""
+import os
+import sys
+import time
+import socket
+import logging
+import threading
+from contextlib import contextmanager
+from typing import Optional
+
+from state_store import state_store
+from service_heartbeat import service_heartbeat
+
+logger = logging.getLogger(__name__)
+
+# state_store'u telemetri / outbox / ayar yazarları da kullanıyor: TTL birkaç yazma
+# çekişmesini (busy bekleme) liderlik kaybetmeden atlatacak kadar uzun olmalı
+LEASE_TTL = float(os.getenv("LEADER_LEASE_TTL", "5"))
+
+
+class LeaseLost(Exception):
+    """Lease artık bu replica'da değil; sinyal üretilmemeli"""
+
+
+class LeaderLease:
+    """Tek lider seçimi: state_store üzerinde TTL'li, epoch'lu lease"""
+
+    def __init__(self, name: str, holder: str = None, ttl: float = LEASE_TTL, store=None):
+        self.name = name
+        self.holder = holder or f"{socket.gethostname()}:{os.getpid()}"
+        self.ttl = ttl
+        self.renew_interval = ttl / 5
+        # Standby yoklaması ucuz bir okuma: graceful devralma TTL'den bağımsız kısa kalsın
+        self.poll_interval = min(ttl / 10, 0.1)
+        self.store = store or state_store
+        self.epoch: Optional[int] = None
+        self._valid_until = 0.0
+        self._lock = threading.Lock()
+        self._renewer: Optional[threading.Thread] = None
+        self.stats = {'acquired': 0, 'lost': 0, 'fenced_rejects': 0, 'standby_s': 0.0}
+
+    @property
+    def is_leader(self) -> bool:
+        """Yerel görüş: son başarılı yenilemeden beri TTL dolmadı"""
+        return self.epoch is not None and time.monotonic() < self._valid_until
+
+    def try_acquire(self) -> bool:
+        lease = self.store.get_lease(self.name)
+        # Ucuz okuma: lease başkasında ve geçerliyse yazma kilidi alma
+        if lease and lease['holder'] != self.holder and lease['expires_at'] >= time.time():
+            return False
+        started = time.monotonic()
+        epoch = self.store.acquire_lease(self.name, self.holder, self.ttl)
+        if epoch is None:
+            return False
+        with self._lock:
+            self.epoch = epoch
+            self._valid_until = started + self.ttl
+        return True
+
+    def wait_for_leadership(self):
+        """Lider olana kadar bekle (standby), sonra yenileme thread'ini başlat"""
+        started = time.monotonic()
+        announced = False
+        while not self.try_acquire():
+            if not announced:
+                holder = (self.store.get_lease(self.name) or {}).get('holder')
+                logger.info(f"🧊 {self.name}: standby ({self.holder}), leader is {holder}")
+                print(f"🧊 Standby modunda bekleniyor (lider: {holder})")
+                announced = True
+            service_heartbeat.incr('standby_polls')  # standby replica takılmış sayılmasın
+            time.sleep(self.poll_interval)
+        self.stats['acquired'] += 1
+        self.stats['standby_s'] += time.monotonic() - started
+        logger.info(f"👑 {self.name}: leader {self.holder} (epoch {self.epoch})")
+        print(f"👑 Liderlik alındı: {self.name} (epoch {self.epoch})")
+        if self._renewer is None or not self._renewer.is_alive():
+            self._renewer = threading.Thread(target=self._renew_loop, name=f"lease-{self.name}", daemon=True)
+            self._renewer.start()
+
+    def _renew_loop(self):
+        # Tek bir yenileme kilit beklerken TTL'i tüketmesin: kısa busy_timeout, sonraki turda tekrar
+        self.store.set_busy_timeout(self.renew_interval)
+        while self.epoch is not None:
+            time.sleep(self.renew_interval)
+            epoch = self.epoch
+            if epoch is None:
+                return
+            started = time.monotonic()
+            try:
+                renewed = self.store.renew_lease(self.name, self.holder, epoch, self.ttl)
+            except Exception as e:
+                logger.error(f"❌ {self.name}: lease renew failed: {e}")
+                continue  # yerel TTL dolunca is_leader zaten False olur
+            with self._lock:
+                if self.epoch != epoch:
+                    return
+                if renewed:
+                    self._valid_until = started + self.ttl
+                else:
+                    self.epoch = None
+                    self.stats['lost'] += 1
+                    logger.warning(f"⚠️ {self.name}: lease lost by {self.holder}")
+                    print(f"⚠️ Liderlik kaybedildi: {self.name}")
+                    return
+
+    def release(self):
+        """Kapanış: lease'i bırak, standby hemen devralsın"""
+        with self._lock:
+            epoch, self.epoch = self.epoch, None
+        if epoch is not None:
+            try:
+                self.store.release_lease(self.name, self.holder, epoch)
+                logger.info(f"👋 {self.name}: lease released by {self.holder}")
+            except Exception as e:
+                logger.error(f"❌ {self.name}: lease release failed: {e}")
+
+    @contextmanager
+    def fenced(self):
+        """
+        Sinyal claim'i için transaction: lease bu replica'da değilse LeaseLost.
+        Blok içindeki state_store yazmaları aynı (BEGIN IMMEDIATE) transaction'a katılır.
+        """
+        epoch = self.epoch
+        with self.store.batch() as conn:
+            if epoch is None or not self.store.lease_valid(self.name, self.holder, epoch):
+                self.stats['fenced_rejects'] += 1
+                raise LeaseLost(f"{self.name}: not leader ({self.holder})")
+            yield conn
+
+    def get_stats(self):
+        stats = dict(self.stats)
+        stats.update({'name': self.name, 'holder': self.holder, 'epoch': self.epoch, 'leader': self.is_leader})
+        return stats
+
+
+def main():
+    """CLI: python3 leader_lease.py status [name ...]"""
+    names = sys.argv[2:] or ["upbit_announcement_scraper", "upbit_market_tracker"]
+    now = time.time()
+    for name in names:
+        lease = state_store.get_lease(name)
+        if lease is None:
+            print(f"📭 {name}: lease yok")
+            continue
+        remaining = lease['expires_at'] - now
+        state = f"geçerli ({remaining:.2f}s)" if remaining >= 0 else f"süresi doldu ({-remaining:.1f}s önce)"
+        print(f"👑 {name}: {lease['holder']} epoch {lease['epoch']} - {state}")
+
+
+if __name__ == "__main__":
+    main()
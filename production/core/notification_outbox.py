@@ -0,0 +1,398 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Notification Outbox
+Executor'lar (long.py, user_trading_engine) bildirimleri Telegram'a beklemeden
+yerel bir SQLite WAL outbox'ına yazar; ayrı bir sender process'i outbox'ı
+TelegramNotifier üzerinden boşaltır. Telegram yavaş/erişilemez olsa da işlem
+akışı (fill sorgusu, TP kontrolü) beklemez.
+
+- put(): tek INSERT (synchronous=NORMAL, fsync yok) + FIFO doorbell ile sender'ı uyandırma
+- Sender mesajları lease ile claim eder; çöken sender'ın mesajları lease bitince geri alınır
+- Bot genelindeki 30 msg/s limiti tek process'te (sender) uygulanır
+- 400/403 kalıcı hata -> 'failed'; ağ/zaman aşımı -> backoff ile tekrar 'pending'
+
+Kullanım:
+    python3 production/core/notification_outbox.py serve     # sender (supervisor çalıştırır)
+    python3 production/core/notification_outbox.py stats
+"""
+import os
+import sys
+import json
+import time
+import select
+import sqlite3
+import asyncio
+import logging
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from trade_journal import trade_journal
+from service_heartbeat import service_heartbeat
+
+_CORE_DIR = os.path.dirname(os.path.realpath(__file__))
+DEFAULT_DB_PATH = os.path.join(_CORE_DIR, '..', 'exchanges', 'notification_outbox.db')
+HEALTH_FILE = os.path.join(_CORE_DIR, '..', 'monitoring', 'notification_sender_health.txt')
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS outbox (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    chat_id INTEGER NOT NULL,
+    text TEXT NOT NULL,
+    parse_mode TEXT,
+    reply_markup TEXT,
+    trade_id TEXT,
+    status TEXT NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    available_at REAL NOT NULL,
+    lease_until REAL,
+    created_at REAL NOT NULL,
+    sent_at REAL,
+    error TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_outbox_status ON outbox(status, id);
+"""
+
+
+class NotificationOutbox:
+    """Process'ler arası kalıcı bildirim kuyruğu (SQLite WAL)"""
+
+    def __init__(self, db_path: str = None, retention: int = 5000, lease_seconds: float = 60.0,
+                 max_attempts: int = 5):
+        self.db_path = os.path.realpath(db_path or os.getenv('NOTIFICATION_OUTBOX_PATH', DEFAULT_DB_PATH))
+        self.doorbell_path = self.db_path + ".doorbell"
+        self.retention = retention
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self._local = threading.local()
+        self._doorbell_fd = None
+        self._finished_since_prune = 0
+
+    def _conn(self) -> sqlite3.Connection:
+        """Thread'e özel bağlantı (ilk kullanımda açılır)"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+            conn = sqlite3.connect(self.db_path, timeout=10.0, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA busy_timeout=10000")
+            conn.executescript(SCHEMA)
+            self._local.conn = conn
+            if not os.path.exists(self.doorbell_path):
+                try:
+                    os.mkfifo(self.doorbell_path)
+                except FileExistsError:
+                    pass
+        return conn
+
+    def warm(self):
+        """Bağlantıyı kritik yoldan önce aç (ilk put() da mikro saniyeler sürsün)"""
+        try:
+            self._conn()
+        except sqlite3.Error as e:
+            logger.error(f"❌ Notification outbox unavailable: {e}")
+
+    # ------------------------------------------------------------------
+    # Üretici tarafı
+    # ------------------------------------------------------------------
+    def put(self, chat_id, text: str, parse_mode: str = None, reply_markup: Dict = None,
+            trade_id: str = None) -> Optional[int]:
+        """Bildirimi outbox'a yaz. Hata durumunda işlem akışını asla bozmaz (None döner)."""
+        now = time.time()
+        try:
+            cursor = self._conn().execute(
+                "INSERT INTO outbox (chat_id, text, parse_mode, reply_markup, trade_id, available_at, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (int(chat_id), text, parse_mode, json.dumps(reply_markup) if reply_markup else None,
+                 trade_id, now, now)
+            )
+        except (sqlite3.Error, ValueError) as e:
+            logger.error(f"❌ Could not queue notification for {chat_id}: {e}")
+            return None
+        self._ring()
+        return cursor.lastrowid
+
+    def _ring(self):
+        """Sender'ı uyandır"""
+        try:
+            fd = os.open(self.doorbell_path, os.O_WRONLY | os.O_NONBLOCK)
+        except OSError:
+            return  # Sender çalışmıyor (ENXIO); mesaj outbox'ta bekler
+        try:
+            os.write(fd, b'\x01')
+        except BlockingIOError:
+            pass  # Doorbell zaten dolu
+        finally:
+            os.close(fd)
+
+    # ------------------------------------------------------------------
+    # Sender tarafı
+    # ------------------------------------------------------------------
+    def claim(self, limit: int) -> List[Tuple]:
+        """
+        Gönderime hazır en fazla `limit` mesajı lease ile al: pending olanlar ve
+        lease'i dolmuş 'sending' olanlar (çöken sender). Sıra: id (FIFO).
+        """
+        conn = self._conn()
+        now = time.time()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            rows = conn.execute("""
+                SELECT id, chat_id, text, parse_mode, reply_markup, trade_id FROM outbox
+                WHERE status = 'pending' AND available_at <= ?
+                ORDER BY id LIMIT ?
+            """, (now, limit)).fetchall()
+            if len(rows) < limit:
+                rows += conn.execute("""
+                    SELECT id, chat_id, text, parse_mode, reply_markup, trade_id FROM outbox
+                    WHERE status = 'sending' AND lease_until < ?
+                    ORDER BY id LIMIT ?
+                """, (now, limit - len(rows))).fetchall()
+            if rows:
+                conn.executemany(
+                    "UPDATE outbox SET status = 'sending', lease_until = ?, attempts = attempts + 1 WHERE id = ?",
+                    [(now + self.lease_seconds, row[0]) for row in rows])
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return [(row[0], row[1], row[2], row[3], json.loads(row[4]) if row[4] else None, row[5]) for row in rows]
+
+    def extend_lease(self, ids: List[int]):
+        """Hâlâ gönderilmekte olan mesajların lease'ini uzat (uzun 429 beklemeleri)"""
+        if not ids:
+            return
+        for i in range(0, len(ids), 500):
+            chunk = ids[i:i + 500]
+            self._conn().execute(
+                f"UPDATE outbox SET lease_until = ? WHERE status = 'sending' AND id IN ({','.join('?' * len(chunk))})",
+                [time.time() + self.lease_seconds, *chunk])
+
+    def finish(self, results: List[Tuple[int, Optional[Exception], bool]]):
+        """
+        Sonuçları tek transaction'da yaz: (id, hata, kalıcı_mı).
+        Geçici hatalar deneme hakkı kaldıysa backoff ile tekrar pending olur.
+        """
+        if not results:
+            return
+        conn = self._conn()
+        now = time.time()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            for outbox_id, error, permanent in results:
+                if error is None:
+                    conn.execute("UPDATE outbox SET status = 'sent', sent_at = ?, lease_until = NULL, error = NULL "
+                                 "WHERE id = ?", (now, outbox_id))
+                elif permanent:
+                    conn.execute("UPDATE outbox SET status = 'failed', lease_until = NULL, error = ? WHERE id = ?",
+                                 (str(error)[:500], outbox_id))
+                else:
+                    conn.execute("""
+                        UPDATE outbox SET
+                            status = CASE WHEN attempts >= ? THEN 'failed' ELSE 'pending' END,
+                            available_at = ? + MIN(300, 5 * (1 << attempts)),
+                            lease_until = NULL, error = ?
+                        WHERE id = ?
+                    """, (self.max_attempts, now, str(error)[:500], outbox_id))
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        self._finished_since_prune += len(results)
+        if self._finished_since_prune >= 500:
+            self._finished_since_prune = 0
+            self._prune()
+
+    def _prune(self) -> int:
+        """Son `retention` kadar sent/failed satırı tut"""
+        cursor = self._conn().execute("""
+            DELETE FROM outbox WHERE status IN ('sent', 'failed') AND id < (
+                SELECT id FROM outbox WHERE status IN ('sent', 'failed')
+                ORDER BY id DESC LIMIT 1 OFFSET ?
+            )
+        """, (self.retention - 1,))
+        return cursor.rowcount
+
+    def open_consumer(self):
+        """Doorbell'i okuyucu olarak aç (ilk claim'den önce: uyandırma kaçmaz)"""
+        if self._doorbell_fd is None:
+            self._conn()  # FIFO'yu oluşturur
+            # O_RDWR: yazan kalmadığında FIFO sürekli EOF (readable) olmasın
+            self._doorbell_fd = os.open(self.doorbell_path, os.O_RDWR | os.O_NONBLOCK)
+
+    def wait(self, timeout: float):
+        """Yeni mesaj gelene (veya timeout) kadar blokla"""
+        self.open_consumer()
+        readable, _, _ = select.select([self._doorbell_fd], [], [], timeout)
+        if readable:
+            try:
+                os.read(self._doorbell_fd, 4096)
+            except BlockingIOError:
+                pass
+
+    def stats(self) -> Dict:
+        conn = self._conn()
+        stats = {status: 0 for status in ('pending', 'sending', 'sent', 'failed')}
+        for status, count in conn.execute("SELECT status, COUNT(*) FROM outbox GROUP BY status"):
+            stats[status] = count
+        oldest = conn.execute("SELECT MIN(created_at) FROM outbox WHERE status = 'pending'").fetchone()[0]
+        stats['oldest_pending_seconds'] = round(time.time() - oldest, 1) if oldest else 0.0
+        return stats
+
+    def close(self):
+        if self._doorbell_fd is not None:
+            os.close(self._doorbell_fd)
+            self._doorbell_fd = None
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+
+# Global outbox instance
+notification_outbox = NotificationOutbox()
+
+
+# ----------------------------------------------------------------------
+# Sender
+# ----------------------------------------------------------------------
+class OutboxSender:
+    """Outbox'ı TelegramNotifier üzerinden boşaltan döngü"""
+
+    def __init__(self, outbox: NotificationOutbox, notifier, max_inflight: int = 200,
+                 idle_wait: float = 1.0, health_file: str = None):
+        self.outbox = outbox
+        self.notifier = notifier
+        self.max_inflight = max_inflight
+        self.idle_wait = idle_wait
+        self.health_file = health_file
+        self.running = False
+        self._inflight: Dict[int, asyncio.Future] = {}
+        self._results: List[Tuple[int, Optional[Exception], bool]] = []
+        self._trade_ids: Dict[int, str] = {}
+        # claim/finish/extend_lease busy_timeout (10 sn) kadar bekleyebilir: event loop'u
+        # (ve supervisor heartbeat'ini) tıkamasınlar diye tek DB thread'inde çalışırlar
+        self._db_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="outbox-db")
+
+    def _on_done(self, outbox_id: int, future: asyncio.Future):
+        from telegram_notifier import TelegramAPIError
+
+        self._inflight.pop(outbox_id, None)
+        trade_id = self._trade_ids.pop(outbox_id, None)
+        error = future.exception() if not future.cancelled() else TelegramAPIError(0, "Cancelled")
+        if error is None:
+            trade_journal.mark(trade_id, "notification_sent")
+            service_heartbeat.incr('sent')
+            self._results.append((outbox_id, None, False))
+            return
+        # 400/403 (chat bulunamadı, bot engellendi) tekrar denenmez
+        permanent = isinstance(error, TelegramAPIError) and 400 <= error.status < 500 and error.status != 429
+        service_heartbeat.incr('send_errors')
+        self._results.append((outbox_id, error, permanent))
+
+    def _heartbeat(self):
+        if not self.health_file:
+            return
+        try:
+            with open(self.health_file, 'w') as f:
+                f.write(f"{datetime.now().isoformat()}\n")
+        except OSError as e:
+            logger.error(f"❌ Health file yazma hatası: {e}")
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        self.outbox.open_consumer()
+        await self.notifier.start()
+        self.running = True
+        last_heartbeat = last_lease = 0.0
+        logger.info(f"📤 Notification sender started ({self.outbox.db_path})")
+
+        while self.running:
+            service_heartbeat.incr('polls')
+            now = time.monotonic()
+            if now - last_heartbeat >= 30:
+                self._heartbeat()
+                last_heartbeat = now
+            if self._inflight and now - last_lease >= self.outbox.lease_seconds / 3:
+                await loop.run_in_executor(self._db_executor, self.outbox.extend_lease, list(self._inflight))
+                last_lease = now
+
+            claimed = []
+            free = self.max_inflight - len(self._inflight)
+            if free > 0:
+                claimed = await loop.run_in_executor(self._db_executor, self.outbox.claim, free)
+            for outbox_id, chat_id, text, parse_mode, reply_markup, trade_id in claimed:
+                future = self.notifier.enqueue(chat_id, text, parse_mode, reply_markup)
+                self._inflight[outbox_id] = future
+                if trade_id:
+                    self._trade_ids[outbox_id] = trade_id
+                future.add_done_callback(lambda f, outbox_id=outbox_id: self._on_done(outbox_id, f))
+
+            if self._results:
+                results, self._results = self._results, []
+                await loop.run_in_executor(self._db_executor, self.outbox.finish, results)
+
+            if not claimed:
+                # Uçuştaki mesaj varsa sonuçları sık yaz; yoksa doorbell'i bekle
+                timeout = 0.2 if self._inflight else self.idle_wait
+                await loop.run_in_executor(None, self.outbox.wait, timeout)
+            else:
+                await asyncio.sleep(0)
+
+        await self.notifier.flush(10)
+        if self._results:
+            results, self._results = self._results, []
+            await loop.run_in_executor(self._db_executor, self.outbox.finish, results)
+        self._db_executor.shutdown()
+        await self.notifier.close()
+        logger.info(f"📤 Notification sender stopped stats={self.outbox.stats()}")
+
+    def stop(self):
+        self.running = False
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Notification outbox")
+    sub = parser.add_subparsers(dest='command')
+    serve = sub.add_parser('serve', help="Outbox'ı Telegram'a gönder")
+    serve.add_argument('--max-inflight', type=int, default=200)
+    sub.add_parser('stats', help="Durum sayıları ve en eski bekleyen mesaj")
+    args = parser.parse_args()
+
+    if args.command == 'stats':
+        print(json.dumps(notification_outbox.stats(), indent=2))
+        return
+
+    if args.command == 'serve':
+        import signal
+        from telegram_notifier import telegram_notifier
+
+        if not telegram_notifier.token:
+            print("❌ TELEGRAM_BOT_TOKEN environment variable tanımlanmamış!")
+            sys.exit(1)
+        sender = OutboxSender(notification_outbox, telegram_notifier, args.max_inflight,
+                              health_file=HEALTH_FILE)
+
+        async def run():
+            loop = asyncio.get_running_loop()
+            for sig in (signal.SIGTERM, signal.SIGINT):
+                loop.add_signal_handler(sig, sender.stop)
+            heartbeat = asyncio.create_task(service_heartbeat.run_async())
+            await sender.run()
+            heartbeat.cancel()
+
+        asyncio.run(run())
+        return
+
+    parser.print_help()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    main()
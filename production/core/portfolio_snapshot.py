@@ -0,0 +1,320 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Portfolio Snapshotter
+Kullanıcı başına pozisyon, unrealized PnL ve bakiyeyi bellekte tutar.
+/status, işlem durumu ve PnL ekranları borsaya gitmeden bu snapshot'tan
+(yaşıyla birlikte) cevaplanır.
+
+- Arka planda: tüm kullanıcılar `interval` saniyede bir, paylaşımlı aiohttp
+  havuzu üzerinden eşzamanlı yenilenir (rate limit governor polling lane'i)
+- request_refresh(user_id): işlem sonrası o kullanıcı hemen (kısa bir payla) yenilenir
+- Yenileme başarısız olursa son başarılı snapshot korunur, hata ve yaşı gösterilir
+- run(): mevcut event loop'ta (async servisler) / start(): ayrı thread'de (senkron süreçler)
+
+Benchmark: python3 debug/portfolio_snapshot_benchmark.py
+"""
+import os
+import sys
+import time
+import asyncio
+import inspect
+import logging
+import threading
+from typing import Callable, Dict, Iterable, List, Optional
+
+import aiohttp
+
+_CORE_DIR = os.path.dirname(os.path.realpath(__file__))
+sys.path.append(os.path.join(_CORE_DIR, '..', 'exchanges', 'PERP'))
+from bitget_client import BitgetClient, BitgetCredentials, BitgetAPIError
+
+logger = logging.getLogger(__name__)
+
+
+def _float(value, default: float = 0.0) -> float:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return default
+
+
+class PortfolioSnapshot:
+    """Tek kullanıcının son bilinen portföy durumu (değişmez; yenileme yeni nesne üretir)"""
+
+    __slots__ = ('user_id', 'positions', 'unrealized_pnl', 'equity', 'available',
+                 'fetched_at', 'latency_ms', 'error', 'error_at')
+
+    def __init__(self, user_id, positions: List[Dict], unrealized_pnl: float, equity: float,
+                 available: float, fetched_at: float, latency_ms: float, error: str = None,
+                 error_at: float = None):
+        self.user_id = user_id
+        self.positions = positions
+        self.unrealized_pnl = unrealized_pnl
+        self.equity = equity
+        self.available = available
+        self.fetched_at = fetched_at
+        self.latency_ms = latency_ms
+        self.error = error
+        self.error_at = error_at
+
+    @classmethod
+    def from_exchange(cls, user_id, positions: List[Dict], accounts: List[Dict], latency_ms: float):
+        open_positions = []
+        for pos in positions:
+            size = _float(pos.get('total'))
+            if size == 0:
+                continue
+            margin = _float(pos.get('marginSize', pos.get('margin')))
+            pnl = _float(pos.get('unrealizedPL'))
+            open_positions.append({
+                'symbol': pos.get('symbol', 'Unknown'),
+                'side': pos.get('holdSide', 'long'),
+                'size': size,
+                'entry_price': _float(pos.get('openPriceAvg')),
+                'mark_price': _float(pos.get('markPrice')),
+                'unrealized_pnl': pnl,
+                'pnl_percent': (pnl / margin * 100) if margin > 0 else 0.0,
+                'margin': margin,
+                'leverage': pos.get('leverage', '1'),
+                'margin_mode': pos.get('marginMode', 'unknown'),
+            })
+        usdt = next((a for a in accounts if a.get('marginCoin') == 'USDT'), accounts[0] if accounts else {})
+        return cls(user_id, open_positions,
+                   unrealized_pnl=sum(p['unrealized_pnl'] for p in open_positions),
+                   equity=_float(usdt.get('accountEquity', usdt.get('usdtEquity'))),
+                   available=_float(usdt.get('available')),
+                   fetched_at=time.time(), latency_ms=latency_ms)
+
+    def with_error(self, error: str) -> 'PortfolioSnapshot':
+        return PortfolioSnapshot(self.user_id, self.positions, self.unrealized_pnl, self.equity,
+                                 self.available, self.fetched_at, self.latency_ms, error, time.time())
+
+    @property
+    def age(self) -> float:
+        return max(0.0, time.time() - self.fetched_at) if self.fetched_at else float('inf')
+
+    def to_dict(self) -> Dict:
+        return {
+            'user_id': self.user_id,
+            'positions': self.positions,
+            'unrealized_pnl': self.unrealized_pnl,
+            'equity': self.equity,
+            'available': self.available,
+            'fetched_at': self.fetched_at,
+            'age_seconds': round(self.age, 1),
+            'latency_ms': self.latency_ms,
+            'error': self.error,
+        }
+
+
+def format_age(seconds: float) -> str:
+    """Snapshot yaşı: '12 sn önce', '3 dk önce'"""
+    if seconds == float('inf'):
+        return "hiç güncellenmedi"
+    if seconds < 60:
+        return f"{int(seconds)} sn önce"
+    if seconds < 3600:
+        return f"{int(seconds // 60)} dk önce"
+    return f"{int(seconds // 3600)} sa önce"
+
+
+def format_portfolio(snapshot: Optional[PortfolioSnapshot], html: bool = False) -> str:
+    """Status ekranları için portföy bloğu (Markdown veya HTML kalın yazı)"""
+    bold = (lambda text: f"<b>{text}</b>") if html else (lambda text: f"**{text}**")
+    if snapshot is None:
+        return f"💼 {bold('Portföy')}\n⏳ Borsa verisi hazırlanıyor, birazdan tekrar deneyin"
+
+    lines = [f"💼 {bold('Portföy')}"]
+    if snapshot.positions:
+        for pos in snapshot.positions:
+            emoji = "🟢" if pos['unrealized_pnl'] >= 0 else "🔴"
+            lines.append(f"🔹 {pos['symbol']} {pos['side']} {pos['size']:g} @ {pos['leverage']}x - "
+                         f"{emoji} ${pos['unrealized_pnl']:.2f} ({pos['pnl_percent']:+.2f}%)")
+    else:
+        lines.append("🔹 Açık pozisyon yok")
+    total_emoji = "🟢" if snapshot.unrealized_pnl >= 0 else "🔴"
+    lines.append(f"💰 Toplam K/Z: {total_emoji} ${snapshot.unrealized_pnl:.2f}")
+    lines.append(f"🏦 Bakiye: ${snapshot.equity:.2f} (kullanılabilir ${snapshot.available:.2f})")
+    lines.append(f"🕐 Güncelleme: {format_age(snapshot.age)}")
+    if snapshot.error:
+        lines.append("⚠️ Son yenileme başarısız, gösterilen veri eski olabilir")
+    return "\n".join(lines)
+
+
+class PortfolioSnapshotter:
+    """Tüm kullanıcıların portföy snapshot'larını arka planda güncel tutar"""
+
+    def __init__(self, credential_loader: Callable, interval: float = 30.0, host: str = None,
+                 max_concurrency: int = 16, request_timeout: float = 10.0, refresh_delay: float = 0.5,
+                 credentials_ttl: float = 300.0):
+        """
+        credential_loader: {user_id: BitgetCredentials} döndüren (sync veya async) çağrılabilir
+        refresh_delay: request_refresh sonrası bekleme (fill'in hesaba yansıması + istekleri birleştirme)
+        """
+        self.credential_loader = credential_loader
+        self.interval = interval
+        self.host = host
+        self.max_concurrency = max_concurrency
+        self.request_timeout = request_timeout
+        self.refresh_delay = refresh_delay
+        self.credentials_ttl = credentials_ttl
+
+        self._snapshots: Dict = {}
+        self._credentials: Dict = {}
+        self._credentials_at = 0.0
+        self._pending = set()
+        self._refresh_all = False
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._running = False
+        self._thread: Optional[threading.Thread] = None
+        self.stats = {'cycles': 0, 'refreshes': 0, 'failures': 0, 'on_demand': 0, 'last_cycle_ms': 0.0}
+
+    # ------------------------------------------------------------------
+    # Okuma (her thread'den, borsaya gitmeden)
+    # ------------------------------------------------------------------
+    def get(self, user_id) -> Optional[PortfolioSnapshot]:
+        return self._snapshots.get(user_id)
+
+    def request_refresh(self, user_id=None):
+        """Thread-safe: kullanıcıyı (None ise herkesi) en kısa sürede yenile"""
+        if self._loop is None:
+            self._enqueue(user_id)
+            return
+        try:
+            self._loop.call_soon_threadsafe(self._enqueue, user_id)
+        except RuntimeError:
+            pass  # loop kapandı
+
+    def _enqueue(self, user_id):
+        if user_id is None:
+            self._refresh_all = True
+        else:
+            self._pending.add(user_id)
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    # ------------------------------------------------------------------
+    # Yenileme
+    # ------------------------------------------------------------------
+    async def _load_credentials(self, force: bool = False):
+        if not force and time.monotonic() - self._credentials_at < self.credentials_ttl:
+            return
+        try:
+            if inspect.iscoroutinefunction(self.credential_loader):
+                credentials = await self.credential_loader()
+            else:
+                credentials = await asyncio.to_thread(self.credential_loader)
+            self._credentials = dict(credentials or {})
+            self._credentials_at = time.monotonic()
+            # Artık takip edilmeyen kullanıcıların snapshot'ları bellekte kalmasın
+            for user_id in [uid for uid in self._snapshots if uid not in self._credentials]:
+                del self._snapshots[user_id]
+        except Exception as e:
+            logger.error(f"❌ Portfolio credential load failed: {e}")
+
+    async def _refresh_user(self, session: aiohttp.ClientSession, semaphore: asyncio.Semaphore,
+                            user_id, credentials: BitgetCredentials):
+        client = BitgetClient(session, credentials, host=self.host)
+        started = time.monotonic()
+        try:
+            async with semaphore:
+                positions, accounts = await asyncio.wait_for(
+                    asyncio.gather(client.get_positions(), client.get_accounts()), self.request_timeout)
+            self._snapshots[user_id] = PortfolioSnapshot.from_exchange(
+                user_id, positions, accounts, round((time.monotonic() - started) * 1000, 1))
+            self.stats['refreshes'] += 1
+        except (BitgetAPIError, aiohttp.ClientError, asyncio.TimeoutError) as e:
+            self.stats['failures'] += 1
+            error = str(e) or type(e).__name__
+            previous = self._snapshots.get(user_id)
+            self._snapshots[user_id] = (previous.with_error(error) if previous else
+                                        PortfolioSnapshot(user_id, [], 0.0, 0.0, 0.0, 0.0, 0.0, error, time.time()))
+            logger.warning(f"⚠️ Portfolio refresh failed for user {user_id}: {error}")
+
+    async def refresh(self, user_ids: Iterable = None, session: aiohttp.ClientSession = None):
+        """Verilen kullanıcıları (None ise herkesi) eşzamanlı yenile ve bitmesini bekle"""
+        targets = list(self._credentials) if user_ids is None else [u for u in user_ids if u in self._credentials]
+        if not targets:
+            return
+        own_session = session is None
+        if own_session:
+            session = aiohttp.ClientSession(connector=aiohttp.TCPConnector(limit=self.max_concurrency))
+        try:
+            semaphore = asyncio.Semaphore(self.max_concurrency)
+            await asyncio.gather(*(self._refresh_user(session, semaphore, user_id, self._credentials[user_id])
+                                   for user_id in targets))
+        finally:
+            if own_session:
+                await session.close()
+
+    async def run(self):
+        """Yenileme döngüsü (mevcut event loop'ta, stop() ile biter)"""
+        self._loop = asyncio.get_running_loop()
+        self._wakeup = asyncio.Event()
+        self._running = True
+        if self._pending or self._refresh_all:
+            self._wakeup.set()
+        next_full = 0.0
+        logger.info(f"💼 Portfolio snapshotter started (interval {self.interval:.0f}s)")
+
+        connector = aiohttp.TCPConnector(limit=self.max_concurrency, ttl_dns_cache=300)
+        async with aiohttp.ClientSession(connector=connector) as session:
+            while self._running:
+                try:
+                    await self._load_credentials()
+                    now = time.monotonic()
+                    if now >= next_full or self._refresh_all:
+                        self._refresh_all = False
+                        self._pending.clear()
+                        next_full = now + self.interval
+                        started = time.monotonic()
+                        await self.refresh(None, session)
+                        self.stats['cycles'] += 1
+                        self.stats['last_cycle_ms'] = round((time.monotonic() - started) * 1000, 1)
+                    elif self._pending:
+                        targets, self._pending = self._pending, set()
+                        # Henüz credential'ı yüklenmemiş yeni kullanıcı olabilir
+                        if any(user_id not in self._credentials for user_id in targets):
+                            await self._load_credentials(force=True)
+                        self.stats['on_demand'] += len(targets)
+                        await self.refresh(targets, session)
+                except Exception as e:
+                    logger.error(f"❌ Portfolio snapshot cycle error: {e}")
+
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), max(0.0, next_full - time.monotonic()))
+                    self._wakeup.clear()
+                    if self.refresh_delay:
+                        await asyncio.sleep(self.refresh_delay)
+                except asyncio.TimeoutError:
+                    pass
+        logger.info("💼 Portfolio snapshotter stopped")
+
+    def stop(self):
+        self._running = False
+        if self._loop is not None and self._wakeup is not None:
+            try:
+                self._loop.call_soon_threadsafe(self._wakeup.set)
+            except RuntimeError:
+                pass
+
+    def start(self) -> 'PortfolioSnapshotter':
+        """Senkron süreçler için: run() döngüsünü ayrı thread'de başlat"""
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=lambda: asyncio.run(self.run()),
+                                            name="portfolio-snapshotter", daemon=True)
+            self._thread.start()
+        return self
+
+    def get_stats(self) -> Dict:
+        stats = dict(self.stats)
+        ages = [s.age for s in list(self._snapshots.values()) if s.fetched_at]
+        stats.update({
+            'users': len(self._credentials),
+            'snapshots': len(self._snapshots),
+            'errors': sum(1 for s in list(self._snapshots.values()) if s.error),
+            'max_age_s': round(max(ages), 1) if ages else None,
+        })
+        return stats
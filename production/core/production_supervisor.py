@@ -6,17 +6,29 @@ Gerçek 7/24 uptime için industrial-strength process manager
 ✅ Exponential backoff + circuit breaker 
 ✅ Process cleanup + resource management
 ✅ Health monitoring + auto-recovery
+✅ Event-driven: child exit (pidfd) ve heartbeat soketi tek selector döngüsünde,
+   çöken servis anında, donan servis heartbeat_timeout içinde yeniden başlatılır
+✅ Bağımlılık grafiği: bağımsız servisler paralel başlar, bağımlı servis
+   bağımlılıkları ilk heartbeat'i (readiness) gönderince başlar
+✅ Telemetri: servis başına CPU/RSS/fd/thread/restart (/proc) + heartbeat'le gelen
+   throughput sayaçları ring buffer'da (python3 production/core/service_telemetry.py)
 """
 import os
 import sys
 import time
 import json
+import socket
 import subprocess
 import logging
 import threading
+import selectors
 import signal
+from collections import deque
 from datetime import datetime, timedelta
 
+from service_heartbeat import HEARTBEAT_SOCKET_ENV, SERVICE_NAME_ENV
+from service_telemetry import ServiceTelemetry, format_report
+
 # Production logging setup
 logging.basicConfig(
     level=logging.INFO,
@@ -28,45 +40,168 @@ logging.basicConfig(
 )
 logger = logging.getLogger('SUPERVISOR')
 
+HEARTBEAT_SOCKET = "production/monitoring/supervisor_heartbeat.sock"
+HEARTBEAT_TIMEOUT = 1.0      # son heartbeat'ten bu kadar sonra servis donmuş sayılır
+STARTUP_TIMEOUT = 30.0       # ilk heartbeat için tanınan süre
+STABLE_AFTER = 5.0           # bu kadar ayakta kalan servisin backoff'u sıfırlanır
+CIRCUIT_RETRY = 30.0         # circuit breaker açıkken tekrar deneme aralığı
+FALLBACK_POLL = 0.25         # pidfd yoksa (eski kernel) poll() aralığı
+KILL_GRACE = 2.0             # eski instance'lara SIGTERM sonrası tanınan en uzun süre
+
+def pid_alive(pid):
+    """/proc/<pid>/stat: yok veya zombie ise False"""
+    try:
+        with open(f"/proc/{pid}/stat", "rb") as f:
+            stat = f.read()
+    except OSError:
+        return False
+    return stat[stat.rfind(b')') + 2:][:1] != b'Z'
+
+def scan_processes(patterns):
+    """Tek /proc taraması: cmdline'ında pattern geçen process'ler {pattern: [pid]} (pgrep/ps yerine)"""
+    found = {pattern: [] for pattern in patterns}
+    own_pid = os.getpid()
+    for entry in os.scandir('/proc'):
+        if not entry.name.isdigit() or int(entry.name) == own_pid:
+            continue
+        try:
+            with open(f"/proc/{entry.name}/cmdline", "rb") as f:
+                cmdline = f.read().replace(b'\0', b' ').decode(errors='replace')
+        except OSError:
+            continue  # bu arada çıkmış
+        if not cmdline or "production_supervisor.py" in cmdline:
+            continue
+        for pattern in patterns:
+            if pattern in cmdline:
+                found[pattern].append(int(entry.name))
+    return found
+
+def terminate_pids(pids, grace=KILL_GRACE):
+    """SIGTERM, çıkanları 20ms aralıkla izle, grace sonunda kalanlara SIGKILL"""
+    for pid in pids:
+        logger.info(f"🔪 Killing existing instance PID: {pid}")
+        try:
+            os.kill(pid, signal.SIGTERM)
+        except (ProcessLookupError, PermissionError) as e:
+            logger.warning(f"⚠️ Could not kill PID {pid}: {e}")
+    
+    deadline = time.monotonic() + grace
+    alive = [pid for pid in pids if pid_alive(pid)]
+    while alive and time.monotonic() < deadline:
+        time.sleep(0.02)
+        alive = [pid for pid in alive if pid_alive(pid)]
+    
+    for pid in alive:
+        logger.warning(f"🔥 Force killing PID: {pid}")
+        try:
+            os.kill(pid, signal.SIGKILL)
+        except (ProcessLookupError, PermissionError) as e:
+            logger.error(f"❌ Could not force kill PID {pid}: {e}")
+
 class ProductionSupervisor:
-    def __init__(self):
+    def __init__(self, services: dict = None, heartbeat_socket: str = HEARTBEAT_SOCKET):
         self.processes = {}
         self.restart_counts = {}
         self.restart_delays = {}
-        self.last_health_check = {}
+        self.pending_restarts = {}   # service -> restart zamanı (monotonic)
+        self.restart_causes = {}     # service -> (sebep, tespit zamanı)
+        self.restart_history = deque(maxlen=100)
         self.running = True
+        self._lock = threading.RLock()
+        self._poll_fallback = False
+        self._cleaned_up = set()      # eski instance'ları toplu taramada temizlenmiş servisler
+        self._blocked = set()         # bağımlılık bekleyen servisler (tek seferlik log için)
+        self.startup_started = None
+        self.startup_ready = {}
+        self.total_starts = {}        # service -> başlatma sayısı (restart = başlatma - 1)
+        self.telemetry = ServiceTelemetry()
         
         # Production services configuration
-        self.services = {
+        self.services = services or {
             "telegram_bot": {
                 "command": ["python3", "working_telegram_bot.py"],
                 "description": "🤖 Telegram Bot",
                 "max_restarts": 5,
                 "restart_window": 3600,
-                "health_file": "telegram_bot_health.txt",
+                "heartbeat_timeout": 3.0,  # heartbeat event loop'tan: senkron handler'lara pay
+                "depends_on": [],
                 "critical": True
             },
+            # Detection servisleri: iki replica, leader lease'i tutan tarar, diğeri hot standby
+            # (bkz. production/core/leader_lease.py). Replica etiketi komut satırında olduğu için
+            # birinin restart'ı diğerini kill_existing_instances ile öldürmez.
             "upbit_monitor": {
-                "command": ["python3", "upbit_announcement_scraper.py"],
-                "description": "👀 Upbit Monitor",
+                "command": ["python3", "upbit_announcement_scraper.py", "--replica", "a"],
+                "description": "👀 Upbit Monitor (replica A)",
+                "max_restarts": 3,
+                "restart_window": 3600,
+                "heartbeat_timeout": HEARTBEAT_TIMEOUT,
+                "depends_on": [],
+                "critical": True
+            },
+            "upbit_monitor_b": {
+                "command": ["python3", "upbit_announcement_scraper.py", "--replica", "b"],
+                "description": "👀 Upbit Monitor (replica B)",
                 "max_restarts": 3,
                 "restart_window": 3600,
-                "health_file": "upbit_monitor_health.txt",
+                "heartbeat_timeout": HEARTBEAT_TIMEOUT,
+                "depends_on": [],
                 "critical": True
             },
             "market_tracker": {
-                "command": ["python3", "PERP/upbit_market_tracker.py"],
-                "description": "📊 Market Tracker",
+                "command": ["python3", "PERP/upbit_market_tracker.py", "--replica", "a"],
+                "description": "📊 Market Tracker (replica A)",
                 "max_restarts": 3,
                 "restart_window": 3600,
-                "health_file": "market_tracker_health.txt",
+                "heartbeat_timeout": HEARTBEAT_TIMEOUT,
+                "depends_on": [],
                 "critical": True
+            },
+            "market_tracker_b": {
+                "command": ["python3", "PERP/upbit_market_tracker.py", "--replica", "b"],
+                "description": "📊 Market Tracker (replica B)",
+                "max_restarts": 3,
+                "restart_window": 3600,
+                "heartbeat_timeout": HEARTBEAT_TIMEOUT,
+                "depends_on": [],
+                "critical": True
+            },
+            "trading_engine": {
+                "command": ["python3", "production/core/user_trading_engine.py"],
+                "description": "🚀 Trading Engine",
+                "max_restarts": 5,
+                "restart_window": 3600,
+                "heartbeat_timeout": HEARTBEAT_TIMEOUT,
+                "depends_on": [],
+                "critical": True
+            },
+            "notification_sender": {
+                "command": ["python3", "production/core/notification_outbox.py", "serve"],
+                "description": "📤 Notification Sender",
+                "max_restarts": 5,
+                "restart_window": 3600,
+                "heartbeat_timeout": HEARTBEAT_TIMEOUT,
+                "depends_on": [],
+                "critical": False
             }
         }
         
+        # Bağımlılık grafiği: bilinmeyen servis / döngü varsa supervisor hiç başlamaz
+        self.start_order = self.resolve_dependencies()
+        
         # Create necessary directories
         os.makedirs('logs', exist_ok=True)
         
+        # Event kaynakları: heartbeat soketi, child pidfd'leri, durdurma için wake pipe
+        self.selector = selectors.DefaultSelector()
+        self.heartbeat_path = os.path.abspath(heartbeat_socket)
+        self.heartbeat_sock = self.open_heartbeat_socket(self.heartbeat_path)
+        self.selector.register(self.heartbeat_sock, selectors.EVENT_READ, ('heartbeat', None))
+        self._wake_r, self._wake_w = os.pipe()
+        os.set_blocking(self._wake_r, False)
+        os.set_blocking(self._wake_w, False)
+        self.selector.register(self._wake_r, selectors.EVENT_READ, ('wake', None))
+        
         # Signal handlers for graceful shutdown
         signal.signal(signal.SIGTERM, self.signal_handler)
         signal.signal(signal.SIGINT, self.signal_handler)
@@ -76,83 +211,85 @@ class ProductionSupervisor:
     def signal_handler(self, signum, frame):
         """Handle shutdown signals gracefully"""
         logger.info(f"📡 Received signal {signum}, shutting down gracefully...")
-        self.running = False
         self.stop_all_services()
         sys.exit(0)
     
+    @staticmethod
+    def open_heartbeat_socket(path):
+        """Servislerin heartbeat gönderdiği Unix datagram soketi"""
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        try:
+            os.unlink(path)  # önceki supervisor'dan kalan soket dosyası
+        except FileNotFoundError:
+            pass
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        sock.bind(path)
+        sock.setblocking(False)
+        return sock
+    
+    def wake(self):
+        """Selector döngüsünü hemen uyandır (durdurma)"""
+        try:
+            os.write(self._wake_w, b'x')
+        except (BlockingIOError, OSError):
+            pass
+    
+    def resolve_dependencies(self):
+        """depends_on grafiğini doğrula, topolojik sıra döndür"""
+        order, visiting, done = [], set(), set()
+        
+        def visit(service_name, path):
+            if service_name in done:
+                return
+            if service_name in visiting:
+                raise ValueError(f"Dependency cycle: {' -> '.join(path + [service_name])}")
+            visiting.add(service_name)
+            for dependency in self.services[service_name].get("depends_on", []):
+                if dependency not in self.services:
+                    raise ValueError(f"{service_name} depends on unknown service {dependency}")
+                visit(dependency, path + [service_name])
+            visiting.discard(service_name)
+            done.add(service_name)
+            order.append(service_name)
+        
+        for service_name in self.services:
+            visit(service_name, [])
+        return order
+    
+    def script_pattern(self, service_name):
+        command = self.services[service_name]["command"]
+        return " ".join(command[1:]) if len(command) > 1 else ""
+    
     def kill_existing_instances(self, service_name):
         """CRITICAL: Kill existing instances to prevent 409 conflicts"""
+        if service_name in self._cleaned_up:
+            self._cleaned_up.discard(service_name)  # başlangıçta toplu temizlendi
+            return
+        self.kill_existing_instances_batch([service_name])
+    
+    def kill_existing_instances_batch(self, service_names):
+        """Tüm servislerin eski instance'larını tek /proc taramasıyla bul ve birlikte sonlandır"""
         try:
-            config = self.services[service_name]
-            script_name = config["command"][1] if len(config["command"]) > 1 else ""
-            
-            if script_name:
-                # Find all processes running this script
-                result = subprocess.run(
-                    ["pgrep", "-f", script_name],
-                    capture_output=True,
-                    text=True
-                )
-                
-                if result.returncode == 0:
-                    pids = [pid.strip() for pid in result.stdout.split('\n') if pid.strip()]
-                    
-                    for pid in pids:
-                        try:
-                            # Check if it's not this supervisor process
-                            ps_result = subprocess.run(
-                                ["ps", "-p", pid, "-o", "cmd="],
-                                capture_output=True,
-                                text=True
-                            )
-                            
-                            if "production_supervisor.py" not in ps_result.stdout:
-                                logger.info(f"🔪 Killing existing instance PID: {pid}")
-                                subprocess.run(["kill", "-TERM", pid], timeout=3)
-                        except Exception as e:
-                            logger.warning(f"⚠️ Could not kill PID {pid}: {e}")
-                    
-                    # Wait for graceful shutdown
-                    time.sleep(2)
-                    
-                    # Force kill if still running
-                    result = subprocess.run(
-                        ["pgrep", "-f", script_name],
-                        capture_output=True,
-                        text=True
-                    )
-                    
-                    if result.returncode == 0:
-                        pids = [pid.strip() for pid in result.stdout.split('\n') if pid.strip()]
-                        for pid in pids:
-                            try:
-                                ps_result = subprocess.run(
-                                    ["ps", "-p", pid, "-o", "cmd="],
-                                    capture_output=True,
-                                    text=True
-                                )
-                                
-                                if "production_supervisor.py" not in ps_result.stdout:
-                                    logger.warning(f"🔥 Force killing PID: {pid}")
-                                    subprocess.run(["kill", "-KILL", pid], timeout=3)
-                            except Exception as e:
-                                logger.error(f"❌ Could not force kill PID {pid}: {e}")
-                    
+            patterns = {self.script_pattern(name): name for name in service_names if self.script_pattern(name)}
+            found = scan_processes(list(patterns))
+            pids = sorted({pid for pattern_pids in found.values() for pid in pattern_pids})
+            if pids:
+                terminate_pids(pids)
         except Exception as e:
             logger.error(f"❌ Error killing existing instances: {e}")
     
     def apply_restart_delay(self, service_name):
-        """Apply exponential backoff to prevent restart storms"""
+        """Exponential backoff: restart'tan önce beklenecek süreyi döndür (döngü bloklanmaz)"""
         if service_name not in self.restart_delays:
             self.restart_delays[service_name] = 1
         
         delay = self.restart_delays[service_name]
         if delay > 1:
             logger.info(f"⏱️ Backoff delay: {delay}s for {service_name}")
-            time.sleep(delay)
         
         # Exponential backoff (max 60 seconds)
         self.restart_delays[service_name] = min(delay * 2, 60)
+        return delay if delay > 1 else 0
     
     def reset_restart_delay(self, service_name):
         """Reset delay when service runs successfully"""
@@ -189,6 +326,7 @@ class ProductionSupervisor:
             self.restart_counts[service_name] = []
         
         self.restart_counts[service_name].append(datetime.now())
+        self.total_starts[service_name] = self.total_starts.get(service_name, 0) + 1
     
     def start_service(self, service_name):
         """Start service with production-grade guarantees"""
@@ -205,9 +343,6 @@ class ProductionSupervisor:
         if not self.check_restart_limit(service_name):
             return False
         
-        # Apply exponential backoff
-        self.apply_restart_delay(service_name)
-        
         try:
             logger.info(f"🚀 Starting {config['description']}")
             
@@ -221,17 +356,24 @@ class ProductionSupervisor:
                 stdout=stdout_file,
                 stderr=stderr_file,
                 cwd=os.getcwd(),
+                env=dict(os.environ, **{HEARTBEAT_SOCKET_ENV: self.heartbeat_path,
+                                        SERVICE_NAME_ENV: service_name}),
                 preexec_fn=os.setsid if hasattr(os, 'setsid') else None
             )
             
-            self.processes[service_name] = {
-                'process': process,
-                'stdout_file': stdout_file,
-                'stderr_file': stderr_file,
-                'start_time': datetime.now()
-            }
-            
-            self.record_restart(service_name)
+            with self._lock:
+                self.processes[service_name] = {
+                    'process': process,
+                    'stdout_file': stdout_file,
+                    'stderr_file': stderr_file,
+                    'start_time': datetime.now(),
+                    'started_mono': time.monotonic(),
+                    'last_beat': None,
+                    'killed_at': None,
+                    'pidfd': self.watch_exit(service_name, process)
+                }
+                self.record_restart(service_name)
+                self.record_restart_latency(service_name)
             
             logger.info(f"✅ {config['description']} started (PID: {process.pid})")
             return True
@@ -240,25 +382,30 @@ class ProductionSupervisor:
             logger.error(f"❌ Failed to start {service_name}: {e}")
             return False
     
-    def stop_service(self, service_name):
-        """Stop service and cleanup resources"""
-        if service_name not in self.processes:
-            return
-            
-        logger.info(f"🛑 Stopping {service_name}")
-        
-        process_info = self.processes[service_name]
-        process = process_info['process']
-        
+    def watch_exit(self, service_name, process):
+        """Child çıkışını selector'a bağla (pidfd); desteklenmiyorsa poll fallback"""
         try:
-            # Graceful shutdown
-            process.terminate()
-            process.wait(timeout=5)
-        except subprocess.TimeoutExpired:
-            logger.warning(f"⚡ Force killing {service_name}")
-            process.kill()
-        except Exception as e:
-            logger.error(f"❌ Error stopping {service_name}: {e}")
+            pidfd = os.pidfd_open(process.pid)
+        except (AttributeError, OSError) as e:
+            if not self._poll_fallback:
+                logger.warning(f"⚠️ pidfd unavailable ({e}), falling back to {FALLBACK_POLL}s poll")
+            self._poll_fallback = True
+            return None
+        self.selector.register(pidfd, selectors.EVENT_READ, ('exit', service_name))
+        return pidfd
+    
+    def release_process(self, service_name):
+        """pidfd'yi selector'dan çıkar, log dosyalarını kapat, kaydı sil"""
+        process_info = self.processes.pop(service_name, None)
+        if process_info is None:
+            return None
+        pidfd = process_info.get('pidfd')
+        if pidfd is not None:
+            try:
+                self.selector.unregister(pidfd)
+            except (KeyError, ValueError):
+                pass
+            os.close(pidfd)
         
         # Cleanup file handles
         for file_key in ['stdout_file', 'stderr_file']:
@@ -267,9 +414,31 @@ class ProductionSupervisor:
                     process_info[file_key].close()
                 except Exception as e:
                     logger.warning(f"⚠️ Error closing {file_key}: {e}")
-        
-        del self.processes[service_name]
-        logger.info(f"✅ {service_name} stopped and cleaned up")
+        return process_info
+    
+    def stop_service(self, service_name):
+        """Stop service and cleanup resources"""
+        with self._lock:
+            if service_name not in self.processes:
+                return
+                
+            logger.info(f"🛑 Stopping {service_name}")
+            
+            process = self.processes[service_name]['process']
+            
+            try:
+                # Graceful shutdown
+                process.terminate()
+                process.wait(timeout=5)
+            except subprocess.TimeoutExpired:
+                logger.warning(f"⚡ Force killing {service_name}")
+                process.kill()
+                process.wait()
+            except Exception as e:
+                logger.error(f"❌ Error stopping {service_name}: {e}")
+            
+            self.release_process(service_name)
+            logger.info(f"✅ {service_name} stopped and cleaned up")
     
     def is_service_running(self, service_name):
         """Check if service is running"""
@@ -280,69 +449,264 @@ class ProductionSupervisor:
         return process.poll() is None
     
     def health_check(self, service_name):
-        """Check service health via heartbeat file"""
-        config = self.services[service_name]
-        health_file = config.get("health_file")
-        
-        if not health_file or not os.path.exists(health_file):
-            logger.warning(f"⚠️ No health file for {service_name}")
+        """Check service health via heartbeat socket (son heartbeat heartbeat_timeout içinde mi)"""
+        process_info = self.processes.get(service_name)
+        if process_info is None:
             return False
-            
-        try:
-            with open(health_file, 'r') as f:
-                last_update = f.read().strip()
-                last_time = datetime.fromisoformat(last_update)
-                
-            # Health check: updated within last 2 minutes
-            if datetime.now() - last_time < timedelta(minutes=2):
-                return True
+        timeout = self.services[service_name].get("heartbeat_timeout")
+        if timeout is None:
+            return self.is_service_running(service_name)
+        last_beat = process_info['last_beat']
+        return last_beat is not None and time.monotonic() - last_beat <= timeout
+    
+    def handle_heartbeats(self):
+        """Soketteki tüm heartbeat paketlerini oku"""
+        now = time.monotonic()
+        while True:
+            try:
+                data = self.heartbeat_sock.recv(4096)
+            except (BlockingIOError, InterruptedError):
+                return
+            try:
+                beat = json.loads(data)
+                service_name, pid = beat['service'], beat['pid']
+            except (ValueError, KeyError, TypeError):
+                continue
+            process_info = self.processes.get(service_name)
+            # Öldürülmüş / eski instance'tan gelen geç paketleri yok say
+            if process_info is None or process_info['process'].pid != pid or process_info['killed_at']:
+                continue
+            if process_info['last_beat'] is None:
+                self.record_ready_latency(service_name, now)
+            process_info['last_beat'] = now
+            if beat.get('counters'):
+                process_info['counters'] = beat['counters']
+    
+    def handle_exit(self, service_name):
+        """Child çıktı: kaynakları bırak, backoff'a göre restart planla"""
+        process_info = self.processes.get(service_name)
+        if process_info is None:
+            return
+        returncode = process_info['process'].poll()
+        if returncode is None:
+            return
+        detected = time.monotonic()
+        self.release_process(service_name)
+        if not self.running:
+            return
+        
+        uptime = detected - process_info['started_mono']
+        if uptime >= STABLE_AFTER:
+            self.reset_restart_delay(service_name)
+        delay = self.apply_restart_delay(service_name)
+        cause = "heartbeat timeout" if process_info['killed_at'] else f"exit code {returncode}"
+        self.restart_causes[service_name] = (cause, process_info['killed_at'] or detected)
+        self.pending_restarts[service_name] = detected + delay
+        logger.warning(f"💥 {self.services[service_name]['description']} exited ({cause}) "
+                       f"after {uptime:.1f}s, restart in {delay}s")
+    
+    def check_heartbeats(self, now):
+        """Heartbeat'i duran servisi öldür; çıkış event'i restart'ı tetikler"""
+        for service_name, process_info in list(self.processes.items()):
+            timeout = self.services[service_name].get("heartbeat_timeout")
+            if timeout is None or process_info['killed_at']:
+                continue
+            last_beat = process_info['last_beat']
+            if last_beat is None:
+                if now - process_info['started_mono'] <= self.services[service_name].get("startup_timeout", STARTUP_TIMEOUT):
+                    continue
+                reason = "no heartbeat since start"
+            elif now - last_beat > timeout:
+                reason = f"heartbeat stale for {now - last_beat:.2f}s"
             else:
-                logger.warning(f"⚠️ {service_name} health stale (last: {last_time})")
-                return False
-                
-        except Exception as e:
-            logger.error(f"❌ Health check failed for {service_name}: {e}")
+                continue
+            logger.warning(f"⚠️ {service_name} failed health check ({reason}), restarting")
+            process_info['killed_at'] = now
+            try:
+                os.killpg(process_info['process'].pid, signal.SIGKILL)
+            except (ProcessLookupError, PermissionError):
+                process_info['process'].kill()
+    
+    def is_service_ready(self, service_name):
+        """Readiness: ilk heartbeat geldi (heartbeat'siz serviste: çalışıyor)"""
+        process_info = self.processes.get(service_name)
+        if process_info is None or process_info['killed_at']:
             return False
+        if self.services[service_name].get("heartbeat_timeout") is None:
+            return self.is_service_running(service_name)
+        return process_info['last_beat'] is not None
+    
+    def dependencies_ready(self, service_name):
+        return all(self.is_service_ready(dep) for dep in self.services[service_name].get("depends_on", []))
+    
+    def start_due_services(self, now):
+        """Çalışmayan ve zamanı gelen servisleri başlat (circuit breaker açıksa sonra tekrar dene)"""
+        for service_name in self.start_order:
+            if service_name in self.processes:
+                continue
+            due = self.pending_restarts.setdefault(service_name, now)
+            if due > now:
+                continue
+            if not self.dependencies_ready(service_name):
+                if service_name not in self._blocked:
+                    self._blocked.add(service_name)
+                    logger.info(f"⏳ {service_name} waiting for {self.services[service_name]['depends_on']}")
+                continue
+            self._blocked.discard(service_name)
+            del self.pending_restarts[service_name]
+            if not self.start_service(service_name):
+                self.pending_restarts[service_name] = now + CIRCUIT_RETRY
+    
+    def next_timeout(self, now):
+        """Selector için bir sonraki zamanlı işe kadar kalan süre"""
+        if any(name not in self.processes and name not in self.pending_restarts for name in self.services):
+            return 0.0  # çalışmayan ve planlanmamış servis var: hemen başlat
+        deadlines = [self.last_status_log + 600]
+        # Bağımlılık bekleyenler heartbeat event'iyle uyanır, zamanlayıcıya girmez
+        deadlines.extend(due for name, due in self.pending_restarts.items() if self.dependencies_ready(name))
+        for service_name, process_info in self.processes.items():
+            timeout = self.services[service_name].get("heartbeat_timeout")
+            if timeout is None or process_info['killed_at']:
+                continue
+            if process_info['last_beat'] is None:
+                deadlines.append(process_info['started_mono'] +
+                                 self.services[service_name].get("startup_timeout", STARTUP_TIMEOUT))
+            else:
+                deadlines.append(process_info['last_beat'] + timeout)
+        timeout = max(0.0, min(deadlines) - now)
+        return min(timeout, FALLBACK_POLL) if self._poll_fallback else timeout
+    
+    def record_restart_latency(self, service_name):
+        """Restart edilen servis için çıkış/donma tespitinden yeni process'e geçen süre"""
+        cause = self.restart_causes.pop(service_name, None)
+        if cause is None:
+            return
+        reason, detected = cause
+        entry = {
+            'service': service_name,
+            'cause': reason,
+            'at': datetime.now().isoformat(),
+            'restart_ms': round((time.monotonic() - detected) * 1000, 1),
+            'ready_ms': None
+        }
+        self.processes[service_name]['restart_entry'] = entry
+        self.processes[service_name]['restart_detected'] = detected
+        self.restart_history.append(entry)
+    
+    def record_ready_latency(self, service_name, now):
+        process_info = self.processes[service_name]
+        entry = process_info.get('restart_entry')
+        if entry is None:
+            logger.info(f"💓 {service_name} ready in {(now - process_info['started_mono']) * 1000:.0f}ms")
+            self.record_startup_ready(service_name, now)
+            return
+        entry['ready_ms'] = round((now - process_info['restart_detected']) * 1000, 1)
+        logger.info(f"⚡ {service_name} recovered ({entry['cause']}): restarted in {entry['restart_ms']:.0f}ms, "
+                    f"first heartbeat in {entry['ready_ms']:.0f}ms")
+    
+    def record_startup_ready(self, service_name, now):
+        """Soğuk başlangıç: start_all_services'ten her servisin ilk heartbeat'ine geçen süre"""
+        if self.startup_started is None or service_name in self.startup_ready:
+            return
+        self.startup_ready[service_name] = round((now - self.startup_started) * 1000, 1)
+        if len(self.startup_ready) == len(self.services):
+            logger.info(f"✅ All services ready in {max(self.startup_ready.values()):.0f}ms "
+                        f"({', '.join(f'{name} {ms:.0f}ms' for name, ms in self.startup_ready.items())})")
+    
+    def get_startup_report(self):
+        """Time-to-ready: servis başına ve toplam (hepsi hazır değilse total None)"""
+        complete = len(self.startup_ready) == len(self.services)
+        return {
+            'services_ms': dict(self.startup_ready),
+            'total_ms': max(self.startup_ready.values()) if complete and self.startup_ready else None
+        }
+    
+    def get_restart_stats(self):
+        """Time-to-restart özetleri (servis başına son restart'lar)"""
+        stats = {}
+        for entry in self.restart_history:
+            service = stats.setdefault(entry['service'], {'restarts': 0, 'restart_ms': [], 'ready_ms': []})
+            service['restarts'] += 1
+            service['restart_ms'].append(entry['restart_ms'])
+            if entry['ready_ms'] is not None:
+                service['ready_ms'].append(entry['ready_ms'])
+        for service in stats.values():
+            for key in ('restart_ms', 'ready_ms'):
+                values = sorted(service.pop(key))
+                service[f'{key}_p50'] = values[len(values) // 2] if values else None
+                service[f'{key}_max'] = values[-1] if values else None
+        return stats
+    
+    def telemetry_snapshot(self):
+        """Örnekleme için anlık görüntü: PID (çalışmıyorsa None), restart sayısı, son sayaçlar"""
+        snapshot = {}
+        for service_name in self.services:
+            process_info = self.processes.get(service_name)
+            alive = process_info is not None and not process_info['killed_at']
+            snapshot[service_name] = {
+                'pid': process_info['process'].pid if alive else None,
+                'restarts': max(0, self.total_starts.get(service_name, 0) - 1),
+                'counters': dict(process_info.get('counters', {})) if alive else {}
+            }
+        return snapshot
+    
+    def telemetry_loop(self):
+        """Sabit aralıkla /proc örneklemesi; selector döngüsünü (restart gecikmesini) bloklamaz"""
+        while self.running:
+            started = time.monotonic()
+            try:
+                with self._lock:
+                    snapshot = self.telemetry_snapshot()
+                self.telemetry.sample(snapshot)
+            except Exception as e:
+                logger.error(f"❌ Telemetry sample error: {e}")
+            time.sleep(max(0.0, self.telemetry.interval - (time.monotonic() - started)))
     
     def monitor_services(self):
-        """Main monitoring loop"""
-        logger.info("🔍 Production monitoring started")
+        """Main monitoring loop: child exit, heartbeat ve zamanlayıcılar tek selector'da"""
+        logger.info("🔍 Production monitoring started (event-driven)")
+        self.last_status_log = time.monotonic()
+        threading.Thread(target=self.telemetry_loop, name="telemetry", daemon=True).start()
         
         while self.running:
             try:
-                all_healthy = True
-                
-                for service_name, config in self.services.items():
-                    if not self.is_service_running(service_name):
-                        logger.warning(f"⚠️ Service {service_name} not running")
-                        if self.start_service(service_name):
-                            # Reset delay on successful start
-                            time.sleep(5)  # Let it start up
-                            if self.is_service_running(service_name):
-                                self.reset_restart_delay(service_name)
-                        all_healthy = False
-                    else:
-                        # Check health if running
-                        if not self.health_check(service_name):
-                            logger.warning(f"⚠️ {service_name} failed health check, restarting")
-                            self.stop_service(service_name)
-                            time.sleep(2)
-                            self.start_service(service_name)
-                            all_healthy = False
-                
-                # Log status every 10 minutes
-                if not hasattr(self, 'last_status_log'):
-                    self.last_status_log = datetime.now()
+                with self._lock:
+                    timeout = self.next_timeout(time.monotonic())
+                events = self.selector.select(timeout)
                 
-                if datetime.now() - self.last_status_log > timedelta(minutes=10):
-                    self.log_system_status()
-                    self.last_status_log = datetime.now()
+                with self._lock:
+                    if not self.running:
+                        break
+                    for key, _ in events:
+                        kind, service_name = key.data
+                        if kind == 'exit':
+                            self.handle_exit(service_name)
+                        elif kind == 'heartbeat':
+                            self.handle_heartbeats()
+                        elif kind == 'wake':
+                            while True:
+                                try:
+                                    if not os.read(self._wake_r, 4096):
+                                        break
+                                except BlockingIOError:
+                                    break
+                    
+                    if self._poll_fallback:
+                        for service_name in list(self.processes):
+                            self.handle_exit(service_name)
+                    
+                    now = time.monotonic()
+                    self.check_heartbeats(now)
+                    self.start_due_services(now)
+                    
+                    # Log status every 10 minutes
+                    if now - self.last_status_log > 600:
+                        self.log_system_status()
+                        self.last_status_log = now
                 
             except Exception as e:
                 logger.error(f"❌ Monitor error: {e}")
-            
-            # Check every 30 seconds (faster than old system)
-            time.sleep(30)
+                time.sleep(1)
     
     def log_system_status(self):
         """Log comprehensive system status"""
@@ -362,6 +726,10 @@ class ProductionSupervisor:
 📊 Uptime: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}
 """
         logger.info(status)
+        try:
+            logger.info(f"📈 TELEMETRY:\n{format_report(self.telemetry.store)}")
+        except Exception as e:
+            logger.warning(f"⚠️ Could not build telemetry report: {e}")
         
         # Write status file for external monitoring
         try:
@@ -370,30 +738,38 @@ class ProductionSupervisor:
                     'timestamp': datetime.now().isoformat(),
                     'running_services': running_services,
                     'failed_services': failed_services,
-                    'total_services': len(self.services)
+                    'total_services': len(self.services),
+                    'restart_stats': self.get_restart_stats(),
+                    'startup': self.get_startup_report(),
+                    'telemetry': self.telemetry.latest
                 }, f, indent=2)
         except Exception as e:
             logger.warning(f"⚠️ Could not write status file: {e}")
     
     def start_all_services(self):
-        """Start all services with staggered startup"""
+        """Eski instance'ları toplu temizle, servisleri bağımlılık sırasına göre paralel başlat"""
         logger.info("🚀 PRODUCTION SUPERVISOR STARTING ALL SERVICES")
         logger.info("=" * 60)
         
-        for service_name in self.services.keys():
-            if self.start_service(service_name):
-                time.sleep(3)  # Stagger startup to avoid resource conflicts
-            else:
-                logger.error(f"❌ Failed to start critical service: {service_name}")
+        with self._lock:
+            self.startup_started = time.monotonic()
+            self.startup_ready = {}
+            self.kill_existing_instances_batch(self.start_order)
+            self._cleaned_up = set(self.start_order)
+            # Bağımlılığı olmayanlar hemen başlar; diğerleri readiness bekler (monitor döngüsü)
+            self.start_due_services(time.monotonic())
         
-        logger.info("✅ All services startup attempted")
+        logger.info(f"✅ Startup scheduled in dependency order: {' -> '.join(self.start_order)}")
         logger.info("🔍 Continuous monitoring enabled")
     
     def stop_all_services(self):
         """Stop all services gracefully"""
         logger.info("🛑 Stopping all services")
-        for service_name in list(self.processes.keys()):
-            self.stop_service(service_name)
+        with self._lock:
+            self.running = False
+            self.wake()
+            for service_name in list(self.processes.keys()):
+                self.stop_service(service_name)
         logger.info("✅ All services stopped")
 
 def main():
@@ -0,0 +1,346 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Cross-Process Rate Limit Governor
+Aynı Bitget/Gate.io API anahtarını kullanan tüm süreçler (UserTradingEngine alt
+süreçleri, Telegram bot, TP ve PnL monitörleri) için ortak token-bucket limitleyici.
+
+Durum /dev/shm altındaki paylaşımlı bellek dosyasında tutulur; her (API key,
+endpoint sınıfı) çifti için bir slot vardır. Order lane'i polling lane'inin önüne
+geçer: order bekleyen bir slotta polling istekleri geri çekilir.
+"""
+import os
+import sys
+import time
+import mmap
+import fcntl
+import struct
+import asyncio
+import hashlib
+import tempfile
+import threading
+import logging
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Öncelik lane'leri (düşük sayı = yüksek öncelik)
+PRIORITY_ORDER = 0  # Order açma/kapama ve order öncesi ayarlar
+PRIORITY_POLL = 1   # Pozisyon/PnL sorgulama, fill kontrolü
+
+# Endpoint sınıfı -> (saniyedeki token, burst kapasitesi)
+# Bitget limitleri UID başına: place-order 10/s, set-leverage 5/s, all-position 5/s
+ENDPOINT_LIMITS: Dict[str, Tuple[float, int]] = {
+    "order": (10.0, 10),
+    "account": (5.0, 5),
+    "position": (5.0, 5),
+    "market": (15.0, 20),
+}
+
+# Polling lane'i burst'ün bu kadarını order lane'ine bırakır
+POLL_RESERVE_RATIO = 0.3
+
+_MAGIC = b"PRLG"
+_VERSION = 1
+_HEADER = struct.Struct("<4sII")  # magic, version, slot_count
+_HEADER_SIZE = 64
+# key_hash, tokens, last_refill, high_hold_until, acquired, throttled,
+# total_delay, max_delay, label
+_SLOT = struct.Struct("<QdddQQdd24s")
+_SLOT_SIZE = 96
+DEFAULT_SLOT_COUNT = 4096
+
+
+def _default_shm_path() -> str:
+    """Paylaşımlı bellek dosyasının yolu (RATE_LIMIT_SHM_PATH ile değiştirilebilir)"""
+    env_path = os.getenv("RATE_LIMIT_SHM_PATH")
+    if env_path:
+        return env_path
+    base = "/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir()
+    return os.path.join(base, "perp_rate_limits.shm")
+
+
+def _mask_key(api_key: Optional[str]) -> str:
+    """Stats çıktısı için API key'i maskele"""
+    if not api_key:
+        return "public"
+    return f"{api_key[:4]}***"
+
+
+class RateLimitGovernor:
+    """Paylaşımlı bellek üzerinde çalışan çok süreçli token-bucket governor"""
+
+    def __init__(self, shm_path: str = None, slot_count: int = DEFAULT_SLOT_COUNT,
+                 max_wait: float = 10.0):
+        self.shm_path = shm_path or _default_shm_path()
+        self.slot_count = slot_count
+        self.max_wait = max_wait
+        self._fd = None
+        self._mm = None
+        self._open_lock = threading.Lock()
+        # fcntl kayıt kilitleri süreç bazlıdır; aynı süreçteki thread'ler için ayrıca kilit gerekli
+        self._thread_lock = threading.Lock()
+        self._slot_cache: Dict[int, int] = {}
+
+    # ------------------------------------------------------------------
+    # Paylaşımlı bellek yönetimi
+    # ------------------------------------------------------------------
+    def _ensure_open(self):
+        """Paylaşımlı bellek dosyasını tembel şekilde aç ve map'le"""
+        if self._mm is not None:
+            return
+        with self._open_lock:
+            if self._mm is not None:
+                return
+            total_size = _HEADER_SIZE + self.slot_count * _SLOT_SIZE
+            fd = os.open(self.shm_path, os.O_RDWR | os.O_CREAT, 0o600)
+            fcntl.lockf(fd, fcntl.LOCK_EX, _HEADER_SIZE, 0)
+            try:
+                if os.fstat(fd).st_size < total_size:
+                    os.ftruncate(fd, total_size)
+                mm = mmap.mmap(fd, total_size)
+                magic, version, slot_count = _HEADER.unpack_from(mm, 0)
+                if magic != _MAGIC:
+                    _HEADER.pack_into(mm, 0, _MAGIC, _VERSION, self.slot_count)
+                elif slot_count != self.slot_count or version != _VERSION:
+                    logger.warning(f"⚠️ Rate limit tablosu farklı düzende ({slot_count} slot), mevcut düzen kullanılıyor")
+                    self.slot_count = min(slot_count, self.slot_count)
+            finally:
+                fcntl.lockf(fd, fcntl.LOCK_UN, _HEADER_SIZE, 0)
+            self._fd = fd
+            self._mm = mm
+
+    def _slot_offset(self, index: int) -> int:
+        return _HEADER_SIZE + index * _SLOT_SIZE
+
+    def _lock_slot(self, index: int):
+        self._thread_lock.acquire()
+        try:
+            fcntl.lockf(self._fd, fcntl.LOCK_EX, _SLOT_SIZE, self._slot_offset(index))
+        except Exception:
+            self._thread_lock.release()
+            raise
+
+    def _unlock_slot(self, index: int):
+        try:
+            fcntl.lockf(self._fd, fcntl.LOCK_UN, _SLOT_SIZE, self._slot_offset(index))
+        finally:
+            self._thread_lock.release()
+
+    @staticmethod
+    def _key_hash(api_key: Optional[str], endpoint_class: str) -> int:
+        """API key + endpoint sınıfından 64-bit slot anahtarı üret (ham key saklanmaz)"""
+        material = f"{api_key or 'public'}\0{endpoint_class}".encode("utf-8")
+        value = int.from_bytes(hashlib.blake2b(material, digest_size=8).digest(), "little")
+        return value or 1
+
+    def _find_slot(self, api_key: Optional[str], endpoint_class: str) -> Optional[int]:
+        """Slot'u bul veya boş bir slot'u talep et (linear probing)"""
+        key_hash = self._key_hash(api_key, endpoint_class)
+        cached = self._slot_cache.get(key_hash)
+        if cached is not None:
+            return cached
+
+        _, burst = ENDPOINT_LIMITS[endpoint_class]
+        label = f"{_mask_key(api_key)}/{endpoint_class}".encode("utf-8")[:24]
+        start = key_hash % self.slot_count
+        for probe in range(self.slot_count):
+            index = (start + probe) % self.slot_count
+            offset = self._slot_offset(index)
+            self._lock_slot(index)
+            try:
+                slot_hash = struct.unpack_from("<Q", self._mm, offset)[0]
+                if slot_hash == 0:
+                    _SLOT.pack_into(self._mm, offset, key_hash, float(burst), time.monotonic(),
+                                    0.0, 0, 0, 0.0, 0.0, label)
+                    self._slot_cache[key_hash] = index
+                    return index
+                if slot_hash == key_hash:
+                    self._slot_cache[key_hash] = index
+                    return index
+            finally:
+                self._unlock_slot(index)
+
+        logger.error("❌ Rate limit tablosu dolu, istek sınırlandırılmadan geçiyor")
+        return None
+
+    # ------------------------------------------------------------------
+    # Token bucket
+    # ------------------------------------------------------------------
+    def _try_take(self, index: int, endpoint_class: str, priority: int,
+                  delay_so_far: float) -> float:
+        """Token almayı dene. 0 dönerse token alındı, aksi halde beklenecek süre"""
+        rate, burst = ENDPOINT_LIMITS[endpoint_class]
+        offset = self._slot_offset(index)
+        self._lock_slot(index)
+        try:
+            (key_hash, tokens, last_refill, high_hold_until, acquired, throttled,
+             total_delay, max_delay, label) = _SLOT.unpack_from(self._mm, offset)
+
+            now = time.monotonic()
+            tokens = min(float(burst), tokens + max(0.0, now - last_refill) * rate)
+
+            if priority == PRIORITY_ORDER:
+                needed = 1.0
+                blocked_by_order_lane = False
+            else:
+                needed = 1.0 + burst * POLL_RESERVE_RATIO
+                blocked_by_order_lane = now < high_hold_until
+
+            if tokens >= needed and not blocked_by_order_lane:
+                tokens -= 1.0
+                acquired += 1
+                if delay_so_far > 0:
+                    throttled += 1
+                    total_delay += delay_so_far
+                    max_delay = max(max_delay, delay_so_far)
+                _SLOT.pack_into(self._mm, offset, key_hash, tokens, now, high_hold_until,
+                                acquired, throttled, total_delay, max_delay, label)
+                return 0.0
+
+            if blocked_by_order_lane:
+                wait = max(high_hold_until - now, 0.001)
+            else:
+                wait = (needed - tokens) / rate
+            if priority == PRIORITY_ORDER:
+                # Order bekliyor: polling lane'ini bu süre boyunca geri çek
+                high_hold_until = max(high_hold_until, now + wait + 0.05)
+
+            _SLOT.pack_into(self._mm, offset, key_hash, tokens, now, high_hold_until,
+                            acquired, throttled, total_delay, max_delay, label)
+            return max(wait, 0.001)
+        finally:
+            self._unlock_slot(index)
+
+    def acquire(self, api_key: Optional[str], endpoint_class: str,
+                priority: int = PRIORITY_POLL) -> float:
+        """
+        Bir istek için token al, gerekirse bekle.
+        Returns: throttling nedeniyle beklenen süre (saniye)
+        """
+        if endpoint_class not in ENDPOINT_LIMITS:
+            raise ValueError(f"Unknown endpoint class: {endpoint_class}")
+        try:
+            self._ensure_open()
+            index = self._find_slot(api_key, endpoint_class)
+        except OSError as e:
+            logger.error(f"❌ Rate limit governor kullanılamıyor: {e}")
+            return 0.0
+        if index is None:
+            return 0.0
+
+        started = time.monotonic()
+        delay = 0.0
+        while True:
+            wait = self._try_take(index, endpoint_class, priority, delay)
+            if wait == 0.0:
+                break
+            if delay + wait > self.max_wait:
+                logger.warning(f"⚠️ Rate limit bekleme sınırı aşıldı ({endpoint_class}), istek gönderiliyor")
+                break
+            time.sleep(wait)
+            delay = time.monotonic() - started
+
+        if delay > 0.05:
+            logger.info(f"⏱️ Rate limit throttle: {_mask_key(api_key)}/{endpoint_class} {delay * 1000:.0f}ms")
+        return delay
+
+    async def acquire_async(self, api_key: Optional[str], endpoint_class: str,
+                            priority: int = PRIORITY_POLL) -> float:
+        """acquire() ile aynı, event loop'u bloklamadan bekler"""
+        if endpoint_class not in ENDPOINT_LIMITS:
+            raise ValueError(f"Unknown endpoint class: {endpoint_class}")
+        try:
+            self._ensure_open()
+            index = self._find_slot(api_key, endpoint_class)
+        except OSError as e:
+            logger.error(f"❌ Rate limit governor kullanılamıyor: {e}")
+            return 0.0
+        if index is None:
+            return 0.0
+
+        started = time.monotonic()
+        delay = 0.0
+        while True:
+            wait = self._try_take(index, endpoint_class, priority, delay)
+            if wait == 0.0:
+                break
+            if delay + wait > self.max_wait:
+                logger.warning(f"⚠️ Rate limit bekleme sınırı aşıldı ({endpoint_class}), istek gönderiliyor")
+                break
+            await asyncio.sleep(wait)
+            delay = time.monotonic() - started
+
+        if delay > 0.05:
+            logger.info(f"⏱️ Rate limit throttle: {_mask_key(api_key)}/{endpoint_class} {delay * 1000:.0f}ms")
+        return delay
+
+    # ------------------------------------------------------------------
+    # İstatistikler
+    # ------------------------------------------------------------------
+    def get_stats(self) -> List[Dict]:
+        """Tüm aktif slot'ların throttling istatistiklerini döndür"""
+        self._ensure_open()
+        stats = []
+        for index in range(self.slot_count):
+            offset = self._slot_offset(index)
+            if struct.unpack_from("<Q", self._mm, offset)[0] == 0:
+                continue
+            self._lock_slot(index)
+            try:
+                (_, tokens, _, _, acquired, throttled,
+                 total_delay, max_delay, label) = _SLOT.unpack_from(self._mm, offset)
+            finally:
+                self._unlock_slot(index)
+            stats.append({
+                'bucket': label.rstrip(b"\0").decode("utf-8", "replace"),
+                'tokens': round(tokens, 2),
+                'acquired': acquired,
+                'throttled': throttled,
+                'total_delay_ms': round(total_delay * 1000, 1),
+                'avg_delay_ms': round(total_delay * 1000 / throttled, 1) if throttled else 0.0,
+                'max_delay_ms': round(max_delay * 1000, 1),
+            })
+        return stats
+
+    def reset_stats(self):
+        """Sayaçları sıfırla (bucket durumları korunur)"""
+        self._ensure_open()
+        for index in range(self.slot_count):
+            offset = self._slot_offset(index)
+            if struct.unpack_from("<Q", self._mm, offset)[0] == 0:
+                continue
+            self._lock_slot(index)
+            try:
+                values = list(_SLOT.unpack_from(self._mm, offset))
+                values[4:8] = [0, 0, 0.0, 0.0]
+                _SLOT.pack_into(self._mm, offset, *values)
+            finally:
+                self._unlock_slot(index)
+
+
+# Global governor instance
+rate_limit_governor = RateLimitGovernor()
+
+
+def main():
+    """Throttling istatistiklerini göster: python3 rate_limit_governor.py [reset]"""
+    if len(sys.argv) > 1 and sys.argv[1] == "reset":
+        rate_limit_governor.reset_stats()
+        print("🧹 Rate limit istatistikleri sıfırlandı")
+        return
+
+    stats = rate_limit_governor.get_stats()
+    if not stats:
+        print("📭 Henüz rate limit kaydı yok")
+        return
+
+    print(f"📊 Rate limit governor: {rate_limit_governor.shm_path}")
+    print(f"{'BUCKET':<26}{'TOKENS':>8}{'ACQUIRED':>10}{'THROTTLED':>11}{'AVG ms':>9}{'MAX ms':>9}")
+    for row in sorted(stats, key=lambda r: r['bucket']):
+        print(f"{row['bucket']:<26}{row['tokens']:>8}{row['acquired']:>10}{row['throttled']:>11}"
+              f"{row['avg_delay_ms']:>9}{row['max_delay_ms']:>9}")
+
+
+if __name__ == "__main__":
+    main()
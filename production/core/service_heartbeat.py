@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Service Heartbeat
+Supervisor'ın başlattığı servisler canlılığını ISO zaman damgalı health dosyaları
+yerine supervisor'ın Unix datagram soketine küçük JSON paketleriyle bildirir.
+
+- Supervisor soket yolunu ve servis adını env ile verir
+  (SUPERVISOR_HEARTBEAT_SOCKET, SUPERVISOR_SERVICE_NAME); env yoksa her şey no-op
+- beat(): tek non-blocking sendto, supervisor kapalıysa sessizce düşer
+- start(stall_after): ayrı thread'de `interval` saniyede bir beat (senkron servisler); beat
+  sadece ana döngü son `stall_after` saniyede ilerleme bildirdiyse gider (progress(),
+  incr() veya sleep()): thread yaşarken takılan döngüyü de supervisor görür
+- run_async(): aynı döngü event loop'ta (loop tıkanırsa heartbeat de durur)
+- incr(): servisin throughput sayaçları (polls, signals, orders...); kümülatif değerler
+  her heartbeat'le gider, supervisor oranları telemetri örneklerinden hesaplar
+
+Supervisor tarafı: production/core/production_supervisor.py
+"""
+import os
+import json
+import time
+import socket
+import asyncio
+import threading
+from typing import Optional
+
+HEARTBEAT_SOCKET_ENV = "SUPERVISOR_HEARTBEAT_SOCKET"
+SERVICE_NAME_ENV = "SUPERVISOR_SERVICE_NAME"
+DEFAULT_INTERVAL = 0.2
+
+
+class ServiceHeartbeat:
+    """Supervisor'a periyodik canlılık paketi gönderir"""
+
+    def __init__(self, socket_path: str = None, service: str = None, interval: float = DEFAULT_INTERVAL):
+        self.socket_path = socket_path or os.getenv(HEARTBEAT_SOCKET_ENV)
+        self.service = service or os.getenv(SERVICE_NAME_ENV)
+        self.interval = interval
+        self.enabled = bool(self.socket_path and self.service)
+        self._sock: Optional[socket.socket] = None
+        self._seq = 0
+        self.counters = {}
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self.stall_after: Optional[float] = None
+        self._progress_at = time.monotonic()
+
+    def _payload(self) -> bytes:
+        self._seq += 1
+        return json.dumps({'service': self.service, 'pid': os.getpid(), 'seq': self._seq,
+                           'ts': time.time(), 'counters': self.counters}, separators=(',', ':')).encode()
+
+    def incr(self, counter: str, amount: int = 1):
+        """Throughput sayacını artır (supervisor altında değilse de sayılır, gönderilmez)"""
+        with self._lock:
+            self.counters[counter] = self.counters.get(counter, 0) + amount
+        self._progress_at = time.monotonic()
+
+    def progress(self):
+        """Ana döngü ilerliyor (start(stall_after) ile beat'ler buna bağlı)"""
+        self._progress_at = time.monotonic()
+
+    def sleep(self, seconds: float):
+        """Döngüler arası bekleme: bekleyen döngü takılmış sayılmaz"""
+        deadline = time.monotonic() + seconds
+        while True:
+            self._progress_at = time.monotonic()
+            remaining = deadline - self._progress_at
+            if remaining <= 0:
+                return
+            time.sleep(min(remaining, self.interval))
+
+    def beat(self) -> bool:
+        """Tek heartbeat gönder (supervisor yoksa False)"""
+        if not self.enabled:
+            return False
+        with self._lock:
+            try:
+                if self._sock is None:
+                    self._sock = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+                    self._sock.setblocking(False)
+                self._sock.sendto(self._payload(), self.socket_path)
+                return True
+            except OSError:
+                # Supervisor yeniden başlıyor / soket dolu: bir sonraki beat tekrar dener
+                return False
+
+    def _loop(self):
+        while True:
+            if self.stall_after is None or time.monotonic() - self._progress_at <= self.stall_after:
+                self.beat()
+            time.sleep(self.interval)
+
+    def start(self, stall_after: float = None) -> 'ServiceHeartbeat':
+        """
+        Heartbeat thread'ini başlat (supervisor altında değilse no-op).
+        stall_after: ana döngü bu kadar saniye ilerleme bildirmezse beat kesilir; tek bir
+        iterasyonun (fetch timeout'ları dahil) süresinden uzun seçilmeli.
+        """
+        self.stall_after = stall_after
+        self._progress_at = time.monotonic()
+        if self.enabled and (self._thread is None or not self._thread.is_alive()):
+            self._thread = threading.Thread(target=self._loop, name="service-heartbeat", daemon=True)
+            self._thread.start()
+        return self
+
+    async def run_async(self):
+        """Event loop üzerinde heartbeat: loop bloklanırsa supervisor bunu görür"""
+        while self.enabled:
+            self.beat()
+            await asyncio.sleep(self.interval)
+
+
+# Global heartbeat instance (env'den yapılandırılır)
+service_heartbeat = ServiceHeartbeat()
@@ -0,0 +1,207 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Service Telemetry
+Supervisor her TELEMETRY_INTERVAL saniyede bir her servisin process grubunu
+(Selenium / chromedriver alt süreçleri dahil) /proc'tan örnekler: CPU %, RSS, açık fd,
+thread ve process sayısı, restart sayısı. Servislerin heartbeat ile bildirdiği
+throughput sayaçları (service_heartbeat.incr: polls, signals, sent, orders...) aynı
+örneğe eklenir ve saniyelik orana çevrilir.
+
+- Depolama: state_store `telemetry` ring tablosu, servis başına TELEMETRY_SLOTS örnek
+  (varsayılan 720 x 5 sn = 1 saat); slot = örnek no % kapasite, en eskinin üzerine yazılır
+- Uyarılar: aynı PID içinde RSS / process sayısı büyümesi (sızıntı), toplamı ilerlemeyen
+  *polls sayaçları (takılmış döngü)
+- Sorgu: bu CLI ve Telegram admin menüsü (working_telegram_bot)
+
+Kullanım:
+    python3 production/core/service_telemetry.py [report]
+    python3 production/core/service_telemetry.py series <service> [dakika]
+"""
+import os
+import sys
+import time
+import logging
+from datetime import datetime
+from typing import Dict, Iterable, List
+
+from state_store import state_store
+
+logger = logging.getLogger(__name__)
+
+TELEMETRY_INTERVAL = float(os.getenv("TELEMETRY_INTERVAL", "5"))
+TELEMETRY_SLOTS = int(os.getenv("TELEMETRY_SLOTS", "720"))
+STALL_AFTER = 180.0              # *polls sayacı bu kadar ilerlemezse döngü takılmış sayılır
+LEAK_MIN_GROWTH_KB = 50 * 1024   # aynı PID içinde en az bu kadar RSS artışı...
+LEAK_MIN_RATIO = 1.25            # ...ve ilk örneğe göre bu oranda büyüme sızıntı sayılır
+PROC_LEAK_MIN = 3                # process grubunda bu kadar fazladan process (zombi chromedriver)
+
+_CLK_TCK = os.sysconf('SC_CLK_TCK')
+_PAGE_KB = os.sysconf('SC_PAGE_SIZE') // 1024
+
+
+def sample_process_groups(pgids: Iterable[int]) -> Dict[int, Dict]:
+    """/proc'u tek geçişte tara: process grubu başına CPU tick, RSS, fd, thread, process toplamı"""
+    totals = {pgid: {'cpu_ticks': 0, 'rss_kb': 0, 'fds': 0, 'threads': 0, 'procs': 0} for pgid in pgids}
+    if not totals:
+        return totals
+    for entry in os.scandir('/proc'):
+        if not entry.name.isdigit():
+            continue
+        try:
+            with open(f'/proc/{entry.name}/stat', 'rb') as f:
+                stat = f.read()
+        except OSError:
+            continue
+        # comm parantez içinde boşluk içerebilir: alanlar son ')' sonrasından sayılır
+        fields = stat[stat.rfind(b')') + 2:].split()
+        group = totals.get(int(fields[2]))
+        if group is None:
+            continue
+        # utime + stime + reap edilmiş çocukların süresi (kısa ömürlü alt süreçler kaybolmasın)
+        group['cpu_ticks'] += sum(int(field) for field in fields[11:15])
+        group['threads'] += int(fields[17])
+        group['rss_kb'] += int(fields[21]) * _PAGE_KB
+        group['procs'] += 1
+        try:
+            group['fds'] += len(os.listdir(f'/proc/{entry.name}/fd'))
+        except OSError:
+            pass
+    return totals
+
+
+class ServiceTelemetry:
+    """Örnekleme turlarını ring tabloya yazar; CPU ve sayaç oranlarını önceki örnekten hesaplar"""
+
+    def __init__(self, store=None, interval: float = TELEMETRY_INTERVAL, slots: int = TELEMETRY_SLOTS):
+        self.store = store or state_store
+        self.interval = interval
+        self.slots = slots
+        self.latest: Dict[str, Dict] = {}
+        self._prev = {}   # service -> (pid, cpu_ticks, counters, monotonic)
+
+    def sample(self, services: Dict[str, Dict]) -> List[Dict]:
+        """
+        Tek örnekleme turu.
+        services: {name: {'pid': int|None, 'restarts': int, 'counters': dict}} (supervisor'ın anlık görüntüsü)
+        """
+        now, mono = time.time(), time.monotonic()
+        groups = sample_process_groups(info['pid'] for info in services.values() if info['pid'])
+        samples = []
+        for name, info in services.items():
+            pid = info['pid']
+            counters = info.get('counters') or {}
+            group = groups.get(pid) if pid else None
+            prev = self._prev.get(name)
+            elapsed = mono - prev[3] if prev is not None and prev[0] == pid else None
+            sample = {'service': name, 'ts': now, 'pid': pid, 'restarts': info['restarts'], 'cpu_pct': None,
+                      'rss_kb': None, 'fds': None, 'threads': None, 'procs': None, 'counters': {}}
+            if group and group['procs']:
+                sample.update({key: group[key] for key in ('rss_kb', 'fds', 'threads', 'procs')})
+                if elapsed:
+                    sample['cpu_pct'] = round(max(0, group['cpu_ticks'] - prev[1]) / _CLK_TCK / elapsed * 100, 1)
+            for counter, total in counters.items():
+                rate = None
+                if elapsed and counter in prev[2]:
+                    rate = round(max(0, total - prev[2][counter]) / elapsed, 3)
+                sample['counters'][counter] = [total, rate]
+            self._prev[name] = (pid, group['cpu_ticks'] if group else 0, dict(counters), mono)
+            samples.append(sample)
+        self.store.record_telemetry(samples, int(now // self.interval) % self.slots)
+        self.latest = {sample['service']: sample for sample in samples}
+        return samples
+
+
+def analyze(series: List[Dict]) -> List[str]:
+    """Sızıntı / takılma uyarıları (series: eskiden yeniye, tek servis)"""
+    alive = [sample for sample in series if sample['rss_kb'] is not None]
+    if not alive:
+        return []
+    last = alive[-1]
+    # Restart RSS'i sıfırlar: sadece son PID'in örnekleri karşılaştırılır
+    current = [sample for sample in alive if sample['pid'] == last['pid']]
+    first = current[0]
+    warnings = []
+
+    growth = last['rss_kb'] - first['rss_kb']
+    hours = (last['ts'] - first['ts']) / 3600
+    if growth >= LEAK_MIN_GROWTH_KB and last['rss_kb'] >= first['rss_kb'] * LEAK_MIN_RATIO and hours > 0:
+        warnings.append(f"📈 RSS {first['rss_kb'] / 1024:.0f} -> {last['rss_kb'] / 1024:.0f} MB "
+                        f"({growth / 1024 / hours:+.0f} MB/h)")
+    if last['procs'] - min(sample['procs'] for sample in current) >= PROC_LEAK_MIN:
+        warnings.append(f"🧟 process sayısı {first['procs']} -> {last['procs']}")
+
+    # Canlılık *polls sayaçlarının toplamından: failover'da biri (polls) durup diğeri
+    # (standby_polls) ilerlediğinde döngü takılmış sayılmaz
+    polls = [counter for counter in last['counters'] if counter.endswith('polls')]
+    if polls:
+        def total_polls(sample):
+            return sum(sample['counters'].get(counter, [0])[0] or 0 for counter in polls)
+        total = total_polls(last)
+        # Toplamın bu değere ulaştığı ilk örnek: o zamandan beri ilerlemiyor
+        since = next((sample['ts'] for sample in current if total_polls(sample) == total), last['ts'])
+        if last['ts'] - since >= STALL_AFTER:
+            warnings.append(f"⏸️ {'+'.join(sorted(polls))} {last['ts'] - since:.0f}s'dir ilerlemiyor")
+    return warnings
+
+
+def format_report(store=None, now: float = None) -> str:
+    """Servis başına son örnek, sayaç oranları ve uyarılar (CLI ve Telegram admin menüsü)"""
+    store = store or state_store
+    now = now or time.time()
+    latest = store.telemetry_latest()
+    if not latest:
+        return "📭 Telemetri yok (supervisor çalışıyor mu?)"
+
+    lines = [f"🕒 {datetime.fromtimestamp(now).strftime('%H:%M:%S')} servis telemetrisi"]
+    for name, sample in latest.items():
+        if sample['rss_kb'] is None:
+            lines.append(f"🔴 {name}: çalışmıyor (restart {sample['restarts']})")
+        else:
+            cpu = f"{sample['cpu_pct']:.1f}%" if sample['cpu_pct'] is not None else "-"
+            lines.append(f"🟢 {name} pid {sample['pid']}: cpu {cpu} rss {sample['rss_kb'] / 1024:.0f}MB "
+                         f"fd {sample['fds']} thr {sample['threads']} proc {sample['procs']} "
+                         f"restart {sample['restarts']}")
+        rates = [f"{counter} {total}" + (f" ({rate:.2f}/s)" if rate is not None else "")
+                 for counter, (total, rate) in sorted(sample['counters'].items())]
+        if rates:
+            lines.append(f"   📊 {', '.join(rates)}")
+        for warning in analyze(store.telemetry_series(name, now - TELEMETRY_SLOTS * TELEMETRY_INTERVAL)):
+            lines.append(f"   ⚠️ {warning}")
+        age = now - sample['ts']
+        if age > 3 * TELEMETRY_INTERVAL:
+            lines.append(f"   ⏳ son örnek {age:.0f}s önce")
+    return "\n".join(lines)
+
+
+def main():
+    """CLI: python3 service_telemetry.py [report] | series <service> [dakika]"""
+    command = sys.argv[1] if len(sys.argv) > 1 else "report"
+
+    if command == "series" and len(sys.argv) > 2:
+        minutes = float(sys.argv[3]) if len(sys.argv) > 3 else 10
+        series = state_store.telemetry_series(sys.argv[2], time.time() - minutes * 60)
+        if not series:
+            print(f"📭 {sys.argv[2]}: son {minutes:.0f} dakikada örnek yok")
+            return
+        print(f"{'time':8} {'pid':>7} {'cpu%':>6} {'rss MB':>7} {'fd':>4} {'thr':>4} {'proc':>4} {'rst':>3}  counters")
+        for sample in series:
+            if sample['rss_kb'] is None:
+                print(f"{datetime.fromtimestamp(sample['ts']).strftime('%H:%M:%S')} {'down':>7}")
+                continue
+            counters = ' '.join(f"{counter}={total}" + (f"@{rate:.2f}/s" if rate is not None else "")
+                                for counter, (total, rate) in sorted(sample['counters'].items()))
+            cpu = f"{sample['cpu_pct']:.1f}" if sample['cpu_pct'] is not None else "-"
+            print(f"{datetime.fromtimestamp(sample['ts']).strftime('%H:%M:%S')} {sample['pid']:>7} {cpu:>6} "
+                  f"{sample['rss_kb'] / 1024:>7.1f} {sample['fds']:>4} {sample['threads']:>4} "
+                  f"{sample['procs']:>4} {sample['restarts']:>3}  {counters}")
+        for warning in analyze(series):
+            print(f"⚠️ {warning}")
+    elif command == "report":
+        print(format_report())
+    else:
+        print(main.__doc__)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,512 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Unified State Store
+Dağınık JSON durum dosyalarının (order_id.json, order_fills.json, yuzde.json,
+seen_markets.json, upbit_new_list.json, processed_coins.json,
+last_announcement_check.json, order_gateio.json, newprice_gateio.json) yerine
+tek bir SQLite WAL veritabanı.
+Detection servislerinin leader lease'i de burada: sinyal claim'i ile aynı transaction'da doğrulanır.
+Supervisor'ın servis telemetrisi (CPU/RSS/fd/thread/sayaçlar) sabit boyutlu bir ring tabloda tutulur.
+
+- Her durum türü için tipli accessor'lar
+- batch() ile birden fazla yazma tek atomik transaction'da
+- WAL sayesinde okuyucular yazıcıları beklemez
+- Eski dosyalardan migration: python3 state_store.py migrate
+"""
+import os
+import sys
+import json
+import time
+import sqlite3
+import threading
+import logging
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+_CORE_DIR = os.path.dirname(os.path.realpath(__file__))
+DEFAULT_DB_PATH = os.path.join(_CORE_DIR, '..', 'exchanges', 'state.db')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS orders (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    venue TEXT NOT NULL,
+    user_id TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    order_id TEXT,
+    payload TEXT NOT NULL,
+    created_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_orders_latest ON orders(venue, user_id, kind, id);
+
+CREATE TABLE IF NOT EXISTS tp_progress (
+    venue TEXT NOT NULL,
+    user_id TEXT NOT NULL,
+    symbol TEXT,
+    yuzde REAL NOT NULL,
+    price REAL,
+    updated_at REAL NOT NULL,
+    PRIMARY KEY (venue, user_id)
+);
+
+CREATE TABLE IF NOT EXISTS prices (
+    venue TEXT NOT NULL,
+    symbol TEXT NOT NULL,
+    last_price REAL NOT NULL,
+    payload TEXT,
+    updated_at REAL NOT NULL,
+    PRIMARY KEY (venue, symbol)
+);
+
+CREATE TABLE IF NOT EXISTS seen_markets (
+    market TEXT PRIMARY KEY,
+    first_seen REAL NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS new_listings (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    market TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    detected_at TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS processed_coins (
+    symbol TEXT PRIMARY KEY,
+    title TEXT,
+    perp_symbol TEXT,
+    payload TEXT,
+    processed_at TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL,
+    updated_at REAL NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS leases (
+    name TEXT PRIMARY KEY,
+    holder TEXT NOT NULL,
+    epoch INTEGER NOT NULL,
+    expires_at REAL NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS telemetry (
+    service TEXT NOT NULL,
+    slot INTEGER NOT NULL,
+    ts REAL NOT NULL,
+    pid INTEGER,
+    cpu_pct REAL,
+    rss_kb INTEGER,
+    fds INTEGER,
+    threads INTEGER,
+    procs INTEGER,
+    restarts INTEGER NOT NULL,
+    counters TEXT,
+    PRIMARY KEY (service, slot)
+);
+"""
+
+
+class StateStore:
+    """SQLite WAL tabanlı, thread-safe durum deposu"""
+
+    def __init__(self, db_path: str = None):
+        self.db_path = os.path.realpath(db_path or os.getenv('STATE_DB_PATH', DEFAULT_DB_PATH))
+        self._local = threading.local()
+        self._schema_lock = threading.Lock()
+        self._schema_ready = False
+
+    # ------------------------------------------------------------------
+    # Bağlantı ve transaction yönetimi
+    # ------------------------------------------------------------------
+    def _conn(self) -> sqlite3.Connection:
+        """Thread'e özel bağlantı (ilk kullanımda açılır)"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+            # isolation_level=None: transaction'ları batch() ile biz yönetiyoruz
+            conn = sqlite3.connect(self.db_path, timeout=10.0, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA busy_timeout=10000")
+            self._local.conn = conn
+            self._local.depth = 0
+            self._ensure_schema(conn)
+        return conn
+
+    def _ensure_schema(self, conn: sqlite3.Connection):
+        if self._schema_ready:
+            return
+        with self._schema_lock:
+            if not self._schema_ready:
+                conn.executescript(SCHEMA)
+                self._schema_ready = True
+
+    @contextmanager
+    def batch(self):
+        """
+        Birden fazla yazmayı tek atomik transaction'da topla.
+        İç içe kullanılabilir; sadece en dıştaki blok commit eder.
+        """
+        conn = self._conn()
+        if self._local.depth == 0:
+            conn.execute("BEGIN IMMEDIATE")
+        self._local.depth += 1
+        try:
+            yield conn
+        except Exception:
+            self._local.depth -= 1
+            if self._local.depth == 0:
+                conn.execute("ROLLBACK")
+            raise
+        self._local.depth -= 1
+        if self._local.depth == 0:
+            conn.execute("COMMIT")
+
+    def set_busy_timeout(self, seconds: float):
+        """Bu thread'in bağlantısında kilit bekleme süresi (varsayılan 10 sn)"""
+        self._conn().execute(f"PRAGMA busy_timeout={int(seconds * 1000)}")
+
+    def _write(self, sql: str, params=()):
+        with self.batch() as conn:
+            conn.execute(sql, params)
+
+    def _write_many(self, sql: str, rows: Iterable):
+        with self.batch() as conn:
+            conn.executemany(sql, rows)
+
+    def _read_one(self, sql: str, params=()) -> Optional[sqlite3.Row]:
+        return self._conn().execute(sql, params).fetchone()
+
+    def _read_all(self, sql: str, params=()) -> List[sqlite3.Row]:
+        return self._conn().execute(sql, params).fetchall()
+
+    def close(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+    # ------------------------------------------------------------------
+    # Emirler (order_id.json, order_fills.json, order_gateio.json)
+    # ------------------------------------------------------------------
+    def save_order(self, venue: str, user_id, response: Dict, order_id: str = None):
+        """Emir yanıtını kaydet"""
+        if order_id is None:
+            data = response.get('data') if isinstance(response.get('data'), dict) else response
+            order_id = data.get('orderId') or data.get('id')
+        self._write("INSERT INTO orders (venue, user_id, kind, order_id, payload, created_at) VALUES (?, ?, 'order', ?, ?, ?)",
+                    (venue, str(user_id), str(order_id) if order_id is not None else None,
+                     json.dumps(response, ensure_ascii=False), time.time()))
+
+    def save_fills(self, venue: str, user_id, order_id, response: Dict):
+        """Emir fill yanıtını kaydet"""
+        self._write("INSERT INTO orders (venue, user_id, kind, order_id, payload, created_at) VALUES (?, ?, 'fills', ?, ?, ?)",
+                    (venue, str(user_id), str(order_id) if order_id is not None else None,
+                     json.dumps(response, ensure_ascii=False), time.time()))
+
+    def _latest(self, venue: str, user_id, kind: str) -> Optional[Dict]:
+        row = self._read_one("SELECT payload FROM orders WHERE venue = ? AND user_id = ? AND kind = ? ORDER BY id DESC LIMIT 1",
+                             (venue, str(user_id), kind))
+        return json.loads(row['payload']) if row else None
+
+    def latest_order(self, venue: str, user_id) -> Optional[Dict]:
+        """Kullanıcının son emir yanıtı"""
+        return self._latest(venue, user_id, 'order')
+
+    def latest_fills(self, venue: str, user_id) -> Optional[Dict]:
+        """Kullanıcının son fill yanıtı"""
+        return self._latest(venue, user_id, 'fills')
+
+    # ------------------------------------------------------------------
+    # TP ilerlemesi ve fiyatlar (yuzde.json, newprice_gateio.json)
+    # ------------------------------------------------------------------
+    def set_tp_progress(self, venue: str, user_id, yuzde: float, symbol: str = None, price: float = None):
+        self._write("INSERT INTO tp_progress (venue, user_id, symbol, yuzde, price, updated_at) VALUES (?, ?, ?, ?, ?, ?) "
+                    "ON CONFLICT(venue, user_id) DO UPDATE SET symbol = excluded.symbol, yuzde = excluded.yuzde, "
+                    "price = excluded.price, updated_at = excluded.updated_at",
+                    (venue, str(user_id), symbol, float(yuzde), price, time.time()))
+
+    def get_tp_progress(self, venue: str, user_id) -> Optional[Dict]:
+        row = self._read_one("SELECT symbol, yuzde, price, updated_at FROM tp_progress WHERE venue = ? AND user_id = ?",
+                             (venue, str(user_id)))
+        return dict(row) if row else None
+
+    def set_price(self, venue: str, symbol: str, last_price: float, payload: Dict = None):
+        self._write("INSERT INTO prices (venue, symbol, last_price, payload, updated_at) VALUES (?, ?, ?, ?, ?) "
+                    "ON CONFLICT(venue, symbol) DO UPDATE SET last_price = excluded.last_price, "
+                    "payload = excluded.payload, updated_at = excluded.updated_at",
+                    (venue, symbol, float(last_price), json.dumps(payload) if payload else None, time.time()))
+
+    def get_price(self, venue: str, symbol: str) -> Optional[Dict]:
+        row = self._read_one("SELECT last_price, payload, updated_at FROM prices WHERE venue = ? AND symbol = ?",
+                             (venue, symbol))
+        if not row:
+            return None
+        return {'last_price': row['last_price'], 'updated_at': row['updated_at'],
+                **(json.loads(row['payload']) if row['payload'] else {})}
+
+    # ------------------------------------------------------------------
+    # Upbit market takibi (seen_markets.json, upbit_new_list.json)
+    # ------------------------------------------------------------------
+    def get_seen_markets(self) -> Set[str]:
+        return {row['market'] for row in self._read_all("SELECT market FROM seen_markets")}
+
+    def add_seen_markets(self, markets: Iterable[str]) -> int:
+        """Yeni marketleri ekle; eklenen (daha önce görülmemiş) market sayısını döndür"""
+        now = time.time()
+        with self.batch() as conn:
+            before = conn.total_changes
+            conn.executemany("INSERT OR IGNORE INTO seen_markets (market, first_seen) VALUES (?, ?)",
+                             ((market, now) for market in markets))
+            return conn.total_changes - before
+
+    def claim_seen_markets(self, markets: Iterable[str]) -> List[str]:
+        """add_seen_markets gibi, ama bu çağrının eklediği (ilk gören olduğu) marketleri döndür"""
+        now = time.time()
+        claimed = []
+        with self.batch() as conn:
+            for market in markets:
+                cursor = conn.execute("INSERT OR IGNORE INTO seen_markets (market, first_seen) VALUES (?, ?)",
+                                      (market, now))
+                if cursor.rowcount > 0:
+                    claimed.append(market)
+        return claimed
+
+    def add_new_listings(self, pairs: List[Dict], detected_at: str = None):
+        detected_at = detected_at or datetime.now().isoformat()
+        self._write_many("INSERT INTO new_listings (market, payload, detected_at) VALUES (?, ?, ?)",
+                         ((pair['market'], json.dumps(pair, ensure_ascii=False), detected_at) for pair in pairs))
+
+    def recent_new_listings(self, limit: int = 20) -> List[Dict]:
+        rows = self._read_all("SELECT payload, detected_at FROM new_listings ORDER BY id DESC LIMIT ?", (limit,))
+        return [{'timestamp': row['detected_at'], **json.loads(row['payload'])} for row in rows]
+
+    # ------------------------------------------------------------------
+    # Duyuru tarayıcı (processed_coins.json, last_announcement_check.json)
+    # ------------------------------------------------------------------
+    def get_processed_coins(self) -> Set[str]:
+        return {row['symbol'] for row in self._read_all("SELECT symbol FROM processed_coins")}
+
+    def get_processed_coin(self, symbol: str) -> Optional[Dict]:
+        row = self._read_one("SELECT symbol, title, perp_symbol, payload, processed_at FROM processed_coins WHERE symbol = ?",
+                             (symbol,))
+        return dict(row) if row else None
+
+    def mark_coin_processed(self, symbol: str, title: str = None, perp_symbol: str = None,
+                            payload=None, processed_at: str = None) -> bool:
+        """Coin'i işlenmiş olarak kaydet; zaten varsa False"""
+        with self.batch() as conn:
+            cursor = conn.execute(
+                "INSERT OR IGNORE INTO processed_coins (symbol, title, perp_symbol, payload, processed_at) VALUES (?, ?, ?, ?, ?)",
+                (symbol, title, perp_symbol, json.dumps(payload, ensure_ascii=False) if payload is not None else None,
+                 processed_at or datetime.now().isoformat()))
+            return cursor.rowcount > 0
+
+    def set_meta(self, key: str, value):
+        self._write("INSERT INTO meta (key, value, updated_at) VALUES (?, ?, ?) "
+                    "ON CONFLICT(key) DO UPDATE SET value = excluded.value, updated_at = excluded.updated_at",
+                    (key, json.dumps(value, ensure_ascii=False), time.time()))
+
+    def get_meta(self, key: str, default=None):
+        row = self._read_one("SELECT value FROM meta WHERE key = ?", (key,))
+        return json.loads(row['value']) if row else default
+
+    def get_last_announcement_check(self) -> Optional[datetime]:
+        value = self.get_meta('last_announcement_check')
+        return datetime.fromisoformat(value) if value else None
+
+    def set_last_announcement_check(self, when: datetime = None):
+        self.set_meta('last_announcement_check', (when or datetime.now()).isoformat())
+
+    # ------------------------------------------------------------------
+    # Leader lease (hot-standby detection replica'ları)
+    # ------------------------------------------------------------------
+    def get_lease(self, name: str) -> Optional[Dict]:
+        row = self._read_one("SELECT name, holder, epoch, expires_at FROM leases WHERE name = ?", (name,))
+        return dict(row) if row else None
+
+    def acquire_lease(self, name: str, holder: str, ttl: float) -> Optional[int]:
+        """Lease boşsa / süresi dolmuşsa al (epoch artar); zaten bizdeyse uzat. Epoch veya None döndürür."""
+        now = time.time()
+        with self.batch() as conn:
+            row = conn.execute("SELECT holder, epoch, expires_at FROM leases WHERE name = ?", (name,)).fetchone()
+            if row is None:
+                conn.execute("INSERT INTO leases (name, holder, epoch, expires_at) VALUES (?, ?, 1, ?)",
+                             (name, holder, now + ttl))
+                return 1
+            if row['holder'] == holder and row['expires_at'] >= now:
+                conn.execute("UPDATE leases SET expires_at = ? WHERE name = ?", (now + ttl, name))
+                return row['epoch']
+            if row['expires_at'] < now:
+                epoch = row['epoch'] + 1
+                conn.execute("UPDATE leases SET holder = ?, epoch = ?, expires_at = ? WHERE name = ?",
+                             (holder, epoch, now + ttl, name))
+                return epoch
+            return None
+
+    def renew_lease(self, name: str, holder: str, epoch: int, ttl: float) -> bool:
+        """Lease'i uzat; bu arada başkası aldıysa (epoch değiştiyse) False"""
+        with self.batch() as conn:
+            cursor = conn.execute("UPDATE leases SET expires_at = ? WHERE name = ? AND holder = ? AND epoch = ?",
+                                  (time.time() + ttl, name, holder, epoch))
+            return cursor.rowcount > 0
+
+    def release_lease(self, name: str, holder: str, epoch: int):
+        """Kapanışta lease'i hemen bırak: standby TTL'i beklemeden devralır"""
+        self._write("UPDATE leases SET expires_at = 0 WHERE name = ? AND holder = ? AND epoch = ?",
+                    (name, holder, epoch))
+
+    def lease_valid(self, name: str, holder: str, epoch: int) -> bool:
+        row = self._read_one("SELECT 1 FROM leases WHERE name = ? AND holder = ? AND epoch = ? AND expires_at >= ?",
+                             (name, holder, epoch, time.time()))
+        return row is not None
+
+    # ------------------------------------------------------------------
+    # Servis telemetrisi (ring buffer: servis başına `slots` satır, eskisinin üzerine yazılır)
+    # ------------------------------------------------------------------
+    def record_telemetry(self, samples: List[Dict], slot: int):
+        """Bir örnekleme turunu tek transaction'da yaz; slot = örnek no % kapasite"""
+        self._write_many(
+            "INSERT OR REPLACE INTO telemetry (service, slot, ts, pid, cpu_pct, rss_kb, fds, threads, procs, "
+            "restarts, counters) VALUES (:service, :slot, :ts, :pid, :cpu_pct, :rss_kb, :fds, :threads, :procs, "
+            ":restarts, :counters)",
+            ({**sample, 'slot': slot, 'counters': json.dumps(sample.get('counters') or {}, separators=(',', ':'))}
+             for sample in samples))
+
+    def _telemetry_row(self, row: sqlite3.Row) -> Dict:
+        sample = dict(row)
+        sample.pop('slot', None)
+        sample['counters'] = json.loads(sample['counters']) if sample['counters'] else {}
+        return sample
+
+    def telemetry_series(self, service: str, since: float = 0.0) -> List[Dict]:
+        """Bir servisin `since` sonrasındaki örnekleri, eskiden yeniye"""
+        rows = self._read_all("SELECT * FROM telemetry WHERE service = ? AND ts >= ? ORDER BY ts", (service, since))
+        return [self._telemetry_row(row) for row in rows]
+
+    def telemetry_latest(self) -> Dict[str, Dict]:
+        """Servis başına en son örnek"""
+        rows = self._read_all("SELECT t.* FROM telemetry t JOIN (SELECT service, MAX(ts) AS ts FROM telemetry "
+                              "GROUP BY service) m ON t.service = m.service AND t.ts = m.ts ORDER BY t.service")
+        return {row['service']: self._telemetry_row(row) for row in rows}
+
+    # ------------------------------------------------------------------
+    # Migration
+    # ------------------------------------------------------------------
+    def migrate_from_files(self, perp_dir: str, gateio_dir: str, user_id: str = 'legacy') -> Dict[str, int]:
+        """
+        Eski JSON durum dosyalarını tek transaction'da içe aktar.
+        Bir kez çalışır: `migrated_from_files` meta işareti varsa hiçbir şey yapmaz
+        (orders / new_listings düz INSERT; tekrar çalışması kayıtları çoğaltırdı).
+        """
+
+        def load(path):
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    return json.load(f)
+            except (FileNotFoundError, json.JSONDecodeError):
+                return None
+
+        counts = {}
+        with self.batch():
+            if self.get_meta('migrated_from_files'):
+                logger.info("📦 JSON state files already migrated, skipping")
+                return counts
+
+            order = load(os.path.join(perp_dir, 'order_id.json'))
+            if isinstance(order, dict):
+                self.save_order('bitget', user_id, order)
+                counts['order_id.json'] = 1
+
+            fills = load(os.path.join(perp_dir, 'order_fills.json'))
+            if isinstance(fills, dict):
+                data = fills.get('data') or [{}]
+                self.save_fills('bitget', user_id, data[0].get('orderId') if isinstance(data, list) else None, fills)
+                counts['order_fills.json'] = 1
+
+            for venue, directory in (('bitget', perp_dir), ('gateio', gateio_dir)):
+                yuzde = load(os.path.join(directory, 'yuzde.json'))
+                if isinstance(yuzde, dict) and 'yuzde' in yuzde:
+                    self.set_tp_progress(venue, user_id, yuzde['yuzde'])
+                    counts[f'{venue}/yuzde.json'] = 1
+
+            seen = load(os.path.join(perp_dir, 'seen_markets.json'))
+            if isinstance(seen, dict):
+                counts['seen_markets.json'] = self.add_seen_markets(seen.get('usdt_markets', []))
+
+            new_list = load(os.path.join(perp_dir, 'upbit_new_list.json'))
+            if isinstance(new_list, list):
+                for entry in new_list:
+                    self.add_new_listings(entry.get('new_pairs', []), entry.get('timestamp'))
+                counts['upbit_new_list.json'] = len(new_list)
+
+            processed = load(os.path.join(perp_dir, 'processed_coins.json'))
+            if isinstance(processed, list):
+                counts['processed_coins.json'] = sum(
+                    1 for item in processed if 'symbol' in item and self.mark_coin_processed(
+                        item['symbol'], item.get('title'), item.get('perp_symbol'),
+                        item.get('announcement_data'), item.get('processed_at')))
+
+            last_check = load(os.path.join(perp_dir, 'last_announcement_check.json'))
+            if isinstance(last_check, dict) and last_check.get('last_check'):
+                self.set_meta('last_announcement_check', last_check['last_check'])
+                counts['last_announcement_check.json'] = 1
+
+            gate_order = load(os.path.join(gateio_dir, 'order_gateio.json'))
+            if isinstance(gate_order, dict) and gate_order.get('id'):
+                self.save_order('gateio', user_id, gate_order)
+                counts['order_gateio.json'] = 1
+
+            gate_price = load(os.path.join(gateio_dir, 'newprice_gateio.json'))
+            if isinstance(gate_price, dict) and gate_price.get('name'):
+                self.set_price('gateio', gate_price['name'], gate_price['last_price'],
+                               {'leverage_max': gate_price.get('leverage_max')})
+                counts['newprice_gateio.json'] = 1
+
+            if counts:
+                self.set_meta('migrated_from_files', {'at': datetime.now().isoformat(), 'counts': counts})
+
+        return counts
+
+    def summary(self) -> Dict[str, int]:
+        tables = ['orders', 'tp_progress', 'prices', 'seen_markets', 'new_listings', 'processed_coins', 'meta', 'leases',
+                  'telemetry']
+        return {table: self._read_one(f"SELECT COUNT(*) AS n FROM {table}")['n'] for table in tables}
+
+
+# Global state store instance
+state_store = StateStore()
+
+
+def main():
+    """CLI: python3 state_store.py [migrate|summary]"""
+    command = sys.argv[1] if len(sys.argv) > 1 else "summary"
+
+    if command == "migrate":
+        exchanges_dir = os.path.join(_CORE_DIR, '..', 'exchanges')
+        perp_dir = sys.argv[2] if len(sys.argv) > 2 else os.path.join(exchanges_dir, 'PERP')
+        gateio_dir = sys.argv[3] if len(sys.argv) > 3 else os.path.join(exchanges_dir, 'gateio')
+        migrated = state_store.get_meta('migrated_from_files')
+        if migrated:
+            print(f"✅ JSON state files already migrated at {migrated['at']}: {migrated['counts']}")
+            return
+        print(f"📦 Migrating JSON state files into {state_store.db_path}")
+        counts = state_store.migrate_from_files(perp_dir, gateio_dir)
+        for name, count in counts.items():
+            print(f"   ✅ {name}: {count}")
+        if not counts:
+            print("   📭 Aktarılacak dosya bulunamadı")
+    else:
+        print(f"🗄️ State store: {state_store.db_path}")
+        for table, count in state_store.summary().items():
+            print(f"   {table}: {count}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,441 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Telegram Notifier
+Bot API bildirimleri için kuyruklu async gönderim servisi.
+
+- Tek paylaşılan aiohttp session (keep-alive): mesaj başına yeni bağlantı yok
+- Global token bucket (varsayılan 30 msg/s) + chat başına aralık (özel chat 1/s, grup 20/dk)
+- Aynı chat'e gelen burst'ler tek mesajda birleştirilir (coalescing, 4096 karakter sınırı)
+- 429 yanıtında retry_after kadar tüm gönderim durur, mesajlar sıranın başına geri konur
+- 5xx/ağ hatalarında exponential backoff; 400/403 (bot engellenmiş vb.) kalıcı hata
+
+Async kullanım (bot event loop'u içinde):
+    notifier = TelegramNotifier(token)
+    await notifier.start()
+    result = await notifier.broadcast(user_ids, text, parse_mode="Markdown")
+
+Senkron kullanım (long.py, engine thread'leri): arka plan thread'inde kendi loop'u açılır
+    telegram_notifier.send_sync(user_id, text, parse_mode="HTML")   # teslim edilene kadar bekler
+    telegram_notifier.notify(user_id, text)                         # fire-and-forget
+
+Benchmark: python3 debug/telegram_notifier_benchmark.py
+"""
+import os
+import math
+import heapq
+import asyncio
+import logging
+import itertools
+import threading
+import concurrent.futures
+from collections import deque
+from typing import Dict, Iterable, List, Optional
+
+import aiohttp
+
+logger = logging.getLogger(__name__)
+
+TELEGRAM_API_URL = os.getenv("TELEGRAM_API_URL", "https://api.telegram.org")
+MAX_MESSAGE_LENGTH = 4096
+
+
+class TelegramAPIError(Exception):
+    """Bot API hata yanıtı (ok=false veya HTTP hatası)"""
+
+    def __init__(self, status: int, description: str, retry_after: float = None):
+        super().__init__(f"{status}: {description}")
+        self.status = status
+        self.description = description
+        self.retry_after = retry_after
+
+
+class _Message:
+    __slots__ = ('chat_id', 'text', 'parse_mode', 'reply_markup', 'future', 'enqueued_at', 'attempts')
+
+    def __init__(self, chat_id, text, parse_mode, reply_markup, future, enqueued_at):
+        self.chat_id = chat_id
+        self.text = text
+        self.parse_mode = parse_mode
+        self.reply_markup = reply_markup
+        self.future = future
+        self.enqueued_at = enqueued_at
+        self.attempts = 0
+
+
+class _ChatState:
+    __slots__ = ('pending', 'next_at', 'busy', 'scheduled')
+
+    def __init__(self):
+        self.pending = deque()
+        self.next_at = 0.0
+        self.busy = False
+        self.scheduled = False
+
+
+class TelegramNotifier:
+    """Rate limit'e uyan, chat başına sıralı, eşzamanlı Telegram gönderici"""
+
+    def __init__(self, token: str = None, api_url: str = None, global_rate: float = 30.0,
+                 chat_interval: float = 1.0, group_interval: float = 3.0, max_concurrency: int = 16,
+                 coalesce: bool = True, max_attempts: int = 4, request_timeout: float = 10.0,
+                 burst: float = 1.0):
+        self._token = token
+        self.api_url = (api_url or TELEGRAM_API_URL).rstrip('/')
+        self.global_rate = global_rate
+        # Bucket kapasitesi: 1 = düzgün aralıklı gönderim (kayan 1 sn penceresinde limit aşılmaz)
+        self.burst = max(1.0, burst)
+        self.chat_interval = chat_interval
+        self.group_interval = group_interval
+        self.max_concurrency = max_concurrency
+        self.coalesce = coalesce
+        self.max_attempts = max_attempts
+        self.request_timeout = request_timeout
+
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._dispatcher: Optional[asyncio.Task] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._chats: Dict[int, _ChatState] = {}
+        self._ready: List[tuple] = []  # heap: (zaman, seq, chat_id)
+        self._seq = itertools.count()
+        self._inflight = set()
+        self._unresolved = set()
+        self._tokens = self.burst
+        self._tokens_at = 0.0
+        self._paused_until = 0.0
+        self._thread: Optional[threading.Thread] = None
+        self._thread_lock = threading.Lock()
+        self._latencies = deque(maxlen=1000)
+        self.stats = {'enqueued': 0, 'delivered': 0, 'failed': 0, 'requests': 0,
+                      'coalesced': 0, 'retries': 0, 'rate_limited': 0}
+
+    @property
+    def token(self) -> Optional[str]:
+        # Env ilk kullanımda okunur (global instance import sırasında oluşturuluyor)
+        return self._token or os.getenv("TELEGRAM_BOT_TOKEN")
+
+    # ------------------------------------------------------------------
+    # Yaşam döngüsü
+    # ------------------------------------------------------------------
+    async def start(self):
+        """Session ve dispatcher'ı mevcut event loop'ta başlat"""
+        if self._dispatcher is not None:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._wakeup = asyncio.Event()
+        self._slots = asyncio.Semaphore(self.max_concurrency)
+        self._tokens_at = self._loop.time()
+        connector = aiohttp.TCPConnector(limit=self.max_concurrency, ttl_dns_cache=300)
+        self._session = aiohttp.ClientSession(
+            connector=connector, timeout=aiohttp.ClientTimeout(total=self.request_timeout))
+        self._dispatcher = asyncio.create_task(self._dispatch())
+        logger.info(f"📨 Telegram notifier started (global {self.global_rate}/s, "
+                    f"chat interval {self.chat_interval}s, concurrency {self.max_concurrency})")
+
+    async def flush(self, timeout: float = None) -> bool:
+        """Kuyruktaki tüm mesajlar teslim/başarısız olana kadar bekle"""
+        if not self._unresolved:
+            return True
+        try:
+            await asyncio.wait_for(asyncio.gather(*list(self._unresolved), return_exceptions=True), timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+
+    async def close(self, timeout: float = 10.0):
+        """Kuyruğu boşaltmaya çalış, ardından session'ı kapat"""
+        if self._dispatcher is None:
+            return
+        if not await self.flush(timeout):
+            logger.warning(f"⚠️ Telegram notifier closing with {len(self._unresolved)} undelivered messages")
+        self._dispatcher.cancel()
+        try:
+            await self._dispatcher
+        except asyncio.CancelledError:
+            pass
+        for task in list(self._inflight):
+            task.cancel()
+        for future in list(self._unresolved):
+            if not future.done():
+                future.set_exception(TelegramAPIError(0, "Notifier closed"))
+        await self._session.close()
+        self._dispatcher = None
+        logger.info(f"📨 Telegram notifier closed stats={self.get_stats()}")
+
+    # ------------------------------------------------------------------
+    # Kuyruk
+    # ------------------------------------------------------------------
+    def enqueue(self, chat_id: int, text: str, parse_mode: str = None,
+                reply_markup: Dict = None) -> asyncio.Future:
+        """
+        Mesajı kuyruğa al (loop thread'inden çağrılmalı). Future, teslim anının
+        loop.time() değeriyle tamamlanır; kalıcı hatada TelegramAPIError fırlatır.
+        """
+        if self._dispatcher is None:
+            raise RuntimeError("TelegramNotifier.start() must be awaited first")
+        future = self._loop.create_future()
+        if not self.token:
+            future.set_exception(TelegramAPIError(0, "TELEGRAM_BOT_TOKEN not set"))
+            return future
+        now = self._loop.time()
+        chat_id = int(chat_id)
+        state = self._chats.get(chat_id)
+        if state is None:
+            state = self._chats[chat_id] = _ChatState()
+        state.pending.append(_Message(chat_id, text, parse_mode, reply_markup, future, now))
+        self._unresolved.add(future)
+        future.add_done_callback(self._unresolved.discard)
+        self.stats['enqueued'] += 1
+        self._schedule(chat_id, state, now)
+        return future
+
+    async def send(self, chat_id: int, text: str, parse_mode: str = None, reply_markup: Dict = None) -> bool:
+        """Tek mesajı gönder ve teslimi bekle"""
+        try:
+            await self.enqueue(chat_id, text, parse_mode, reply_markup)
+            return True
+        except TelegramAPIError as e:
+            logger.warning(f"⚠️ Telegram notification to {chat_id} failed: {e}")
+            return False
+
+    async def broadcast(self, chat_ids: Iterable[int], text: str, parse_mode: str = None,
+                        reply_markup: Dict = None) -> Dict:
+        """
+        Aynı mesajı birden çok chat'e eşzamanlı gönder.
+        first_to_last: ilk ve son alıcıya teslim arasındaki süre (s).
+        """
+        started = self._loop.time() if self._loop else 0.0
+        chat_ids = list(dict.fromkeys(int(chat_id) for chat_id in chat_ids))
+        futures = [self.enqueue(chat_id, text, parse_mode, reply_markup) for chat_id in chat_ids]
+        results = await asyncio.gather(*futures, return_exceptions=True)
+
+        delivered_at = sorted(r for r in results if isinstance(r, float))
+        failed = {chat_id: str(r) for chat_id, r in zip(chat_ids, results) if isinstance(r, Exception)}
+        return {
+            'recipients': len(chat_ids),
+            'delivered': len(delivered_at),
+            'failed': failed,
+            'seconds': round((delivered_at[-1] if delivered_at else self._loop.time()) - started, 3),
+            'first_to_last': round(delivered_at[-1] - delivered_at[0], 3) if delivered_at else 0.0,
+        }
+
+    # ------------------------------------------------------------------
+    # Dispatcher
+    # ------------------------------------------------------------------
+    def _interval(self, chat_id: int) -> float:
+        # Negatif chat_id: grup/kanal (dakikada 20 mesaj)
+        return self.group_interval if chat_id < 0 else self.chat_interval
+
+    def _schedule(self, chat_id: int, state: _ChatState, at: float):
+        if state.scheduled or state.busy or not state.pending:
+            return
+        state.scheduled = True
+        heapq.heappush(self._ready, (max(at, state.next_at), next(self._seq), chat_id))
+        self._wakeup.set()
+
+    async def _acquire_global(self):
+        """Global token bucket; 429 sonrası duraklatma"""
+        while True:
+            now = self._loop.time()
+            if now < self._paused_until:
+                await asyncio.sleep(self._paused_until - now)
+                continue
+            self._tokens = min(self.burst, self._tokens + (now - self._tokens_at) * self.global_rate)
+            self._tokens_at = now
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return
+            await asyncio.sleep((1 - self._tokens) / self.global_rate)
+
+    def _take_batch(self, state: _ChatState) -> List[_Message]:
+        """Sıradaki mesaj + (coalescing açıksa) birleştirilebilecek ardılları"""
+        batch = [state.pending.popleft()]
+        if not self.coalesce:
+            return batch
+        length = len(batch[0].text)
+        while state.pending and batch[-1].reply_markup is None:
+            candidate = state.pending[0]
+            if candidate.parse_mode != batch[0].parse_mode:
+                break
+            if length + 2 + len(candidate.text) > MAX_MESSAGE_LENGTH:
+                break
+            batch.append(state.pending.popleft())
+            length += 2 + len(candidate.text)
+        return batch
+
+    async def _dispatch(self):
+        while True:
+            now = self._loop.time()
+            while self._ready and self._ready[0][0] <= now:
+                _, _, chat_id = heapq.heappop(self._ready)
+                state = self._chats.get(chat_id)
+                if state is None:
+                    continue
+                state.scheduled = False
+                if state.busy or not state.pending:
+                    continue
+                if state.next_at > now:
+                    self._schedule(chat_id, state, state.next_at)
+                    continue
+                await self._acquire_global()
+                await self._slots.acquire()
+                state.busy = True
+                task = asyncio.create_task(self._deliver(chat_id, state, self._take_batch(state)))
+                self._inflight.add(task)
+                task.add_done_callback(self._inflight.discard)
+                now = self._loop.time()
+
+            if not self._ready and len(self._chats) > len(self._inflight):
+                self._prune_chats(now)
+            timeout = max(0.0, self._ready[0][0] - now) if self._ready else None
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+
+    def _prune_chats(self, now: float):
+        """Boşta ve aralığı dolmuş chat durumlarını at (chat başına aralık bilgisi korunarak)"""
+        for chat_id in [chat_id for chat_id, state in self._chats.items()
+                        if not state.pending and not state.busy and not state.scheduled and state.next_at <= now]:
+            del self._chats[chat_id]
+
+    async def _post(self, chat_id: int, text: str, parse_mode: str, reply_markup: Dict) -> Dict:
+        payload = {"chat_id": chat_id, "text": text}
+        if parse_mode:
+            payload["parse_mode"] = parse_mode
+        if reply_markup:
+            payload["reply_markup"] = reply_markup
+        self.stats['requests'] += 1
+        async with self._session.post(f"{self.api_url}/bot{self.token}/sendMessage", json=payload) as response:
+            try:
+                data = await response.json(content_type=None)
+            except ValueError:
+                data = {}
+        if response.status == 200 and data.get('ok'):
+            return data.get('result', {})
+        raise TelegramAPIError(response.status, data.get('description', response.reason or ''),
+                               (data.get('parameters') or {}).get('retry_after'))
+
+    async def _deliver(self, chat_id: int, state: _ChatState, batch: List[_Message]):
+        delay = 0.0
+        try:
+            text = "\n\n".join(message.text for message in batch)
+            await self._post(chat_id, text, batch[0].parse_mode, batch[-1].reply_markup)
+            now = self._loop.time()
+            for message in batch:
+                self._latencies.append(now - message.enqueued_at)
+                if not message.future.done():
+                    message.future.set_result(now)
+            self.stats['delivered'] += len(batch)
+            self.stats['coalesced'] += len(batch) - 1
+        except TelegramAPIError as e:
+            if e.status == 429:
+                # Flood limit bot geneline uygulanır: tüm gönderimi retry_after kadar durdur
+                delay = float(e.retry_after or 1)
+                self.stats['rate_limited'] += 1
+                self._paused_until = max(self._paused_until, self._loop.time() + delay)
+                logger.warning(f"⏳ Telegram 429 for chat {chat_id}, retry after {delay}s")
+                self._requeue(state, batch, count_attempt=False)
+            elif e.status >= 500 or e.status == 0:
+                delay = self._requeue(state, batch)
+            else:
+                self._fail(batch, e)
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            logger.warning(f"⚠️ Telegram request to chat {chat_id} failed: {e}")
+            delay = self._requeue(state, batch, error=e)
+        except Exception as e:
+            logger.error(f"❌ Unexpected Telegram notifier error for chat {chat_id}: {e}")
+            self._fail(batch, e)
+        finally:
+            self._slots.release()
+            state.busy = False
+            state.next_at = self._loop.time() + max(delay, self._interval(chat_id))
+            if state.pending:
+                self._schedule(chat_id, state, state.next_at)
+
+    def _requeue(self, state: _ChatState, batch: List[_Message], count_attempt: bool = True,
+                 error: Exception = None) -> float:
+        """Mesajları sıranın başına geri koy; deneme hakkı bitenleri düşür. Backoff süresini döndür."""
+        retry = []
+        for message in batch:
+            if count_attempt:
+                message.attempts += 1
+            if message.attempts >= self.max_attempts:
+                self._fail([message], error or TelegramAPIError(0, "Max attempts exceeded"))
+            else:
+                retry.append(message)
+        state.pending.extendleft(reversed(retry))
+        self.stats['retries'] += len(retry)
+        attempts = max((message.attempts for message in retry), default=0)
+        return min(30.0, 0.5 * (2 ** attempts)) if count_attempt else 0.0
+
+    def _fail(self, batch: List[_Message], error: Exception):
+        if not isinstance(error, TelegramAPIError):
+            error = TelegramAPIError(0, str(error))
+        for message in batch:
+            if not message.future.done():
+                message.future.set_exception(error)
+        self.stats['failed'] += len(batch)
+        logger.error(f"❌ Telegram notification to {batch[0].chat_id} dropped: {error}")
+
+    # ------------------------------------------------------------------
+    # Senkron cephe (ayrı thread'de çalışan loop)
+    # ------------------------------------------------------------------
+    def _ensure_background(self) -> asyncio.AbstractEventLoop:
+        if self._loop is not None:
+            return self._loop
+        with self._thread_lock:
+            if self._loop is None:
+                loop = asyncio.new_event_loop()
+                started = threading.Event()
+
+                def run():
+                    asyncio.set_event_loop(loop)
+                    loop.run_until_complete(self.start())
+                    started.set()
+                    loop.run_forever()
+
+                self._thread = threading.Thread(target=run, name="telegram-notifier", daemon=True)
+                self._thread.start()
+                started.wait()
+        return self._loop
+
+    def notify(self, chat_id: int, text: str, parse_mode: str = None,
+               reply_markup: Dict = None) -> concurrent.futures.Future:
+        """Thread-safe, beklemeyen gönderim. Loop thread'inin kendisinden çağrılmamalı."""
+        loop = self._ensure_background()
+
+        async def submit():
+            return await self.enqueue(chat_id, text, parse_mode, reply_markup)
+
+        return asyncio.run_coroutine_threadsafe(submit(), loop)
+
+    def send_sync(self, chat_id: int, text: str, parse_mode: str = None, reply_markup: Dict = None,
+                  timeout: float = 10.0) -> bool:
+        """Teslim edilene (veya timeout'a) kadar bekleyen senkron gönderim"""
+        try:
+            self.notify(chat_id, text, parse_mode, reply_markup).result(timeout)
+            return True
+        except concurrent.futures.TimeoutError:
+            logger.warning(f"⚠️ Telegram notification to {chat_id} still queued after {timeout}s")
+            return False
+        except TelegramAPIError as e:
+            logger.warning(f"⚠️ Telegram notification to {chat_id} failed: {e}")
+            return False
+
+    def get_stats(self) -> Dict:
+        stats = dict(self.stats)
+        stats['queue_depth'] = sum(len(state.pending) for state in self._chats.values())
+        stats['chats'] = len(self._chats)
+        latencies = sorted(self._latencies)
+        if latencies:
+            stats['latency_p50_ms'] = round(latencies[len(latencies) // 2] * 1000, 1)
+            stats['latency_p95_ms'] = round(latencies[max(0, math.ceil(len(latencies) * 0.95) - 1)] * 1000, 1)
+        return stats
+
+
+# Global notifier instance (senkron çağıranlar için arka plan loop'u ilk kullanımda açılır)
+telegram_notifier = TelegramNotifier()
@@ -0,0 +1,247 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Telegram Webhook Mode
+working_telegram_bot için long-polling yerine gömülü aiohttp webhook sunucusu
+ve kullanıcı bazında sıralı, eşzamanlı update işleme.
+
+- PerUserUpdateProcessor: farklı kullanıcıların update'leri eşzamanlı işlenir,
+  aynı kullanıcınınkiler geliş sırasıyla (ör. "ACİL DURDUR" ardından ayar değişikliği)
+- WebhookServer: Telegram'ın POST'unu secret token ile doğrular, update'i
+  application.update_queue'ya koyar ve hemen 200 döner (handler'ı beklemez)
+- GET /healthz: processor istatistikleri (kuyruk bekleme / handler süreleri)
+
+Ortam değişkenleri:
+    TELEGRAM_WEBHOOK_URL      Telegram'ın erişeceği public URL (ayarlanırsa webhook modu)
+    TELEGRAM_WEBHOOK_LISTEN   varsayılan 127.0.0.1 (önünde reverse proxy / TLS)
+    TELEGRAM_WEBHOOK_PORT     varsayılan 8443
+    TELEGRAM_WEBHOOK_SECRET   X-Telegram-Bot-Api-Secret-Token (yoksa her başlangıçta üretilir)
+    TELEGRAM_CONCURRENT_UPDATES  eşzamanlı update sayısı (varsayılan 64)
+
+Benchmark: python3 debug/telegram_webhook_benchmark.py
+"""
+import os
+import math
+import time
+import asyncio
+import hashlib
+import logging
+import secrets
+from collections import deque
+from typing import Any, Awaitable, Dict, Optional
+from urllib.parse import urlparse
+
+from aiohttp import web
+from telegram import Update
+from telegram.ext import Application, BaseUpdateProcessor
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CONCURRENT_UPDATES = 64
+
+
+def _percentile_ms(sorted_values, pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    return round(sorted_values[max(0, math.ceil(pct / 100.0 * len(sorted_values)) - 1)] * 1000, 2)
+
+
+class PerUserUpdateProcessor(BaseUpdateProcessor):
+    """
+    Eşzamanlı update işleme, kullanıcı başına sıra garantisiyle.
+    Kullanıcı kilidi semaphore'dan ÖNCE alınır: tek bir kullanıcının update
+    yığını global eşzamanlılık slotlarını işgal etmez.
+    """
+
+    def __init__(self, max_concurrent_updates: int = DEFAULT_CONCURRENT_UPDATES):
+        super().__init__(max_concurrent_updates)
+        self._locks: Dict[int, asyncio.Lock] = {}
+        self._waiters: Dict[int, int] = {}
+        self._queue_wait = deque(maxlen=2000)
+        self._handler_time = deque(maxlen=2000)
+        self.stats = {'processed': 0, 'failed': 0, 'serialized': 0}
+
+    @staticmethod
+    def _ordering_key(update: object) -> Optional[int]:
+        if isinstance(update, Update):
+            if update.effective_user:
+                return update.effective_user.id
+            if update.effective_chat:
+                return update.effective_chat.id
+        return None
+
+    async def process_update(self, update: object, coroutine: Awaitable[Any]) -> None:
+        key = self._ordering_key(update)
+        received = time.monotonic()
+        if key is None:
+            await self._run(update, coroutine, received)
+            return
+
+        lock = self._locks.get(key)
+        if lock is None:
+            lock = self._locks[key] = asyncio.Lock()
+        self._waiters[key] = self._waiters.get(key, 0) + 1
+        if lock.locked():
+            self.stats['serialized'] += 1
+        try:
+            async with lock:
+                await self._run(update, coroutine, received)
+        finally:
+            self._waiters[key] -= 1
+            if not self._waiters[key]:
+                del self._waiters[key]
+                del self._locks[key]
+
+    async def _run(self, update: object, coroutine: Awaitable[Any], received: float):
+        await super().process_update(update, self._timed(coroutine, received))
+
+    async def _timed(self, coroutine: Awaitable[Any], received: float):
+        started = time.monotonic()
+        self._queue_wait.append(started - received)
+        try:
+            await coroutine
+            self.stats['processed'] += 1
+        except Exception:
+            self.stats['failed'] += 1
+            raise
+        finally:
+            self._handler_time.append(time.monotonic() - started)
+
+    async def do_process_update(self, update: object, coroutine: Awaitable[Any]) -> None:
+        await coroutine
+
+    async def initialize(self) -> None:
+        pass
+
+    async def shutdown(self) -> None:
+        pass
+
+    def get_stats(self) -> Dict:
+        stats = dict(self.stats)
+        queue_wait = sorted(self._queue_wait)
+        handler_time = sorted(self._handler_time)
+        stats.update({
+            'max_concurrent': self.max_concurrent_updates,
+            'in_flight': self.current_concurrent_updates,
+            'users_waiting': len(self._locks),
+            'queue_wait_p50_ms': _percentile_ms(queue_wait, 50),
+            'queue_wait_p95_ms': _percentile_ms(queue_wait, 95),
+            'handler_p50_ms': _percentile_ms(handler_time, 50),
+            'handler_p95_ms': _percentile_ms(handler_time, 95),
+        })
+        return stats
+
+
+class WebhookServer:
+    """Telegram update'lerini alan gömülü aiohttp sunucusu"""
+
+    def __init__(self, application: Application, listen: str = "127.0.0.1", port: int = 8443,
+                 path: str = None, secret_token: str = None):
+        self.application = application
+        self.listen = listen
+        self.port = port
+        self.secret_token = secret_token or secrets.token_urlsafe(32)
+        # Yol token'dan türetilir: URL tahmin edilemez, token açığa çıkmaz
+        self.path = path or "/telegram/" + hashlib.sha256(application.bot.token.encode()).hexdigest()[:24]
+        self._runner: Optional[web.AppRunner] = None
+        self.stats = {'received': 0, 'rejected': 0, 'invalid': 0}
+
+    def _web_app(self) -> web.Application:
+        app = web.Application(client_max_size=1024 * 1024)
+        app.router.add_post(self.path, self._handle_update)
+        app.router.add_get("/healthz", self._handle_health)
+        return app
+
+    async def _handle_update(self, request: web.Request) -> web.Response:
+        if request.headers.get("X-Telegram-Bot-Api-Secret-Token") != self.secret_token:
+            self.stats['rejected'] += 1
+            return web.Response(status=403)
+        try:
+            update = Update.de_json(await request.json(), self.application.bot)
+        except Exception as e:
+            # Telegram hatalı update'i tekrar denemesin diye 200 dön
+            self.stats['invalid'] += 1
+            logger.warning(f"⚠️ Invalid webhook payload: {e}")
+            return web.Response()
+        self.stats['received'] += 1
+        await self.application.update_queue.put(update)
+        return web.Response()
+
+    async def _handle_health(self, request: web.Request) -> web.Response:
+        health = {'webhook': self.stats, 'update_queue': self.application.update_queue.qsize()}
+        processor = self.application.update_processor
+        if isinstance(processor, PerUserUpdateProcessor):
+            health['processor'] = processor.get_stats()
+        return web.json_response(health)
+
+    async def start(self):
+        self._runner = web.AppRunner(self._web_app(), access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, self.listen, self.port)
+        await site.start()
+        if not self.port:
+            self.port = site._server.sockets[0].getsockname()[1]
+        logger.info(f"🌐 Webhook server listening on {self.listen}:{self.port}{self.path}")
+
+    async def stop(self):
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+
+def webhook_config_from_env() -> Optional[Dict]:
+    """TELEGRAM_WEBHOOK_URL ayarlıysa webhook parametreleri, değilse None (polling)"""
+    url = os.getenv("TELEGRAM_WEBHOOK_URL")
+    if not url:
+        return None
+    return {
+        'url': url.rstrip('/'),
+        'listen': os.getenv("TELEGRAM_WEBHOOK_LISTEN", "127.0.0.1"),
+        'port': int(os.getenv("TELEGRAM_WEBHOOK_PORT", "8443")),
+        'secret_token': os.getenv("TELEGRAM_WEBHOOK_SECRET") or None,
+    }
+
+
+async def run_webhook(application: Application, url: str, listen: str = "127.0.0.1", port: int = 8443,
+                      secret_token: str = None, stop_event: asyncio.Event = None,
+                      drop_pending_updates: bool = True) -> None:
+    """
+    Application'ı webhook modunda çalıştır (application.run_polling yerine).
+    `url` Telegram'ın erişeceği public taban adres; yol sunucu tarafından eklenir.
+    """
+    import signal
+
+    stop_event = stop_event or asyncio.Event()
+    server = WebhookServer(application, listen, port, path=urlparse(url).path or None, secret_token=secret_token)
+    if urlparse(url).path in ('', '/'):
+        url = url.rstrip('/') + server.path
+
+    async with application:
+        await server.start()
+        await application.bot.set_webhook(
+            url=url,
+            secret_token=server.secret_token,
+            allowed_updates=Update.ALL_TYPES,
+            drop_pending_updates=drop_pending_updates,
+            max_connections=min(100, max(40, application.update_processor.max_concurrent_updates)),
+        )
+        await application.start()
+        logger.info(f"✅ Webhook mode active: {url}")
+
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGTERM, signal.SIGINT):
+            try:
+                loop.add_signal_handler(sig, stop_event.set)
+            except (NotImplementedError, RuntimeError):
+                pass
+        try:
+            await stop_event.wait()
+        finally:
+            logger.info("🛑 Webhook mode stopping...")
+            await server.stop()
+            await application.stop()
+            # Bir sonraki polling başlangıcı çakışmasın diye webhook kaldırılır
+            try:
+                await application.bot.delete_webhook()
+            except Exception as e:
+                logger.warning(f"⚠️ delete_webhook failed: {e}")
@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Timer Wheel
+Anahtar başına tek son kullanma zamanı tutan bucket'lı zamanlayıcı (UserStateTimeoutManager için).
+
+- Girişler `resolution` saniyelik slot'lara dağıtılır: slot -> {key: expires_at}
+- Slot numaraları küçük bir min-heap'te (en fazla timeout / resolution slot)
+- set / discard / expires_at: O(1) (yeni slot açılırsa O(log slot))
+- pop_expired(now): sadece süresi dolan slot'lara dokunur; tamamen geçmiş slot
+  toptan düşer, tüm durumları tarayan O(n) döngü yok
+- Tombstone yok: bellek canlı giriş + açık slot sayısıyla sınırlı
+
+Benchmark: python3 debug/state_timeout_benchmark.py
+"""
+import math
+import heapq
+from typing import Dict, Hashable, List, Optional
+
+
+class TimerWheel:
+    """key -> expires_at, süresi dolanları slot slot çıkarır"""
+
+    def __init__(self, resolution: float = 1.0):
+        self.resolution = resolution
+        self._slots: Dict[int, Dict[Hashable, float]] = {}
+        self._slot_heap: List[int] = []
+        self._key_slot: Dict[Hashable, int] = {}
+        self.stats = {'expired': 0}
+
+    def __len__(self) -> int:
+        return len(self._key_slot)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._key_slot
+
+    def _slot(self, when: float) -> int:
+        return math.floor(when / self.resolution)
+
+    def set(self, key: Hashable, expires_at: float):
+        """Anahtarın son kullanma zamanını ayarla (varsa eskisini geçersiz kılar)"""
+        self.discard(key)
+        slot = self._slot(expires_at)
+        bucket = self._slots.get(slot)
+        if bucket is None:
+            bucket = self._slots[slot] = {}
+            heapq.heappush(self._slot_heap, slot)
+        bucket[key] = expires_at
+        self._key_slot[key] = slot
+
+    def discard(self, key: Hashable) -> bool:
+        """Anahtarı kaldır. Boşalan slot, zamanı gelince pop_expired tarafından atılır."""
+        slot = self._key_slot.pop(key, None)
+        if slot is None:
+            return False
+        del self._slots[slot][key]
+        return True
+
+    def expires_at(self, key: Hashable) -> Optional[float]:
+        slot = self._key_slot.get(key)
+        return None if slot is None else self._slots[slot][key]
+
+    def pop_expired(self, now: float) -> List[Hashable]:
+        """Süresi dolmuş (expires_at <= now) anahtarları çıkar ve döndür"""
+        expired = []
+        now_slot = self._slot(now)
+        heap = self._slot_heap
+        while heap and heap[0] <= now_slot:
+            slot = heap[0]
+            bucket = self._slots[slot]
+            if slot < now_slot:
+                # Slot tamamen geçmişte: içindeki her giriş dolmuş
+                heapq.heappop(heap)
+                del self._slots[slot]
+                for key in bucket:
+                    del self._key_slot[key]
+                expired.extend(bucket)
+                continue
+            # Şu anki slot: sadece zamanı gelenler
+            due = [key for key, expires_at in bucket.items() if expires_at <= now]
+            for key in due:
+                del bucket[key]
+                del self._key_slot[key]
+            expired.extend(due)
+            if not bucket:
+                heapq.heappop(heap)
+                del self._slots[slot]
+            break
+        self.stats['expired'] += len(expired)
+        return expired
+
+    def get_stats(self) -> Dict:
+        stats = dict(self.stats)
+        stats.update({'live': len(self._key_slot), 'slots': len(self._slots)})
+        return stats
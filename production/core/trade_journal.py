@@ -0,0 +1,319 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Trade Latency Journal
+Her listing işleminin aşamalarını (tespit -> sinyal -> engine -> order -> bildirim)
+monotonic zaman damgalarıyla append-only JSONL dosyasına yazar.
+
+- time.monotonic_ns() Linux'ta sistem genelidir: farklı süreçlerin kayıtları karşılaştırılabilir
+- Her kayıt tek bir O_APPEND write() ile yazılır (kilit yok, satırlar karışmaz)
+- Sinyal kimliği (signal_id) tracker/scraper'da üretilir; kullanıcı işlemleri
+  "<signal_id>/<user_id>" trade_id'si ile alt süreçlere TRADE_ID env'i üzerinden taşınır
+- Günlük segmentler (trade_journal-YYYYMMDD.jsonl, UTC): rename yok, her süreç gün
+  değişince yeni segmenti açar; TRADE_JOURNAL_RETENTION_DAYS'ten eski segmentler silinir
+- Raporlar sadece istenen zaman penceresine düşen segmentleri okur
+
+Rapor: python3 trade_journal.py report --since 24h
+"""
+import os
+import sys
+import json
+import math
+import time
+import uuid
+import argparse
+import threading
+from typing import Dict, Iterator, List, Optional
+
+_CORE_DIR = os.path.dirname(os.path.realpath(__file__))
+DEFAULT_JOURNAL_PATH = os.path.join(_CORE_DIR, '..', 'monitoring', 'trade_journal.jsonl')
+DEFAULT_RETENTION_DAYS = 14
+
+# Aşamalar, long.py akışındaki sırasıyla (rapor sırası)
+STAGES = [
+    "detection",
+    "signal_write",
+    "engine_pickup",
+    "credential_load",
+    "leverage_set",
+    "balance_check",
+    "margin_set",
+    "order_post",
+    "order_ack",
+    "fill_fetch",
+    "notification",
+    "notification_sent",
+]
+
+
+def _percentile(sorted_values: List[float], pct: float) -> float:
+    """Nearest-rank percentile"""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(pct / 100.0 * len(sorted_values)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+def _segment_day(wall: float) -> str:
+    """Kaydın düştüğü günlük segment (UTC)"""
+    return time.strftime('%Y%m%d', time.gmtime(wall))
+
+
+def _signal_wall(trade_id: str) -> Optional[float]:
+    """'<SYMBOL>-<epoch ms>-<hex>[/<user>]' kimliğinden sinyal zamanı"""
+    try:
+        return int(trade_id.split('/', 1)[0].rsplit('-', 2)[1]) / 1000.0
+    except (IndexError, ValueError):
+        return None
+
+
+def _parse_window(value: Optional[str]) -> Optional[float]:
+    """'90s', '15m', '24h', '7d' veya epoch saniyesi -> epoch saniyesi"""
+    if not value:
+        return None
+    units = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+    if value[-1] in units:
+        return time.time() - float(value[:-1]) * units[value[-1]]
+    return float(value)
+
+
+class TradeJournal:
+    """Append-only işlem aşama günlüğü"""
+
+    def __init__(self, path: str = None, retention_days: float = None):
+        # path: segmentlerin taban adı (rotasyon öncesi tek dosya da bu isimde, okunmaya devam eder)
+        self.path = os.path.realpath(path or os.getenv('TRADE_JOURNAL_PATH', DEFAULT_JOURNAL_PATH))
+        self._base, self._ext = os.path.splitext(self.path)
+        self._ext = self._ext or '.jsonl'
+        self.retention_days = float(retention_days if retention_days is not None
+                                    else os.getenv('TRADE_JOURNAL_RETENTION_DAYS', DEFAULT_RETENTION_DAYS))
+        self._fd = None
+        self._day = None
+        # Bir önceki günün fd'si bir sonraki rotasyona kadar açık kalır: o an yazan thread
+        # kapatılmış (ve başka dosyaya yeniden atanmış) fd'ye yazmasın
+        self._previous_fd = None
+        self._lock = threading.Lock()
+        self.enabled = os.getenv('TRADE_JOURNAL_DISABLED', '0') != '1'
+
+    def segment_path(self, day: str) -> str:
+        return f"{self._base}-{day}{self._ext}"
+
+    def _open(self, wall: float) -> int:
+        day = _segment_day(wall)
+        if self._fd is None or day != self._day:
+            with self._lock:
+                if self._fd is None or day != self._day:
+                    os.makedirs(os.path.dirname(self.path), exist_ok=True)
+                    path = self.segment_path(day)
+                    try:
+                        fd = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT | os.O_EXCL, 0o644)
+                        created = True
+                    except FileExistsError:
+                        fd = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+                        created = False
+                    if self._previous_fd is not None:
+                        os.close(self._previous_fd)
+                    self._previous_fd, self._fd, self._day = self._fd, fd, day
+                    if created:
+                        # Günün ilk yazanı budar (süreç başına değil, günde bir kez)
+                        self.prune(wall)
+        return self._fd
+
+    def _segments(self) -> List[tuple]:
+        """(gün, yol) listesi, eskiden yeniye"""
+        directory = os.path.dirname(self.path)
+        prefix = os.path.basename(self._base) + '-'
+        segments = []
+        try:
+            names = os.listdir(directory)
+        except FileNotFoundError:
+            return segments
+        for name in names:
+            day = name[len(prefix):-len(self._ext)]
+            if name.startswith(prefix) and name.endswith(self._ext) and len(day) == 8 and day.isdigit():
+                segments.append((day, os.path.join(directory, name)))
+        return sorted(segments)
+
+    def prune(self, now: float = None) -> int:
+        """Saklama süresinden eski segmentleri sil"""
+        cutoff_wall = (now or time.time()) - self.retention_days * 86400
+        cutoff = _segment_day(cutoff_wall)
+        removed = 0
+        try:
+            # Rotasyon öncesi tek dosya: son yazımı saklama süresinden eskiyse
+            if os.path.getmtime(self.path) < cutoff_wall:
+                os.remove(self.path)
+                removed += 1
+        except OSError:
+            pass
+        for day, path in self._segments():
+            if day >= cutoff:
+                break
+            try:
+                os.remove(path)
+                removed += 1
+            except OSError:
+                pass
+        return removed
+
+    @staticmethod
+    def new_signal_id(symbol: str) -> str:
+        """Yeni listing sinyali için kimlik"""
+        return f"{symbol}-{int(time.time() * 1000)}-{uuid.uuid4().hex[:6]}"
+
+    def mark(self, trade_id: Optional[str], stage: str, mono_ns: int = None, **fields):
+        """Aşama zaman damgasını yaz. Hata durumunda işlem akışını asla bozmaz."""
+        if not trade_id or not self.enabled:
+            return
+        wall = time.time()
+        record = {
+            'trade_id': trade_id,
+            'stage': stage,
+            'mono_ns': mono_ns if mono_ns is not None else time.monotonic_ns(),
+            'wall': wall,
+            'pid': os.getpid(),
+        }
+        if fields:
+            record.update(fields)
+        try:
+            os.write(self._open(wall), (json.dumps(record, separators=(',', ':')) + "\n").encode('utf-8'))
+        except OSError:
+            pass
+
+    # ------------------------------------------------------------------
+    # Sorgulama
+    # ------------------------------------------------------------------
+    def segments_for(self, since: float = None, until: float = None) -> List[str]:
+        """Pencereyle kesişen dosyalar: günlük segmentler + (mtime'ı pencerede ise) rotasyon öncesi dosya"""
+        paths = []
+        try:
+            if since is None or os.path.getmtime(self.path) >= since:
+                paths.append(self.path)
+        except OSError:
+            pass
+        first = _segment_day(since) if since is not None else None
+        last = _segment_day(until) if until is not None else None
+        for day, path in self._segments():
+            if (first is None or day >= first) and (last is None or day <= last):
+                paths.append(path)
+        return paths
+
+    def read_events(self, since: float = None, until: float = None) -> Iterator[Dict]:
+        """Zaman penceresindeki (wall clock) kayıtlar; pencere dışındaki segmentler açılmaz"""
+        for path in self.segments_for(since, until):
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    for line in f:
+                        try:
+                            event = json.loads(line)
+                        except json.JSONDecodeError:
+                            continue
+                        if since is not None and event['wall'] < since:
+                            continue
+                        if until is not None and event['wall'] > until:
+                            continue
+                        yield event
+            except FileNotFoundError:
+                continue
+
+    def trades(self, since: float = None, until: float = None) -> Dict[str, Dict[str, int]]:
+        """
+        trade_id -> {stage: mono_ns}. Kullanıcı işlemlerine ("<signal>/<user>")
+        ait sinyalin detection/signal_write kayıtları da eklenir.
+        """
+        signals: Dict[str, Dict[str, int]] = {}
+        trades: Dict[str, Dict[str, int]] = {}
+        for event in self.read_events(since, until):
+            trade_id = event['trade_id']
+            target = trades if '/' in trade_id else signals
+            # Aynı aşama birden fazla kez yazıldıysa order'a en yakın olan (son) kayıt geçerli
+            target.setdefault(trade_id, {})[event['stage']] = event['mono_ns']
+
+        for trade_id, stages in trades.items():
+            signal_stages = signals.get(trade_id.split('/', 1)[0], {})
+            for stage, mono_ns in signal_stages.items():
+                stages.setdefault(stage, mono_ns)
+        return trades
+
+    def stage_percentiles(self, since: float = None, until: float = None) -> Dict[str, Dict[str, float]]:
+        """
+        Her aşama için zaman sırasında bir önceki kayıtlı aşamadan geçen süre (ms)
+        ve uçtan uca süre için count/p50/p95/p99/max.
+        """
+        durations: Dict[str, List[float]] = {}
+        for stages in self.trades(since, until).values():
+            ordered = sorted(stages.items(), key=lambda item: item[1])
+            for (_, previous_ns), (stage, mono_ns) in zip(ordered, ordered[1:]):
+                durations.setdefault(stage, []).append((mono_ns - previous_ns) / 1e6)
+            if len(ordered) > 1:
+                durations.setdefault('total', []).append((ordered[-1][1] - ordered[0][1]) / 1e6)
+
+        report = {}
+        for stage, values in durations.items():
+            if not values:
+                continue
+            values.sort()
+            report[stage] = {
+                'count': len(values),
+                'p50': round(_percentile(values, 50), 2),
+                'p95': round(_percentile(values, 95), 2),
+                'p99': round(_percentile(values, 99), 2),
+                'max': round(values[-1], 2),
+            }
+        return report
+
+
+# Global journal instance
+trade_journal = TradeJournal()
+
+
+def mark(stage: str, **fields):
+    """Alt süreçler için kısayol: TRADE_ID env'indeki işleme aşama yaz"""
+    trade_journal.mark(os.getenv('TRADE_ID'), stage, **fields)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Trade latency journal")
+    sub = parser.add_subparsers(dest='command')
+    report = sub.add_parser('report', help="Aşama bazında p50/p95/p99 (ms)")
+    report.add_argument('--since', default='24h', help="örn. 15m, 24h, 7d veya epoch (varsayılan 24h)")
+    report.add_argument('--until', help="örn. 1h veya epoch")
+    report.add_argument('--json', action='store_true')
+    show = sub.add_parser('trade', help="Tek işlemin aşama zaman çizelgesi")
+    show.add_argument('trade_id')
+    args = parser.parse_args()
+
+    if args.command == 'trade':
+        # Kimlikteki sinyal zamanı biliniyorsa sadece o günün segmentlerini oku
+        signal_wall = _signal_wall(args.trade_id)
+        window = (signal_wall - 60, signal_wall + 3600) if signal_wall else (None, None)
+        stages = trade_journal.trades(*window).get(args.trade_id)
+        if not stages:
+            print(f"📭 {args.trade_id} bulunamadı")
+            return
+        start = min(stages.values())
+        for stage, mono_ns in sorted(stages.items(), key=lambda item: item[1]):
+            print(f"{stage:<16}+{(mono_ns - start) / 1e6:>10.2f} ms")
+        return
+
+    since = _parse_window(getattr(args, 'since', None))
+    until = _parse_window(getattr(args, 'until', None))
+    result = trade_journal.stage_percentiles(since, until)
+    if getattr(args, 'json', False):
+        print(json.dumps(result, indent=2))
+        return
+    if not result:
+        print("📭 Seçilen aralıkta kayıt yok")
+        return
+
+    print(f"📊 Trade journal: {trade_journal.path}")
+    print(f"{'STAGE':<16}{'COUNT':>7}{'P50 ms':>10}{'P95 ms':>10}{'P99 ms':>10}{'MAX ms':>10}")
+    extra = sorted(stage for stage in result if stage not in STAGES and stage != 'total')
+    for stage in STAGES + extra + ['total']:
+        if stage in result:
+            row = result[stage]
+            print(f"{stage:<16}{row['count']:>7}{row['p50']:>10}{row['p95']:>10}{row['p99']:>10}{row['max']:>10}")
+
+
+if __name__ == "__main__":
+    main()
@@ -3,16 +3,24 @@
 """
 Upbit Duyuru Sayfası Tarayıcısı
 Upbit'in duyuru sayfasından yeni coin listeleme duyurularını takip eder
+Hot standby: iki replica çalışır (--replica a/b), sadece leader lease'i tutan tarar ve tetikler
 """
 import os
+import sys
 import json
 import time
+import signal
+import argparse
 import threading
 import requests
 from datetime import datetime, timedelta
 from bs4 import BeautifulSoup
 import re
 from notification_config import notification_config
+from state_store import state_store
+from trade_journal import trade_journal
+from service_heartbeat import service_heartbeat
+from leader_lease import LeaderLease, LeaseLost
 from selenium import webdriver
 from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.common.by import By
@@ -20,22 +28,29 @@ from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.common.exceptions import TimeoutException, WebDriverException
 
+LEASE_NAME = "upbit_announcement_scraper"
+SELENIUM_PAGE_LOAD_TIMEOUT = 30  # sn: driver.get varsayılanı 300 sn
+# Bir tarama (HTTP 10 sn + Selenium sayfa yükleme + içerik beklemeleri) bundan uzun sürerse
+# döngü takılmış sayılır ve supervisor heartbeat'i kesilir
+LOOP_STALL_AFTER = 180
+
 class UpbitAnnouncementScraper:
-    def __init__(self):
+    def __init__(self, lease: LeaderLease = None):
         self.BASE_DIR = os.getcwd()
         self.announcement_url = "https://upbit.com/service_center/notice"
         self.headers = {
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
         }
+        # Keep-alive session: standby'da da hazır, devralınca ilk istek bağlantı kurulumunu beklemez
+        self.session = requests.Session()
+        self.session.headers.update(self.headers)
+        self.lease = lease or LeaderLease(LEASE_NAME)
         
         # Centralized notification configuration kullan
         self.announcement_file = notification_config.announcement_coins_file
-        self.last_check_file = notification_config.last_announcement_check_file
-        self.processed_coins_file = notification_config.processed_coins_file
         print(f"🔧 Upbit Scraper using centralized config:")
         print(f"   📁 Announcements: {self.announcement_file}")
-        print(f"   📁 Last check: {self.last_check_file}")
-        print(f"   📁 Processed coins: {self.processed_coins_file}")
+        print(f"   🗄️ Last check / processed coins: {state_store.db_path}")
         
         # Yeni coin patternleri (Korece ve İngilizce)
         self.new_coin_patterns = [
@@ -65,6 +80,8 @@ class UpbitAnnouncementScraper:
         """Heartbeat thread'ini başlat"""
         heartbeat_thread = threading.Thread(target=self.heartbeat_writer, daemon=True)
         heartbeat_thread.start()
+        # Supervisor canlılık soketi: tarama döngüsü LOOP_STALL_AFTER sn ilerlemezse beat kesilir
+        service_heartbeat.start(stall_after=LOOP_STALL_AFTER)
         print("💓 Upbit Monitor heartbeat başlatıldı")
         
     def get_announcements(self):
@@ -100,7 +117,7 @@ class UpbitAnnouncementScraper:
             print("🌐 Upbit duyuru sayfası HTTP ile çekiliyor...")
             
             # HTTP isteği gönder
-            response = requests.get(self.announcement_url, headers=self.headers, timeout=10)
+            response = self.session.get(self.announcement_url, timeout=10)
             response.raise_for_status()
             
             # HTML parse et
@@ -315,6 +332,7 @@ class UpbitAnnouncementScraper:
             
             # Initialize driver
             driver = webdriver.Chrome(options=chrome_options)
+            driver.set_page_load_timeout(SELENIUM_PAGE_LOAD_TIMEOUT)
             driver.get(self.announcement_url)
             
             # Wait for content to load
@@ -614,12 +632,11 @@ class UpbitAnnouncementScraper:
     def get_last_check_time(self):
         """Son kontrol zamanını al"""
         try:
-            if os.path.exists(self.last_check_file):
-                with open(self.last_check_file, 'r') as f:
-                    data = json.load(f)
-                return datetime.fromisoformat(data.get('last_check', ''))
-        except:
-            pass
+            last_check = state_store.get_last_announcement_check()
+            if last_check:
+                return last_check
+        except Exception as e:
+            print(f"⚠️ Son kontrol zamanı okuma hatası: {e}")
         
         # İlk çalıştırma için 1 saat öncesi
         return datetime.now() - timedelta(hours=1)
@@ -627,21 +644,14 @@ class UpbitAnnouncementScraper:
     def save_last_check_time(self):
         """Son kontrol zamanını kaydet"""
         try:
-            data = {'last_check': datetime.now().isoformat()}
-            with open(self.last_check_file, 'w') as f:
-                json.dump(data, f)
+            state_store.set_last_announcement_check()
         except Exception as e:
             print(f"⚠️ Son kontrol zamanı kaydetme hatası: {e}")
     
     def load_processed_coins(self):
         """Daha önce işlenmiş coinleri yükle - Set formatında symbols döndür"""
         try:
-            if os.path.exists(self.processed_coins_file):
-                with open(self.processed_coins_file, 'r', encoding='utf-8') as f:
-                    processed_list = json.load(f)
-                    # Symbol'leri set olarak döndür
-                    return {item['symbol'] for item in processed_list if 'symbol' in item}
-            return set()
+            return state_store.get_processed_coins()
         except Exception as e:
             print(f"⚠️ Processed coins yükleme hatası: {e}")
             return set()
@@ -649,35 +659,46 @@ class UpbitAnnouncementScraper:
     def save_processed_coin(self, symbol, title, announcement_data):
         """Yeni işlenmiş coin'i kaydet"""
         try:
-            processed_coins = self.load_processed_coins()
-            
-            new_entry = {
-                'symbol': symbol,
-                'title': title,
-                'perp_symbol': symbol + 'USDT_UMCBL',
-                'processed_at': datetime.now().isoformat(),
-                'announcement_data': announcement_data
-            }
-            
-            processed_coins.append(new_entry)
-            
-            with open(self.processed_coins_file, 'w', encoding='utf-8') as f:
-                json.dump(processed_coins, f, indent=2, ensure_ascii=False)
+            state_store.mark_coin_processed(symbol, title, symbol + 'USDT_UMCBL', announcement_data)
             
             print(f"💾 İşlenmiş coin kaydedildi: {symbol} -> {symbol}USDT_UMCBL")
             
         except Exception as e:
             print(f"❌ Processed coin kaydetme hatası: {e}")
     
+    def claim_coin(self, symbol, title, announcement_data, emit=None):
+        """
+        Coin'i lease doğrulamasıyla aynı transaction'da işlenmiş say; emit() sinyali (new_coin_output.txt)
+        aynı transaction içinde yazar, claim sadece sinyal yazıldıysa commit edilir.
+        Sadece ilk claim eden lider tetikler: standby / lease'i kaybetmiş eski lider asla tekrar üretmez.
+        İki adım arasında çökme claim'i geri alır: standby aynı sinyali tekrar yazar (engine sembol
+        bazında tekilleştirir), sinyal kaybolmaz.
+        """
+        try:
+            with self.lease.fenced():
+                claimed = state_store.mark_coin_processed(symbol, title, symbol + 'USDT_UMCBL', announcement_data)
+                if claimed and emit is not None:
+                    emit()
+        except LeaseLost:
+            print(f"🛑 Lider değil, {symbol} tetiklenmedi")
+            return False
+        except Exception as e:
+            print(f"❌ Coin claim / sinyal yazma hatası: {e}")
+            return False
+        
+        if claimed:
+            service_heartbeat.incr('signals')
+            print(f"💾 İşlenmiş coin kaydedildi: {symbol} -> {symbol}USDT_UMCBL")
+        else:
+            print(f"🔄 {symbol} başka bir replica tarafından zaten tetiklendi")
+        return claimed
+    
     def is_coin_already_processed(self, symbol):
         """Coin daha önce işlenmiş mi kontrol et"""
-        processed_coins = self.load_processed_coins()
-        
-        for entry in processed_coins:
-            if entry.get('symbol') == symbol:
-                processed_at = entry.get('processed_at', '')
-                print(f"⚠️ {symbol} daha önce işlenmiş: {processed_at}")
-                return True
+        entry = state_store.get_processed_coin(symbol)
+        if entry:
+            print(f"⚠️ {symbol} daha önce işlenmiş: {entry.get('processed_at', '')}")
+            return True
         
         return False
     
@@ -769,18 +790,22 @@ class UpbitAnnouncementScraper:
                             for symbol in new_symbols:
                                 perp_symbol = symbol + "USDT_UMCBL"
                                 
-                                # PERP dosyasına yaz
+                                # Latency journal: sinyal kimliği dosyadan önce kaydedilir
+                                signal_id = trade_journal.new_signal_id(perp_symbol)
+                                trade_journal.mark(signal_id, "detection", source="announcement_scraper")
+                                
+                                # PERP dosyasına claim ile aynı (lease altındaki) transaction'da yaz
                                 perp_file = notification_config.new_coin_output_txt
-                                try:
+                                
+                                def emit(perp_symbol=perp_symbol, signal_id=signal_id, perp_file=perp_file):
+                                    state_store.set_meta("last_signal", {"symbol": perp_symbol, "signal_id": signal_id})
                                     with open(perp_file, 'w') as f:
                                         f.write(perp_symbol)
-                                    print(f"📝 PERP: {perp_symbol} → {perp_file}")
-                                    
-                                    # Processed coins'e ekle
-                                    self.save_processed_coin(symbol, title, perp_symbol)
-                                    
-                                except Exception as e:
-                                    print(f"⚠️ PERP dosya yazma hatası: {e}")
+                                
+                                if not self.claim_coin(symbol, title, perp_symbol, emit):
+                                    continue
+                                trade_journal.mark(signal_id, "signal_write")
+                                print(f"📝 PERP: {perp_symbol} → {perp_file}")
                         else:
                             print(f"🔄 Tüm coinler daha önce işlenmiş: {', '.join(symbols)}")
                     else:
@@ -802,10 +827,15 @@ class UpbitAnnouncementScraper:
         
         while True:
             try:
+                # Hot standby: lease bizde değilse tarama yapma, devralana kadar bekle
+                if not self.lease.is_leader:
+                    self.lease.wait_for_leadership()
+                
                 print(f"\n⏰ {datetime.now().strftime('%Y-%m-%d %H:%M:%S')} - Duyuru kontrolü...")
                 
                 # Duyuruları al
                 announcements = self.get_announcements()
+                service_heartbeat.incr('polls')
                 
                 if announcements:
                     print(f"📢 {len(announcements)} duyuru alındı")
@@ -836,17 +866,20 @@ class UpbitAnnouncementScraper:
                                     perp_symbol = main_symbol + "USDT_UMCBL"
                                     perp_file = os.path.join(self.BASE_DIR, "PERP", "new_coin_output.txt")
                                     
-                                    try:
+                                    def emit():
                                         with open(perp_file, 'w') as f:
                                             f.write(perp_symbol)
+                                    
+                                    # İşlenmiş coin olarak kaydet ve sinyali yaz (lease altında, tek transaction)
+                                    if not self.claim_coin(main_symbol, announcement['title'], {
+                                        'date': announcement['date'],
+                                        'link': announcement['link']
+                                    }, emit):
+                                        continue
+                                    
+                                    try:
                                         print(f"🚀 TETİKLENDİ! PERP formatında kaydedildi: {perp_symbol}")
                                         
-                                        # İşlenmiş coin olarak kaydet
-                                        self.save_processed_coin(main_symbol, announcement['title'], {
-                                            'date': announcement['date'],
-                                            'link': announcement['link']
-                                        })
-                                        
                                         # Kayıt dosyasına da ekle
                                         coin_data = [{
                                             'symbols': symbols,
@@ -896,6 +929,7 @@ class UpbitAnnouncementScraper:
                 
                 else:
                     print("⚠️ Duyuru alınamadı")
+                    service_heartbeat.incr('fetch_errors')
                     consecutive_errors += 1
                 
                 # Son kontrol zamanını güncelle
@@ -909,7 +943,7 @@ class UpbitAnnouncementScraper:
                     wait_time = 60  # Normal: 1 dakikada bir kontrol
                     print(f"💤 {wait_time//60} dakika bekleniyor...")
                 
-                time.sleep(wait_time)
+                service_heartbeat.sleep(wait_time)
                 
             except KeyboardInterrupt:
                 print("\n👋 Duyuru tarayıcısı durduruldu")
@@ -919,12 +953,27 @@ class UpbitAnnouncementScraper:
                 consecutive_errors += 1
                 wait_time = min(60 + (consecutive_errors * 30), 300)  # Max 5 dakika
                 print(f"⏳ {wait_time//60} dakika bekleyip tekrar deneniyor...")
-                time.sleep(wait_time)
+                service_heartbeat.sleep(wait_time)
 
 def main():
     """Ana fonksiyon"""
-    scraper = UpbitAnnouncementScraper()
-    scraper.run_continuous()
+    parser = argparse.ArgumentParser(description="Upbit duyuru tarayıcısı")
+    parser.add_argument('--replica', default='a', help="Hot standby replica etiketi (supervisor: a / b)")
+    args = parser.parse_args()
+    
+    lease = LeaderLease(LEASE_NAME, holder=f"replica-{args.replica}:{os.getpid()}")
+    
+    def shutdown(signum, frame):
+        # Lease'i bırak: standby TTL'i beklemeden devralır
+        lease.release()
+        sys.exit(0)
+    
+    signal.signal(signal.SIGTERM, shutdown)
+    scraper = UpbitAnnouncementScraper(lease)
+    try:
+        scraper.run_continuous()
+    finally:
+        lease.release()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
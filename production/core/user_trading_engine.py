@@ -18,10 +18,15 @@ import base64
 from datetime import datetime, timedelta
 from cryptography.fernet import Fernet
 
+from service_heartbeat import service_heartbeat
+
 # Setup logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Ana döngü iterasyonu 30 sn bekleme + kullanıcı sorgusu; bu kadar ilerlemezse heartbeat kesilir
+LOOP_STALL_AFTER = 120
+
 class UserTradingEngine:
     def __init__(self):
         self.BASE_DIR = os.getcwd()
@@ -234,12 +239,27 @@ class UserTradingEngine:
         except Exception as e:
             logger.error(f"Error checking new coin signal for user {user_id}: {e}")
     
+    def _trade_id_for(self, user_id: int, symbol: str) -> str:
+        """Latency journal için işlem kimliği: tracker/scraper sinyaline bağlanır"""
+        from state_store import state_store
+        from trade_journal import trade_journal
+        try:
+            signal = state_store.get_meta("last_signal") or {}
+        except Exception:
+            signal = {}
+        signal_id = signal.get("signal_id") if signal.get("symbol") == symbol else None
+        return f"{signal_id or trade_journal.new_signal_id(symbol)}/{user_id}"
+
     def execute_user_trade(self, user_id: int, symbol: str, trade_type: str):
         """Execute trade for specific user with their credentials"""
+        from trade_journal import trade_journal
+        trade_id = self._trade_id_for(user_id, symbol)
+        trade_journal.mark(trade_id, "engine_pickup", trade_type=trade_type)
         try:
             # Get user's API keys and settings
             api_keys = self.get_user_api_keys(user_id)
             settings = self.get_user_settings(user_id)
+            trade_journal.mark(trade_id, "credential_load")
             
             if not api_keys or not api_keys['is_configured']:
                 logger.error(f"No API keys configured for user {user_id}")
@@ -247,6 +267,10 @@ class UserTradingEngine:
                 
             # Create user-specific environment
             user_env = os.environ.copy()
+            # long.py venue router'ı Gate.io anahtarı varsa kesin redde Gate.io'ya düşer;
+            # user_settings'te kullanıcı bazlı Gate.io anahtarı yok, operatör anahtarı kullanıcılara sızmasın
+            user_env.pop('GATEIO_API_KEY', None)
+            user_env.pop('GATEIO_SECRET_KEY', None)
             user_env['BITGET_API_KEY'] = api_keys['api_key']
             user_env['BITGET_SECRET_KEY'] = api_keys['secret_key']
             user_env['BITGET_PASSPHRASE'] = api_keys['passphrase']
@@ -256,6 +280,7 @@ class UserTradingEngine:
             user_env['USER_ID'] = str(user_id)
             user_env['TRADE_TYPE'] = trade_type
             user_env['TRADE_SYMBOL'] = symbol
+            user_env['TRADE_ID'] = trade_id
             
             # Create user-specific symbol file
             user_dir = os.path.join(self.users_dir, str(user_id))
@@ -296,10 +321,12 @@ class UserTradingEngine:
             logger.info(f"Long script output for user {user_id}: {result.stdout}")
             if result.returncode == 0:
                 logger.info(f"Trade executed successfully for user {user_id}: {symbol}")
+                service_heartbeat.incr('orders')
                 # İşlem başarılı - Telegram bildirimi gönder
                 self.send_trade_notification(user_id, symbol, "SUCCESS", settings, result.stdout)
             else:
                 logger.error(f"Long script failed for user {user_id}: {result.stderr}")
+                service_heartbeat.incr('order_errors')
                 # İşlem başarısız - Hata bildirimi gönder
                 self.send_trade_notification(user_id, symbol, "ERROR", settings, result.stderr)
                 
@@ -325,29 +352,23 @@ class UserTradingEngine:
             order_id = "N/A"
             amount = settings.get('trading_amount', 'N/A')
             
-            # Order bilgilerini JSON dosyalarından al (daha güvenilir)
+            # Order bilgilerini state store'dan al (kullanıcıya özel, daha güvenilir)
             if status == "SUCCESS":
                 try:
-                    # Order ID ve detaylarını order_id.json'dan al
-                    order_id_file = os.path.join(self.BASE_DIR, "PERP", "order_id.json")
-                    if os.path.exists(order_id_file):
-                        with open(order_id_file, 'r') as f:
-                            order_data = json.load(f)
-                            if 'data' in order_data and 'orderId' in order_data['data']:
-                                order_id = order_data['data']['orderId']
-                                
-                    # Order fills bilgilerini order_fills.json'dan al
-                    order_fills_file = os.path.join(self.BASE_DIR, "PERP", "order_fills.json")
-                    if os.path.exists(order_fills_file):
-                        with open(order_fills_file, 'r') as f:
-                            fills_data = json.load(f)
-                            if 'data' in fills_data and fills_data['data']:
-                                fill = fills_data['data'][0]  # İlk fill
-                                price = f"${float(fill.get('price', 0)):.4f}"
-                                actual_amount = f"{float(fill.get('sizeQty', amount)):.4f}"
-                                
+                    from state_store import state_store
+
+                    order_data = state_store.latest_order("bitget", user_id) or {}
+                    if isinstance(order_data.get('data'), dict) and 'orderId' in order_data['data']:
+                        order_id = order_data['data']['orderId']
+
+                    fills_data = state_store.latest_fills("bitget", user_id) or {}
+                    if fills_data.get('data'):
+                        fill = fills_data['data'][0]  # İlk fill
+                        price = f"${float(fill.get('price', 0)):.4f}"
+                        actual_amount = f"{float(fill.get('sizeQty', amount)):.4f}"
+
                 except Exception as e:
-                    logger.warning(f"Error reading order files: {e}")
+                    logger.warning(f"Error reading order state: {e}")
                     # Fallback: console output'tan parse et
                     try:
                         import re
@@ -388,6 +409,12 @@ class UserTradingEngine:
                     "message": f"❌ İŞLEM HATASI!\n\n💰 Coin: {symbol}\n💵 Miktar: {amount} USDT\n🚨 Hata: Sistem hatası\n🕐 Zaman: {datetime.now().strftime('%H:%M:%S')}\n\n🔄 Lütfen API anahtarlarını ve ayarlarını kontrol edin."
                 }
             
+            # Kalıcı outbox'a yaz; gönderimi (rate limit'li) notification sender process'i yapar
+            from notification_outbox import notification_outbox
+            if notification_outbox.put(user_id, notification_data['message']) is not None:
+                logger.info(f"📱 Trade notification queued for user {user_id}: {symbol} - {status}")
+                return
+            
             # Bildirim dosyasına güvenle yaz (file lock ile)
             notification_file = notification_config.telegram_notifications_file
             
@@ -417,48 +444,67 @@ class UserTradingEngine:
             logger.error(f"Error sending trade notification for user {user_id}: {e}")
     
     def execute_user_emergency_stop(self, user_id: int):
-        """Execute emergency stop for specific user"""
+        """Execute emergency stop for specific user (in-process, pooled connection)"""
         try:
+            from emergency_stop import emergency_stop_executor, format_summary
+            from bitget_client import BitgetCredentials
+            
             # Get user's API keys
             api_keys = self.get_user_api_keys(user_id)
             
             if not api_keys or not api_keys['is_configured']:
                 logger.error(f"No API keys configured for user {user_id}")
                 return
-                
-            # Create user-specific environment
-            user_env = os.environ.copy()
-            user_env['BITGET_API_KEY'] = api_keys['api_key']
-            user_env['BITGET_SECRET_KEY'] = api_keys['secret_key']
-            user_env['BITGET_PASSPHRASE'] = api_keys['passphrase']
-            user_env['USER_ID'] = str(user_id)
             
             logger.info(f"Executing emergency stop for user {user_id}")
+            credentials = BitgetCredentials(api_keys['api_key'], api_keys['secret_key'],
+                                            api_keys['passphrase'], user_id=str(user_id))
+            summary = emergency_stop_executor.run({user_id: credentials})
             
-            # Execute close positions script
-            close_script = os.path.join(self.BASE_DIR, "PERP", "kapat.py")
-            result = subprocess.run(
-                ["python3", close_script],
-                capture_output=True,
-                text=True,
-                timeout=60,
-                env=user_env,
-                cwd=self.BASE_DIR
-            )
-            
-            if result.returncode == 0:
-                logger.info(f"Emergency stop executed successfully for user {user_id}")
+            if not summary['failed'] and not summary['timed_out']:
+                logger.info(f"Emergency stop executed successfully for user {user_id} "
+                            f"({summary['positions']} positions, {summary['latency_max_ms']:.0f}ms)")
             else:
-                logger.error(f"Emergency stop failed for user {user_id}: {result.stderr}")
+                logger.error(f"Emergency stop failed for user {user_id}:\n{format_summary(summary)}")
                 
         except Exception as e:
             logger.error(f"Error executing emergency stop for user {user_id}: {e}")
     
+    def execute_all_users_emergency_stop(self) -> Dict[str, Any]:
+        """Market-wide panic stop: every user's positions closed concurrently under one deadline"""
+        try:
+            from emergency_stop import emergency_stop_users
+            return emergency_stop_users(db_path=self.db_path)
+        except Exception as e:
+            logger.error(f"Error executing all-users emergency stop: {e}")
+            return {}
+    
+    def watch_global_emergency_stop(self):
+        """users/emergency_stop_all.txt oluşturulunca tüm kullanıcılar için acil durdurma"""
+        signal_file = os.path.join(self.users_dir, "emergency_stop_all.txt")
+        while self.running:
+            try:
+                if os.path.exists(signal_file):
+                    os.remove(signal_file)
+                    logger.warning("🚨 Global emergency stop signal detected")
+                    self.execute_all_users_emergency_stop()
+            except Exception as e:
+                logger.error(f"Error in global emergency stop watcher: {e}")
+            time.sleep(0.5)
+    
     def start(self):
         """Start the user trading engine"""
         self.running = True
         logger.info("Starting User Trading Engine...")
         
+        # Acil durdurma bağlantı havuzunu önceden ısıt, global sinyal dosyasını izle
+        try:
+            from emergency_stop import emergency_stop_executor
+            emergency_stop_executor.warm()
+        except Exception as e:
+            logger.warning(f"Emergency stop pool warm-up failed: {e}")
+        threading.Thread(target=self.watch_global_emergency_stop, daemon=True).start()
+        
         while self.running:
             try:
                 # Get current active users
@@ -483,11 +529,12 @@ class UserTradingEngine:
                     if user_id in self.user_threads:
                         del self.user_threads[user_id]
                 
-                time.sleep(30)  # Check for new/removed users every 30 seconds
+                service_heartbeat.incr('polls')
+                service_heartbeat.sleep(30)  # Check for new/removed users every 30 seconds
                 
             except Exception as e:
                 logger.error(f"Error in main trading engine loop: {e}")
-                time.sleep(10)
+                service_heartbeat.sleep(10)
     
     def stop(self):
         """Stop the user trading engine"""
@@ -508,6 +555,8 @@ class UserTradingEngine:
         """Heartbeat thread'ini başlat"""
         heartbeat_thread = threading.Thread(target=self.heartbeat_writer, daemon=True)
         heartbeat_thread.start()
+        # production_supervisor altında: canlılık (ana döngü ilerlemesine bağlı) + polls/orders sayaçları
+        service_heartbeat.start(stall_after=LOOP_STALL_AFTER)
         logger.info("💓 User Trading Engine heartbeat başlatıldı")
 
 if __name__ == "__main__":
@@ -0,0 +1,372 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Multi-Venue Order Router
+Bitget ve Gate.io arasında listing emirlerini yönlendirir.
+
+- Her venue için canlı EWMA gecikme ve erişilebilirlik istatistikleri tutulur
+- Hangi venue'nün hangi kontratı listelediği bellekte tutulur
+- Venue seçimi tamamen bellek içi durumdan yapılır (mikro saniye mertebesi)
+- Emir tek (en iyi) venue'ye ya da venue'ler arasında bölünerek gönderilir
+- Başka venue'ye sadece emrin gönderilmediği kesin olan hatalarda düşülür (listelenmemiş,
+  minimum altı, borsanın açık reddi); timeout / ağ / 5xx sonrası emir client OID ile sorgulanır
+- Base URL'ler enjekte edilebilir: debug/fake_exchange_server.py ile test edilir
+
+Üretimde long.py açılış emrini bu router üzerinden gönderir (Bitget önce, depth planlı
+parametrelerle; Gate.io anahtarı varsa kesin red durumunda Gate.io'ya düşülür).
+"""
+import os
+import sys
+import time
+import uuid
+import asyncio
+import logging
+from decimal import Decimal
+from typing import Dict, List, Optional, Tuple
+
+import aiohttp
+
+_CORE_DIR = os.path.dirname(os.path.realpath(__file__))
+sys.path.append(os.path.join(_CORE_DIR, '..', 'exchanges', 'PERP'))
+sys.path.append(os.path.join(_CORE_DIR, '..', 'exchanges', 'gateio'))
+from bitget_client import BitgetClient, BitgetAPIError, size_from_notional
+from gateio_executor import GateioClient, GateioAPIError, HOST as GATEIO_HOST
+from contract_precision import contract_precision_cache
+
+logger = logging.getLogger(__name__)
+
+VENUE_ERRORS = (BitgetAPIError, GateioAPIError, aiohttp.ClientError, asyncio.TimeoutError)
+
+
+def is_rejection(error: Exception) -> bool:
+    """Emrin borsaya ulaşmadığı kesin mi? (başka venue'de denemek güvenli)"""
+    if isinstance(error, (ValueError, KeyError)):
+        # Listelenmemiş / minimum altı / credential yok: gönderimden önce
+        return True
+    if isinstance(error, (BitgetAPIError, GateioAPIError)):
+        # 4xx ve Bitget'in 200 + hata kodu yanıtları açık red; 5xx sonrası emir oluşmuş olabilir
+        return error.status < 500
+    return False
+
+
+class VenueStats:
+    """Tek venue için canlı gecikme / erişilebilirlik istatistiği"""
+
+    __slots__ = ('name', 'ewma_latency', 'samples', 'successes', 'failures',
+                 'consecutive_failures', 'down_until', 'last_error')
+
+    def __init__(self, name: str, initial_latency: float = 0.25):
+        self.name = name
+        self.ewma_latency = initial_latency
+        self.samples = 0
+        self.successes = 0
+        self.failures = 0
+        self.consecutive_failures = 0
+        self.down_until = 0.0
+        self.last_error = None
+
+    def to_dict(self) -> Dict:
+        return {
+            'venue': self.name,
+            'ewma_latency_ms': round(self.ewma_latency * 1000, 2),
+            'samples': self.samples,
+            'successes': self.successes,
+            'failures': self.failures,
+            'consecutive_failures': self.consecutive_failures,
+            'available': time.monotonic() >= self.down_until,
+            'last_error': self.last_error,
+        }
+
+
+class BitgetVenue:
+    """Bitget adaptörü: base asset (örn. 'ABC') -> ABCUSDT"""
+
+    name = "bitget"
+
+    def __init__(self, session: aiohttp.ClientSession, host: str = None):
+        self.session = session
+        self.host = host
+        self._contracts: Dict[str, Dict] = {}
+        # base asset -> hazır emir gövdesi (long.py depth planı); yoksa market emir
+        self._prepared: Dict[str, Dict] = {}
+
+    def symbol(self, base: str) -> str:
+        return f"{base}USDT"
+
+    async def ping(self):
+        await BitgetClient(self.session, host=self.host)._request("GET", "/api/v2/public/time")
+
+    async def list_bases(self) -> List[str]:
+        contracts = await BitgetClient(self.session, host=self.host).list_contracts()
+        self._contracts = {c['symbol']: c for c in contracts if c.get('quoteCoin') == 'USDT'}
+        return [c['baseCoin'] for c in self._contracts.values()]
+
+    def prepare(self, base: str, body: Dict):
+        """Sonraki place_long için hazır emir gövdesi ver (size/fiyat çağıran tarafta hesaplandı)"""
+        self._prepared[base] = body
+
+    async def place_long(self, credentials, base: str, notional_usdt: float, client_oid: str) -> Dict:
+        client = BitgetClient(self.session, credentials, host=self.host)
+        symbol = self.symbol(base)
+        prepared = self._prepared.get(base)
+        if prepared is not None:
+            order = await client.place_order(dict(prepared, symbol=symbol, clientOid=client_oid))
+            return {'symbol': symbol, 'size': str(prepared['size']), 'order': order}
+        contract = self._contracts.get(symbol)
+        if contract is None:
+            contracts = await client.list_contracts()
+            self._contracts = {c['symbol']: c for c in contracts if c.get('quoteCoin') == 'USDT'}
+            contract = self._contracts.get(symbol, {})
+        ticker = await client.get_ticker(symbol)
+        size = size_from_notional(contract, notional_usdt, float(ticker['lastPr']))
+        if size <= 0:
+            raise ValueError(f"{symbol}: notional {notional_usdt} below minimum size")
+        order = await client.place_market_order(symbol, size, client_oid=client_oid)
+        return {'symbol': symbol, 'size': str(size), 'order': order}
+
+    async def find_long(self, credentials, base: str, client_oid: str) -> Optional[Dict]:
+        return await BitgetClient(self.session, credentials, host=self.host).find_order(self.symbol(base), client_oid)
+
+
+class GateioVenue:
+    """Gate.io adaptörü: base asset (örn. 'ABC') -> ABC_USDT"""
+
+    name = "gateio"
+
+    def __init__(self, session: aiohttp.ClientSession, host: str = None, price_markup: float = 1.03):
+        self.session = session
+        self.host = host
+        self.price_markup = price_markup
+
+    def _client(self, credentials=None) -> GateioClient:
+        return GateioClient(self.session, credentials, host=self.host or GATEIO_HOST)
+
+    def symbol(self, base: str) -> str:
+        return f"{base}_USDT"
+
+    async def ping(self):
+        await self._client()._request("GET", "/spot/time")
+
+    async def list_bases(self) -> List[str]:
+        contracts = await self._client().list_contracts()
+        contract_precision_cache.load_catalog(contracts)
+        return [c['name'].rsplit('_', 1)[0] for c in contracts if c.get('name', '').endswith('_USDT')]
+
+    def text_id(self, client_oid: str) -> str:
+        # Gate.io özel id'leri "t-" ile başlamalı ve en fazla 28 karakter olmalı
+        return f"t-{client_oid}"[:28]
+
+    async def place_long(self, credentials, base: str, notional_usdt: float, client_oid: str) -> Dict:
+        client = self._client(credentials)
+        symbol = self.symbol(base)
+        contract = await client.get_contract(symbol)
+        precision = contract_precision_cache.update_from_contract(contract)
+        last_price = Decimal(str(contract['last_price']))
+        size = precision.floor_size(Decimal(str(notional_usdt)) / (last_price * precision.quanto_multiplier))
+        if size <= 0:
+            raise ValueError(f"{symbol}: notional {notional_usdt} below minimum size")
+        price = precision.round_price(last_price * Decimal(str(self.price_markup)))
+        order = await client.place_order(symbol, size, price, text=self.text_id(client_oid))
+        return {'symbol': symbol, 'size': size, 'order': order}
+
+    async def find_long(self, credentials, base: str, client_oid: str) -> Optional[Dict]:
+        return await self._client(credentials).find_order(self.text_id(client_oid))
+
+
+class VenueRouter:
+    """Gecikme ve erişilebilirliğe göre venue seçen emir router'ı"""
+
+    def __init__(self, venues: List, ewma_alpha: float = 0.2, failure_threshold: int = 3,
+                 cooldown: float = 30.0, split_min_usdt: float = 5.0, lookup_delay: float = 0.5):
+        self.venues = {venue.name: venue for venue in venues}
+        self.stats = {venue.name: VenueStats(venue.name) for venue in venues}
+        self.ewma_alpha = ewma_alpha
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.split_min_usdt = split_min_usdt
+        # Belirsiz sonuçtan sonra sorgulamadan önce bekle: borsa emri henüz indekslememiş olabilir
+        self.lookup_delay = lookup_delay
+        # base asset -> bu asset'i listeleyen venue isimleri
+        self.listings: Dict[str, Tuple[str, ...]] = {}
+
+    # ------------------------------------------------------------------
+    # İstatistik kaydı
+    # ------------------------------------------------------------------
+    def record_success(self, venue: str, latency: float):
+        stats = self.stats[venue]
+        stats.samples += 1
+        stats.successes += 1
+        stats.consecutive_failures = 0
+        stats.down_until = 0.0
+        stats.ewma_latency += self.ewma_alpha * (latency - stats.ewma_latency)
+
+    def record_failure(self, venue: str, error: Exception):
+        stats = self.stats[venue]
+        stats.failures += 1
+        stats.consecutive_failures += 1
+        stats.last_error = str(error)[:200]
+        if stats.consecutive_failures >= self.failure_threshold:
+            stats.down_until = time.monotonic() + self.cooldown
+            logger.warning(f"⚠️ Venue {venue} marked unavailable for {self.cooldown:.0f}s: {error}")
+
+    async def _timed(self, venue: str, coro):
+        """Venue çağrısını zamanla ve istatistiğe işle"""
+        started = time.perf_counter()
+        try:
+            result = await coro
+        except VENUE_ERRORS as e:
+            self.record_failure(venue, e)
+            raise
+        self.record_success(venue, time.perf_counter() - started)
+        return result
+
+    # ------------------------------------------------------------------
+    # Listing kataloğu ve gecikme ölçümü
+    # ------------------------------------------------------------------
+    async def refresh_listings(self) -> Dict[str, Tuple[str, ...]]:
+        """Tüm venue kataloglarını eşzamanlı çek ve listing haritasını yeniden kur"""
+        names = list(self.venues)
+        results = await asyncio.gather(*(self._timed(name, self.venues[name].list_bases()) for name in names),
+                                       return_exceptions=True)
+        listings: Dict[str, List[str]] = {}
+        for name, bases in zip(names, results):
+            if isinstance(bases, Exception):
+                logger.error(f"❌ {name} contract catalog failed: {bases}")
+                # Önceki bilinen listingleri koru
+                bases = [base for base, venues in self.listings.items() if name in venues]
+            for base in bases:
+                listings.setdefault(base, []).append(name)
+        self.listings = {base: tuple(venues) for base, venues in listings.items()}
+        logger.info(f"📋 Listings refreshed: {len(self.listings)} assets across {len(names)} venues")
+        return self.listings
+
+    def mark_listed(self, base: str, venue: str):
+        """Katalog yenilenmeden önce öğrenilen yeni listing'i ekle"""
+        venues = self.listings.get(base, ())
+        if venue not in venues:
+            self.listings[base] = venues + (venue,)
+
+    async def probe(self):
+        """Tüm venue'lere hafif bir istek at ve gecikmeyi güncelle"""
+        await asyncio.gather(*(self._timed(name, venue.ping()) for name, venue in self.venues.items()),
+                             return_exceptions=True)
+
+    async def run_probes(self, interval: float = 5.0):
+        """Arka planda periyodik gecikme ölçümü"""
+        while True:
+            await self.probe()
+            await asyncio.sleep(interval)
+
+    # ------------------------------------------------------------------
+    # Seçim (sadece bellek içi durum)
+    # ------------------------------------------------------------------
+    def candidates(self, base: str, allowed=None) -> List[str]:
+        """Asset'i listeleyen, erişilebilir venue'ler (en düşük gecikme önce)"""
+        now = time.monotonic()
+        stats = self.stats
+        venues = [name for name in self.listings.get(base, ())
+                  if stats[name].down_until <= now and (allowed is None or name in allowed)]
+        venues.sort(key=lambda name: stats[name].ewma_latency)
+        return venues
+
+    def select(self, base: str, allowed=None) -> Optional[str]:
+        """En iyi venue'yü seç; uygun venue yoksa None"""
+        now = time.monotonic()
+        best = None
+        best_latency = float('inf')
+        for name in self.listings.get(base, ()):
+            stats = self.stats[name]
+            if stats.down_until > now or (allowed is not None and name not in allowed):
+                continue
+            if stats.ewma_latency < best_latency:
+                best, best_latency = name, stats.ewma_latency
+        return best
+
+    def allocate(self, base: str, notional_usdt: float, split: bool = False, allowed=None) -> List[Tuple[str, float]]:
+        """Tutarı venue'lere dağıt: split=False ise tamamı en iyi venue'ye, aksi halde 1/gecikme ağırlıklı"""
+        venues = self.candidates(base, allowed)
+        if not venues:
+            return []
+        if not split or len(venues) == 1:
+            return [(venues[0], notional_usdt)]
+
+        weights = {name: 1.0 / max(self.stats[name].ewma_latency, 1e-4) for name in venues}
+        # Minimum tutarın altına düşen venue'leri (en yavaştan başlayarak) çıkar
+        while len(venues) > 1:
+            total = sum(weights[name] for name in venues)
+            slowest = venues[-1]
+            if notional_usdt * weights[slowest] / total >= self.split_min_usdt:
+                break
+            venues.pop()
+        total = sum(weights[name] for name in venues)
+        return [(name, notional_usdt * weights[name] / total) for name in venues]
+
+    # ------------------------------------------------------------------
+    # Emir yönlendirme
+    # ------------------------------------------------------------------
+    async def route_order(self, credentials: Dict, base: str, notional_usdt: float,
+                          split: bool = False) -> List[Dict]:
+        """
+        Bir kullanıcının listing emrini yönlendir.
+        credentials: {venue_name: BitgetCredentials/GateioCredentials}
+        Tek venue modunda sıradaki venue sadece emrin gönderilmediği kesinse denenir;
+        sonuç belirsiz kalırsa ('uncertain') durulur, aynı emir iki venue'de açılmaz.
+        """
+        allowed = set(credentials)
+        plan = self.allocate(base, notional_usdt, split=split, allowed=allowed)
+        if not plan:
+            return [{'success': False, 'error': f"No available venue lists {base}"}]
+
+        if split:
+            return list(await asyncio.gather(*(self._place(credentials, venue, base, amount)
+                                               for venue, amount in plan)))
+
+        results = []
+        for venue in self.candidates(base, allowed):
+            result = await self._place(credentials, venue, base, notional_usdt)
+            results.append(result)
+            if result['success'] or not result.get('rejected'):
+                break
+        return results
+
+    async def _place(self, credentials: Dict, venue: str, base: str, notional_usdt: float) -> Dict:
+        client_oid = uuid.uuid4().hex[:24]
+        result = {'venue': venue, 'notional_usdt': round(notional_usdt, 4), 'client_oid': client_oid,
+                  'success': False}
+        adapter = self.venues[venue]
+        try:
+            result.update(await self._timed(venue, adapter.place_long(credentials[venue], base, notional_usdt,
+                                                                      client_oid)))
+            result['success'] = True
+            return result
+        except (*VENUE_ERRORS, ValueError, KeyError) as e:
+            logger.error(f"❌ {venue} order for {base} failed: {e}")
+            result['error'] = str(e)
+            if is_rejection(e):
+                result['rejected'] = True
+                return result
+
+        # Timeout / ağ / 5xx: emir borsaya ulaşmış olabilir, client OID ile sor
+        await asyncio.sleep(self.lookup_delay)
+        try:
+            order = await adapter.find_long(credentials[venue], base, client_oid)
+        except VENUE_ERRORS as e:
+            logger.error(f"❌ {venue} order {client_oid} for {base} status unknown: {e}")
+            result['uncertain'] = True
+            return result
+        if order:
+            logger.warning(f"⚠️ {venue} order {client_oid} for {base} was placed despite the error")
+            result.update({'symbol': adapter.symbol(base), 'order': order, 'success': True, 'recovered': True})
+        else:
+            result['rejected'] = True
+        return result
+
+    def get_stats(self) -> List[Dict]:
+        return [stats.to_dict() for stats in self.stats.values()]
+
+
+def create_default_router(session: aiohttp.ClientSession, bitget_host: str = None,
+                          gateio_host: str = None, **kwargs) -> VenueRouter:
+    """Bitget + Gate.io ile router oluştur (host'lar test için enjekte edilebilir)"""
+    return VenueRouter([BitgetVenue(session, host=bitget_host),
+                        GateioVenue(session, host=gateio_host)], **kwargs)
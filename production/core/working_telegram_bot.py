@@ -11,6 +11,7 @@ import re
 import time
 import threading
 import queue
+from collections import deque, OrderedDict
 from datetime import datetime, timedelta
 from contextlib import contextmanager
 from typing import Optional, Dict, Any
@@ -18,6 +19,12 @@ from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
 from telegram.ext import Application, CommandHandler, CallbackQueryHandler, MessageHandler, filters, ContextTypes
 from telegram.error import BadRequest
 
+from db_indexes import ensure_hot_query_indexes
+from timer_wheel import TimerWheel
+from service_heartbeat import service_heartbeat
+from service_telemetry import format_report as telemetry_report
+from telegram_webhook import PerUserUpdateProcessor, run_webhook, webhook_config_from_env, DEFAULT_CONCURRENT_UPDATES
+
 # ✅ ROBUST INPUT VALIDATION
 class ValidationError(Exception):
     """API input validation error"""
@@ -99,17 +106,21 @@ class UserStateTimeoutManager:
     def __init__(self):
         self.user_state_timestamps = {}  # user_id -> timestamp
         self.timeout_minutes = 10  # 10 minutes timeout
+        # Son kullanma zamanları timer wheel'de: cleanup tick'i sadece süresi dolanlara dokunur
+        self._expiry = TimerWheel(resolution=1.0)
     
     def set_user_waiting_state(self, user_id: int, state: str, context: ContextTypes.DEFAULT_TYPE):
         """Set user state with timestamp"""
         context.user_data['waiting'] = state
-        self.user_state_timestamps[user_id] = time.time()
+        now = time.time()
+        self.user_state_timestamps[user_id] = now
+        self._expiry.set(user_id, now + self.timeout_minutes * 60)
         logger.info(f"✅ User {user_id} state set to '{state}' with timeout")
     
     def clear_user_state(self, user_id: int, context: ContextTypes.DEFAULT_TYPE):
         """Clear user state and timestamp"""
-        if user_id in self.user_state_timestamps:
-            del self.user_state_timestamps[user_id]
+        self.user_state_timestamps.pop(user_id, None)
+        self._expiry.discard(user_id)
         
         if context.user_data.get('waiting'):
             context.user_data['waiting'] = None
@@ -117,21 +128,21 @@ class UserStateTimeoutManager:
             logger.info(f"✅ User {user_id} state cleared")
     
     async def check_and_cleanup_expired_states(self, application):
-        """Check for expired user states and cleanup"""
+        """Check for expired user states and cleanup (O(expired · log n) per tick)"""
         try:
-            current_time = time.time()
-            timeout_seconds = self.timeout_minutes * 60
-            expired_users = []
-            
-            for user_id, timestamp in self.user_state_timestamps.items():
-                if current_time - timestamp > timeout_seconds:
-                    expired_users.append(user_id)
+            expired_users = self._expiry.pop_expired(time.time())
             
             # Cleanup expired users
             for user_id in expired_users:
                 try:
                     # Clear our tracking
-                    del self.user_state_timestamps[user_id]
+                    self.user_state_timestamps.pop(user_id, None)
+                    
+                    # Konuşma durumunu da sıfırla; yoksa kullanıcı 'api' modunda takılı kalır
+                    user_data = application.user_data.get(user_id)
+                    if user_data and user_data.get('waiting'):
+                        user_data['waiting'] = None
+                        user_data['api_failures'] = 0
                     
                     # Try to notify user if possible
                     try:
@@ -150,18 +161,17 @@ class UserStateTimeoutManager:
                     
                 except Exception as e:
                     logger.error(f"❌ Error cleaning up user {user_id}: {e}")
+            
+            return len(expired_users)
                     
         except Exception as e:
             logger.error(f"❌ Error in state cleanup task: {e}")
+            return 0
     
     def is_state_expired(self, user_id: int) -> bool:
         """Check if user state has expired"""
-        if user_id not in self.user_state_timestamps:
-            return False
-        
-        current_time = time.time()
-        timeout_seconds = self.timeout_minutes * 60
-        return (current_time - self.user_state_timestamps[user_id]) > timeout_seconds
+        expires_at = self._expiry.expires_at(user_id)
+        return expires_at is not None and time.time() > expires_at
 
 # ✅ GLOBAL TIMEOUT MANAGER INSTANCE
 timeout_manager = UserStateTimeoutManager()
@@ -173,7 +183,19 @@ class DatabaseManager:
     proper concurrency handling to prevent system crashes.
     """
     
-    def __init__(self, db_path: str, pool_size: int = 5):
+    # user_settings kolonu -> get_user_settings() anahtarı
+    SETTINGS_CACHE_KEYS = {
+        'api_key': 'api_key',
+        'secret_key': 'secret_key',
+        'passphrase': 'passphrase',
+        'amount_usdt': 'amount',
+        'leverage': 'leverage',
+        'take_profit_percent': 'take_profit',
+        'active': 'active',
+    }
+    
+    def __init__(self, db_path: str, pool_size: int = 5, batch_max_ops: int = 256,
+                 batch_window: float = 0.005, settings_cache_size: int = 1024):
         self.db_path = db_path
         self.pool_size = pool_size
         self._connection_pool = queue.Queue(maxsize=pool_size)
@@ -182,6 +204,23 @@ class DatabaseManager:
         self._write_worker_running = False
         self._shutdown = False
         
+        # Group commit: kuyruk tek transaction'da boşaltılır (tek fsync)
+        # batch_window: ilk op'tan sonra diğer op'lar için beklenecek en uzun süre
+        self.batch_max_ops = max(1, batch_max_ops)
+        self.batch_window = batch_window
+        self._metrics_lock = threading.Lock()
+        self._commit_latencies = deque(maxlen=1000)
+        self._batch_sizes = deque(maxlen=1000)
+        self._metrics = {'batches': 0, 'ops': 0, 'failed_ops': 0, 'retries': 0, 'max_batch_size': 0}
+        
+        # Read-through settings cache (LRU). Write'lar commit sonrası cache'e yazılır.
+        # _cache_generation: okuma sürerken commit olan write'ın eski değeri geri yazmasını engeller
+        self.settings_cache_size = settings_cache_size
+        self._settings_cache = OrderedDict()
+        self._cache_lock = threading.Lock()
+        self._cache_generation = 0
+        self._cache_stats = {'hits': 0, 'misses': 0, 'evictions': 0}
+        
         # Initialize connection pool
         self._init_connection_pool()
         
@@ -254,67 +293,175 @@ class DatabaseManager:
             logger.info("✅ Database write worker started")
     
     def _write_worker(self):
-        """Background worker to process write operations serially"""
+        """Background worker: drains the write queue into group-committed batches"""
         while not self._shutdown:
             try:
-                # Get write operation with timeout
+                # İlk op'u bekle, sonra batch_window boyunca kuyruğu boşalt
                 write_op = self._write_queue.get(timeout=1.0)
-                if write_op is None:  # Shutdown signal
-                    break
-                
-                # Execute write operation with retry
-                self._execute_write_with_retry(write_op)
-                self._write_queue.task_done()
-                
             except queue.Empty:
                 continue
+            
+            if write_op is None:  # Shutdown signal
+                self._write_queue.task_done()
+                break
+            
+            batch = [write_op]
+            stop_after_batch = False
+            deadline = time.monotonic() + self.batch_window
+            while len(batch) < self.batch_max_ops:
+                try:
+                    remaining = deadline - time.monotonic()
+                    write_op = self._write_queue.get(timeout=remaining) if remaining > 0 else self._write_queue.get_nowait()
+                except queue.Empty:
+                    break
+                if write_op is None:
+                    self._write_queue.task_done()
+                    stop_after_batch = True
+                    break
+                batch.append(write_op)
+            
+            try:
+                self._execute_batch_with_retry(batch)
             except Exception as e:
                 logger.error(f"❌ Write worker error: {e}")
+            finally:
+                for _ in batch:
+                    self._write_queue.task_done()
+            
+            if stop_after_batch:
+                break
     
-    def _execute_write_with_retry(self, write_op: Dict[str, Any]):
-        """Execute write operation with exponential backoff retry"""
+    def _apply_write(self, cursor: sqlite3.Cursor, conn: sqlite3.Connection, write_op: Dict[str, Any]):
+        """Tek write op'u mevcut transaction içinde uygula (commit etmez)"""
         operation = write_op['operation']
         params = write_op['params']
+        if operation == 'update_setting':
+            self._do_update_setting(cursor, conn, **params)
+        elif operation == 'save_user':
+            self._do_save_user(cursor, conn, **params)
+        else:
+            raise ValueError(f"Unknown write operation: {operation}")
+    
+    @staticmethod
+    def _notify(write_op: Dict[str, Any], success: bool, error: str = None):
+        """Op callback'ini çağır; callback hatası batch'i bozmaz"""
         callback = write_op.get('callback')
+        if not callback:
+            return
+        try:
+            if success:
+                callback(success=True)
+            else:
+                callback(success=False, error=error)
+        except Exception as e:
+            logger.error(f"❌ Write callback error: {e}")
+    
+    def _execute_batch_with_retry(self, batch: list):
+        """
+        Execute a batch of write operations in one transaction with exponential backoff retry.
+        Her op kendi SAVEPOINT'i içinde çalışır: hatalı op geri alınır, diğerleri commit edilir.
+        """
         max_retries = 5
         base_delay = 0.1  # 100ms base delay
         
         for attempt in range(max_retries):
+            results = []
             try:
                 with self.get_connection() as conn:
                     cursor = conn.cursor()
-                    
-                    if operation == 'update_setting':
-                        self._do_update_setting(cursor, conn, **params)
-                    elif operation == 'save_user':
-                        self._do_save_user(cursor, conn, **params)
-                    else:
-                        logger.error(f"❌ Unknown write operation: {operation}")
-                        return
-                    
-                    # Success - notify callback if provided
-                    if callback:
-                        callback(success=True)
-                    return
-                    
+                    started = time.perf_counter()
+                    cursor.execute('BEGIN IMMEDIATE')
+                    try:
+                        for write_op in batch:
+                            cursor.execute('SAVEPOINT write_op')
+                            try:
+                                self._apply_write(cursor, conn, write_op)
+                                cursor.execute('RELEASE SAVEPOINT write_op')
+                                results.append(None)
+                            except (ValueError, sqlite3.IntegrityError) as e:
+                                cursor.execute('ROLLBACK TO SAVEPOINT write_op')
+                                cursor.execute('RELEASE SAVEPOINT write_op')
+                                results.append(str(e))
+                        conn.commit()
+                    except Exception:
+                        conn.rollback()
+                        raise
+                    commit_latency = time.perf_counter() - started
+                break
+                
             except sqlite3.OperationalError as e:
                 if "database is locked" in str(e).lower() or "busy" in str(e).lower():
                     if attempt < max_retries - 1:
                         delay = base_delay * (2 ** attempt)  # Exponential backoff
-                        logger.warning(f"⚠️ Database busy (attempt {attempt + 1}/{max_retries}), retrying in {delay:.2f}s")
+                        logger.warning(f"⚠️ Database busy (attempt {attempt + 1}/{max_retries}), retrying batch of {len(batch)} in {delay:.2f}s")
                         time.sleep(delay)
                         continue
                 
-                logger.error(f"❌ Database operation failed after {max_retries} attempts: {e}")
-                if callback:
-                    callback(success=False, error=str(e))
-                return
+                logger.error(f"❌ Database batch of {len(batch)} failed after {attempt + 1} attempts: {e}")
+                error = str(e)
                 
             except Exception as e:
                 logger.error(f"❌ Unexpected database error: {e}")
-                if callback:
-                    callback(success=False, error=str(e))
-                return
+                error = str(e)
+            
+            self._record_batch(len(batch), None, attempt, len(batch))
+            for write_op in batch:
+                self._notify(write_op, False, error)
+            return
+        
+        # Batch commit edildi: buradan sonraki hatalar onu başarısız saymamalı (callback'ler tek sefer)
+        self._record_batch(len(batch), commit_latency, attempt, sum(1 for r in results if r))
+        for write_op, error in zip(batch, results):
+            if error:
+                logger.error(f"❌ Write operation {write_op['operation']} rejected: {error}")
+                self._notify(write_op, False, error)
+                continue
+            try:
+                self._apply_to_cache(write_op)
+            except Exception as e:
+                # Cache'i yamalayamadık: kullanıcının kaydını düşür, sonraki okuma DB'den gelsin
+                logger.error(f"❌ Cache update for {write_op['operation']} failed: {e}")
+                self.invalidate_user_settings(write_op['params'].get('user_id'))
+            self._notify(write_op, True)
+    
+    def _record_batch(self, size: int, commit_latency: Optional[float], retries: int, failed: int):
+        with self._metrics_lock:
+            self._metrics['batches'] += 1
+            self._metrics['ops'] += size
+            self._metrics['failed_ops'] += failed
+            self._metrics['retries'] += retries
+            self._metrics['max_batch_size'] = max(self._metrics['max_batch_size'], size)
+            self._batch_sizes.append(size)
+            if commit_latency is not None:
+                self._commit_latencies.append(commit_latency)
+    
+    def get_write_metrics(self) -> Dict[str, Any]:
+        """Queue depth, batch size ve commit latency metrikleri (son 1000 batch)"""
+        with self._metrics_lock:
+            metrics = dict(self._metrics)
+            latencies = sorted(self._commit_latencies)
+            sizes = list(self._batch_sizes)
+        
+        def pct(values, p):
+            return values[min(len(values) - 1, int(p / 100.0 * len(values)))] if values else 0.0
+        
+        metrics['queue_depth'] = self._write_queue.qsize()
+        metrics['avg_batch_size'] = round(sum(sizes) / len(sizes), 2) if sizes else 0.0
+        metrics['commit_ms_p50'] = round(pct(latencies, 50) * 1000, 2)
+        metrics['commit_ms_p95'] = round(pct(latencies, 95) * 1000, 2)
+        metrics['commit_ms_max'] = round(latencies[-1] * 1000, 2) if latencies else 0.0
+        return metrics
+    
+    def flush(self, timeout: float = 10.0) -> bool:
+        """Kuyruktaki tüm write op'ları commit edilene kadar bekle"""
+        deadline = time.monotonic() + timeout
+        with self._write_queue.all_tasks_done:
+            while self._write_queue.unfinished_tasks:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                self._write_queue.all_tasks_done.wait(remaining)
+        return True
     
     def _do_update_setting(self, cursor: sqlite3.Cursor, conn: sqlite3.Connection, 
                           user_id: int, key: str, value: Any):
@@ -327,8 +474,7 @@ class DatabaseManager:
         
         cursor.execute(f'UPDATE user_settings SET {key} = ? WHERE user_id = ?', 
                       (value, user_id))
-        conn.commit()
-        logger.info(f"✅ Updated {key} for user {user_id}")
+        logger.debug(f"✅ Updated {key} for user {user_id}")
     
     def _do_save_user(self, cursor: sqlite3.Cursor, conn: sqlite3.Connection, 
                      user_id: int, username: str):
@@ -337,11 +483,77 @@ class DatabaseManager:
                       (user_id, username))
         cursor.execute('INSERT OR IGNORE INTO user_settings (user_id) VALUES (?)', 
                       (user_id,))
-        conn.commit()
-        logger.info(f"✅ Saved user {user_id}")
+        logger.debug(f"✅ Saved user {user_id}")
     
     def get_user_settings(self, user_id: int) -> Optional[Dict[str, Any]]:
-        """Get user settings with retry logic"""
+        """Get user settings: cache first, database (with retry logic) on miss"""
+        with self._cache_lock:
+            cached = self._settings_cache.get(user_id)
+            if cached is not None:
+                self._settings_cache.move_to_end(user_id)
+                self._cache_stats['hits'] += 1
+                return dict(cached)
+            self._cache_stats['misses'] += 1
+            generation = self._cache_generation
+        
+        settings = self._read_user_settings(user_id)
+        if settings is not None:
+            with self._cache_lock:
+                # Okuma sırasında commit olan write varsa sonucu cache'leme
+                if generation == self._cache_generation:
+                    self._cache_put(user_id, dict(settings))
+        return settings
+    
+    def _cache_put(self, user_id: int, settings: Dict[str, Any]):
+        """_cache_lock altında çağrılır"""
+        self._settings_cache[user_id] = settings
+        self._settings_cache.move_to_end(user_id)
+        while len(self._settings_cache) > self.settings_cache_size:
+            self._settings_cache.popitem(last=False)
+            self._cache_stats['evictions'] += 1
+    
+    def _apply_to_cache(self, write_op: Dict[str, Any]):
+        """Commit edilmiş write'ı cache'e yansıt (write-through)"""
+        params = write_op['params']
+        with self._cache_lock:
+            self._cache_generation += 1
+            cached = self._settings_cache.get(params['user_id'])
+            if cached is None:
+                return
+            if write_op['operation'] == 'update_setting':
+                key = self.SETTINGS_CACHE_KEYS[params['key']]
+                value = params['value']
+                # SQLite kolon tiplerini taklit et (REAL/INTEGER affinity)
+                if key == 'active':
+                    value = bool(value)
+                elif key in ('amount', 'take_profit') and value is not None:
+                    value = float(value)
+                elif key == 'leverage' and value is not None:
+                    value = int(value)
+                elif key in ('api_key', 'secret_key', 'passphrase'):
+                    value = value or ''
+                cached[key] = value
+    
+    def invalidate_user_settings(self, user_id: int = None):
+        """Cache'ten kullanıcıyı (veya hepsini) düşür - DB dışarıdan değiştiğinde"""
+        with self._cache_lock:
+            self._cache_generation += 1
+            if user_id is None:
+                self._settings_cache.clear()
+            else:
+                self._settings_cache.pop(user_id, None)
+    
+    def get_cache_stats(self) -> Dict[str, Any]:
+        """Settings cache hit rate"""
+        with self._cache_lock:
+            stats = dict(self._cache_stats)
+            stats['size'] = len(self._settings_cache)
+        lookups = stats['hits'] + stats['misses']
+        stats['hit_rate'] = round(stats['hits'] / lookups, 4) if lookups else 0.0
+        return stats
+    
+    def _read_user_settings(self, user_id: int) -> Optional[Dict[str, Any]]:
+        """Read user settings from database with retry logic"""
         max_retries = 3
         for attempt in range(max_retries):
             try:
@@ -413,8 +625,12 @@ class DatabaseManager:
     def shutdown(self):
         """Shutdown database manager gracefully"""
         logger.info("🔄 Shutting down DatabaseManager...")
-        self._shutdown = True
+        # Bekleyen write'ları son bir batch'te commit et
         self._write_queue.put(None)  # Signal shutdown
+        self.flush(timeout=5.0)
+        self._shutdown = True
+        logger.info(f"📊 Write metrics: {self.get_write_metrics()}")
+        logger.info(f"📊 Settings cache: {self.get_cache_stats()}")
         
         # Close all pooled connections
         while not self._connection_pool.empty():
@@ -440,14 +656,20 @@ async def safe_create_task(coro, task_name: str = "unknown"):
         return None
 
 def heartbeat_writer():
-    """Health file'ını her 60 saniyede bir günceller"""
+    """Health file'ını her 60 saniyede bir günceller, 10 dakikada bir cache hit rate loglar"""
     health_file = "production/monitoring/telegram_bot_health.txt"
+    beats = 0
     while True:
         try:
             with open(health_file, 'w') as f:
                 f.write(f"{datetime.now().isoformat()}\n")
         except Exception as e:
             print(f"❌ Health file yazma hatası: {e}")
+        beats += 1
+        if beats % 10 == 0:
+            stats = bot.db_manager.get_cache_stats()
+            logger.info(f"📊 Settings cache hit rate: {stats['hit_rate']:.1%} "
+                        f"(hits={stats['hits']}, misses={stats['misses']}, size={stats['size']})")
         time.sleep(60)
 
 def start_heartbeat():
@@ -491,6 +713,8 @@ token_filter = TokenSanitizingFilter()
 logging.getLogger().addFilter(token_filter)
 
 BOT_TOKEN = os.environ.get('TELEGRAM_BOT_TOKEN')
+# Admin menüsü (servis telemetrisi) sadece bu kullanıcılara: TELEGRAM_ADMIN_IDS=123,456
+ADMIN_IDS = {int(x) for x in os.environ.get('TELEGRAM_ADMIN_IDS', '').split(',') if x.strip().isdigit()}
 
 class WorkingTelegramBot:
     def __init__(self):
@@ -531,6 +755,9 @@ class WorkingTelegramBot:
             ''')
             
             conn.commit()
+            
+            # Sıcak sorgu index'leri (long.py, user_trading_engine, task kuyruğu)
+            ensure_hot_query_indexes(conn)
             logger.info("✅ Database initialized with WAL mode")
         finally:
             conn.close()
@@ -547,7 +774,7 @@ class WorkingTelegramBot:
         self.db_manager.save_user_async(user_id, username, callback=on_save_complete)
     
     def get_user_settings(self, user_id):
-        """Kullanıcı ayarlarını getir - Robust with retry logic"""
+        """Kullanıcı ayarlarını getir - LRU cache, miss durumunda retry'li DB okuması"""
         return self.db_manager.get_user_settings(user_id)
     
     def update_setting(self, user_id, key, value):
@@ -580,6 +807,8 @@ async def send_menu(chat_id, context, user_id=None):
         
         if has_api:
             keyboard.append([InlineKeyboardButton("🧪 Test Sistemi", callback_data="test")])
+        if (user_id or chat_id) in ADMIN_IDS:
+            keyboard.append([InlineKeyboardButton("🛠️ Admin", callback_data="admin")])
         
         text = f"""🚀 **Kripto Otomatik Trading Bot**
 
@@ -622,6 +851,7 @@ async def button_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
     
     user_id = query.from_user.id
     data = query.data
+    service_heartbeat.incr('callbacks')
     
     logger.info(f"Button: {data} by user {user_id}")
     
@@ -754,6 +984,9 @@ async def button_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
             # ✅ STOP POSITION BUTTON - Close all open positions
             await handle_stop_position(query, user_id)
             
+        elif data.startswith("admin") and user_id in ADMIN_IDS:
+            await handle_admin_menu(query, data)
+            
         elif data == "back":
             # ✅ Ana menü güvenli şekilde
             await send_menu(query.message.chat_id, context, user_id)
@@ -892,6 +1125,30 @@ async def handle_stop_position(query, user_id):
             parse_mode='Markdown'
         )
 
+async def handle_admin_menu(query, data):
+    """Admin menüsü: supervisor'ın servis telemetrisi (CPU/RSS/fd/thread, sayaçlar, uyarılar)"""
+    if data == "admin":
+        keyboard = [
+            [InlineKeyboardButton("📈 Servis Telemetrisi", callback_data="admin_telemetry")],
+            [InlineKeyboardButton("🔙 Ana Menü", callback_data="back")]
+        ]
+        await query.edit_message_text(
+            "🛠️ **Admin Menüsü**\n\nSupervisor'ın servis başına kaynak ve throughput örnekleri:",
+            reply_markup=InlineKeyboardMarkup(keyboard),
+            parse_mode='Markdown'
+        )
+    elif data == "admin_telemetry":
+        # SQLite okuması event loop'u bloklamasın
+        report = await asyncio.to_thread(telemetry_report)
+        keyboard = [
+            [InlineKeyboardButton("🔄 Yenile", callback_data="admin_telemetry")],
+            [InlineKeyboardButton("🔙 Admin", callback_data="admin")]
+        ]
+        await query.edit_message_text(
+            report[:4000],
+            reply_markup=InlineKeyboardMarkup(keyboard)
+        )
+
 async def trigger_test_trade(query):
     """Test trade'i arka planda tetikle"""
     try:
@@ -1078,7 +1335,16 @@ def main():
         print("❌ TELEGRAM_BOT_TOKEN bulunamadı!")
         return
         
-    application = Application.builder().token(BOT_TOKEN).build()
+    # Webhook modu: TELEGRAM_WEBHOOK_URL ayarlıysa polling yerine gömülü aiohttp sunucusu
+    webhook = webhook_config_from_env()
+    
+    # ✅ Eşzamanlı update işleme - aynı kullanıcının update'leri sırayla işlenir
+    builder = Application.builder().token(BOT_TOKEN).concurrent_updates(
+        PerUserUpdateProcessor(int(os.getenv("TELEGRAM_CONCURRENT_UPDATES", DEFAULT_CONCURRENT_UPDATES)))
+    )
+    if webhook:
+        builder = builder.updater(None)
+    application = builder.build()
     
     # ✅ ADD GLOBAL ERROR HANDLER FIRST (highest priority)
     application.add_error_handler(global_error_handler)
@@ -1097,24 +1363,41 @@ def main():
     # Start heartbeat for supervisor health monitoring
     start_heartbeat()
     
+    # Supervisor heartbeat soketi: event loop üzerinden, loop tıkanırsa supervisor yeniden başlatır
+    async def supervisor_heartbeat(context):
+        service_heartbeat.beat()
+    
+    if service_heartbeat.enabled:
+        if application.job_queue:
+            application.job_queue.run_repeating(supervisor_heartbeat, interval=service_heartbeat.interval, first=0)
+        else:
+            service_heartbeat.start()
+    
     # ✅ PERIODIC STATE CLEANUP (will run in background when needed)
     async def periodic_state_cleanup(context):
         """Job queue task to cleanup expired user states"""
         try:
-            await timeout_manager.check_and_cleanup_expired_states(application)
-            logger.info("🧹 Periodic state cleanup completed")
+            expired = await timeout_manager.check_and_cleanup_expired_states(application)
+            if expired:
+                logger.info(f"🧹 Periodic state cleanup completed ({expired} expired)")
         except Exception as e:
             logger.error(f"❌ Periodic cleanup error: {e}")
     
-    # Schedule periodic cleanup every 10 minutes using job queue
+    # Schedule periodic cleanup every 30 seconds using job queue
+    # (tick sadece süresi dolan state'lere dokunur; zaman aşımı ~10 dk yerine ~10.5 dk'da uygulanır)
     if application.job_queue:
         application.job_queue.run_repeating(
             periodic_state_cleanup, 
-            interval=600,  # 10 minutes
-            first=600      # Start after 10 minutes
+            interval=30,
+            first=30
         )
         logger.info("✅ Periodic state cleanup scheduled")
     
+    if webhook:
+        print(f"🌐 Webhook modu: {webhook['url']} ({webhook['listen']}:{webhook['port']})")
+        asyncio.run(run_webhook(application, **webhook))
+        return
+    
     # ✅ Architect önerisi: Eski callback'leri temizle
     application.run_polling(
         drop_pending_updates=True,
@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Bitget Async Client
+long.py içindeki imzalama/istek mantığının paylaşılan aiohttp session üzerinde
+çalışan async sürümü. Venue router ve çok kullanıcılı akışlar için kullanılır.
+Base URL BITGET_API_HOST ile değiştirilebilir (örn. debug/fake_exchange_server.py).
+"""
+import os
+import sys
+import json
+import time
+import hmac
+import base64
+import logging
+from decimal import Decimal, ROUND_DOWN
+from typing import Dict, List, Optional
+
+import aiohttp
+
+# Cross-process rate limit governor (production/core)
+sys.path.append(os.path.join(os.path.dirname(os.path.realpath(__file__)), '..', '..', 'core'))
+from rate_limit_governor import rate_limit_governor, PRIORITY_ORDER, PRIORITY_POLL
+
+logger = logging.getLogger(__name__)
+
+HOST = os.getenv("BITGET_API_HOST", "https://api.bitget.com")
+PRODUCT_TYPE = "USDT-FUTURES"
+ORDER_NOT_FOUND_CODES = ("40109",)
+
+
+class BitgetAPIError(Exception):
+    """Bitget API hata yanıtı (HTTP hatası veya code != 00000)"""
+
+    def __init__(self, status: int, code: str, message: str):
+        super().__init__(f"{status} {code}: {message}")
+        self.status = status
+        self.code = code
+        self.message = message
+
+
+class BitgetCredentials:
+    """Bir kullanıcının Bitget API bilgileri (bellekte tutulur)"""
+
+    def __init__(self, api_key: str, secret_key: str, passphrase: str, user_id: str = None):
+        if not api_key or not secret_key or not passphrase:
+            raise ValueError("Bitget API key, secret and passphrase are required")
+        self.api_key = api_key
+        self.passphrase = passphrase
+        self.user_id = user_id or f"{api_key[:4]}***"
+        self._secret_bytes = secret_key.encode('utf-8')
+
+    def sign(self, method: str, request_path: str, body: str = "") -> Dict[str, str]:
+        """ACCESS-* başlıklarını üret (timestamp + METHOD + path + body, HMAC-SHA256)"""
+        timestamp = str(int(time.time() * 1000))
+        message = timestamp + method.upper() + request_path + body
+        sign = base64.b64encode(hmac.new(self._secret_bytes, message.encode('utf-8'), digestmod='sha256').digest()).decode()
+        return {
+            "ACCESS-KEY": self.api_key,
+            "ACCESS-SIGN": sign,
+            "ACCESS-PASSPHRASE": self.passphrase,
+            "ACCESS-TIMESTAMP": timestamp,
+            "locale": "en-US",
+        }
+
+
+class BitgetClient:
+    """Bitget USDT-M futures client'ı (v2 API)"""
+
+    def __init__(self, session: aiohttp.ClientSession, credentials: Optional[BitgetCredentials] = None,
+                 host: str = None):
+        self.session = session
+        self.credentials = credentials
+        self.host = host or HOST
+
+    async def _request(self, method: str, path: str, params: Dict = None, body: Dict = None,
+                       endpoint_class: str = "market", priority: int = PRIORITY_POLL,
+                       signed: bool = False):
+        """Tek bir REST isteği; başarılı yanıtın 'data' alanını döndür"""
+        request_path = path
+        if params:
+            request_path += "?" + "&".join(f"{k}={v}" for k, v in params.items())
+        payload = json.dumps(body) if body is not None else ""
+        headers = {"Content-Type": "application/json"}
+
+        await rate_limit_governor.acquire_async(self.credentials.api_key if signed else None,
+                                                endpoint_class, priority)
+        if signed:
+            headers.update(self.credentials.sign(method, request_path, payload))
+
+        async with self.session.request(method, self.host + request_path, headers=headers,
+                                        data=payload or None) as response:
+            try:
+                data = await response.json(content_type=None)
+            except (json.JSONDecodeError, aiohttp.ContentTypeError):
+                data = {'code': 'INVALID_RESPONSE', 'msg': await response.text()}
+            if response.status >= 400 or data.get('code') != '00000':
+                raise BitgetAPIError(response.status, data.get('code', ''), data.get('msg', ''))
+            return data.get('data')
+
+    async def get_ticker(self, symbol: str, priority: int = PRIORITY_ORDER) -> Dict:
+        """Son fiyat / en iyi alış-satış (symbol v2 formatında: BTCUSDT)"""
+        data = await self._request("GET", "/api/v2/mix/market/ticker",
+                                   params={"symbol": symbol, "productType": PRODUCT_TYPE},
+                                   endpoint_class="market", priority=priority)
+        return data[0] if isinstance(data, list) else data
+
+    async def list_contracts(self) -> List[Dict]:
+        """Tüm USDT-M kontrat kataloğu"""
+        return await self._request("GET", "/api/v2/mix/market/contracts",
+                                   params={"productType": PRODUCT_TYPE},
+                                   endpoint_class="market", priority=PRIORITY_POLL)
+
+    async def place_market_order(self, symbol: str, size, side: str = "buy",
+                                 trade_side: str = "open", margin_mode: str = "isolated",
+                                 client_oid: str = None) -> Dict:
+        """
+        Market emir gönder (long.py ile aynı v2 parametreleri).
+        client_oid verilirse zaman aşımından sonra emir find_order ile bulunabilir.
+        """
+        return await self.place_order({
+            "symbol": symbol,
+            "productType": PRODUCT_TYPE,
+            "marginMode": margin_mode,
+            "marginCoin": "USDT",
+            "size": str(size),
+            "side": side,
+            "tradeSide": trade_side,
+            "orderType": "market",
+            "clientOid": client_oid or f"auto_trade_{int(time.time() * 1000)}",
+        })
+
+    async def place_order(self, body: Dict) -> Dict:
+        """Hazır v2 emir gövdesini gönder (örn. long.py'nin depth planlı IOC limit emri)"""
+        return await self._request("POST", "/api/v2/mix/order/place-order", body=body,
+                                   endpoint_class="order", priority=PRIORITY_ORDER, signed=True)
+
+    async def get_positions(self, priority: int = PRIORITY_POLL) -> List[Dict]:
+        """Tüm açık USDT-M pozisyonları"""
+        return await self._request("GET", "/api/v2/mix/position/all-position",
+                                   params={"productType": PRODUCT_TYPE, "marginCoin": "USDT"},
+                                   endpoint_class="position", priority=priority, signed=True) or []
+
+    async def get_accounts(self, priority: int = PRIORITY_POLL) -> List[Dict]:
+        """Futures hesap bakiyeleri (marginCoin başına equity / available / unrealizedPL)"""
+        return await self._request("GET", "/api/v2/mix/account/accounts",
+                                   params={"productType": PRODUCT_TYPE},
+                                   endpoint_class="account", priority=priority, signed=True) or []
+
+    async def close_all_positions(self, symbol: str = None) -> Dict:
+        """Flash close: tüm (veya tek sembol) pozisyonları market fiyatından kapat"""
+        body = {"productType": PRODUCT_TYPE}
+        if symbol:
+            body["symbol"] = symbol
+        return await self._request("POST", "/api/v2/mix/order/close-positions", body=body,
+                                   endpoint_class="order", priority=PRIORITY_ORDER, signed=True)
+
+    async def set_leverage(self, symbol: str, leverage: int, margin_coin: str = "USDT") -> Dict:
+        """Sembol için kaldıraç ayarla (leverage.py ile aynı v2 endpoint'i)"""
+        body = {"symbol": symbol, "productType": PRODUCT_TYPE, "marginCoin": margin_coin,
+                "leverage": str(leverage)}
+        return await self._request("POST", "/api/v2/mix/account/set-leverage", body=body,
+                                   endpoint_class="account", priority=PRIORITY_ORDER, signed=True)
+
+    async def get_order(self, symbol: str, order_id: str = None, client_oid: str = None) -> Dict:
+        """Emir detayı (orderId veya clientOid ile)"""
+        params = {"symbol": symbol, "productType": PRODUCT_TYPE}
+        if order_id:
+            params["orderId"] = order_id
+        else:
+            params["clientOid"] = client_oid
+        return await self._request("GET", "/api/v2/mix/order/detail", params=params,
+                                   endpoint_class="order", priority=PRIORITY_ORDER, signed=True)
+
+    async def find_order(self, symbol: str, client_oid: str) -> Optional[Dict]:
+        """clientOid ile emri ara; borsada yoksa None (gönderim sonucu belirsiz kalan emirler için)"""
+        try:
+            return await self.get_order(symbol, client_oid=client_oid)
+        except BitgetAPIError as e:
+            if e.code in ORDER_NOT_FOUND_CODES:
+                return None
+            raise
+
+
+def size_from_notional(contract: Dict, notional_usdt: float, price: float) -> Decimal:
+    """USDT tutarından kontrat adedi (volumePlace'e aşağı yuvarlanmış, minTradeNum altıysa 0)"""
+    volume_place = int(contract.get('volumePlace', 4))
+    size = (Decimal(str(notional_usdt)) / Decimal(str(price))).quantize(
+        Decimal(1).scaleb(-volume_place), rounding=ROUND_DOWN)
+    if size < Decimal(str(contract.get('minTradeNum', 0))):
+        return Decimal(0)
+    return size
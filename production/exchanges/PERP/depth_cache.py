@@ -0,0 +1,233 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Bitget Depth Cache
+Listing sembolü için kısa TTL'li order book snapshot'ı tutar ve buradan
+slippage sınırlı emir büyüklüğü / IOC limit fiyatı hesaplar.
+
+Sürekli poller yok: track() tek seferlik ön yükleme yapar, plan_order() snapshot
+bayatsa bir kez çeker. Snapshot state store'da paylaşılır; aynı listing için çalışan
+long.py süreçleri TTL içinde birbirinin snapshot'ını kullanır (N kullanıcı = N x 5 req/s değil).
+"""
+import os
+import sys
+import time
+import threading
+import logging
+from decimal import Decimal, ROUND_DOWN, ROUND_UP
+from typing import Dict, List, Optional, Tuple
+
+import requests
+
+# Cross-process rate limit governor (production/core)
+sys.path.append(os.path.join(os.path.dirname(os.path.realpath(__file__)), '..', '..', 'core'))
+from rate_limit_governor import rate_limit_governor, PRIORITY_ORDER, PRIORITY_POLL
+from state_store import state_store
+
+logger = logging.getLogger(__name__)
+
+HOST = os.getenv("BITGET_API_HOST", "https://api.bitget.com")
+PRODUCT_TYPE = "USDT-FUTURES"
+
+
+class DepthSnapshot:
+    """Tek sembolün order book görüntüsü (fiyat artan asks, fiyat azalan bids)"""
+
+    __slots__ = ('symbol', 'bids', 'asks', 'received_at')
+
+    def __init__(self, symbol: str, bids: List[Tuple[float, float]], asks: List[Tuple[float, float]],
+                 received_at: float = None):
+        self.symbol = symbol
+        self.bids = bids
+        self.asks = asks
+        # Süreçler arası paylaşıldığı için duvar saati
+        self.received_at = received_at or time.time()
+
+    @property
+    def age(self) -> float:
+        return time.time() - self.received_at
+
+    def to_dict(self) -> Dict:
+        return {'bids': self.bids, 'asks': self.asks, 'received_at': self.received_at}
+
+    @classmethod
+    def from_dict(cls, symbol: str, data: Dict) -> 'DepthSnapshot':
+        return cls(symbol, [tuple(level) for level in data['bids']], [tuple(level) for level in data['asks']],
+                   received_at=data['received_at'])
+
+    @property
+    def best_ask(self) -> Optional[float]:
+        return self.asks[0][0] if self.asks else None
+
+    @property
+    def best_bid(self) -> Optional[float]:
+        return self.bids[0][0] if self.bids else None
+
+
+def size_for_slippage(asks: List[Tuple[float, float]], notional_usdt: float,
+                      max_slippage: float) -> Dict:
+    """
+    Ask tarafını best_ask * (1 + max_slippage) fiyatına kadar yürü ve
+    notional_usdt'yi aşmadan alınabilecek miktarı hesapla.
+    """
+    if not asks:
+        return {'size': 0.0, 'avg_price': None, 'limit_price': None, 'notional': 0.0}
+
+    limit_price = asks[0][0] * (1 + max_slippage)
+    remaining = notional_usdt
+    size = 0.0
+    cost = 0.0
+    for price, quantity in asks:
+        if price > limit_price or remaining <= 0:
+            break
+        take = min(quantity, remaining / price)
+        size += take
+        cost += take * price
+        remaining -= take * price
+
+    return {
+        'size': size,
+        'avg_price': cost / size if size else None,
+        'limit_price': limit_price,
+        'notional': cost,
+    }
+
+
+def round_to_place(value: float, place: int, rounding=ROUND_DOWN) -> str:
+    """Bitget pricePlace/volumePlace'e göre string formatında yuvarla"""
+    return str(Decimal(str(value)).quantize(Decimal(1).scaleb(-int(place)), rounding=rounding))
+
+
+class DepthCache:
+    """Talep üzerine çekilen, süreçler arası paylaşılan depth snapshot cache'i"""
+
+    def __init__(self, ttl: float = 1.0, contract_ttl: float = 3600.0, levels: int = 50,
+                 host: str = None, timeout: float = 1.0):
+        self.ttl = ttl
+        self.contract_ttl = contract_ttl
+        self.levels = levels
+        self.host = host or HOST
+        self.timeout = timeout
+        self._snapshots: Dict[str, DepthSnapshot] = {}
+        self._contracts: Dict[str, Dict] = {}
+        self._session = requests.Session()
+
+    # ------------------------------------------------------------------
+    # Talep üzerine yükleme
+    # ------------------------------------------------------------------
+    def track(self, symbol: str):
+        """Kontrat bilgisini ve ilk snapshot'ı arka planda tek seferlik yükle (hemen döner)"""
+        threading.Thread(target=self._prefetch, args=(symbol,), name="depth-prefetch", daemon=True).start()
+
+    def _prefetch(self, symbol: str):
+        self.contract(symbol)
+        self.snapshot(symbol, priority=PRIORITY_POLL)
+
+    def _get(self, path: str, params: Dict, priority: int):
+        rate_limit_governor.acquire(None, "market", priority)
+        response = self._session.get(self.host + path, params=params, timeout=self.timeout)
+        data = response.json()
+        if response.status_code != 200 or data.get('code') != '00000':
+            raise ValueError(f"{path}: {data.get('msg', response.status_code)}")
+        return data.get('data')
+
+    def _fetch_depth(self, symbol: str, priority: int) -> Optional[DepthSnapshot]:
+        try:
+            data = self._get("/api/v2/mix/market/merge-depth",
+                             {"symbol": symbol, "productType": PRODUCT_TYPE, "limit": self.levels}, priority)
+            snapshot = DepthSnapshot(
+                symbol,
+                bids=[(float(price), float(size)) for price, size in data.get('bids') or []],
+                asks=[(float(price), float(size)) for price, size in data.get('asks') or []],
+            )
+        except (requests.RequestException, ValueError, TypeError) as e:
+            logger.debug(f"Depth refresh failed for {symbol}: {e}")
+            return None
+        self._snapshots[symbol] = snapshot
+        self._share(f"depth:{symbol}", snapshot.to_dict())
+        return snapshot
+
+    def _fetch_contract(self, symbol: str) -> Optional[Dict]:
+        try:
+            data = self._get("/api/v2/mix/market/contracts", {"productType": PRODUCT_TYPE, "symbol": symbol},
+                             PRIORITY_POLL)
+        except (requests.RequestException, ValueError, TypeError) as e:
+            logger.debug(f"Contract info failed for {symbol}: {e}")
+            return None
+        if not data:
+            return None
+        self._contracts[symbol] = data[0]
+        self._share(f"contract:{symbol}", {'contract': data[0], 'received_at': time.time()})
+        return data[0]
+
+    @staticmethod
+    def _share(key: str, value: Dict):
+        try:
+            state_store.set_meta(key, value)
+        except Exception as e:
+            logger.debug(f"Depth cache share failed for {key}: {e}")
+
+    @staticmethod
+    def _shared(key: str) -> Optional[Dict]:
+        try:
+            return state_store.get_meta(key)
+        except Exception as e:
+            logger.debug(f"Depth cache read failed for {key}: {e}")
+            return None
+
+    # ------------------------------------------------------------------
+    # Order yolu (sadece bellek okuması)
+    # ------------------------------------------------------------------
+    def snapshot(self, symbol: str, priority: int = PRIORITY_ORDER) -> Optional[DepthSnapshot]:
+        """
+        TTL içindeki snapshot: önce bellek, sonra başka süreçlerin paylaştığı snapshot,
+        ikisi de bayatsa tek istekle çek. Çekilemezse None.
+        """
+        snapshot = self._snapshots.get(symbol)
+        if snapshot is not None and snapshot.age <= self.ttl:
+            return snapshot
+        shared = self._shared(f"depth:{symbol}")
+        if shared and time.time() - shared['received_at'] <= self.ttl:
+            snapshot = self._snapshots[symbol] = DepthSnapshot.from_dict(symbol, shared)
+            return snapshot
+        return self._fetch_depth(symbol, priority)
+
+    def contract(self, symbol: str) -> Optional[Dict]:
+        """Kontrat bilgisi (pricePlace / volumePlace / minTradeNum): bellek, paylaşılan, REST"""
+        contract = self._contracts.get(symbol)
+        if contract is not None:
+            return contract
+        shared = self._shared(f"contract:{symbol}")
+        if shared and time.time() - shared['received_at'] <= self.contract_ttl:
+            self._contracts[symbol] = shared['contract']
+            return shared['contract']
+        return self._fetch_contract(symbol)
+
+    def plan_order(self, symbol: str, notional_usdt: float, max_slippage: float) -> Optional[Dict]:
+        """
+        Snapshot'tan slippage sınırlı IOC limit emir planı çıkar.
+        Taze snapshot veya kontrat bilgisi alınamazsa None (çağıran market emre düşer).
+        """
+        contract = self.contract(symbol)
+        snapshot = self.snapshot(symbol) if contract is not None else None
+        if snapshot is None or not snapshot.asks:
+            return None
+
+        plan = size_for_slippage(snapshot.asks, notional_usdt, max_slippage)
+        size = round_to_place(plan['size'], contract.get('volumePlace', 4))
+        if Decimal(size) < Decimal(str(contract.get('minTradeNum', 0))) or Decimal(size) <= 0:
+            return None
+
+        return {
+            'size': size,
+            'price': round_to_place(plan['limit_price'], contract.get('pricePlace', 4), rounding=ROUND_DOWN),
+            'avg_price': plan['avg_price'],
+            'notional': plan['notional'],
+            'best_ask': snapshot.best_ask,
+            'depth_age_ms': round(snapshot.age * 1000, 1),
+            'capped': plan['notional'] < notional_usdt * 0.999,
+        }
+
+
+# Global cache instance
+depth_cache = DepthCache()
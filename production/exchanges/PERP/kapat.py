@@ -2,8 +2,14 @@ import hmac
 import base64
 import json
 import time
+import os
+import sys
 import requests
 
+# Cross-process rate limit governor (production/core)
+sys.path.append(os.path.join(os.path.dirname(os.path.realpath(__file__)), '..', '..', 'core'))
+from rate_limit_governor import rate_limit_governor, PRIORITY_ORDER
+
 def get_timestamp():
   return int(time.time() * 1000)
 
@@ -16,6 +22,7 @@ def pre_hash(timestamp, method, request_path, body):
   return str(timestamp) + str.upper(method) + request_path + body
 
 def close_all_positions(api_key, api_secret_key, passphrase):
+  rate_limit_governor.acquire(api_key, "order", PRIORITY_ORDER)
   timestamp = str(get_timestamp())
   request_path = "/api/mix/v1/order/close-all-positions"
   
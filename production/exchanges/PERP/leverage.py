@@ -7,6 +7,10 @@ import json
 import os
 import sys
 
+# Cross-process rate limit governor (production/core)
+sys.path.append(os.path.join(os.path.dirname(os.path.realpath(__file__)), '..', '..', 'core'))
+from rate_limit_governor import rate_limit_governor, PRIORITY_ORDER
+
 def get_symbol():
     """Get symbol from environment or user-specific file"""
     # Prefer TRADE_SYMBOL environment variable
@@ -52,6 +56,7 @@ def load_api_credentials():
 def get_max_leverage(symbol):
     """Get maximum leverage for symbol from Bitget API"""
     url = f"https://api.bitget.com/api/mix/v1/market/symbol-leverage?symbol={symbol}"
+    rate_limit_governor.acquire(None, "market", PRIORITY_ORDER)
     
     try:
         response = requests.get(url, timeout=10)
@@ -75,6 +80,7 @@ def get_max_leverage(symbol):
 
 def set_leverage(api_key, secret_key, passphrase, symbol, leverage):
     """Set leverage for symbol using Bitget API"""
+    rate_limit_governor.acquire(api_key, "account", PRIORITY_ORDER)
     timestamp = str(int(time.time() * 1000))
     method = "POST"
     request_path = "/api/mix/v1/account/setLeverage"
@@ -6,36 +6,64 @@ import requests
 import subprocess
 import os
 import math # Tam sayiya yuvarlamak icin math modulunu ekle
+import sys
+import asyncio
+import aiohttp
+
+# Cross-process rate limit governor (production/core)
+sys.path.append(os.path.join(os.path.dirname(os.path.realpath(__file__)), '..', '..', 'core'))
+from rate_limit_governor import rate_limit_governor, PRIORITY_ORDER, PRIORITY_POLL
+from depth_cache import depth_cache
+from state_store import state_store
+from trade_journal import mark as journal_mark
+from notification_outbox import notification_outbox
+from venue_router import create_default_router
+from bitget_client import BitgetCredentials
+from gateio_executor import GateioCredentials
+
+# Outbox bağlantısını order'dan önce aç: bildirim yazımı kritik yolda mikro saniyeler sürer
+notification_outbox.warm()
 
 
 def get_timestamp():
   return int(time.time() * 1000)
 
 def send_telegram_notification(message, user_id):
-    """Send Telegram notification to user after successful trade"""
-    bot_token = os.getenv("TELEGRAM_BOT_TOKEN")
-    if not bot_token:
-        print("⚠️ TELEGRAM_BOT_TOKEN not found, skipping notification")
-        return False
-    
-    url = f"https://api.telegram.org/bot{bot_token}/sendMessage"
-    payload = {
-        "chat_id": user_id,
-        "text": message,
-        "parse_mode": "HTML"
-    }
-    
-    try:
-        response = requests.post(url, json=payload, timeout=10)
-        if response.status_code == 200:
-            print(f"✅ Telegram notification sent to user {user_id}")
-            return True
-        else:
-            print(f"❌ Telegram notification failed: {response.status_code}")
-            return False
-    except requests.RequestException as e:
-        print(f"❌ Telegram notification error: {e}")
+    """
+    Queue Telegram notification in the local outbox and return immediately.
+    notification_outbox.py serve gönderimi yapar; Telegram yavaşsa order akışı beklemez.
+    """
+    outbox_id = notification_outbox.put(user_id, message, parse_mode="HTML", trade_id=os.getenv('TRADE_ID'))
+    if outbox_id is None:
+        print(f"❌ Telegram notification could not be queued for user {user_id}")
         return False
+    print(f"📤 Telegram notification queued for user {user_id} (outbox #{outbox_id})")
+    return True
+
+def route_open_order(order_params, notional_usdt, api_key, secret_key, passphrase, user_id):
+  """
+  Açılış emrini venue router üzerinden gönder.
+  Bitget hazır (depth planlı) parametrelerle önce denenir; emir gönderilmediği kesinse ve
+  GATEIO_API_KEY / GATEIO_SECRET_KEY tanımlıysa Gate.io'ya düşülür. Timeout / 5xx sonrası
+  emir client OID ile sorgulanır, aynı emir iki venue'de açılmaz.
+  """
+  base = order_params["symbol"][:-len("USDT")]
+  credentials = {"bitget": BitgetCredentials(api_key, secret_key, passphrase, user_id=str(user_id))}
+  gateio_api = os.getenv("GATEIO_API_KEY")
+  gateio_secret = os.getenv("GATEIO_SECRET_KEY")
+  if gateio_api and gateio_secret:
+      credentials["gateio"] = GateioCredentials(gateio_api, gateio_secret, user_id=str(user_id))
+
+  async def route():
+      async with aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=10)) as session:
+          router = create_default_router(session)
+          router.venues["bitget"].prepare(base, order_params)
+          # Sinyal katalog yenilemesinden önce gelir: listing'i varsay, listelenmemişse venue reddeder
+          for venue in credentials:
+              router.mark_listed(base, venue)
+          return await router.route_order(credentials, base, notional_usdt)
+
+  return asyncio.run(route())[-1]
 
 def create_signature(message, secret_key):
   mac = hmac.new(bytes(secret_key, encoding='utf8'), bytes(message, encoding='utf-8'), digestmod='sha256')
@@ -69,10 +97,13 @@ def load_api_credentials():
         "open_USDT": os.getenv("BITGET_OPEN_USDT"),
         "close_yuzde": os.getenv("BITGET_CLOSE_YUZDE", "1.2"),
         "leverage": os.getenv("BITGET_LEVERAGE", "0"),
+        "max_slippage": os.getenv("BITGET_MAX_SLIPPAGE", "0.02"),
         "user_id": os.getenv("USER_ID", "0")
     }
 
-def get_futures_price(symbol):
+def get_futures_price(symbol, priority=PRIORITY_ORDER):
+  # Public market endpoint: limit IP bazlı olduğu için ortak "public" bucket
+  rate_limit_governor.acquire(None, "market", priority)
   url = f"https://api.bitget.com/api/mix/v1/market/ticker?symbol={symbol}"
   response = requests.get(url)
   
@@ -96,24 +127,23 @@ def get_futures_price(symbol):
       print("Veri cekme hatasi:", response.status_code)
       return None
 
-def save_order_id_to_file(order_response, file_path):
+def save_order_state(order_response, user_id):
   try:
-      with open(file_path, 'w') as file:
-          json.dump(order_response, file, indent=4)
-      print(f"Order bilgileri {file_path} dosyasina kaydedildi.")
-  except IOError as e:
-      print(f"Dosya yazma hatasi: {e}")
+      state_store.save_order("bitget", user_id, order_response)
+      print(f"Order bilgileri state store'a kaydedildi (user {user_id}).")
+  except Exception as e:
+      print(f"State store yazma hatasi: {e}")
 
-def save_order_fills_to_file(order_fills_response, file_path):
+def save_order_fills_state(order_fills_response, user_id, order_id):
   try:
-      with open(file_path, 'w') as file:
-          json.dump(order_fills_response, file, indent=4)
-      print(f"Order fills bilgileri {file_path} dosyasina kaydedildi.")
-  except IOError as e:
-      print(f"Dosya yazma hatasi: {e}")
+      state_store.save_fills("bitget", user_id, order_id, order_fills_response)
+      print(f"Order fills bilgileri state store'a kaydedildi (user {user_id}).")
+  except Exception as e:
+      print(f"State store yazma hatasi: {e}")
 
-def get_all_positions(api_key, api_secret_key, passphrase):
+def get_all_positions(api_key, api_secret_key, passphrase, priority=PRIORITY_POLL):
   """Tüm açık pozisyonları getir - kar/zarar hesabı için"""
+  rate_limit_governor.acquire(api_key, "position", priority)
   timestamp = str(get_timestamp())
   request_path = "/api/mix/v1/position/allPosition"
   
@@ -151,7 +181,8 @@ def get_all_positions(api_key, api_secret_key, passphrase):
 
 def close_all_positions(api_key, api_secret_key, passphrase):
   # Önce pozisyonları al - kar/zarar hesabı için
-  positions = get_all_positions(api_key, api_secret_key, passphrase)
+  # Kapatma akışı order lane'inde çalışır, polling'in önüne geçer
+  positions = get_all_positions(api_key, api_secret_key, passphrase, priority=PRIORITY_ORDER)
   
   total_pnl = 0.0
   active_positions = []
@@ -178,6 +209,7 @@ def close_all_positions(api_key, api_secret_key, passphrase):
           print(f"  {pnl_status} {pos['symbol']}: {pos['unrealizedPL']:.2f} USDT")
   
   # Şimdi pozisyonları kapat
+  rate_limit_governor.acquire(api_key, "order", PRIORITY_ORDER)
   timestamp = str(get_timestamp())
   request_path = "/api/mix/v1/order/close-all-positions"
   
@@ -222,6 +254,7 @@ def close_all_positions(api_key, api_secret_key, passphrase):
 # Set margin mode to isolated for better risk management
 def set_margin_mode(api_key, secret_key, passphrase, symbol, margin_mode="isolated"):
     """Set margin mode for symbol using Bitget API V2"""
+    rate_limit_governor.acquire(api_key, "account", PRIORITY_ORDER)
     timestamp = str(get_timestamp())
     method = "POST"
     request_path = "/api/v2/mix/account/set-margin-mode"
@@ -283,6 +316,7 @@ def set_margin_mode(api_key, secret_key, passphrase, symbol, margin_mode="isolat
 
 # API'den maxLeverage degerini al
 def get_max_leverage(symbol):
+  rate_limit_governor.acquire(None, "market", PRIORITY_ORDER)
   url = f"https://api.bitget.com/api/mix/v1/market/symbol-leverage?symbol={symbol}"
   response = requests.get(url)
   
@@ -305,9 +339,6 @@ if __name__ == '__main__':
   
   secret_file_path = os.path.join(script_dir, "secret.json")
   symbol_file_path = os.path.join(script_dir, "new_coin_output.txt")
-  order_id_file_path = os.path.join(script_dir, "order_id.json")
-  order_fills_file_path = os.path.join(script_dir, "order_fills.json")
-  yuzde_file_path = os.path.join(script_dir, "yuzde.json")
   
   # API bilgilerini environment variable'lardan al
   credentials = load_api_credentials()
@@ -315,6 +346,7 @@ if __name__ == '__main__':
   API_SECRET_KEY = credentials.get("secret_key")
   PASS_PHRASE = credentials.get("passphrase")
   close_yuzde = float(credentials.get("close_yuzde", 1.2))
+  max_slippage = float(credentials.get("max_slippage", 0.02))
   
   # API anahtarlarını kontrol et
   if not all([API_KEY, API_SECRET_KEY, PASS_PHRASE]):
@@ -329,6 +361,10 @@ if __name__ == '__main__':
   symbol = get_symbol_from_file(symbol_file_path)
   
   if symbol and API_KEY and API_SECRET_KEY and PASS_PHRASE:
+      # Kontrat bilgisi + ilk depth snapshot'ı arka planda tek seferlik yükle; order anında
+      # snapshot bayatsa bir kez yenilenir (diğer kullanıcıların süreçleri paylaşılan snapshot'ı kullanır)
+      depth_cache.track(symbol.replace("_UMCBL", ""))
+
       # Coin fiyatini al
       coin_price = get_futures_price(symbol)
       
@@ -405,8 +441,10 @@ if __name__ == '__main__':
           }
           
           leverage_url = "https://api.bitget.com" + leverage_request_path
+          rate_limit_governor.acquire(API_KEY, "account", PRIORITY_ORDER)
           leverage_response = requests.post(leverage_url, headers=leverage_headers, data=leverage_body)
           leverage_result = leverage_response.json()
+          journal_mark("leverage_set")
           print(f"🔧 Leverage API Response: {leverage_result}")
           
           if leverage_result.get('code') == '00000':
@@ -434,7 +472,9 @@ if __name__ == '__main__':
               "Content-Type": "application/json"
           }
           balance_url = "https://api.bitget.com" + balance_request_path
+          rate_limit_governor.acquire(API_KEY, "account", PRIORITY_ORDER)
           balance_response = requests.get(balance_url, headers=balance_headers)
+          journal_mark("balance_check")
           print(f"🔍 Balance API Response: {balance_response.json()}")
           
           balance_data = balance_response.json()
@@ -505,11 +545,10 @@ if __name__ == '__main__':
               print(f"❌ CRITICAL: Could not set isolated margin mode for {symbol}")
               print(f"🚨 ABORTING ORDER: Risk management compromised, cannot proceed with cross margin")
               exit(1)
+          journal_mark("margin_set")
           print(f"✅ Isolated margin mode confirmed for {symbol}, proceeding with order")
           
-          # POST istegi icin imza olusturma - NEW API V2 + MARKET ORDER
-          timestamp = str(get_timestamp())
-          request_path = "/api/v2/mix/order/place-order"
+          # NEW API V2 + MARKET ORDER (rate limit ve imza router'daki BitgetClient'ta)
           # V2 API: Remove _UMCBL suffix from symbol (per release notes)
           api_symbol = symbol.replace("_UMCBL", "")
           print(f"🔧 V2 API Symbol: {symbol} → {api_symbol}")
@@ -525,30 +564,39 @@ if __name__ == '__main__':
               "orderType": "market",
               "clientOid": f"auto_trade_{get_timestamp()}"
           }
-          body = json.dumps(params)
-          post_sign = create_signature(pre_hash(timestamp, "POST", request_path, body), API_SECRET_KEY)
 
-          # POST istegi gonderme
-          headers = {
-              "ACCESS-KEY": API_KEY,
-              "ACCESS-SIGN": post_sign,
-              "ACCESS-PASSPHRASE": PASS_PHRASE,
-              "ACCESS-TIMESTAMP": timestamp,
-              "Content-Type": "application/json"
-          }
-          url = "https://api.bitget.com" + request_path
-          response = requests.post(url, headers=headers, data=body)
-          print("POST Istegi Durum Kodu:", response.status_code)
-          post_response = response.json()
-          print("POST Yaniti:", post_response)
+          # Depth snapshot varsa: slippage sınırlı miktar + IOC limit fiyat
+          depth_plan = depth_cache.plan_order(api_symbol, actual_open_USDT, max_slippage)
+          if depth_plan:
+              params.update({
+                  "size": depth_plan['size'],
+                  "orderType": "limit",
+                  "price": depth_plan['price'],
+                  "force": "ioc"
+              })
+              print(f"📚 Depth plan: size={depth_plan['size']} limit={depth_plan['price']} "
+                    f"best_ask={depth_plan['best_ask']} avg={depth_plan['avg_price']:.8f} "
+                    f"age={depth_plan['depth_age_ms']}ms{' (CAPPED by depth)' if depth_plan['capped'] else ''}")
+          else:
+              print("📚 Depth snapshot alınamadı, market order kullanılıyor")
+
+          # Emri venue router ile gönder (Bitget önce, kesin redde Gate.io)
+          journal_mark("order_post", order_type=params["orderType"])
+          route_result = route_open_order(params, actual_open_USDT, API_KEY, API_SECRET_KEY, PASS_PHRASE, user_id)
+          order_venue = route_result.get('venue', 'bitget')
+          journal_mark("order_ack", venue=order_venue, success=route_result['success'])
+          print("Router Yaniti:", route_result)
 
-          # Order ID'yi dosyaya kaydet
-          save_order_id_to_file(post_response, order_id_file_path)
+          # Order yanitini state store'a kaydet
+          if route_result['success'] and order_venue == 'bitget':
+              save_order_state({'code': '00000', 'data': route_result['order']}, user_id)
+          elif route_result['success']:
+              state_store.save_order(order_venue, user_id, route_result['order'])
 
           # Order ID'yi degiskene ata - hata kontrolü ekle
-          if post_response.get('code') == '00000' and post_response.get('data'):
-              order_id = post_response['data'].get('orderId')
-              print(f"Order ID: {order_id}")
+          if route_result['success']:
+              order_id = route_result['order'].get('orderId') or route_result['order'].get('id')
+              print(f"Order ID: {order_id} ({order_venue})")
               
               # INSTANT TELEGRAM NOTIFICATION after successful order
               # Get user_id from environment or the database lookup above
@@ -561,20 +609,27 @@ if __name__ == '__main__':
 ⚡ <b>Leverage:</b> {leverage}x
 🔒 <b>Margin:</b> Isolated
 💹 <b>Fiyat:</b> ${float(coin_price['last_price']):.4f}
+🏦 <b>Borsa:</b> {order_venue}
 📋 <b>Order ID:</b> {order_id}
 
 ✅ İşlem başarıyla tamamlandı!
 """
               
-              if send_telegram_notification(notification_message, notification_user_id):
-                  print(f"✅ Order notification sent to Telegram user {notification_user_id}")
-              else:
-                  print(f"⚠️ Could not send Telegram notification to user {notification_user_id}")
+              notification_queued = send_telegram_notification(notification_message, notification_user_id)
+              journal_mark("notification", queued=notification_queued)
           else:
-              print(f"❌ İşlem hatası: {post_response.get('msg', 'Bilinmeyen hata')}")
+              if route_result.get('uncertain'):
+                  print(f"🚨 Emir durumu bilinmiyor (client OID {route_result.get('client_oid')}), manuel kontrol gerekli")
+              print(f"❌ İşlem hatası: {route_result.get('error', 'Bilinmeyen hata')}")
               exit(1)
 
+          if order_venue != 'bitget':
+              # Fills / TP takibi aşağıda Bitget'e özel; Gate.io emri state store'a kaydedildi
+              print(f"ISLEM BASARILI ({order_venue})")
+              exit(0)
+
           # GET istegi icin imza olusturma
+          rate_limit_governor.acquire(API_KEY, "account", PRIORITY_POLL)
           timestamp = str(get_timestamp())  # Zaman damgasini guncelle
           body = ""
           request_path = "/api/mix/v1/account/account"
@@ -600,6 +655,8 @@ if __name__ == '__main__':
 
           # Order fills bilgilerini almak icin yeni bir GET istegi
           request_path = f"/api/mix/v1/order/fills?symbol={symbol}&orderId={order_id}"
+          rate_limit_governor.acquire(API_KEY, "order", PRIORITY_POLL)
+          timestamp = str(get_timestamp())
           get_sign = create_signature(pre_hash(timestamp, "GET", request_path, body), API_SECRET_KEY)
 
           headers = {
@@ -614,10 +671,11 @@ if __name__ == '__main__':
           response = requests.get(url, headers=headers)
           print("Order Fills Istegi Durum Kodu:", response.status_code)
           order_fills_response = response.json()
+          journal_mark("fill_fetch")
           print("Order Fills Yaniti:", order_fills_response)
 
-          # Order fills bilgilerini dosyaya kaydet
-          save_order_fills_to_file(order_fills_response, order_fills_file_path)
+          # Order fills bilgilerini state store'a kaydet
+          save_order_fills_state(order_fills_response, user_id, order_id)
 
           # Ilk fiyat degerini degiskene ata
           fills_price = float(order_fills_response['data'][0]['price'])
@@ -627,17 +685,16 @@ if __name__ == '__main__':
           print("ISLEM BASARILI")
 
           # Son fiyat bilgisini al ve yazdir
-          coin_info = get_futures_price(symbol)
+          coin_info = get_futures_price(symbol, priority=PRIORITY_POLL)
           if coin_info:
               print(f"Son Fiyat: {coin_info['last_price']}")
               
               # Yuzde hesaplama
               yuzde = round(float(coin_info['last_price']) / fills_price, 3)
 
-              # Yuzdeyi dosyaya kaydet
-              timestamp = get_timestamp()
-              with open(yuzde_file_path, 'w') as file:
-                  json.dump({"timestamp": timestamp, "yuzde": yuzde}, file)
+              # Yuzdeyi state store'a kaydet
+              state_store.set_tp_progress("bitget", user_id, yuzde, symbol=api_symbol,
+                                          price=float(coin_info['last_price']))
               
               # Yuzdeyi close_yuzde ile karsilastir
               if yuzde >= close_yuzde:
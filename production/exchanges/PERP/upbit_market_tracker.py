@@ -4,6 +4,8 @@ import json
 import time
 import os
 import sys
+import signal
+import argparse
 import threading
 from datetime import datetime, timedelta
 
@@ -13,6 +15,13 @@ production_dir = os.path.dirname(os.path.dirname(os.path.dirname(current_file_pa
 core_dir = os.path.join(production_dir, 'core')
 sys.path.append(core_dir)
 from notification_config import notification_config
+from state_store import state_store
+from trade_journal import trade_journal
+from service_heartbeat import service_heartbeat
+from leader_lease import LeaderLease, LeaseLost
+
+# Hot standby: iki replica (--replica a/b), sadece lease'i tutan tarar ve tetikler
+LEASE_NAME = "upbit_market_tracker"
 
 # PERP dizini - yeni directory structure ile uyumlu
 # Eğer production/exchanges/PERP içindeyse, bu dizini kullan
@@ -27,10 +36,16 @@ else:
 if not os.path.exists(BASE_DIR):
   os.makedirs(BASE_DIR)
 
+# Keep-alive session: standby replica'da da hazır tutulur
+session = requests.Session()
+REQUEST_TIMEOUT = (3, 10)  # (connect, read) sn: takılan istek döngüyü kilitlemesin
+# Bir iterasyon (istek timeout'ları + dosya/DB yazımı) bundan uzun sürerse döngü takılmış sayılır
+LOOP_STALL_AFTER = 30
+
 def get_market_data():
   """Upbit API'den market verilerini ceker"""
   url = "https://api.upbit.com/v1/market/all"
-  response = requests.get(url)
+  response = session.get(url, timeout=REQUEST_TIMEOUT)
   if response.status_code == 200:
       return response.json()
   else:
@@ -55,45 +70,40 @@ def read_from_file(filename):
   except json.JSONDecodeError:
       return []
 
-def append_new_pairs_to_file(new_pairs):
-  """Yeni ciftleri upbit_new_list.json dosyasina ekler"""
+def append_new_pairs_to_file(new_pairs, detected_ns=None):
+  """Yeni ciftleri state store'daki new_listings tablosuna ekler"""
   if not new_pairs:
       return
 
   timestamp = datetime.now().isoformat()
-  new_entry = {
-      "timestamp": timestamp,
-      "new_pairs": new_pairs
-  }
-  
-  existing_data = read_from_file("upbit_new_list.json")
-  existing_data.append(new_entry)
-  save_to_file(existing_data, "upbit_new_list.json")
+  state_store.add_new_listings(new_pairs, timestamp)
+  print(f"💾 Yeni çiftler state store'a eklendi: {[p['market'] for p in new_pairs]}")
   
   # Son eklenen USDT coinini SAFEUSDT_UMCBL formatinda yaz (centralized config kullanarak)
   last_new_coin = new_pairs[-1]['market'].split('-')[1] + "USDT_UMCBL"
+
+  # Latency journal: sinyal kimliğini engine'in bulabilmesi için dosyadan önce kaydet
+  signal_id = trade_journal.new_signal_id(last_new_coin)
+  trade_journal.mark(signal_id, "detection", mono_ns=detected_ns, source="market_tracker")
+  state_store.set_meta("last_signal", {"symbol": last_new_coin, "signal_id": signal_id})
+
   # Centralized notification config kullan
   new_coin_file = notification_config.new_coin_output_txt
   with open(new_coin_file, 'w', encoding='utf-8') as file:
       file.write(last_new_coin)
+  trade_journal.mark(signal_id, "signal_write")
   print(f"📝 New coin yazıldı (centralized): {last_new_coin}")
   print(f"   📁 Path: {new_coin_file}")
 
 def initialize_state_files():
   """Durum dosyalarını başlat - sadece yoksa boş oluştur, varsa koru"""
-  files_to_check = ["upbit_ciftler_1.json", "upbit_ciftler_2.json", "seen_markets.json"]
+  # seen_markets artık state store'da (bkz. production/core/state_store.py)
+  files_to_check = ["upbit_ciftler_1.json", "upbit_ciftler_2.json"]
   
   for filename in files_to_check:
     full_path = os.path.join(BASE_DIR, filename)
     if not os.path.exists(full_path):
-      if filename == "seen_markets.json":
-        # seen_markets için özel başlangıç yapısı
-        initial_data = {
-          "last_update": datetime.now().isoformat(),
-          "usdt_markets": []
-        }
-      else:
-        initial_data = []
+      initial_data = []
       
       with open(full_path, 'w', encoding='utf-8') as f:
         json.dump(initial_data, f, indent=4, ensure_ascii=False)
@@ -103,23 +113,33 @@ def initialize_state_files():
 
 def load_seen_markets():
   """Daha önce görülen USDT marketlerini yükle"""
-  seen_markets_file = os.path.join(BASE_DIR, "seen_markets.json")
   try:
-    with open(seen_markets_file, 'r', encoding='utf-8') as f:
-      data = json.load(f)
-    return set(data.get('usdt_markets', []))
-  except (FileNotFoundError, json.JSONDecodeError):
+    return state_store.get_seen_markets()
+  except Exception as e:
+    print(f"⚠️ Seen markets okunamadı: {e}")
     return set()
 
-def save_seen_markets(markets_set):
-  """Görülen USDT marketlerini kaydet"""
-  seen_markets_file = os.path.join(BASE_DIR, "seen_markets.json")
-  data = {
-    "last_update": datetime.now().isoformat(),
-    "usdt_markets": list(markets_set)
-  }
-  with open(seen_markets_file, 'w', encoding='utf-8') as f:
-    json.dump(data, f, indent=4, ensure_ascii=False)
+def save_seen_markets(markets):
+  """Yeni görülen USDT marketlerini kaydet (sadece eklenenler yazılır)"""
+  return state_store.add_seen_markets(markets)
+
+def claim_markets(lease, markets, emit=None):
+  """
+  Yeni marketleri lease doğrulamasıyla aynı transaction'da kaydet; ilk kez kaydedilenleri döndür
+  (lider değilse None).
+  emit(claimed) sinyali aynı transaction içinde yazar: claim sadece sinyal yazıldıysa commit edilir.
+  İki adım arasında çökme claim'i geri alır, standby aynı sinyali tekrar yazar (engine sembol
+  bazında tekilleştirir) - sinyal kaybolmaz.
+  """
+  try:
+    with lease.fenced():
+      claimed = state_store.claim_seen_markets(markets)
+      if claimed and emit is not None:
+        emit(claimed)
+      return claimed
+  except LeaseLost:
+    print("🛑 Lider değil, yeni market tetiklenmedi")
+    return None
 
 def heartbeat_writer():
   """Health file'ını her 60 saniyede bir günceller"""
@@ -136,6 +156,8 @@ def start_heartbeat():
   """Heartbeat thread'ini başlat"""
   heartbeat_thread = threading.Thread(target=heartbeat_writer, daemon=True)
   heartbeat_thread.start()
+  # Supervisor canlılık soketi: ana döngü LOOP_STALL_AFTER sn ilerlemezse beat kesilir
+  service_heartbeat.start(stall_after=LOOP_STALL_AFTER)
   print("💓 Market Tracker heartbeat başlatıldı")
 
 def check_announcement_coins():
@@ -178,6 +200,19 @@ def check_announcement_coins():
   return []
 
 def main():
+  parser = argparse.ArgumentParser(description="Upbit market tracker")
+  parser.add_argument('--replica', default='a', help="Hot standby replica etiketi (supervisor: a / b)")
+  args = parser.parse_args()
+
+  lease = LeaderLease(LEASE_NAME, holder=f"replica-{args.replica}:{os.getpid()}")
+
+  def shutdown(signum, frame):
+    # Lease'i bırak: standby TTL'i beklemeden devralır
+    lease.release()
+    sys.exit(0)
+
+  signal.signal(signal.SIGTERM, shutdown)
+
   # Durum dosyalarını kontrollü olarak başlat
   initialize_state_files()
   
@@ -192,19 +227,27 @@ def main():
 
   while True:
       try:
+          # Hot standby: lease bizde değilse bekle; devralınca diğer replica'nın kayıtlarını yükle
+          if not lease.is_leader:
+              lease.wait_for_leadership()
+              seen_markets = load_seen_markets()
+
           # Yeni veriyi cek
           new_data = get_market_data()
+          service_heartbeat.incr('polls')
           if not new_data:
-              time.sleep(1)
+              service_heartbeat.incr('fetch_errors')
+              service_heartbeat.sleep(1)
               continue
 
-          # Dosya sirasina gore yazma islemi
+          # Dosya sirasina gore yazma islemi: yeni veri claim'den sonra kaydedilir, claim/sinyal
+          # yazılmadan çökülürse market bir sonraki turda (veya standby'da) tekrar yeni görünür
           if toggle:
               old_data = read_from_file("upbit_ciftler_1.json")
-              save_to_file(new_data, "upbit_ciftler_2.json")
+              new_data_file = "upbit_ciftler_2.json"
           else:
               old_data = read_from_file("upbit_ciftler_2.json")
-              save_to_file(new_data, "upbit_ciftler_1.json")
+              new_data_file = "upbit_ciftler_1.json"
 
           # Yeni ciftleri bul - sadece USDT marketleri kontrol et
           old_usdt_markets = [pair['market'] for pair in old_data if pair['market'].startswith('USDT-')]
@@ -216,6 +259,7 @@ def main():
           
           # Gerçekten yeni olan marketleri bul - hem file comparison hem de seen_markets kontrolü
           truly_new_markets = []
+          detected_ns = time.monotonic_ns()
           for market in new_usdt_markets:
             # Hem old_data'da hem de seen_markets'te yoksa gerçekten yeni
             if market not in old_markets_set and market not in seen_markets:
@@ -246,15 +290,25 @@ def main():
                       'english_name': coin['english_name']
                     })
               
+              # Seen markets'e lease altında ekle ve sinyali aynı transaction'da yaz: diğer
+              # replica / eski lider aynı marketi ikinci kez tetikleyemez
+              def emit(claimed):
+                pairs = [p for p in combined_new_pairs if p['market'] in claimed]
+                if pairs:
+                  append_new_pairs_to_file([pairs[-1]], detected_ns)
+              
+              claimed = claim_markets(lease, truly_new_markets, emit)
+              if claimed is None:
+                # Lease gitti: veri dosyası kaydedilmez, yeni lider bu marketleri yeni görür
+                continue
+              seen_markets.update(truly_new_markets)
+              combined_new_pairs = [p for p in combined_new_pairs if p['market'] in claimed]
+              
               if combined_new_pairs:
-                append_new_pairs_to_file([combined_new_pairs[-1]])
+                service_heartbeat.incr('signals')
                 print(f"{datetime.now()}: YENİ COIN TESPİT EDİLDİ!")
                 print(f"API'den: {[p['market'] for p in api_new_pairs]}")
                 print(f"Announcement'dan: {[c['market'] for c in announcement_coins if c['market'] in truly_new_markets]}")
-                
-                # Seen markets'e yeni marketleri ekle
-                seen_markets.update(truly_new_markets)
-                save_seen_markets(seen_markets)
                 print(f"💾 Seen markets güncellendi: {len(seen_markets)} total")
           else:
               # Mevcut marketleri seen_markets'e ekle (ilk çalıştırmada persistence için)
@@ -262,21 +316,23 @@ def main():
                 initial_size = len(seen_markets)
                 seen_markets.update(current_markets_set)
                 if len(seen_markets) > initial_size:
-                  save_seen_markets(seen_markets)
+                  save_seen_markets(current_markets_set)
                   print(f"🔄 Mevcut marketler persistence'e eklendi: {len(seen_markets)} total")
               
               # Debug için - hangi marketler var kontrol et
               print(f"{datetime.now()}: Kontrol - USDT marketleri: {len(new_usdt_markets)} (yeni yok)")
 
+          save_to_file(new_data, new_data_file)
+          
           # Toggle degiskenini degistir
           toggle = not toggle
 
           # 1 saniye bekle
-          time.sleep(1)
+          service_heartbeat.sleep(1)
 
       except Exception as e:
           print(f"Hata olustu: {e}")
-          time.sleep(5)  # Hata durumunda 5 saniye bekle
+          service_heartbeat.sleep(5)  # Hata durumunda 5 saniye bekle
 
 if __name__ == "__main__":
   main()
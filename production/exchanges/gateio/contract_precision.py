@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Gate.io Contract Precision Cache
+round_gate.py polling döngüsünün yerine: fiyat hassasiyeti sembol başına bir kez
+kontrat kataloğundan türetilir, bellekte tutulur ve sadece sembol değiştiğinde
+yeniden hesaplanır. Ondalık basamak sayısı float anahtarlı tablo yerine doğrudan
+tick size'ın (mark_price_round) Decimal üssünden çıkarılır.
+"""
+import logging
+import threading
+from decimal import Decimal, ROUND_HALF_UP, ROUND_DOWN
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+def decimals_from_tick(tick) -> int:
+    """Tick size'dan ondalık basamak sayısı: "0.0001" -> 4, "1e-05" -> 5, "0.5" -> 1, "10" -> 0"""
+    value = Decimal(str(tick)).normalize()
+    if value <= 0:
+        raise ValueError(f"Invalid tick size: {tick}")
+    return max(0, -value.as_tuple().exponent)
+
+
+class ContractPrecision:
+    """Tek bir kontratın fiyat/miktar hassasiyeti"""
+
+    def __init__(self, contract: str, price_tick: Decimal, order_size_min: int = 1,
+                 quanto_multiplier: Decimal = Decimal("1")):
+        self.contract = contract
+        self.price_tick = price_tick
+        self.price_decimals = decimals_from_tick(price_tick)
+        self.order_size_min = order_size_min
+        self.quanto_multiplier = quanto_multiplier
+
+    @classmethod
+    def from_contract(cls, contract_data: Dict) -> 'ContractPrecision':
+        """Gate.io /futures/usdt/contracts yanıtından oluştur"""
+        tick = contract_data.get('mark_price_round') or contract_data.get('order_price_round')
+        if not tick:
+            raise ValueError(f"Contract {contract_data.get('name')} has no price tick")
+        return cls(
+            contract=contract_data['name'],
+            price_tick=Decimal(str(tick)),
+            order_size_min=int(contract_data.get('order_size_min') or 1),
+            quanto_multiplier=Decimal(str(contract_data.get('quanto_multiplier') or "1")),
+        )
+
+    def round_price(self, price, rounding=ROUND_HALF_UP) -> Decimal:
+        """Fiyatı tick size'ın katına yuvarla"""
+        steps = (Decimal(str(price)) / self.price_tick).quantize(Decimal("1"), rounding=rounding)
+        return (steps * self.price_tick).quantize(Decimal(1).scaleb(-self.price_decimals))
+
+    def floor_size(self, size) -> int:
+        """Kontrat adedini aşağı yuvarla (minimum altındaysa 0)"""
+        contracts = int(Decimal(str(size)).to_integral_value(rounding=ROUND_DOWN))
+        return contracts if contracts >= self.order_size_min else 0
+
+    def __repr__(self):
+        return f"ContractPrecision({self.contract}, tick={self.price_tick}, decimals={self.price_decimals})"
+
+
+class ContractPrecisionCache:
+    """Sembol -> ContractPrecision bellek içi cache"""
+
+    def __init__(self):
+        self._cache: Dict[str, ContractPrecision] = {}
+        self._lock = threading.Lock()
+        self.active_symbol: Optional[str] = None
+
+    def get(self, contract: str) -> Optional[ContractPrecision]:
+        """Cache'teki hassasiyeti döndür (yoksa None)"""
+        return self._cache.get(contract)
+
+    def update_from_contract(self, contract_data: Dict) -> ContractPrecision:
+        """Zaten alınmış kontrat yanıtından hassasiyeti kaydet; değişmediyse mevcut nesneyi döndür"""
+        precision = ContractPrecision.from_contract(contract_data)
+        with self._lock:
+            cached = self._cache.get(precision.contract)
+            if cached and cached.price_tick == precision.price_tick:
+                return cached
+            self._cache[precision.contract] = precision
+        logger.info(f"📐 {precision}")
+        return precision
+
+    def load_catalog(self, contracts) -> int:
+        """Tüm kontrat kataloğunu tek seferde yükle; yüklenen kontrat sayısını döndür"""
+        loaded = 0
+        for contract_data in contracts:
+            try:
+                precision = ContractPrecision.from_contract(contract_data)
+            except (ValueError, KeyError, ArithmeticError):
+                continue
+            with self._lock:
+                self._cache[precision.contract] = precision
+            loaded += 1
+        return loaded
+
+    async def resolve(self, client, contract: str) -> ContractPrecision:
+        """Cache'te yoksa kontratı bir kez API'den çekip hassasiyeti hesapla"""
+        precision = self._cache.get(contract)
+        if precision is None:
+            precision = self.update_from_contract(await client.get_contract(contract))
+        return precision
+
+    async def on_symbol_change(self, client, contract: str) -> ContractPrecision:
+        """Aktif sembol değiştiğinde çağrılır; aynı sembol için yeniden hesaplama yapılmaz"""
+        if contract != self.active_symbol:
+            self.active_symbol = contract
+            logger.info(f"🔄 Active Gate.io symbol: {contract}")
+        return await self.resolve(client, contract)
+
+    def invalidate(self, contract: str = None):
+        """Tek kontratı veya tüm cache'i temizle"""
+        with self._lock:
+            if contract:
+                self._cache.pop(contract, None)
+            else:
+                self._cache.clear()
+
+
+# Global cache instance
+contract_precision_cache = ContractPrecisionCache()
@@ -0,0 +1,313 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Gate.io Futures Executor
+gateio_long.py / kapat.py akışının import edilebilir, async sürümü.
+
+- Tek bir pooled aiohttp session tüm kullanıcılar arasında paylaşılır
+- Credential'lar bellekte tutulur, imza her istekte diskten okumadan üretilir
+- Order durumu order_gateio.json yerine API'den sorgulanır
+- Pozisyon kapatma subprocess yerine aynı süreç içinde yapılır
+- Birden fazla kullanıcı asyncio.gather ile eşzamanlı işlenir
+"""
+import os
+import sys
+import json
+import time
+import hmac
+import hashlib
+import asyncio
+import logging
+from typing import Dict, List, Optional
+
+import aiohttp
+
+# Cross-process rate limit governor (production/core)
+sys.path.append(os.path.join(os.path.dirname(os.path.realpath(__file__)), '..', '..', 'core'))
+from rate_limit_governor import rate_limit_governor, PRIORITY_ORDER, PRIORITY_POLL
+
+sys.path.append(os.path.dirname(os.path.realpath(__file__)))
+from contract_precision import contract_precision_cache
+from state_store import state_store
+
+logger = logging.getLogger(__name__)
+
+HOST = os.getenv("GATEIO_API_HOST", "https://api.gateio.ws")
+PREFIX = "/api/v4"
+SETTLE = "usdt"
+
+# Public endpoint'ler IP bazlı limitlenir; Gate.io public çağrıları ortak bucket'ta
+PUBLIC_BUCKET = "gateio-public"
+
+
+class GateioAPIError(Exception):
+    """Gate.io API hata yanıtı"""
+
+    def __init__(self, status: int, label: str, message: str):
+        super().__init__(f"{status} {label}: {message}")
+        self.status = status
+        self.label = label
+        self.message = message
+
+
+class GateioCredentials:
+    """Bir kullanıcının Gate.io ayarları (bellekte tutulur)"""
+
+    def __init__(self, api_key: str, secret_key: str, open_usdt: float = 1.0,
+                 close_yuzde: float = 1.2, user_id: str = None):
+        if not api_key or not secret_key:
+            raise ValueError("Gate.io API key and secret are required")
+        self.api_key = api_key
+        self.secret_key = secret_key
+        self.open_usdt = float(open_usdt)
+        self.close_yuzde = float(close_yuzde)
+        self.user_id = user_id or f"{api_key[:4]}***"
+        # HMAC anahtarını bir kez encode et
+        self._secret_bytes = secret_key.encode('utf-8')
+
+    def sign(self, method: str, url: str, query_string: str = "", payload_string: str = "") -> Dict[str, str]:
+        """Gate.io APIv4 imza başlıklarını üret"""
+        t = time.time()
+        hashed_payload = hashlib.sha512((payload_string or "").encode('utf-8')).hexdigest()
+        s = '%s\n%s\n%s\n%s\n%s' % (method, url, query_string or "", hashed_payload, t)
+        sign = hmac.new(self._secret_bytes, s.encode('utf-8'), hashlib.sha512).hexdigest()
+        return {'KEY': self.api_key, 'Timestamp': str(t), 'SIGN': sign}
+
+
+class GateioClient:
+    """Tek kullanıcı için Gate.io USDT futures client'ı (paylaşılan session üzerinde)"""
+
+    def __init__(self, session: aiohttp.ClientSession, credentials: Optional[GateioCredentials] = None,
+                 host: str = HOST):
+        self.session = session
+        self.credentials = credentials
+        self.host = host
+
+    async def _request(self, method: str, path: str, params: Dict = None, body: Dict = None,
+                       endpoint_class: str = "market", priority: int = PRIORITY_POLL,
+                       signed: bool = False):
+        """Tek bir REST isteği gönder; hata yanıtlarında GateioAPIError fırlat"""
+        url = PREFIX + path
+        query_string = "&".join(f"{k}={v}" for k, v in (params or {}).items())
+        payload = json.dumps(body) if body is not None else ""
+        headers = {'Accept': 'application/json', 'Content-Type': 'application/json'}
+
+        bucket = self.credentials.api_key if signed else PUBLIC_BUCKET
+        await rate_limit_governor.acquire_async(bucket, endpoint_class, priority)
+
+        if signed:
+            headers.update(self.credentials.sign(method, url, query_string, payload))
+
+        full_url = self.host + url + (f"?{query_string}" if query_string else "")
+        async with self.session.request(method, full_url, headers=headers, data=payload or None) as response:
+            try:
+                data = await response.json(content_type=None)
+            except (json.JSONDecodeError, aiohttp.ContentTypeError):
+                data = {'label': 'INVALID_RESPONSE', 'message': await response.text()}
+            if response.status >= 400:
+                raise GateioAPIError(response.status, data.get('label', ''), data.get('message', ''))
+            return data
+
+    async def get_contract(self, contract: str, priority: int = PRIORITY_ORDER) -> Dict:
+        """Kontrat bilgisi (last_price, leverage_max, mark_price_round ...)"""
+        return await self._request("GET", f"/futures/{SETTLE}/contracts/{contract}",
+                                   endpoint_class="market", priority=priority)
+
+    async def list_contracts(self) -> List[Dict]:
+        """Tüm USDT futures kontrat kataloğu"""
+        return await self._request("GET", f"/futures/{SETTLE}/contracts",
+                                   endpoint_class="market", priority=PRIORITY_POLL)
+
+    async def place_order(self, contract: str, size: int, price, tif: str = "gtc",
+                          reduce_only: bool = False, text: str = "t-my-custom-id") -> Dict:
+        """Futures emri gönder (size > 0 long, size < 0 short)"""
+        body = {
+            "contract": contract,
+            "size": size,
+            "iceberg": 0,
+            "price": str(price),
+            "tif": tif,
+            "text": text,
+        }
+        if reduce_only:
+            body["reduce_only"] = True
+        else:
+            body["stp_act"] = "-"
+        return await self._request("POST", f"/futures/{SETTLE}/orders", body=body,
+                                   endpoint_class="order", priority=PRIORITY_ORDER, signed=True)
+
+    async def get_order(self, order_id) -> Dict:
+        """Emir durumunu API'den sorgula"""
+        return await self._request("GET", f"/futures/{SETTLE}/orders/{order_id}",
+                                   endpoint_class="order", priority=PRIORITY_POLL, signed=True)
+
+    async def find_order(self, text: str) -> Optional[Dict]:
+        """Özel text id (t-...) ile emri ara; borsada yoksa None (gönderim sonucu belirsiz kalan emirler için)"""
+        try:
+            return await self.get_order(text)
+        except GateioAPIError as e:
+            if e.label == "ORDER_NOT_FOUND":
+                return None
+            raise
+
+    async def cancel_order(self, order_id) -> Dict:
+        """Açık emri iptal et"""
+        return await self._request("DELETE", f"/futures/{SETTLE}/orders/{order_id}",
+                                   endpoint_class="order", priority=PRIORITY_ORDER, signed=True)
+
+    async def close_position(self, contract: str, size: int) -> Dict:
+        """Pozisyonu piyasa fiyatından kapat (reduce_only IOC, price=0)"""
+        return await self.place_order(contract, -size, "0", tif="ioc", reduce_only=True, text="t-close")
+
+
+class GateioExecutor:
+    """Çok kullanıcılı Gate.io long açma / TP kapatma yürütücüsü"""
+
+    def __init__(self, host: str = HOST, price_markup: float = 1.03, fill_timeout: float = 10.0,
+                 order_poll_interval: float = 0.2, price_poll_interval: float = 1.0,
+                 persist_state: bool = True):
+        self.host = host
+        self.price_markup = price_markup
+        self.fill_timeout = fill_timeout
+        self.order_poll_interval = order_poll_interval
+        self.price_poll_interval = price_poll_interval
+        # Order / fiyat / yuzde durumunu state store'a yaz
+        self.persist_state = persist_state
+        self.precision = contract_precision_cache
+        self.session: Optional[aiohttp.ClientSession] = None
+
+    async def start(self):
+        """Paylaşılan HTTP session'ını başlat"""
+        if self.session is None:
+            connector = aiohttp.TCPConnector(limit=100, limit_per_host=50, ttl_dns_cache=300)
+            timeout = aiohttp.ClientTimeout(total=15, connect=5)
+            self.session = aiohttp.ClientSession(connector=connector, timeout=timeout)
+            logger.info("🔌 Gate.io executor session started")
+
+    async def stop(self):
+        """Session'ı kapat"""
+        if self.session:
+            await self.session.close()
+            self.session = None
+
+    async def __aenter__(self):
+        await self.start()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.stop()
+
+    def client(self, credentials: Optional[GateioCredentials] = None) -> GateioClient:
+        """Paylaşılan session üzerinde kullanıcıya özel client"""
+        return GateioClient(self.session, credentials, host=self.host)
+
+    def _persist(self, write, *args, **kwargs):
+        """State store yazması; hata olursa akışı durdurmaz"""
+        if not self.persist_state:
+            return
+        try:
+            write(*args, **kwargs)
+        except Exception as e:
+            logger.warning(f"⚠️ State store yazılamadı: {e}")
+
+    def _persist_tick(self, credentials: GateioCredentials, contract: str, contract_data: Dict,
+                      new_price: float, yuzde: float):
+        """Fiyat ve yuzde tek transaction'da"""
+        with state_store.batch():
+            state_store.set_price("gateio", contract, new_price, {"leverage_max": contract_data['leverage_max']})
+            state_store.set_tp_progress("gateio", credentials.user_id, yuzde, symbol=contract, price=new_price)
+
+    async def open_long(self, credentials: GateioCredentials, contract: str) -> Dict:
+        """Kontrat bilgisini al, +%3 limit fiyattan long emir gönder ve dolmasını bekle"""
+        client = self.client(credentials)
+        contract_data = await client.get_contract(contract)
+
+        last_price = float(contract_data['last_price'])
+        leverage = float(contract_data['leverage_max'])
+        # Kontrat yanıtı zaten elimizde: hassasiyet ek istek olmadan cache'ten/yanıttan gelir
+        precision = self.precision.update_from_contract(contract_data)
+
+        self._persist(state_store.set_price, "gateio", contract, last_price, {
+            "leverage_max": contract_data['leverage_max'],
+            "mark_price_round": contract_data['mark_price_round']
+        })
+
+        order_price = precision.round_price(last_price * self.price_markup)
+        size = precision.floor_size(credentials.open_usdt * leverage / last_price)
+        if size <= 0:
+            raise ValueError(f"Order size is zero for {contract} (open_usdt={credentials.open_usdt})")
+
+        logger.info(f"📈 [{credentials.user_id}] {contract} long: size={size} price={order_price}")
+        order = await client.place_order(contract, size, order_price)
+        self._persist(state_store.save_order, "gateio", credentials.user_id, order)
+
+        # Order durumunu API'den takip et
+        deadline = time.monotonic() + self.fill_timeout
+        while order.get('status') != 'finished' and time.monotonic() < deadline:
+            await asyncio.sleep(self.order_poll_interval)
+            order = await client.get_order(order['id'])
+
+        if order.get('status') != 'finished':
+            logger.warning(f"⚠️ [{credentials.user_id}] order {order['id']} not filled in time, cancelling")
+            try:
+                order = await client.cancel_order(order['id'])
+            except GateioAPIError as e:
+                logger.warning(f"⚠️ [{credentials.user_id}] cancel failed: {e}")
+
+        self._persist(state_store.save_order, "gateio", credentials.user_id, order)
+        return order
+
+    async def preload_precision(self) -> int:
+        """Kontrat kataloğunu bir kez çekip hassasiyet cache'ini doldur"""
+        contracts = await self.client().list_contracts()
+        loaded = self.precision.load_catalog(contracts)
+        logger.info(f"📐 Precision cache loaded for {loaded} contracts")
+        return loaded
+
+    async def monitor_take_profit(self, credentials: GateioCredentials, contract: str,
+                                  fill_price: float, size: int) -> Dict:
+        """Fiyatı izle, yuzde >= close_yuzde olduğunda pozisyonu kapat"""
+        client = self.client(credentials)
+        while True:
+            contract_data = await client.get_contract(contract, priority=PRIORITY_POLL)
+            new_price = float(contract_data['last_price'])
+            yuzde = round(new_price / fill_price, 3)
+
+            self._persist(self._persist_tick, credentials, contract, contract_data, new_price, yuzde)
+
+            if yuzde >= credentials.close_yuzde:
+                logger.info(f"🎯 [{credentials.user_id}] {contract} target {credentials.close_yuzde} reached ({yuzde})")
+                return await client.close_position(contract, size)
+
+            await asyncio.sleep(self.price_poll_interval)
+
+    async def run_user(self, credentials: GateioCredentials, contract: str) -> Dict:
+        """Tek kullanıcı için tam akış: long aç, TP'ye kadar izle, kapat"""
+        result = {'user_id': credentials.user_id, 'contract': contract, 'success': False}
+        try:
+            order = await self.open_long(credentials, contract)
+            result['order'] = order
+
+            filled_size = int(order.get('size', 0)) - int(order.get('left', 0))
+            fill_price = float(order.get('fill_price') or 0)
+            if order.get('finish_as') != 'filled':
+                # Kısmi dolum varsa pozisyonu bırakma
+                if filled_size > 0:
+                    result['close'] = await self.client(credentials).close_position(contract, filled_size)
+                result['error'] = f"order finished as {order.get('finish_as')}"
+                return result
+
+            result['close'] = await self.monitor_take_profit(credentials, contract, fill_price, filled_size)
+            result['success'] = True
+        except (GateioAPIError, aiohttp.ClientError, asyncio.TimeoutError, ValueError, KeyError) as e:
+            logger.error(f"❌ [{credentials.user_id}] Gate.io flow failed: {e}")
+            result['error'] = str(e)
+        return result
+
+    async def run_many(self, users: List[GateioCredentials], contract: str) -> List[Dict]:
+        """Tüm kullanıcılar için akışı eşzamanlı çalıştır"""
+        return await asyncio.gather(*(self.run_user(creds, contract) for creds in users))
+
+    async def close_for_user(self, credentials: GateioCredentials, contract: str, size: int) -> Dict:
+        """Acil durum: kullanıcının pozisyonunu hemen kapat"""
+        return await self.client(credentials).close_position(contract, size)
@@ -1,61 +1,46 @@
-import requests
-import time
-import hashlib
-import hmac
 import json
+import asyncio
+import os
+import sys
 
-host = "https://api.gateio.ws"
-prefix = "/api/v4"
-headers = {'Accept': 'application/json', 'Content-Type': 'application/json'}
+# Kapatma islemi gateio_executor.py icinde; bu dosya acil durum CLI'i olarak kalir
+sys.path.append(os.path.dirname(os.path.realpath(__file__)))
+from gateio_executor import GateioExecutor, GateioCredentials
+from state_store import state_store
 
-# secret.json dosyasini oku
-import os
-BASE_DIR = os.getcwd()
-with open(os.path.join(BASE_DIR, 'gateio', 'secret.json'), 'r') as file:
-  gateio_secrets = json.load(file)['gateio_example']
 
-# Degiskenleri tanimla
-gateio_api = gateio_secrets['api_key']
-gateio_secret = gateio_secrets['secret_key']
+def main():
+  BASE_DIR = os.getcwd()
+
+  # secret.json dosyasini oku
+  with open(os.path.join(BASE_DIR, 'gateio', 'secret.json'), 'r') as file:
+      gateio_secrets = json.load(file)['gateio_example']
 
-# order_gateio.json dosyasindan bilgileri oku
-with open(os.path.join(BASE_DIR, 'gateio', 'order_gateio.json'), 'r') as f:
-  order_data = json.load(f)
+  # Son order bilgisini state store'dan oku
+  user_id = os.getenv('USER_ID', 'default')
+  order_data = state_store.latest_order('gateio', user_id)
+  if not order_data:
+      print(f"❌ Kullanici {user_id} icin kayitli Gate.io order bulunamadi")
+      exit(1)
   gate_contract = order_data['contract']
   gate_id = order_data['id']
   gate_fill_price = order_data['fill_price']
-  gate_size = order_data['size']
-
-# order_id'yi ve diÄŸer bilgileri ekrana yazdir
-print(f"Order ID: {gate_id}")
-print(f"Contract: {gate_contract}")
-print(f"Fill Price: {gate_fill_price}")
-print(f"Size: {gate_size}")
-
-# Imza olusturma fonksiyonu
-def gen_sign(method, url, query_string=None, payload_string=None):
-  t = time.time()
-  m = hashlib.sha512()
-  m.update((payload_string or "").encode('utf-8'))
-  hashed_payload = m.hexdigest()
-  s = '%s\n%s\n%s\n%s\n%s' % (method, url, query_string or "", hashed_payload, t)
-  sign = hmac.new(gateio_secret.encode('utf-8'), s.encode('utf-8'), hashlib.sha512).hexdigest()
-  return {'KEY': gateio_api, 'Timestamp': str(t), 'SIGN': sign}
-
-# Pozisyonu kapatmak icin emir ver
-url = f'/futures/usdt/orders'
-body = {
-  "contract": gate_contract,
-  "size": -gate_size,  # Pozisyonu kapatmak icin ters yonde emir ver
-  "price": "0",  # Piyasa fiyatindan kapatmak icin 0 kullanilir
-  "tif": "ioc",  # Immediate or Cancel
-  "reduce_only": True  # Pozisyonu kapatmak icin
-}
-
-body_string = json.dumps(body)
-sign_headers = gen_sign('POST', prefix + url, '', body_string)
-headers.update(sign_headers)
-
-# API istegi yap
-r = requests.post(host + prefix + url, headers=headers, data=body_string)
-print(r.json())
+  gate_size = int(order_data['size']) - int(order_data.get('left', 0))
+
+  # order_id'yi ve diger bilgileri ekrana yazdir
+  print(f"Order ID: {gate_id}")
+  print(f"Contract: {gate_contract}")
+  print(f"Fill Price: {gate_fill_price}")
+  print(f"Size: {gate_size}")
+
+  credentials = GateioCredentials(gateio_secrets['api_key'], gateio_secrets['secret_key'])
+
+  async def run():
+      async with GateioExecutor() as executor:
+          return await executor.close_for_user(credentials, gate_contract, gate_size)
+
+  print(asyncio.run(run()))
+
+
+if __name__ == '__main__':
+  main()
@@ -1,71 +1,36 @@
-import json
-import time
+import asyncio
 import os
-import requests
+import sys
 
-# mark_price_round ile round_gate eslesmesini tanimla
-round_gate_mapping = {
-  0.1: 1,
-  0.01: 2,
-  0.001: 3,
-  0.0001: 4,
-  0.00001: 5,
-  1e-05: 5,
-  0.000001: 6,
-  1e-06: 6,
-  0.0000001: 7,
-  1e-07: 7,
-  0.00000001: 8,
-  1e-08: 8,
-  0.000000001: 9,
-  1e-09: 9
-}
+# Hassasiyet artik contract_precision.py cache'inden gelir ve gateio_executor.py
+# tarafindan dogrudan kullanilir. Bu script surekli calismaz: round_gate.txt'ye
+# ihtiyac duyan eski araclar icin degeri bir kez hesaplayip yazar.
+sys.path.append(os.path.dirname(os.path.realpath(__file__)))
+from gateio_executor import GateioExecutor
 
-# Dosya yollari
-BASE_DIR = os.getcwd()
-secret_file_path = os.path.join(BASE_DIR, 'secret.json')
-bitget_file_path = os.path.join(BASE_DIR, 'PERP', 'secret.json')
-gateio_file_path = os.path.join(BASE_DIR, 'gateio', 'secret.json')
-new_coin_file_path = os.path.join(BASE_DIR, 'gateio', 'new_coin_output.txt')
-round_gate_file_path = os.path.join(BASE_DIR, 'gateio', 'round_gate.txt')
 
-# Sonsuz dongu
-while True:
-  try:
-      # new_coin_output.txt dosyasindan sembolu oku
-      with open(new_coin_file_path, 'r') as file:
-          round_symbol = file.read().strip()
+def main():
+  # Dosya yollari
+  BASE_DIR = os.getcwd()
+  new_coin_file_path = os.path.join(BASE_DIR, 'gateio', 'new_coin_output.txt')
+  round_gate_file_path = os.path.join(BASE_DIR, 'gateio', 'round_gate.txt')
 
-      # API'den veri cek
-      api_url = f"https://api.gateio.ws/api/v4/futures/usdt/contracts/{round_symbol}"
-      response = requests.get(api_url)
-      response.raise_for_status()
-      contract_data = response.json()
+  # new_coin_output.txt dosyasindan sembolu oku
+  with open(new_coin_file_path, 'r') as file:
+      round_symbol = file.read().strip()
 
-      # mark_price_round degerini al
-      gateio_mark_price_round = float(contract_data.get('mark_price_round', 0))
-      print(f"round_symbol: {round_symbol}, mark_price_round: {gateio_mark_price_round}")
+  async def run():
+      async with GateioExecutor() as executor:
+          return await executor.precision.on_symbol_change(executor.client(), round_symbol)
 
-      # round_gate degerini belirle
-      rounded_value = round(gateio_mark_price_round, 10)
-      round_gate = round_gate_mapping.get(rounded_value, None)
+  precision = asyncio.run(run())
+  print(f"round_symbol: {round_symbol}, mark_price_round: {precision.price_tick}")
 
-      # round_gate degerini dosyaya yaz
-      if round_gate is not None:
-          with open(round_gate_file_path, 'w') as file:
-              file.write(str(round_gate))
-          print(f"round_gate: {round_gate}")
-      else:
-          print(f"Uyari: mark_price_round icin eslesen round_gate bulunamadi: {gateio_mark_price_round}")
+  # round_gate degerini dosyaya yaz
+  with open(round_gate_file_path, 'w') as file:
+      file.write(str(precision.price_decimals))
+  print(f"round_gate: {precision.price_decimals}")
 
-  except FileNotFoundError:
-      print("Hata: Belirtilen dosya bulunamadi.")
-  except json.JSONDecodeError:
-      print("Hata: JSON verisi cozulemedi.")
-  except requests.exceptions.RequestException as e:
-      print(f"API hatasi: {e}")
-  except Exception as e:
-      print(f"Beklenmeyen bir hata olustu: {e}")
 
-  # Bir sonraki yinelemeden once 1 saniye bekle
-  time.sleep(1)
+if __name__ == '__main__':
+  main()
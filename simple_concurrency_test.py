@@ -1,16 +1,22 @@
 #!/usr/bin/env python3
 """
 Simple test for the exact crash scenario: Two users updating API settings simultaneously
+
+Benchmark mode (group commit throughput):
+    python3 simple_concurrency_test.py --benchmark --users 50 --rounds 20
 """
 import sys
 import os
+import argparse
 import threading
 import time
 
 # Add production core to path
 sys.path.append(os.path.join(os.path.dirname(__file__), 'production', 'core'))
 
-from working_telegram_bot import WorkingTelegramBot
+from working_telegram_bot import WorkingTelegramBot, DatabaseManager
+
+BENCHMARK_DB = 'test_write_benchmark.db'
 
 def simulate_user_api_setup(bot, user_id, iteration):
     """Simulate the exact API setup that caused crashes"""
@@ -101,6 +107,7 @@ def main():
         print(f"✅ Successful operations: {successful_operations}/{total_operations}")
         print(f"🔍 User 625972998 final settings: {'✅ OK' if final_settings1 else '❌ Missing'}")
         print(f"🔍 User 8484524377 final settings: {'✅ OK' if final_settings2 else '❌ Missing'}")
+        print(f"🗃️ Settings cache: {bot.db_manager.get_cache_stats()}")
         
         if successful_operations == total_operations and final_settings1 and final_settings2:
             print(f"\n🎉 TEST PASSED: Multi-user concurrency fix is working!")
@@ -123,5 +130,79 @@ def main():
     except Exception as e:
         print(f"⚠️ Cleanup error: {e}")
 
+def run_write_benchmark(bot, users, rounds, batch_max_ops):
+    """Tek DatabaseManager konfigürasyonu için yazma throughput'unu ölç"""
+    for suffix in ('', '-wal', '-shm'):
+        if os.path.exists(BENCHMARK_DB + suffix):
+            os.remove(BENCHMARK_DB + suffix)
+    bot.db_path = BENCHMARK_DB
+    bot.init_database()
+    manager = DatabaseManager(BENCHMARK_DB, pool_size=10, batch_max_ops=batch_max_ops)
+    
+    failures = []
+    def on_complete(success, error=None):
+        if not success:
+            failures.append(error)
+    
+    def user_worker(user_id):
+        manager.save_user_async(user_id, f"benchuser_{user_id}", callback=on_complete)
+        for iteration in range(rounds):
+            manager.update_setting_async(user_id, 'api_key', f'bg_bench_{user_id}_{iteration}', callback=on_complete)
+            manager.update_setting_async(user_id, 'secret_key', f'sk_bench_{user_id}_{iteration}', callback=on_complete)
+            manager.update_setting_async(user_id, 'passphrase', f'pass_{user_id}_{iteration}', callback=on_complete)
+            manager.update_setting_async(user_id, 'leverage', 10 + iteration % 5, callback=on_complete)
+    
+    started = time.perf_counter()
+    threads = [threading.Thread(target=user_worker, args=(1000 + i,)) for i in range(users)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    drained = manager.flush(timeout=120)
+    elapsed = time.perf_counter() - started
+    
+    metrics = manager.get_write_metrics()
+    manager.shutdown()
+    for suffix in ('', '-wal', '-shm'):
+        if os.path.exists(BENCHMARK_DB + suffix):
+            os.remove(BENCHMARK_DB + suffix)
+    
+    return {
+        'elapsed': elapsed,
+        'ops_per_sec': metrics['ops'] / elapsed if elapsed else 0.0,
+        'drained': drained,
+        'failures': len(failures),
+        **metrics,
+    }
+
+def benchmark(users, rounds):
+    """Eski davranış (op başına commit) ile group commit'i karşılaştır"""
+    print(f"🏁 Write benchmark: {users} users x {rounds} rounds x 4 updates")
+    bot = WorkingTelegramBot()
+    
+    results = {
+        'commit-per-op': run_write_benchmark(bot, users, rounds, batch_max_ops=1),
+        'group-commit': run_write_benchmark(bot, users, rounds, batch_max_ops=256),
+    }
+    
+    print(f"\n{'MODE':<16}{'OPS':>8}{'OPS/S':>10}{'BATCHES':>9}{'AVG BATCH':>11}{'P50 ms':>9}{'P95 ms':>9}{'FAILED':>8}")
+    for mode, result in results.items():
+        print(f"{mode:<16}{result['ops']:>8}{result['ops_per_sec']:>10.0f}{result['batches']:>9}"
+              f"{result['avg_batch_size']:>11}{result['commit_ms_p50']:>9}{result['commit_ms_p95']:>9}{result['failures']:>8}")
+    
+    baseline = results['commit-per-op']['ops_per_sec']
+    if baseline:
+        print(f"\n📈 Group commit speedup: {results['group-commit']['ops_per_sec'] / baseline:.1f}x")
+    bot.db_manager.shutdown()
+
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Telegram bot DatabaseManager concurrency test")
+    parser.add_argument('--benchmark', action='store_true', help="Write throughput benchmark")
+    parser.add_argument('--users', type=int, default=50)
+    parser.add_argument('--rounds', type=int, default=20)
+    args = parser.parse_args()
+    
+    if args.benchmark:
+        benchmark(args.users, args.rounds)
+    else:
+        main()
\ No newline at end of file
@@ -16,6 +16,7 @@ from datetime import datetime, timezone
 from pathlib import Path
 from typing import Dict, List, Optional, Set
 import aiosqlite
+from async_sqlite_pool import AsyncSQLitePool
 from aiogram import Bot, Dispatcher, F
 from aiogram.types import Message, CallbackQuery, InlineKeyboardMarkup, InlineKeyboardButton
 from aiogram.filters import Command
@@ -29,6 +30,10 @@ import traceback
 import hashlib
 import base64
 
+sys.path.append(os.path.join(os.path.dirname(os.path.realpath(__file__)), 'production', 'core'))
+from portfolio_snapshot import PortfolioSnapshotter, format_portfolio
+from bitget_client import BitgetCredentials
+
 # Logging setup  
 logging.basicConfig(
     level=logging.INFO,
@@ -79,6 +84,8 @@ class DatabaseManager:
         self.db_path = db_path
         self.encryption_key = self._get_encryption_key()
         self.cipher = Fernet(self.encryption_key)
+        # Shared connection pool (prepared pragmas, reused connections)
+        self.pool = AsyncSQLitePool(db_path, size=int(os.getenv('SQLITE_POOL_SIZE', '4')))
         
     def _get_encryption_key(self) -> bytes:
         """Get and validate encryption key from environment (fail-fast)"""
@@ -200,6 +207,15 @@ class DatabaseManager:
                 CREATE INDEX IF NOT EXISTS idx_announcements_processed ON announcements(processed, discovered_at);
                 CREATE INDEX IF NOT EXISTS idx_trading_tasks_status ON trading_tasks(status, created_at);
             """),
+            
+            # Version 3: Task leases for parallel workers (lease_until = unix epoch seconds)
+            (3, "Trading task leases", """
+                ALTER TABLE trading_tasks ADD COLUMN lease_until REAL;
+                ALTER TABLE trading_tasks ADD COLUMN worker_id TEXT;
+                ALTER TABLE trading_tasks ADD COLUMN attempts INTEGER DEFAULT 0;
+                
+                CREATE INDEX IF NOT EXISTS idx_trading_tasks_lease ON trading_tasks(status, lease_until);
+            """),
         ]
         
         for version, description, sql in migrations:
@@ -214,6 +230,10 @@ class DatabaseManager:
                     INSERT INTO schema_version (version, description) VALUES (?, ?)
                 """, (version, description))
     
+    async def close(self):
+        """Close pooled connections"""
+        await self.pool.close()
+    
     def encrypt_text(self, text: str) -> str:
         """Encrypt sensitive text"""
         return self.cipher.encrypt(text.encode()).decode()
@@ -227,7 +247,7 @@ class DatabaseManager:
     
     async def store_user_credentials(self, user_id: int, api_key: str, secret_key: str, passphrase: str):
         """Store encrypted user credentials"""
-        async with aiosqlite.connect(self.db_path) as db:
+        async with self.pool.connection() as db:
             await db.execute("""
                 INSERT OR REPLACE INTO user_credentials 
                 (user_id, api_key_encrypted, secret_key_encrypted, passphrase_encrypted, updated_at)
@@ -243,7 +263,7 @@ class DatabaseManager:
     
     async def get_user_credentials(self, user_id: int) -> Optional[Dict]:
         """Get decrypted user credentials"""
-        async with aiosqlite.connect(self.db_path) as db:
+        async with self.pool.connection() as db:
             cursor = await db.execute("""
                 SELECT api_key_encrypted, secret_key_encrypted, passphrase_encrypted
                 FROM user_credentials WHERE user_id = ?
@@ -260,7 +280,7 @@ class DatabaseManager:
     
     async def initialize_token_baseline(self, tokens: Set[str]):
         """Initialize token baseline to prevent false positives"""
-        async with aiosqlite.connect(self.db_path) as db:
+        async with self.pool.connection() as db:
             # Check if baseline already exists
             cursor = await db.execute("SELECT COUNT(*) FROM token_baseline")
             result = await cursor.fetchone()
@@ -281,14 +301,14 @@ class DatabaseManager:
     
     async def get_baseline_tokens(self) -> Set[str]:
         """Get baseline tokens"""
-        async with aiosqlite.connect(self.db_path) as db:
+        async with self.pool.connection() as db:
             cursor = await db.execute("SELECT symbol FROM token_baseline WHERE market_type = 'KRW'")
             rows = await cursor.fetchall()
             return {row[0] for row in rows}
     
     async def update_token_baseline(self, new_tokens: Set[str]):
         """Update baseline with new tokens"""
-        async with aiosqlite.connect(self.db_path) as db:
+        async with self.pool.connection() as db:
             for token in new_tokens:
                 await db.execute("""
                     INSERT OR IGNORE INTO token_baseline (symbol, market_type)
@@ -426,7 +446,7 @@ class StableUpbitMonitor:
         announcement_id = f"krw_{token}_{int(datetime.now().timestamp())}_{uuid.uuid4().hex[:8]}"
         
         # Store in database
-        async with aiosqlite.connect(self.db_manager.db_path) as db:
+        async with self.db_manager.pool.connection() as db:
             await db.execute("""
                 INSERT INTO announcements (id, token, title, discovered_at, processed)
                 VALUES (?, ?, ?, ?, ?)
@@ -449,10 +469,12 @@ class StableUpbitMonitor:
 class TelegramBot:
     """Production Telegram bot with single-instance control"""
     
-    def __init__(self, token: str, db_manager: DatabaseManager):
+    def __init__(self, token: str, db_manager: DatabaseManager,
+                 portfolio: Optional[PortfolioSnapshotter] = None):
         self.bot = Bot(token=token)
         self.dp = Dispatcher()
         self.db_manager = db_manager
+        self.portfolio = portfolio
         self._register_handlers()
     
     def _register_handlers(self):
@@ -476,7 +498,7 @@ class TelegramBot:
         first_name = user.first_name or "User"
         
         # Register user
-        async with aiosqlite.connect(self.db_manager.db_path) as db:
+        async with self.db_manager.pool.connection() as db:
             await db.execute("""
                 INSERT OR REPLACE INTO users (user_id, username, first_name)
                 VALUES (?, ?, ?)
@@ -571,7 +593,7 @@ class TelegramBot:
         # Get user status
         credentials = await self.db_manager.get_user_credentials(user_id)
         
-        async with aiosqlite.connect(self.db_manager.db_path) as db:
+        async with self.db_manager.pool.connection() as db:
             # Get settings
             cursor = await db.execute("""
                 SELECT leverage, trade_amount, take_profit_percent, auto_trading
@@ -600,6 +622,12 @@ class TelegramBot:
                 f"📈 Recent trades (24h): {recent_trades}\n\n"
                 f"🔍 Monitoring: Upbit KRW listings"
             )
+            # Positions / PnL from the in-memory snapshot (no exchange round trip)
+            if credentials and self.portfolio:
+                snapshot = self.portfolio.get(user_id)
+                if snapshot is None:
+                    self.portfolio.request_refresh(user_id)
+                status_text += "\n\n" + format_portfolio(snapshot)
         else:
             status_text = (
                 "❌ **Not configured**\n\n"
@@ -616,7 +644,7 @@ class TelegramBot:
         user_id = message.from_user.id
         
         # Get current settings
-        async with aiosqlite.connect(self.db_manager.db_path) as db:
+        async with self.db_manager.pool.connection() as db:
             cursor = await db.execute("""
                 SELECT leverage, trade_amount, take_profit_percent, auto_trading
                 FROM user_settings WHERE user_id = ?
@@ -681,7 +709,7 @@ class TelegramBot:
                 if not (10 <= value <= 125):
                     raise ValueError("Leverage must be between 10x-125x")
                 
-                async with aiosqlite.connect(self.db_manager.db_path) as db:
+                async with self.db_manager.pool.connection() as db:
                     await db.execute("""
                         INSERT OR REPLACE INTO user_settings 
                         (user_id, leverage, trade_amount, take_profit_percent, auto_trading)
@@ -703,7 +731,7 @@ class TelegramBot:
                 if not (10 <= value <= 1000):
                     raise ValueError("Trade amount must be between $10-$1000")
                 
-                async with aiosqlite.connect(self.db_manager.db_path) as db:
+                async with self.db_manager.pool.connection() as db:
                     await db.execute("""
                         INSERT OR REPLACE INTO user_settings 
                         (user_id, leverage, trade_amount, take_profit_percent, auto_trading)
@@ -726,7 +754,7 @@ class TelegramBot:
                 if not (5 <= value <= 50):
                     raise ValueError("Take profit must be between 5%-50%")
                 
-                async with aiosqlite.connect(self.db_manager.db_path) as db:
+                async with self.db_manager.pool.connection() as db:
                     await db.execute("""
                         INSERT OR REPLACE INTO user_settings 
                         (user_id, leverage, trade_amount, take_profit_percent, auto_trading)
@@ -800,6 +828,12 @@ class TelegramBot:
 class StableCryptoBot:
     """Main stable crypto bot coordinator"""
     
+    # Trade task workers
+    TASK_LEASE_SECONDS = 60          # Worker ölürse görev bu süre sonunda yeniden alınır
+    TASK_MAX_ATTEMPTS = 3            # Bu kadar lease süresi dolan görev 'failed' olur
+    TASK_IDLE_POLL_SECONDS = 10      # Wakeup gelmezse (örn. lease kurtarma) yoklama aralığı
+    TASK_LEASE_RENEW_SECONDS = 20    # Çalışan görevin lease'i bu aralıkla uzatılır
+    
     def __init__(self):
         self.running = True
         self.lock = SingletonLock()
@@ -808,6 +842,18 @@ class StableCryptoBot:
         self.telegram_bot = None
         self.scheduler = AsyncIOScheduler()
         
+        # Background portfolio snapshots for /status (refreshed on schedule and after trades)
+        self.portfolio = PortfolioSnapshotter(
+            self._load_portfolio_credentials,
+            interval=float(os.getenv('PORTFOLIO_REFRESH_SECONDS', '30'))
+        )
+        
+        # Parallel trade workers: wakeup on new tasks, bounded concurrency
+        self.max_trade_workers = int(os.getenv('TRADE_WORKER_CONCURRENCY', '8'))
+        self.worker_id = f"{os.getpid()}-{uuid.uuid4().hex[:6]}"
+        self.task_wakeup = asyncio.Event()
+        self.in_flight_task_ids: Set[str] = set()
+        
         # Signal handlers
         signal.signal(signal.SIGINT, self._signal_handler)
         signal.signal(signal.SIGTERM, self._signal_handler)
@@ -837,7 +883,7 @@ class StableCryptoBot:
             if not telegram_token:
                 raise ValueError("TELEGRAM_BOT_TOKEN environment variable not set")
             
-            self.telegram_bot = TelegramBot(telegram_token, self.db_manager)
+            self.telegram_bot = TelegramBot(telegram_token, self.db_manager, self.portfolio)
             
             # Schedule monitoring (every 1 minute)
             self.scheduler.add_job(
@@ -857,7 +903,8 @@ class StableCryptoBot:
             tasks = [
                 self._run_telegram_bot(),
                 self._process_pending_trades(),
-                self._health_monitor()
+                self._health_monitor(),
+                self.portfolio.run()
             ]
             
             logger.info("🏭 STABLE CRYPTO BOT RUNNING - 24/7 MODE ACTIVE")
@@ -869,6 +916,28 @@ class StableCryptoBot:
             await self.stop()
             raise
     
+    async def _load_portfolio_credentials(self) -> Dict[int, BitgetCredentials]:
+        """Credentials of every user tracked by the portfolio snapshotter"""
+        async with self.db_manager.pool.connection() as db:
+            cursor = await db.execute("""
+                SELECT user_id, api_key_encrypted, secret_key_encrypted, passphrase_encrypted
+                FROM user_credentials
+            """)
+            rows = await cursor.fetchall()
+        
+        credentials = {}
+        for user_id, api_key, secret_key, passphrase in rows:
+            try:
+                credentials[user_id] = BitgetCredentials(
+                    self.db_manager.decrypt_text(api_key),
+                    self.db_manager.decrypt_text(secret_key),
+                    self.db_manager.decrypt_text(passphrase),
+                    user_id=str(user_id)
+                )
+            except Exception as e:
+                logger.warning(f"⚠️ Skipping portfolio snapshot for user {user_id}: {e}")
+        return credentials
+    
     async def _check_and_process_listings(self):
         """Check for new listings and process them"""
         try:
@@ -898,7 +967,7 @@ class StableCryptoBot:
         
         try:
             # Mark announcement as being processed
-            async with aiosqlite.connect(self.db_manager.db_path) as db:
+            async with self.db_manager.pool.connection() as db:
                 await db.execute("""
                     UPDATE announcements 
                     SET processing_started_at = ?
@@ -925,7 +994,7 @@ class StableCryptoBot:
                     # Create trading task
                     task_id = str(uuid.uuid4())
                     
-                    async with aiosqlite.connect(self.db_manager.db_path) as db:
+                    async with self.db_manager.pool.connection() as db:
                         await db.execute("""
                             INSERT INTO trading_tasks 
                             (id, user_id, announcement_id, token_symbol, action, status)
@@ -933,6 +1002,9 @@ class StableCryptoBot:
                         """, (task_id, user_id, announcement_id, token))
                         await db.commit()
                     
+                    # Wake trade workers immediately
+                    self.task_wakeup.set()
+                    
                     # Notify user
                     if self.telegram_bot:
                         await self.telegram_bot.notify_new_listing(user_id, listing)
@@ -943,7 +1015,7 @@ class StableCryptoBot:
                     logger.error(f"❌ Failed to create trade for user {user_id}: {e}")
             
             # Mark announcement as processed
-            async with aiosqlite.connect(self.db_manager.db_path) as db:
+            async with self.db_manager.pool.connection() as db:
                 await db.execute("""
                     UPDATE announcements 
                     SET processed = 1, processing_completed_at = ?
@@ -957,53 +1029,154 @@ class StableCryptoBot:
             logger.error(f"❌ Error processing listing {token}: {e}")
     
     async def _process_pending_trades(self):
-        """Process pending trading tasks"""
+        """Dispatch pending trading tasks to a bounded pool of concurrent workers"""
+        in_flight: Set[asyncio.Task] = set()
+        logger.info(f"👷 Trade workers started (id={self.worker_id}, concurrency={self.max_trade_workers})")
+        
         while self.running:
             try:
-                # Get pending trades
-                async with aiosqlite.connect(self.db_manager.db_path) as db:
-                    cursor = await db.execute("""
-                        SELECT id, user_id, token_symbol, action
-                        FROM trading_tasks 
-                        WHERE status = 'pending'
-                        ORDER BY created_at
-                        LIMIT 10
-                    """)
-                    pending_trades = await cursor.fetchall()
+                # Clear before claiming so an insert during the claim is not missed
+                self.task_wakeup.clear()
+                capacity = self.max_trade_workers - len(in_flight)
+                claimed = await self._claim_trade_tasks(capacity) if capacity > 0 else []
                 
-                for task_id, user_id, token, action in pending_trades:
-                    try:
-                        # TODO: Implement actual Bitget trading
-                        logger.info(f"💰 SIMULATING TRADE: {action} {token} for user {user_id}")
-                        
-                        # Mark as completed (simulation)
-                        async with aiosqlite.connect(self.db_manager.db_path) as db:
-                            await db.execute("""
-                                UPDATE trading_tasks 
-                                SET status = 'completed', completed_at = ?
-                                WHERE id = ?
-                            """, (datetime.now(timezone.utc), task_id))
-                            await db.commit()
-                        
-                        logger.info(f"✅ Trade {task_id[:8]} completed")
-                        
-                    except Exception as e:
-                        logger.error(f"❌ Trade execution error {task_id}: {e}")
-                        
-                        # Mark as failed
-                        async with aiosqlite.connect(self.db_manager.db_path) as db:
-                            await db.execute("""
-                                UPDATE trading_tasks 
-                                SET status = 'failed', error_message = ?, completed_at = ?
-                                WHERE id = ?
-                            """, (str(e), datetime.now(timezone.utc), task_id))
-                            await db.commit()
+                for task_id, user_id, token, action, lease_token in claimed:
+                    self.in_flight_task_ids.add(task_id)
+                    worker = asyncio.create_task(self._run_trade_task(task_id, user_id, token, action, lease_token))
+                    in_flight.add(worker)
+                    worker.add_done_callback(in_flight.discard)
+                    worker.add_done_callback(lambda _, task_id=task_id: self.in_flight_task_ids.discard(task_id))
                 
-                await asyncio.sleep(10)  # Check every 10 seconds
+                if len(in_flight) >= self.max_trade_workers:
+                    # All slots busy - wait for one to free up
+                    await asyncio.wait(in_flight, return_when=asyncio.FIRST_COMPLETED)
+                elif len(claimed) < capacity:
+                    # Queue drained - sleep until new tasks arrive (or a lease may have expired)
+                    try:
+                        await asyncio.wait_for(self.task_wakeup.wait(), self.TASK_IDLE_POLL_SECONDS)
+                    except asyncio.TimeoutError:
+                        pass
                 
             except Exception as e:
                 logger.error(f"❌ Trade processing error: {e}")
-                await asyncio.sleep(30)
+                await asyncio.sleep(5)
+        
+        if in_flight:
+            logger.info(f"⏳ Waiting for {len(in_flight)} in-flight trades...")
+            await asyncio.gather(*in_flight, return_exceptions=True)
+    
+    async def _claim_trade_tasks(self, limit: int) -> List[tuple]:
+        """
+        Atomically lease up to `limit` tasks: pending ones, plus 'processing' ones
+        whose lease expired (crashed worker). Tasks that exhausted their attempts fail.
+        Each claim gets its own lease token; tasks still running here are never re-claimed.
+        """
+        now = datetime.now(timezone.utc).timestamp()
+        running = list(self.in_flight_task_ids)
+        not_running = f"AND id NOT IN ({','.join('?' * len(running))})" if running else ""
+        async with self.db_manager.pool.connection() as db:
+            await db.execute("BEGIN IMMEDIATE")
+            
+            # Expired leases with no attempts left
+            cursor = await db.execute("""
+                UPDATE trading_tasks 
+                SET status = 'failed', error_message = 'Lease expired too many times', 
+                    completed_at = ?, lease_until = NULL
+                WHERE status = 'processing' AND lease_until < ? AND attempts >= ? {not_running}
+            """.format(not_running=not_running), (datetime.now(timezone.utc), now, self.TASK_MAX_ATTEMPTS, *running))
+            if cursor.rowcount:
+                logger.error(f"❌ {cursor.rowcount} trade tasks failed after {self.TASK_MAX_ATTEMPTS} expired leases")
+            
+            cursor = await db.execute("""
+                SELECT id, user_id, token_symbol, action, status
+                FROM trading_tasks
+                WHERE status = 'pending'
+                ORDER BY created_at
+                LIMIT ?
+            """, (limit,))
+            rows = await cursor.fetchall()
+            
+            if len(rows) < limit:
+                cursor = await db.execute("""
+                    SELECT id, user_id, token_symbol, action, status
+                    FROM trading_tasks
+                    WHERE status = 'processing' AND lease_until < ? {not_running}
+                    ORDER BY lease_until
+                    LIMIT ?
+                """.format(not_running=not_running), (now, *running, limit - len(rows)))
+                rows += await cursor.fetchall()
+            
+            # worker_id sütunu claim başına lease token'ı tutar: süresi dolup başkasına
+            # geçen görevi eski claim ne uzatabilir ne de bitirebilir
+            leases = [(row, f"{self.worker_id}:{uuid.uuid4().hex[:8]}") for row in rows]
+            if leases:
+                await db.executemany("""
+                    UPDATE trading_tasks 
+                    SET status = 'processing', lease_until = ?, worker_id = ?, 
+                        attempts = COALESCE(attempts, 0) + 1
+                    WHERE id = ?
+                """, [(now + self.TASK_LEASE_SECONDS, lease_token, row[0]) for row, lease_token in leases])
+            await db.commit()
+        
+        recovered = sum(1 for row in rows if row[4] == 'processing')
+        if recovered:
+            logger.warning(f"♻️ Recovered {recovered} trade tasks with expired leases")
+        return [(*row[:4], lease_token) for row, lease_token in leases]
+    
+    async def _renew_trade_lease(self, task_id: str, lease_token: str):
+        """Görev sürdükçe lease'i uzat; lease kaybedilirse dur"""
+        while True:
+            await asyncio.sleep(self.TASK_LEASE_RENEW_SECONDS)
+            try:
+                async with self.db_manager.pool.connection() as db:
+                    cursor = await db.execute("""
+                        UPDATE trading_tasks SET lease_until = ?
+                        WHERE id = ? AND status = 'processing' AND worker_id = ?
+                    """, (datetime.now(timezone.utc).timestamp() + self.TASK_LEASE_SECONDS, task_id, lease_token))
+                    await db.commit()
+            except Exception as e:
+                # Bir sonraki turda tekrar denenir; lease hâlâ TASK_LEASE_SECONDS boyunca geçerli
+                logger.error(f"❌ Could not renew lease for trade {task_id[:8]}: {e}")
+                continue
+            if cursor.rowcount == 0:
+                logger.warning(f"⚠️ Trade {task_id[:8]} lease lost while running")
+                return
+    
+    async def _run_trade_task(self, task_id: str, user_id: int, token: str, action: str, lease_token: str):
+        """Execute one leased trade task (renewing its lease) and record the result"""
+        renewer = asyncio.create_task(self._renew_trade_lease(task_id, lease_token))
+        try:
+            # TODO: Implement actual Bitget trading
+            logger.info(f"💰 SIMULATING TRADE: {action} {token} for user {user_id}")
+            
+            await self._finish_trade_task(task_id, lease_token, 'completed')
+            logger.info(f"✅ Trade {task_id[:8]} completed")
+            
+            # Position changed: refresh this user's snapshot right away
+            self.portfolio.request_refresh(user_id)
+            
+        except Exception as e:
+            logger.error(f"❌ Trade execution error {task_id}: {e}")
+            try:
+                await self._finish_trade_task(task_id, lease_token, 'failed', str(e))
+            except Exception as db_error:
+                # Lease expires and the task is retried
+                logger.error(f"❌ Could not mark trade {task_id} failed: {db_error}")
+        finally:
+            renewer.cancel()
+    
+    async def _finish_trade_task(self, task_id: str, lease_token: str, status: str,
+                                 error_message: Optional[str] = None):
+        """Release the lease; ignored if the task was re-claimed under another lease token meanwhile"""
+        async with self.db_manager.pool.connection() as db:
+            cursor = await db.execute("""
+                UPDATE trading_tasks 
+                SET status = ?, error_message = ?, completed_at = ?, lease_until = NULL
+                WHERE id = ? AND status = 'processing' AND worker_id = ?
+            """, (status, error_message, datetime.now(timezone.utc), task_id, lease_token))
+            await db.commit()
+        if cursor.rowcount == 0:
+            logger.warning(f"⚠️ Trade {task_id[:8]} lease lost before completion")
     
     async def _run_telegram_bot(self):
         """Run Telegram bot with restart capability"""
@@ -1023,7 +1196,7 @@ class StableCryptoBot:
         while self.running:
             try:
                 # Health checks
-                async with aiosqlite.connect(self.db_manager.db_path) as db:
+                async with self.db_manager.pool.connection() as db:
                     cursor = await db.execute("SELECT COUNT(*) FROM users")
                     result = await cursor.fetchone()
                     user_count = result[0] if result and result[0] else 0
@@ -1055,11 +1228,15 @@ class StableCryptoBot:
         if self.scheduler.running:
             self.scheduler.shutdown(wait=False)
         
+        self.portfolio.stop()
+        
         if self.upbit_monitor:
             await self.upbit_monitor.stop()
         
         self.lock.release()
         
+        await self.db_manager.close()
+        
         logger.info("✅ Stable crypto bot stopped gracefully")
 
 async def main():
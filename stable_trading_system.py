@@ -4,15 +4,18 @@
 Modern asyncio-based architecture with Redis queues and proper error handling
 GOAL: NEVER CRASH - 24/7 UPTIME GUARANTEED
 """
+import argparse
 import asyncio
 import logging
 import os
 import signal
+import socket
 import sys
 from datetime import datetime, timezone
 from pathlib import Path
-from typing import Dict, List, Optional
+from typing import Awaitable, Callable, Dict, List, Optional
 import aiosqlite
+from async_sqlite_pool import AsyncSQLitePool
 import redis.asyncio as redis
 from aiogram import Bot, Dispatcher, F
 from aiogram.types import Message, CallbackQuery, InlineKeyboardMarkup, InlineKeyboardButton
@@ -28,6 +31,10 @@ import uuid
 import traceback
 from contextlib import asynccontextmanager
 
+# Shared async Bitget client (production/exchanges/PERP)
+sys.path.append(os.path.join(os.path.dirname(os.path.realpath(__file__)), 'production', 'exchanges', 'PERP'))
+from bitget_client import BitgetClient, BitgetCredentials, BitgetAPIError, size_from_notional
+
 # Logging setup
 logging.basicConfig(
     level=logging.INFO,
@@ -39,6 +46,28 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Redis streams and consumer groups
+LISTINGS_STREAM = "upbit:new_listings"
+LISTINGS_GROUP = "listing-processors"
+PENDING_ORDERS_STREAM = "trading:pending_orders"
+ORDERS_GROUP = "order-workers"
+
+class OrderRejected(Exception):
+    """Order can never succeed as queued (no credentials, not listed, API reject): fail the task, ack the entry"""
+
+def create_redis_client(url: str):
+    """
+    Redis client from URL. 'fakeredis://' uses the in-process fakeredis stand-in
+    (optional dependency, for local testing only).
+    """
+    if url.startswith('fakeredis://'):
+        try:
+            import fakeredis
+        except ImportError:
+            raise RuntimeError("REDIS_URL=fakeredis:// requires the fakeredis package (pip install fakeredis)")
+        return fakeredis.aioredis.FakeRedis(decode_responses=True)
+    return redis.Redis.from_url(url, decode_responses=True)
+
 class DatabaseManager:
     """Unified database with proper schema and migrations"""
     
@@ -46,6 +75,8 @@ class DatabaseManager:
         self.db_path = db_path
         self.encryption_key = self._get_or_create_encryption_key()
         self.cipher = Fernet(self.encryption_key)
+        # Shared connection pool (prepared pragmas, reused connections)
+        self.pool = AsyncSQLitePool(db_path, size=int(os.getenv('SQLITE_POOL_SIZE', '4')))
         
     def _get_or_create_encryption_key(self) -> bytes:
         """Get encryption key from env or create new one"""
@@ -155,6 +186,10 @@ class DatabaseManager:
             await db.commit()
             logger.info("✅ Database initialized with unified schema")
     
+    async def close(self):
+        """Close pooled connections"""
+        await self.pool.close()
+    
     def encrypt_text(self, text: str) -> str:
         """Encrypt sensitive text"""
         return self.cipher.encrypt(text.encode()).decode()
@@ -165,7 +200,7 @@ class DatabaseManager:
     
     async def store_user_credentials(self, user_id: int, api_key: str, secret_key: str, passphrase: str):
         """Store encrypted user credentials"""
-        async with aiosqlite.connect(self.db_path) as db:
+        async with self.pool.connection() as db:
             await db.execute("""
                 INSERT OR REPLACE INTO user_credentials 
                 (user_id, bitget_api_key_encrypted, bitget_secret_key_encrypted, bitget_passphrase_encrypted, updated_at)
@@ -181,7 +216,7 @@ class DatabaseManager:
     
     async def get_user_credentials(self, user_id: int) -> Optional[Dict]:
         """Get decrypted user credentials"""
-        async with aiosqlite.connect(self.db_path) as db:
+        async with self.pool.connection() as db:
             cursor = await db.execute("""
                 SELECT bitget_api_key_encrypted, bitget_secret_key_encrypted, bitget_passphrase_encrypted
                 FROM user_credentials WHERE user_id = ?
@@ -327,7 +362,7 @@ class UpbitMonitor:
         announcement_id = f"listing_{token}_{int(datetime.now().timestamp())}"
         
         # Store in database
-        async with aiosqlite.connect(self.db_manager.db_path) as db:
+        async with self.db_manager.pool.connection() as db:
             await db.execute("""
                 INSERT OR IGNORE INTO announcements (id, title, tokens, discovered_at)
                 VALUES (?, ?, ?, ?)
@@ -340,7 +375,7 @@ class UpbitMonitor:
             await db.commit()
         
         # Publish to Redis stream
-        await self.redis_client.xadd("upbit:new_listings", {
+        await self.redis_client.xadd(LISTINGS_STREAM, {
             "announcement_id": announcement_id,
             "token": token,
             "symbol": symbol,
@@ -425,12 +460,170 @@ class TelegramBot:
             except Exception as e:
                 logger.error(f"Failed to edit message: {e}")
 
+class StreamConsumer:
+    """
+    Redis Streams consumer group loop (at-least-once delivery)
+    - XREADGROUP: each entry goes to exactly one consumer of the group
+    - XACK only after the handler succeeds; failures stay in the pending entries list
+    - XAUTOCLAIM: entries idle longer than claim_idle_ms (crashed consumer) are taken over
+    - Entries delivered max_deliveries times are moved to '<stream>:dead' and acked
+    Handlers must be idempotent: a crash between handler and XACK redelivers the entry.
+    Redelivered entries carry a '_deliveries' field with the delivery count.
+    """
+    
+    def __init__(self, redis_client, stream: str, group: str, consumer: str,
+                 handler: Callable[[dict], Awaitable[None]],
+                 dead_letter_handler: Optional[Callable[[dict], Awaitable[None]]] = None,
+                 batch_size: int = 10, block_ms: int = 1000,
+                 claim_idle_ms: int = 60000, max_deliveries: int = 5,
+                 start_id: str = '$'):
+        self.redis_client = redis_client
+        self.stream = stream
+        self.group = group
+        self.consumer = consumer
+        self.handler = handler
+        self.dead_letter_handler = dead_letter_handler
+        self.batch_size = batch_size
+        self.block_ms = block_ms
+        self.claim_idle_ms = claim_idle_ms
+        self.max_deliveries = max_deliveries
+        self.start_id = start_id
+        self._claim_cursor = '0-0'
+        self._last_claim = 0.0
+        self.stats = {'processed': 0, 'failed': 0, 'reclaimed': 0, 'dead_lettered': 0}
+    
+    async def ensure_group(self):
+        """Create the consumer group (and stream) if missing"""
+        try:
+            await self.redis_client.xgroup_create(self.stream, self.group, id=self.start_id, mkstream=True)
+            logger.info(f"✅ Created consumer group {self.group} on {self.stream}")
+        except redis.ResponseError as e:
+            if 'BUSYGROUP' not in str(e):
+                raise
+    
+    async def run(self, is_running: Callable[[], bool]):
+        """Consume until is_running() returns False"""
+        await self.ensure_group()
+        await self._drain_own_pending(is_running)
+        
+        while is_running():
+            try:
+                loop_time = asyncio.get_running_loop().time()
+                if loop_time - self._last_claim >= self.claim_idle_ms / 2000:
+                    self._last_claim = loop_time
+                    await self._reclaim()
+                
+                messages = await self._read('>')
+                await self._handle_batch(messages)
+                
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"❌ Stream consumer {self.consumer} ({self.stream}) error: {e}")
+                await asyncio.sleep(5)
+    
+    async def _drain_own_pending(self, is_running: Callable[[], bool]):
+        """
+        Entries delivered to this consumer name before a restart, in one pass over its PEL.
+        The start id moves past every entry handled, failed or not: failures are left to the
+        XAUTOCLAIM path (claim_idle_ms apart) instead of being re-read back-to-back, which
+        would burn through max_deliveries on a transient error.
+        """
+        last_id = '0'
+        while is_running():
+            try:
+                entries = await self._read(last_id, skip_deleted=False)
+                if not entries:
+                    return
+                await self._handle_batch([(msg_id, fields) for msg_id, fields in entries if fields],
+                                         check_deliveries=True)
+                last_id = entries[-1][0]
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"❌ Stream consumer {self.consumer} ({self.stream}) pending drain error: {e}")
+                await asyncio.sleep(5)
+    
+    async def _read(self, last_id: str, skip_deleted: bool = True) -> list:
+        response = await self.redis_client.xreadgroup(
+            self.group, self.consumer, {self.stream: last_id},
+            count=self.batch_size, block=self.block_ms if last_id == '>' else None
+        )
+        messages = []
+        for _, entries in response or []:
+            # Deleted entries in the pending list come back with empty fields
+            messages.extend((msg_id, fields) for msg_id, fields in entries if fields or not skip_deleted)
+        return messages
+    
+    async def _reclaim(self):
+        """Take over entries whose consumer stopped acknowledging (one XAUTOCLAIM page)"""
+        response = await self.redis_client.xautoclaim(
+            self.stream, self.group, self.consumer,
+            min_idle_time=self.claim_idle_ms, start_id=self._claim_cursor, count=self.batch_size
+        )
+        self._claim_cursor = response[0] or '0-0'
+        messages = [(msg_id, fields) for msg_id, fields in response[1] if fields]
+        if messages:
+            self.stats['reclaimed'] += len(messages)
+            logger.warning(f"♻️ {self.consumer} reclaimed {len(messages)} idle entries from {self.stream}")
+            await self._handle_batch(messages, check_deliveries=True)
+    
+    async def _delivery_count(self, msg_id: str) -> int:
+        pending = await self.redis_client.xpending_range(self.stream, self.group, msg_id, msg_id, 1)
+        return pending[0]['times_delivered'] if pending else 0
+    
+    async def _handle_batch(self, messages: list, check_deliveries: bool = False):
+        for msg_id, fields in messages:
+            if check_deliveries:
+                deliveries = await self._delivery_count(msg_id)
+                if deliveries > self.max_deliveries:
+                    await self._dead_letter(msg_id, fields)
+                    continue
+                # Handlers see redeliveries (previous consumer may have died mid-way)
+                fields = {**fields, '_deliveries': deliveries}
+            try:
+                await self.handler(fields)
+            except Exception as e:
+                # Not acked: stays pending and is reclaimed after claim_idle_ms
+                self.stats['failed'] += 1
+                logger.error(f"❌ {self.stream} entry {msg_id} failed on {self.consumer}: {e}")
+                continue
+            await self.redis_client.xack(self.stream, self.group, msg_id)
+            self.stats['processed'] += 1
+    
+    async def _dead_letter(self, msg_id: str, fields: dict):
+        logger.error(f"☠️ {self.stream} entry {msg_id} exceeded {self.max_deliveries} deliveries - dead-lettered")
+        if self.dead_letter_handler:
+            try:
+                await self.dead_letter_handler(fields)
+            except Exception as e:
+                logger.error(f"❌ Dead-letter handler failed for {msg_id}: {e}")
+        async with self.redis_client.pipeline(transaction=True) as pipe:
+            pipe.xadd(f"{self.stream}:dead", {**fields, "original_id": msg_id})
+            pipe.xack(self.stream, self.group, msg_id)
+            await pipe.execute()
+        self.stats['dead_lettered'] += 1
+
 class StableTradingSystem:
     """Main system coordinator"""
     
-    def __init__(self):
+    # Listing fan-out: SQL IN-list / Redis pipeline chunk size
+    FANOUT_CHUNK_SIZE = 500
+    
+    def __init__(self, role: str = "all"):
         self.running = True
+        self.role = role  # 'all': full system, 'worker': order workers only (scale out)
+        self.listings_stream = LISTINGS_STREAM
+        self.pending_orders_stream = PENDING_ORDERS_STREAM
+        # Consumer names must be unique per worker across hosts; set CONSUMER_NAME for a
+        # stable name so a restarted worker resumes its own pending entries immediately
+        self.consumer_name = os.getenv('CONSUMER_NAME', f"{socket.gethostname()}-{os.getpid()}")
+        self.order_workers = int(os.getenv('ORDER_WORKERS', '4'))
+        self.claim_idle_ms = int(os.getenv('STREAM_CLAIM_IDLE_MS', '60000'))
+        self.consumers: List[StreamConsumer] = []
         self.redis_client = None
+        self.http_session: Optional[ClientSession] = None
+        self._bitget_contracts: Dict[str, Dict] = {}
         self.db_manager = DatabaseManager()
         self.upbit_monitor = None
         self.telegram_bot = None
@@ -451,16 +644,26 @@ class StableTradingSystem:
             logger.info("🚀 STABLE TRADING SYSTEM STARTING")
             
             # Initialize Redis
-            self.redis_client = redis.Redis.from_url(
-                os.getenv('REDIS_URL', 'redis://localhost:6379'), 
-                decode_responses=True
-            )
+            self.redis_client = create_redis_client(os.getenv('REDIS_URL', 'redis://localhost:6379'))
             await self.redis_client.ping()
             logger.info("✅ Redis connected")
             
+            # One keep-alive session for all order workers
+            self.http_session = ClientSession(timeout=aiohttp.ClientTimeout(total=10))
+            
             # Initialize database
             await self.db_manager.initialize()
             
+            # Consumer groups exist before anything is published, so no entry is missed
+            self.consumers = self._create_consumers()
+            for consumer in self.consumers:
+                await consumer.ensure_group()
+            
+            if self.role == "worker":
+                logger.info(f"🏭 ORDER WORKER RUNNING ({self.order_workers} consumers as {self.consumer_name})")
+                await asyncio.gather(self._run_consumers(), self._health_check_loop())
+                return
+            
             # Initialize components
             self.upbit_monitor = UpbitMonitor(self.redis_client, self.db_manager)
             await self.upbit_monitor.start()
@@ -484,7 +687,7 @@ class StableTradingSystem:
             # Start async tasks
             tasks = [
                 self._run_telegram_bot(),
-                self._process_trade_requests(),
+                self._run_consumers(),
                 self._health_check_loop()
             ]
             
@@ -507,27 +710,134 @@ class StableTradingSystem:
             await asyncio.sleep(5)
             await self._run_telegram_bot()
     
-    async def _process_trade_requests(self):
-        """Process trading requests from Redis streams"""
-        while self.running:
-            try:
-                # Process new listings
-                if not self.redis_client:
-                    await asyncio.sleep(5)
-                    continue
-                messages = await self.redis_client.xread(
-                    {"upbit:new_listings": "$"}, 
-                    count=10, 
-                    block=1000
-                )
-                
-                for stream, msgs in messages:
-                    for msg_id, fields in msgs:
-                        await self._handle_new_listing(fields)
-                
-            except Exception as e:
-                logger.error(f"❌ Trade processing error: {e}")
-                await asyncio.sleep(5)
+    def _create_consumers(self) -> List[StreamConsumer]:
+        """Listing consumer (full system only) + ORDER_WORKERS order consumers"""
+        consumers = []
+        if self.role == "all":
+            consumers.append(StreamConsumer(
+                self.redis_client, self.listings_stream, LISTINGS_GROUP,
+                f"{self.consumer_name}-listings", self._handle_new_listing,
+                claim_idle_ms=self.claim_idle_ms
+            ))
+        for i in range(self.order_workers):
+            consumers.append(StreamConsumer(
+                self.redis_client, self.pending_orders_stream, ORDERS_GROUP,
+                f"{self.consumer_name}-orders-{i}", self._handle_pending_order,
+                dead_letter_handler=self._fail_pending_order,
+                claim_idle_ms=self.claim_idle_ms
+            ))
+        return consumers
+    
+    async def _run_consumers(self):
+        """Process listings and pending orders from Redis stream consumer groups"""
+        await asyncio.gather(*(consumer.run(lambda: self.running) for consumer in self.consumers))
+    
+    async def _handle_pending_order(self, order: dict):
+        """
+        Execute one queued order. Idempotent: only a 'pending' task is claimed, so a
+        duplicate entry is skipped. A redelivered entry (its consumer stopped acking)
+        may also retry a task left 'processing'; the order is then looked up by its
+        clientOid before anything is placed.
+        Rejected orders fail the task and are acked; transient errors (network, 5xx, 429)
+        propagate, so the entry stays pending and is retried via XAUTOCLAIM.
+        """
+        task_id = order['task_id']
+        redelivered = int(order.get('_deliveries', 1)) > 1
+        claimable = ('pending', 'processing') if redelivered else ('pending',)
+        async with self.db_manager.pool.connection() as db:
+            cursor = await db.execute(f"""
+                UPDATE trading_tasks SET status = 'processing'
+                WHERE id = ? AND status IN ({','.join('?' * len(claimable))})
+            """, (task_id, *claimable))
+            await db.commit()
+        if cursor.rowcount == 0:
+            logger.info(f"⏭️ Task {task_id[:8]} already claimed or finished - skipping")
+            return
+        
+        try:
+            placed = await self._execute_order(task_id, int(order['user_id']), order['token'], order['action'],
+                                               redelivered=redelivered)
+        except OrderRejected as e:
+            async with self.db_manager.pool.connection() as db:
+                await db.execute("""
+                    UPDATE trading_tasks SET status = 'failed', error_message = ?, completed_at = ?
+                    WHERE id = ?
+                """, (str(e)[:500], datetime.now(timezone.utc), task_id))
+                await db.commit()
+            logger.error(f"❌ Trade {task_id[:8]} rejected: {e}")
+            return
+        
+        async with self.db_manager.pool.connection() as db:
+            await db.execute("""
+                UPDATE trading_tasks SET status = 'completed', order_id = ?, completed_at = ?
+                WHERE id = ?
+            """, ((placed or {}).get('orderId'), datetime.now(timezone.utc), task_id))
+            await db.commit()
+        logger.info(f"✅ Trade {task_id[:8]} completed")
+    
+    async def _bitget_contract(self, client: BitgetClient, symbol: str) -> Optional[Dict]:
+        """Contract specs from the cached catalog (refreshed once when a new listing is missing)"""
+        if symbol not in self._bitget_contracts:
+            contracts = await client.list_contracts()
+            self._bitget_contracts = {c['symbol']: c for c in contracts or [] if c.get('quoteCoin') == 'USDT'}
+        return self._bitget_contracts.get(symbol)
+    
+    async def _execute_order(self, task_id: str, user_id: int, token: str, action: str,
+                             redelivered: bool = False) -> Dict:
+        """
+        Place the order on Bitget with the user's credentials and settings.
+        The task id is the clientOid: a redelivered task (an earlier attempt may have timed
+        out after the POST reached Bitget) finds that order instead of placing a second one.
+        """
+        if action != 'open':
+            raise OrderRejected(f"Unsupported action '{action}'")
+        credentials = await self.db_manager.get_user_credentials(user_id)
+        if not credentials:
+            raise OrderRejected("No Bitget API credentials")
+        async with self.db_manager.pool.connection() as db:
+            cursor = await db.execute(
+                "SELECT leverage, trade_amount FROM user_settings WHERE user_id = ?", (user_id,))
+            settings = await cursor.fetchone()
+        if not settings:
+            raise OrderRejected("No trading settings")
+        leverage, trade_amount = settings
+        
+        client = BitgetClient(self.http_session, BitgetCredentials(
+            credentials['api_key'], credentials['secret_key'], credentials['passphrase'], user_id=str(user_id)))
+        symbol = f"{token}USDT"
+        try:
+            if redelivered:
+                existing = await client.find_order(symbol, task_id)
+                if existing:
+                    logger.warning(f"♻️ Trade {task_id[:8]} already placed as {existing.get('orderId')} - not re-sending")
+                    return existing
+            contract = await self._bitget_contract(client, symbol)
+            if contract is None:
+                raise OrderRejected(f"{symbol} is not listed on Bitget")
+            await client.set_leverage(symbol, leverage)
+            ticker = await client.get_ticker(symbol)
+            size = size_from_notional(contract, trade_amount, float(ticker['lastPr']))
+            if size <= 0:
+                raise OrderRejected(f"{symbol}: {trade_amount} USDT is below the minimum order size")
+            placed = await client.place_market_order(symbol, size, client_oid=task_id)
+        except BitgetAPIError as e:
+            # 4xx (except rate limit) is an explicit reject; 5xx / 429 may succeed on retry
+            if 400 <= e.status < 500 and e.status != 429:
+                raise OrderRejected(f"Bitget rejected {symbol}: {e}") from e
+            raise
+        logger.info(f"💰 Order placed: {action} {size} {symbol} at {leverage}x for user {user_id} "
+                    f"(order {placed.get('orderId')})")
+        return placed
+    
+    async def _fail_pending_order(self, order: dict):
+        """Dead-lettered order: mark the task failed"""
+        async with self.db_manager.pool.connection() as db:
+            await db.execute("""
+                UPDATE trading_tasks 
+                SET status = 'failed', error_message = 'Exceeded max stream deliveries', completed_at = ?
+                WHERE id = ? AND status IN ('pending', 'processing')
+            """, (datetime.now(timezone.utc), order['task_id']))
+            await db.commit()
     
     async def _handle_new_listing(self, listing_data: dict):
         """Handle new token listing"""
@@ -536,53 +846,89 @@ class StableTradingSystem:
         
         logger.info(f"🎯 Processing new listing: {token}")
         
-        # Get all users with auto-trading enabled
-        async with aiosqlite.connect(self.db_manager.db_path) as db:
+        # Get all users with auto-trading enabled (single query)
+        async with self.db_manager.pool.connection() as db:
             cursor = await db.execute("""
                 SELECT u.user_id FROM users u
                 JOIN user_settings s ON u.user_id = s.user_id
                 WHERE s.auto_trading = true
             """)
-            users = await cursor.fetchall()
+            user_ids = [row[0] for row in await cursor.fetchall()]
+        
+        tasks = await self._create_trade_tasks(user_ids, token, announcement_id)
+        await self._queue_trade_tasks(tasks, token)
+        
+        logger.info(f"📝 Queued {len(tasks)} trade tasks for {token} ({len(user_ids) - len(tasks)} duplicates skipped)")
+    
+    async def _create_trade_tasks(self, user_ids: List[int], token: str, announcement_id: str) -> List[Dict]:
+        """
+        Create idempotency keys and trade tasks for all users in one transaction.
+        Returns the tasks to queue: newly created ones, plus ones from an earlier delivery
+        of this listing that are still 'pending' (crash between commit and XADD).
+        """
+        candidates = [{
+            'task_id': str(uuid.uuid4()),
+            'user_id': user_id,
+            'idempotency_key': f"{user_id}:{token}:{announcement_id}",
+        } for user_id in user_ids]
+        if not candidates:
+            return []
         
-        # Create trade tasks for each user
-        for (user_id,) in users:
-            task_id = str(uuid.uuid4())
-            idempotency_key = f"{user_id}:{token}:{announcement_id}"
+        async with self.db_manager.pool.connection() as db:
+            # BEGIN IMMEDIATE: existing-key check and inserts are atomic against other writers
+            await db.execute("BEGIN IMMEDIATE")
             
-            # Check idempotency
-            async with aiosqlite.connect(self.db_manager.db_path) as db:
-                cursor = await db.execute(
-                    "SELECT key FROM idempotency_keys WHERE key = ?",
-                    (idempotency_key,)
-                )
-                if await cursor.fetchone():
-                    continue  # Skip duplicate
-                
-                # Store idempotency key and task
-                await db.execute("""
-                    INSERT INTO idempotency_keys (key, user_id, task_id)
-                    VALUES (?, ?, ?)
-                """, (idempotency_key, user_id, task_id))
-                
-                await db.execute("""
-                    INSERT INTO trading_tasks 
-                    (id, user_id, announcement_id, token_symbol, action, status)
-                    VALUES (?, ?, ?, ?, 'open', 'pending')
-                """, (task_id, user_id, announcement_id, token))
-                
-                await db.commit()
+            existing = set()
+            requeue = []
+            keys = [task['idempotency_key'] for task in candidates]
+            for i in range(0, len(keys), self.FANOUT_CHUNK_SIZE):
+                chunk = keys[i:i + self.FANOUT_CHUNK_SIZE]
+                cursor = await db.execute(f"""
+                    SELECT k.key, k.user_id, k.task_id, t.status
+                    FROM idempotency_keys k LEFT JOIN trading_tasks t ON t.id = k.task_id
+                    WHERE k.key IN ({','.join('?' * len(chunk))})
+                """, chunk)
+                for key, user_id, task_id, status in await cursor.fetchall():
+                    existing.add(key)
+                    if status == 'pending':
+                        requeue.append({'task_id': task_id, 'user_id': user_id, 'idempotency_key': key})
             
-            # Queue for processing
-            if self.redis_client:
-                await self.redis_client.xadd("trading:pending_orders", {
-                "task_id": task_id,
-                "user_id": user_id,
-                "token": token,
-                "action": "open"
-            })
+            tasks = [task for task in candidates if task['idempotency_key'] not in existing]
             
-            logger.info(f"📝 Queued trade task for user {user_id}: {token}")
+            await db.executemany("""
+                INSERT INTO idempotency_keys (key, user_id, task_id)
+                VALUES (?, ?, ?)
+                ON CONFLICT(key) DO NOTHING
+            """, [(task['idempotency_key'], task['user_id'], task['task_id']) for task in tasks])
+            
+            await db.executemany("""
+                INSERT INTO trading_tasks 
+                (id, user_id, announcement_id, token_symbol, action, status)
+                VALUES (?, ?, ?, ?, 'open', 'pending')
+                ON CONFLICT(id) DO NOTHING
+            """, [(task['task_id'], task['user_id'], announcement_id, token) for task in tasks])
+            
+            await db.commit()
+        
+        if requeue:
+            logger.warning(f"♻️ Re-queueing {len(requeue)} pending tasks from an earlier delivery of {announcement_id}")
+        return tasks + requeue
+    
+    async def _queue_trade_tasks(self, tasks: List[Dict], token: str):
+        """Queue trade tasks with pipelined XADD (one round trip per chunk)"""
+        if not self.redis_client or not tasks:
+            return
+        
+        for i in range(0, len(tasks), self.FANOUT_CHUNK_SIZE):
+            async with self.redis_client.pipeline(transaction=False) as pipe:
+                for task in tasks[i:i + self.FANOUT_CHUNK_SIZE]:
+                    pipe.xadd(self.pending_orders_stream, {
+                        "task_id": task['task_id'],
+                        "user_id": task['user_id'],
+                        "token": token,
+                        "action": "open"
+                    })
+                await pipe.execute()
     
     async def _health_check_loop(self):
         """System health monitoring"""
@@ -593,7 +939,12 @@ class StableTradingSystem:
                     await self.redis_client.ping()
                 
                 # Log system status
-                logger.info("💚 System healthy - all components running")
+                consumer_stats = {}
+                for consumer in self.consumers:
+                    totals = consumer_stats.setdefault(consumer.stream, dict.fromkeys(consumer.stats, 0))
+                    for key, value in consumer.stats.items():
+                        totals[key] += value
+                logger.info(f"💚 System healthy - all components running | streams: {consumer_stats}")
                 
                 await asyncio.sleep(60)  # Check every minute
                 
@@ -613,16 +964,26 @@ class StableTradingSystem:
             await self.upbit_monitor.stop()
         
         if self.redis_client:
-            await self.redis_client.close()
+            await self.redis_client.aclose()
+        
+        if self.http_session:
+            await self.http_session.close()
+        
+        await self.db_manager.close()
         
         logger.info("✅ System stopped gracefully")
 
 async def main():
     """Main entry point"""
+    parser = argparse.ArgumentParser(description="Stable trading system")
+    parser.add_argument('--role', choices=['all', 'worker'], default='all',
+                        help="'worker' runs only order consumers (run several, on any host)")
+    args = parser.parse_args()
+    
     # Ensure logs directory exists
     Path("logs").mkdir(exist_ok=True)
     
-    system = StableTradingSystem()
+    system = StableTradingSystem(role=args.role)
     try:
         await system.start()
     except KeyboardInterrupt: